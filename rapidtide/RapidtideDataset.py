@@ -19,6 +19,7 @@
 import copy
 import os
 import sys
+import threading
 from typing import Any, Callable
 
 import nibabel as nib
@@ -29,6 +30,7 @@ import rapidtide.filter as tide_filt
 import rapidtide.io as tide_io
 import rapidtide.miscmath as tide_math
 import rapidtide.stats as tide_stats
+import rapidtide.statscache as tide_statscache
 import rapidtide.util as tide_util
 from rapidtide.Colortables import *
 from rapidtide.stats import neglogpfromr_interpolator
@@ -40,6 +42,28 @@ atlases = {
     "JHU2": {"atlasname": "JHU-ArterialTerritoriesNoVent-LVL2"},
 }
 
+# Overlay attributes that are not available until the data of a lazy overlay has been read
+_DEFERREDATTRIBUTES = {
+    "data",
+    "maskeddata",
+    "mask",
+    "funcmask",
+    "geommask",
+    "minval",
+    "maxval",
+    "robustmin",
+    "pct25",
+    "pct50",
+    "pct75",
+    "robustmax",
+    "quartiles",
+    "histx",
+    "histy",
+    "dispmin",
+    "dispmax",
+    "maskedcount",
+}
+
 
 def check_rt_spatialmatch(dataset1: Any, dataset2: Any) -> tuple[bool, bool, bool, bool]:
     """
@@ -357,6 +381,8 @@ class Overlay:
         isaMask: bool = False,
         init_LUT: bool = True,
         verbose: int = 1,
+        lazy: bool = False,
+        statscache: bool = False,
     ) -> None:
         """
         Initialize an overlay object for rapidtide image data visualization.
@@ -397,6 +423,15 @@ class Overlay:
             If True, initializes the lookup table. Default is True.
         verbose : int, optional
             Verbosity level. Default is 1.
+        lazy : bool, optional
+            If True, only read the header now.  The voxel data is read, masked, and its
+            statistics calculated the first time a data dependent attribute (``data``,
+            ``maskeddata``, ``minval``, ``histy``, ...) is used, or when ``load`` is called.
+            Default is False.
+        statscache : bool, optional
+            If True, keep the statistics of the masked data in a sidecar file next to the
+            image, keyed on the mask, and reuse them as long as the image is unchanged.
+            Default is False.
 
         Returns
         -------
@@ -413,6 +448,9 @@ class Overlay:
         5. Determines the spatial coordinate system and affine transformation matrix.
         6. Determines the orientation (neurological or radiological) based on the affine matrix.
 
+        For a lazy overlay, steps 1-3 are deferred until the data is first needed.  Masks set
+        before then are recorded and applied when the data is loaded.
+
         Examples
         --------
         >>> overlay = Overlay(
@@ -437,15 +475,28 @@ class Overlay:
             print("reading map ", self.name, " from ", self.filename, "...")
         self.maskhash = 0
         self.invertonload = invertonload
-        self.readImageData(isaMask=isaMask)
-        self.mask = None
-        self.maskeddata = None
-        self.setFuncMask(funcmask, maskdata=False)
-        self.setGeomMask(geommask, maskdata=False)
-        self.maskData()
-        self.updateStats()
-        self.dispmin = self.robustmin
-        self.dispmax = self.robustmax
+        self.isaMask = isaMask
+        self.lazy = lazy
+        self.statscache = statscache
+        self._statsfile = None
+        self._datasource = None
+        self._datafromfile = False
+        self._loadlock = threading.RLock()
+        self._loading = False
+        self._loaded = not self.lazy
+        if self.lazy:
+            self._pendingfuncmask = funcmask
+            self._pendinggeommask = geommask
+            self.readImageHeader()
+        else:
+            self.readImageData(isaMask=isaMask)
+            self.mask = None
+            self.maskeddata = None
+            self.setFuncMask(funcmask, maskdata=False)
+            self.setGeomMask(geommask, maskdata=False)
+            self.maskData()
+            self.dispmin = self.robustmin
+            self.dispmax = self.robustmax
         if init_LUT:
             self.gradient = getagradient()
             self.lut_state = lut_state
@@ -493,6 +544,10 @@ class Overlay:
         self.zcoord = 0.0
         self.tcoord = 0.0
 
+        if not self._loaded:
+            if self.verbose > 1:
+                print("Overlay initialized:", self.name, self.filename, "(data deferred)")
+            return
         if self.verbose > 1:
             print(
                 "Overlay initialized:",
@@ -506,6 +561,93 @@ class Overlay:
         if self.verbose > 0:
             self.summarize()
 
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes that have not been set - on a lazy overlay, the data
+        # dependent ones appear once the data is loaded
+        if (name in _DEFERREDATTRIBUTES) and not self.__dict__.get("_loaded", True):
+            self.load()
+            try:
+                return self.__dict__[name]
+            except KeyError:
+                pass
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def isloaded(self) -> bool:
+        """
+        Report whether the overlay data has been read.
+
+        Returns
+        -------
+        bool
+            False for a lazy overlay whose data has not been needed yet, True otherwise.
+        """
+        return self._loaded
+
+    def load(self) -> None:
+        """
+        Read, mask, and calculate the statistics of the data of a lazy overlay.
+
+        This is called automatically the first time a data dependent attribute is used.  It
+        is safe to call from a background thread - other threads that need the data wait
+        for the load to finish.  Calling it on an overlay that is already loaded does nothing.
+
+        Returns
+        -------
+        None
+
+        Notes
+        -----
+        Masks, data sources, and display limits that were set before the data was loaded are
+        applied here.  Display limits that were not set default to the robust range of the data
+        with those masks applied.
+
+        Examples
+        --------
+        >>> overlay = Overlay("lagtimes", "sub-01_desc-maxtime_map.nii.gz", "sub-01", lazy=True)
+        >>> overlay.isloaded()
+        False
+        >>> overlay.load()
+        >>> overlay.isloaded()
+        True
+        """
+        if self._loaded:
+            return
+        with self._loadlock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+            try:
+                if self.verbose > 1:
+                    print("reading deferred data for", self.name)
+                if self._datasource is None:
+                    self.data = self.nim.get_fdata()
+                    self._preparedata(self.isaMask)
+                    self._datafromfile = True
+                else:
+                    datafunc, isaMask = self._datasource
+                    self.data = datafunc()
+                    if isaMask:
+                        self.data[np.where(self.data < 0.5)] = 0.0
+                        self.data[np.where(self.data > 0.5)] = 1.0
+                    self._datafromfile = False
+                self.mask = None
+                self.maskeddata = None
+                # masks that were assigned directly take precedence over pending ones
+                if "funcmask" not in self.__dict__:
+                    self.setFuncMask(self._pendingfuncmask, maskdata=False)
+                if "geommask" not in self.__dict__:
+                    self.setGeomMask(self._pendinggeommask, maskdata=False)
+                self.maskData()
+                if "dispmin" not in self.__dict__:
+                    self.dispmin = self.robustmin
+                if "dispmax" not in self.__dict__:
+                    self.dispmax = self.robustmax
+                self._loaded = True
+            finally:
+                self._loading = False
+        if self.verbose > 0:
+            self.summarize()
+
     def duplicate(self, newname: str, newlabel: str, init_LUT: bool = True) -> Any:
         """
         Create a duplicate of the current overlay with new name and label.
@@ -541,16 +683,21 @@ class Overlay:
         >>> print(new_overlay.label)
         'Copy Label'
         """
+        if self._loaded:
+            funcmask, geommask = self.funcmask, self.geommask
+        else:
+            funcmask, geommask = self._pendingfuncmask, self._pendinggeommask
         return Overlay(
             newname,
             self.filename,
             self.namebase,
-            funcmask=self.funcmask,
-            geommask=self.geommask,
+            funcmask=funcmask,
+            geommask=geommask,
             label=newlabel,
             report=self.report,
             init_LUT=init_LUT,
             verbose=self.verbose,
+            lazy=self.lazy,
         )
 
     def updateStats(self) -> None:
@@ -579,6 +726,11 @@ class Overlay:
         - Robust statistics (0.02, 0.25, 0.5, 0.75, 0.98 percentiles)
         - Histogram data with 200 bins
         - Quartiles (25th, 50th, 75th percentiles)
+        - The number of values included (``maskedcount``)
+
+        If the overlay was created with ``statscache=True`` and its data comes straight from
+        the image file, the results are looked up in, and saved to, the statistics cache of
+        the file (see ``rapidtide.statscache``).
 
         Examples
         --------
@@ -586,8 +738,31 @@ class Overlay:
         >>> print(obj.minval, obj.maxval)
         >>> print(obj.quartiles)
         """
+        statskey = None
+        if self.statscache and self._datafromfile:
+            if self._statsfile is None:
+                self._statsfile = tide_statscache.StatsCache(self.filename, verbose=self.verbose)
+            statskey = self._statsfile.makekey(
+                "overlay",
+                self.mask,
+                invertonload=self.invertonload,
+                isaMask=self.isaMask,
+                filevals=self.filevals,
+            )
+            thestats = self._statsfile.get(statskey)
+            if thestats is not None:
+                try:
+                    self._setstats(thestats)
+                except (KeyError, TypeError, ValueError):
+                    pass
+                else:
+                    if self.verbose > 1:
+                        print(self.name, ": using cached statistics")
+                    return
+
         calcmaskeddata = self.data[np.where(self.mask != 0)]
 
+        self.maskedcount = calcmaskeddata.size
         self.minval = calcmaskeddata.min()
         self.maxval = calcmaskeddata.max()
         (
@@ -612,6 +787,35 @@ class Overlay:
                 self.robustmax,
                 self.quartiles,
             )
+        if statskey is not None:
+            self._statsfile.put(statskey, self._getstats())
+
+    def _getstats(self) -> dict:
+        return {
+            "dtype": str(self.data.dtype),
+            "maskedcount": self.maskedcount,
+            "minval": self.minval.item(),
+            "maxval": self.maxval.item(),
+            "fracvals": [self.robustmin, self.pct25, self.pct50, self.pct75, self.robustmax],
+            "histx": self.histx.tolist(),
+            "histy": self.histy.tolist(),
+        }
+
+    def _setstats(self, thestats: dict) -> None:
+        thetype = np.dtype(thestats["dtype"]).type
+        self.maskedcount = int(thestats["maskedcount"])
+        self.minval = thetype(thestats["minval"])
+        self.maxval = thetype(thestats["maxval"])
+        (
+            self.robustmin,
+            self.pct25,
+            self.pct50,
+            self.pct75,
+            self.robustmax,
+        ) = [float(theval) for theval in thestats["fracvals"]]
+        self.histx = np.asarray(thestats["histx"], dtype=np.float64)
+        self.histy = np.asarray(thestats["histy"], dtype=np.int64)
+        self.quartiles = [self.pct25, self.pct50, self.pct75]
 
     def setData(self, data: NDArray, isaMask: bool = False) -> None:
         """
@@ -645,12 +849,66 @@ class Overlay:
         >>> obj.setData(np.array([0.2, 0.7, 0.3, 0.8]))
         >>> obj.setData(np.array([0.2, 0.7, 0.3, 0.8]), isaMask=True)
         """
+        if not self._loaded:
+            with self._loadlock:
+                if not (self._loaded or self._loading):
+                    thedata = data.copy()
+                    self._datasource = (lambda: thedata, isaMask)
+                    return
+        self._datafromfile = False
         self.data = data.copy()
         if isaMask:
             self.data[np.where(self.data < 0.5)] = 0.0
             self.data[np.where(self.data > 0.5)] = 1.0
         self.updateStats()
 
+    def setDataSource(self, datafunc: Callable[[], NDArray], isaMask: bool = False) -> None:
+        """
+        Replace the data with the output of a function, called when the data is needed.
+
+        On an overlay that is already loaded this is the same as
+        ``setData(datafunc(), isaMask=isaMask)``.  On a lazy overlay that has not been loaded,
+        neither the image file nor ``datafunc`` is read until the data is first used.
+
+        Parameters
+        ----------
+        datafunc : callable
+            Function with no arguments that returns a new array with the overlay's shape.
+        isaMask : bool, optional
+            If True, binarize the data at 0.5, as in ``setData``.  Default is False.
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> pmask.setDataSource(lambda: np.where(neglog10p.data > 1.3, 1.0, 0.0), isaMask=True)
+        """
+        if not self._loaded:
+            with self._loadlock:
+                if not (self._loaded or self._loading):
+                    self._datasource = (datafunc, isaMask)
+                    return
+        self.setData(datafunc(), isaMask=isaMask)
+
+    def readImageHeader(self) -> None:
+        """
+        Read the header of the overlay file, without reading the voxel data.
+
+        Sets the same header derived attributes as ``readImageData``: `nim`, `header`,
+        `dims`, `sizes`, `xdim`, `ydim`, `zdim`, `tdim`, `xsize`, `ysize`, `zsize`, `tr`,
+        and `toffset`.
+
+        Returns
+        -------
+        None
+        """
+        self.nim, dummy, self.header, self.dims, self.sizes = tide_io.readfromnifti(
+            self.filename, headeronly=True
+        )
+        self._parseheader()
+
     def readImageData(self, isaMask: bool = False) -> None:
         """
         Read image data from a NIfTI file and process it based on specified flags.
@@ -697,6 +955,13 @@ class Overlay:
         self.nim, self.data, self.header, self.dims, self.sizes = tide_io.readfromnifti(
             self.filename
         )
+        self._datafromfile = True
+        self._preparedata(isaMask)
+        if self.verbose > 1:
+            print("header", self.header)
+        self._parseheader()
+
+    def _preparedata(self, isaMask: bool) -> None:
         if self.invertonload:
             self.data *= -1.0
         if isaMask:
@@ -710,7 +975,8 @@ class Overlay:
                 self.data = np.where(tempmask > 0, 1, 0)
         if self.verbose > 1:
             print("Overlay data range:", np.min(self.data), np.max(self.data))
-            print("header", self.header)
+
+    def _parseheader(self) -> None:
         self.xdim, self.ydim, self.zdim, self.tdim = tide_io.parseniftidims(self.dims)
         self.xsize, self.ysize, self.zsize, self.tr = tide_io.parseniftisizes(self.sizes)
         self.toffset = self.header["toffset"]
@@ -996,6 +1262,12 @@ class Overlay:
         >>> obj.setFuncMask(np.ones((10, 10)))
         >>> obj.setFuncMask(None, maskdata=False)
         """
+        if not self._loaded:
+            with self._loadlock:
+                if not (self._loaded or self._loading):
+                    self._pendingfuncmask = funcmask
+                    self.__dict__.pop("funcmask", None)
+                    return
         self.funcmask = funcmask
         if self.funcmask is None:
             if self.tdim == 1:
@@ -1036,6 +1308,12 @@ class Overlay:
         >>> obj.setGeomMask(None)
         >>> obj.setGeomMask(mask_array, maskdata=False)
         """
+        if not self._loaded:
+            with self._loadlock:
+                if not (self._loaded or self._loading):
+                    self._pendinggeommask = geommask
+                    self.__dict__.pop("geommask", None)
+                    return
         self.geommask = geommask
         if self.geommask is None:
             if self.tdim == 1:
@@ -1395,6 +1673,9 @@ class RapidtideDataset:
         offsettime: float = 0.0,
         init_LUT: bool = True,
         verbose: int = 0,
+        lazy: bool = False,
+        statscache: bool = False,
+        backgroundload: bool = True,
     ) -> None:
         """
         Initialize a RapidtideDataset object for processing neuroimaging data.
@@ -1439,6 +1720,16 @@ class RapidtideDataset:
             Whether to initialize lookup tables. Default is True.
         verbose : int, optional
             Verbosity level. Default is 0.
+        lazy : bool, optional
+            If True, only read the image headers now, and read each overlay's data the first
+            time it is used (see ``Overlay``).  Default is False.
+        statscache : bool, optional
+            If True, cache overlay statistics in sidecar files next to the images.  Default is
+            False.
+        backgroundload : bool, optional
+            If True and ``lazy`` is set, start reading the overlay data in a background
+            thread as soon as the dataset is set up.  If False, call ``startbackgroundload``
+            when ready.  Default is True.
 
         Returns
         -------
@@ -1477,6 +1768,9 @@ class RapidtideDataset:
         self.coordinatespace = coordinatespace
         self.offsettime = offsettime
         self.init_LUT = init_LUT
+        self.lazy = lazy
+        self.statscache = statscache
+        self.loadthread = None
         self.referencedir = tide_util.findreferencedir()
 
         # check which naming style the dataset has
@@ -1499,6 +1793,8 @@ class RapidtideDataset:
 
         self.setupregressors()
         self.setupoverlays()
+        if self.lazy and backgroundload:
+            self.startbackgroundload()
 
     def _loadregressors(self) -> None:
         """
@@ -1646,6 +1942,8 @@ class RapidtideDataset:
                     report=True,
                     invertonload=invertthismap,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if xdim == 0:
                     xdim = self.overlays[mapname].xdim
@@ -1738,6 +2036,8 @@ class RapidtideDataset:
                     init_LUT=self.init_LUT,
                     isaMask=True,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 self.loadedfuncmasks.append(maskname)
             else:
@@ -1793,8 +2093,11 @@ class RapidtideDataset:
             self.overlays[maskname] = self.overlays[self.loadedfuncmasks[-1]].duplicate(
                 maskname, None, self.init_LUT
             )
-            self.overlays[maskname].setData(
-                np.where(self.overlays["neglog10p"].data > nlpthresh, 1.0, 0.0), isaMask=True
+            self.overlays[maskname].setDataSource(
+                lambda nlpthresh=nlpthresh: np.where(
+                    self.overlays["neglog10p"].data > nlpthresh, 1.0, 0.0
+                ),
+                isaMask=True,
             )
             self.loadedfuncmasks.append(maskname)
         if self.verbose > 1:
@@ -1845,6 +2148,8 @@ class RapidtideDataset:
                     init_LUT=self.init_LUT,
                     isaMask=True,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", self.geommaskname, " as geometric mask")
@@ -1879,6 +2184,8 @@ class RapidtideDataset:
                     init_LUT=self.init_LUT,
                     isaMask=True,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", self.geommaskname, " as background")
@@ -1949,6 +2256,8 @@ class RapidtideDataset:
                     thebase,
                     init_LUT=self.init_LUT,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", self.anatname, " as background")
@@ -1968,6 +2277,8 @@ class RapidtideDataset:
                 thebase,
                 init_LUT=self.init_LUT,
                 verbose=self.verbose,
+                lazy=self.lazy,
+                statscache=self.statscache,
             )
             if self.verbose > 1:
                 print("using ", self.fileroot + "highres_head.nii.gz", " as background")
@@ -1983,6 +2294,8 @@ class RapidtideDataset:
                 thebase,
                 init_LUT=self.init_LUT,
                 verbose=self.verbose,
+                lazy=self.lazy,
+                statscache=self.statscache,
             )
             if self.verbose > 1:
                 print("using ", self.fileroot + "highres.nii.gz", " as background")
@@ -2006,6 +2319,8 @@ class RapidtideDataset:
                     "MNI152",
                     init_LUT=self.init_LUT,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", mniname, " as background")
@@ -2035,6 +2350,8 @@ class RapidtideDataset:
                     "MNI152NLin2009cAsym",
                     init_LUT=self.init_LUT,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", mniname, " as background")
@@ -2052,6 +2369,8 @@ class RapidtideDataset:
                 thebase,
                 init_LUT=self.init_LUT,
                 verbose=self.verbose,
+                lazy=self.lazy,
+                statscache=self.statscache,
             )
             if self.verbose > 1:
                 print("using ", self.fileroot + "mean.nii.gz", " as background")
@@ -2065,6 +2384,8 @@ class RapidtideDataset:
                 thebase,
                 init_LUT=self.init_LUT,
                 verbose=self.verbose,
+                lazy=self.lazy,
+                statscache=self.statscache,
             )
             if self.verbose > 1:
                 print("using ", self.fileroot + "meanvalue.nii.gz", " as background")
@@ -2078,6 +2399,8 @@ class RapidtideDataset:
                 thebase,
                 init_LUT=self.init_LUT,
                 verbose=self.verbose,
+                lazy=self.lazy,
+                statscache=self.statscache,
             )
             if self.verbose > 1:
                 print(
@@ -2095,6 +2418,8 @@ class RapidtideDataset:
                 thebase,
                 init_LUT=self.init_LUT,
                 verbose=self.verbose,
+                lazy=self.lazy,
+                statscache=self.statscache,
             )
             if self.verbose > 1:
                 print(
@@ -2147,6 +2472,8 @@ class RapidtideDataset:
                     init_LUT=self.init_LUT,
                     isaMask=True,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", self.graymaskspec, " as gray matter mask")
@@ -2201,6 +2528,8 @@ class RapidtideDataset:
                     init_LUT=self.init_LUT,
                     isaMask=True,
                     verbose=self.verbose,
+                    lazy=self.lazy,
+                    statscache=self.statscache,
                 )
                 if self.verbose > 1:
                     print("using ", self.whitemaskspec, " as white matter mask")
@@ -2743,6 +3072,8 @@ class RapidtideDataset:
                         report=True,
                         init_LUT=self.init_LUT,
                         verbose=self.verbose,
+                        lazy=self.lazy,
+                        statscache=self.statscache,
                     )
                     self.overlays["atlasmask"] = Overlay(
                         "atlasmask",
@@ -2751,6 +3082,8 @@ class RapidtideDataset:
                         init_LUT=self.init_LUT,
                         report=True,
                         verbose=self.verbose,
+                        lazy=self.lazy,
+                        statscache=self.statscache,
                     )
                     self.allloadedmaps.append("atlas")
                     self.dispmaps.append("atlas")
@@ -2793,6 +3126,62 @@ class RapidtideDataset:
         """
         return self.overlays
 
+    def startbackgroundload(self) -> None:
+        """
+        Start reading the data of lazy overlays in a background thread.
+
+        Overlays are read in the order they are needed for the first view: the focus map,
+        the anatomic background, and the masks, then the remaining maps.  An overlay that is
+        used before the thread gets to it is read on the spot.  Does nothing if a background
+        load is already running.
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> thesubject = RapidtideDataset("main", fileroot, lazy=True, backgroundload=False)
+        >>> thesubject.startbackgroundload()
+        """
+        if (self.loadthread is not None) and self.loadthread.is_alive():
+            return
+        loadorder = []
+        for themap in [self.focusmap, "anatomic", "geommask", "lagmask"] + list(self.overlays):
+            if (themap in self.overlays) and (themap not in loadorder):
+                loadorder.append(themap)
+        self.loadthread = threading.Thread(
+            target=self._loadoverlays,
+            args=(loadorder,),
+            name=f"{self.name}_overlayloader",
+            daemon=True,
+        )
+        self.loadthread.start()
+
+    def _loadoverlays(self, mapnames: list[str]) -> None:
+        for themap in mapnames:
+            try:
+                self.overlays[themap].load()
+            except Exception as theexception:
+                # leave it unloaded - the error will be raised again when the map is used
+                if self.verbose > 0:
+                    print(f"background load of {themap} failed: {theexception}")
+
+    def loadoverlays(self) -> None:
+        """
+        Make sure the data of every overlay has been read.
+
+        Waits for a running background load to finish, then reads anything that is left.
+
+        Returns
+        -------
+        None
+        """
+        if self.loadthread is not None:
+            self.loadthread.join()
+        for themap in self.overlays:
+            self.overlays[themap].load()
+
     def setfocusmap(self, whichmap: str) -> None:
         """
         Set the focus map to the specified map name.
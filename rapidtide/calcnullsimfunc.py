@@ -26,7 +26,62 @@ from numpy.typing import NDArray
 import rapidtide.filter as tide_filt
 import rapidtide.genericmultiproc as tide_genericmultiproc
 import rapidtide.miscmath as tide_math
-import rapidtide.stats as tide_stats
+
+
+def _makenullregressors(
+    normalizedreftc: NDArray,
+    reps: NDArray,
+    permutationmethod: str = "shuffle",
+    seed: int = 0,
+) -> NDArray:
+    """
+    Make the surrogate regressors for a set of null correlation repetitions.
+
+    Each repetition draws its random numbers from its own generator, seeded with
+    ``[seed, rep]``, so the surrogate for a given repetition does not depend on
+    how the repetitions are divided into blocks or among worker processes.
+
+    Parameters
+    ----------
+    normalizedreftc : NDArray
+        Normalized reference time course.
+    reps : NDArray
+        Indices of the repetitions to make surrogates for.
+    permutationmethod : str, optional
+        'shuffle' to randomly reorder the time points, or 'phaserandom' to randomize the
+        phases of the Fourier coefficients while keeping their magnitudes. Default is 'shuffle'.
+    seed : int, optional
+        Seed of the whole null distribution. Default is 0.
+
+    Returns
+    -------
+    NDArray
+        The surrogate regressors, shape (len(reps), len(normalizedreftc)).
+
+    Examples
+    --------
+    >>> surrogates = _makenullregressors(reftc, np.arange(100), permutationmethod="phaserandom")
+    >>> surrogates.shape
+    (100, 400)
+    """
+    thelen = len(normalizedreftc)
+    therngs = [np.random.default_rng([seed, int(rep)]) for rep in reps]
+    if permutationmethod == "shuffle":
+        permutedtcs = np.zeros((len(reps), thelen), dtype=np.float64)
+        for i, therng in enumerate(therngs):
+            permutedtcs[i, :] = therng.permutation(normalizedreftc)
+    elif permutationmethod == "phaserandom":
+        themagnitudes = np.abs(np.fft.rfft(normalizedreftc))
+        thephases = np.zeros((len(reps), len(themagnitudes)), dtype=np.float64)
+        for i, therng in enumerate(therngs):
+            thephases[i, :] = 2.0 * np.pi * (therng.random(len(themagnitudes)) - 0.5)
+        permutedtcs = np.fft.irfft(
+            themagnitudes[None, :] * np.exp(1j * thephases), n=thelen, axis=1
+        )
+    else:
+        print("illegal shuffling method")
+        sys.exit()
+    return permutedtcs
 
 
 # note: rawtimecourse has been filtered, but NOT windowed
@@ -58,6 +113,8 @@ def _procOneNullCorrelationx(
         - permutationmethod : str, optional
             The method used for shuffling the reference time course.
             Options are 'shuffle' (default) or 'phaserandom'.
+        - nullseed : int, optional
+            Seed of the null distribution (see `_makenullregressors`). Default is 0.
         - debug : bool, optional
             If True, prints debug information including the permutation method used.
 
@@ -91,6 +148,7 @@ def _procOneNullCorrelationx(
 
     options = {
         "permutationmethod": "shuffle",
+        "nullseed": 0,
         "debug": False,
     }
     options.update(kwargs)
@@ -107,15 +165,12 @@ def _procOneNullCorrelationx(
     ) = voxelargs
 
     # make a shuffled copy of the regressors
-    if permutationmethod == "shuffle":
-        permutedtc = np.random.permutation(normalizedreftc)
-        # apply the appropriate filter
-        # permutedtc = theCorrelator.ncprefilter.apply(Fs, permutedtc)
-    elif permutationmethod == "phaserandom":
-        permutedtc = tide_stats.permute_phase(normalizedreftc)
-    else:
-        print("illegal shuffling method")
-        sys.exit()
+    permutedtc = _makenullregressors(
+        normalizedreftc,
+        [vox],
+        permutationmethod=permutationmethod,
+        seed=options["nullseed"],
+    )[0, :]
 
     # crosscorrelate with original
     thexcorr_y, thexcorr_x, dummy = theCorrelator.run(permutedtc)
@@ -136,6 +191,59 @@ def _procOneNullCorrelationx(
     return vox, maxval
 
 
+def _procNullCorrelationBlock(
+    reps: NDArray,
+    voxelargs: list,
+    **kwargs: Any,
+) -> list[tuple[int, float]]:
+    """
+    Compute the null correlation maxima for a block of repetitions at once.
+
+    This is the vectorized counterpart of `_procOneNullCorrelationx`.  The surrogate
+    regressors for the whole block are made together, correlated with the reference in a
+    single call to `Correlator.run_batch`, and their peaks are fit with
+    `SimilarityFunctionFitter.fit_batch`.
+
+    Parameters
+    ----------
+    reps : NDArray
+        Indices of the repetitions to process.
+    voxelargs : list
+        Same as for `_procOneNullCorrelationx`.
+    **kwargs : Any
+        Same options as `_procOneNullCorrelationx`.
+
+    Returns
+    -------
+    list[tuple[int, float]]
+        One `_procOneNullCorrelationx` style result tuple for each repetition in `reps`.
+    """
+    options = {
+        "permutationmethod": "shuffle",
+        "nullseed": 0,
+        "debug": False,
+    }
+    options.update(kwargs)
+    (
+        normalizedreftc,
+        rawtcfft_r,
+        rawtcfft_ang,
+        theCorrelator,
+        thefitter,
+    ) = voxelargs
+
+    permutedtcs = _makenullregressors(
+        normalizedreftc,
+        reps,
+        permutationmethod=options["permutationmethod"],
+        seed=options["nullseed"],
+    )
+    thexcorr_ys, thexcorr_x, dummy = theCorrelator.run_batch(permutedtcs)
+    thefitter.setcorrtimeaxis(thexcorr_x)
+    maxvals = thefitter.fit_batch(thexcorr_ys)[2]
+    return [(rep, maxvals[i]) for i, rep in enumerate(reps)]
+
+
 def _packvoxeldata(voxnum: int, voxelargs: list) -> list:
     """
     Pack voxel data into a list format.
@@ -217,6 +325,8 @@ def getNullDistributionData(
     showprogressbar: bool = True,
     chunksize: int = 1000,
     permutationmethod: str = "shuffle",
+    seed: int | None = None,
+    blocksize: int = 250,
     rt_floattype: np.dtype = np.float64,
     debug: bool = False,
 ) -> NDArray:
@@ -249,6 +359,14 @@ def getNullDistributionData(
         Size of chunks for multiprocessing. Default is 1000.
     permutationmethod : str, optional
         Permutation method to use ('shuffle' or other supported methods). Default is 'shuffle'.
+    seed : int or None, optional
+        Seed for the surrogate regressors.  For a given `blocksize` the distribution is
+        fully determined by the seed, independent of `nprocs`.  If None, a seed is drawn
+        from numpy's global random state. Default is None.
+    blocksize : int, optional
+        Number of repetitions to generate, correlate and fit together when the similarity
+        function and fitter support batch processing (`run_batch` and `fit_batch`).
+        Default is 250.
     rt_floattype : str, optional
         String representation of the floating-point type. Default is np.float64.
     debug : bool, optional
@@ -262,9 +380,14 @@ def getNullDistributionData(
     Notes
     -----
     This function applies normalization and filtering to the reference time course before
-    computing correlations. It supports parallel processing via multiprocessing for
-    improved performance when `numestreps` is large.
+    computing correlations. Repetitions are processed in blocks with a single 2D FFT and a
+    vectorized peak fit where possible, and the blocks can be spread over multiple processes
+    for improved performance when `numestreps` is large.
     """
+    if seed is None:
+        seed = int(np.random.randint(0, 2**31 - 1))
+    if debug:
+        print(f"null distribution seed: {seed}")
     inputshape = np.asarray([numestreps])
     normalizedreftc = theCorrelator.ncprefilter.apply(
         Fs,
@@ -279,6 +402,10 @@ def getNullDistributionData(
     voxelmask = np.ones((numestreps), dtype=rt_floattype)
     voxelargs = [normalizedreftc, rawtcfft_r, rawtcfft_ang, theCorrelator, thefitter]
     voxelfunc = _procOneNullCorrelationx
+    if hasattr(theCorrelator, "run_batch") and hasattr(thefitter, "fit_batch"):
+        batchfunc = _procNullCorrelationBlock
+    else:
+        batchfunc = None
     packfunc = _packvoxeldata
     unpackfunc = _unpackvoxeldata
     voxeltargets = [
@@ -298,7 +425,10 @@ def getNullDistributionData(
         alwaysmultiproc,
         showprogressbar,
         chunksize,
+        batchsize=blocksize,
+        batchfunc=batchfunc,
         permutationmethod=permutationmethod,
+        nullseed=seed,
         debug=debug,
     )
 
@@ -168,6 +168,60 @@ def _procOneVoxelCorrelation(
     return vox, np.mean(thetc), thexcorr_y, thexcorr_x, theglobalmax, theglobalmaxlist
 
 
+def _procVoxelBlockCorrelation(
+    voxels: NDArray,
+    voxelargs: list[Any],
+    **kwargs: Any,
+) -> list[tuple[int, float, NDArray, NDArray, int, list[float]]]:
+    """
+    Process correlation for a block of voxels at once.
+
+    This is the vectorized counterpart of `_procOneVoxelCorrelation`.  Each voxel is
+    resampled as before, then the whole block is correlated with the reference time
+    course in a single call to `Correlator.run_batch`.
+
+    Parameters
+    ----------
+    voxels : NDArray
+        Indices of the voxels to process.
+    voxelargs : list[Any]
+        The unpacked voxel arguments, in the same order as for `_procOneVoxelCorrelation`,
+        except that the fourth element is the full fMRI data array rather than one voxel's
+        time course.
+    **kwargs : Any
+        Same options as `_procOneVoxelCorrelation`.
+
+    Returns
+    -------
+    list[tuple[int, float, NDArray, NDArray, int, list[float]]]
+        One `_procOneVoxelCorrelation` style result tuple for each voxel in `voxels`.
+    """
+    options = {
+        "oversampfactor": 1,
+        "interptype": "univariate",
+        "debug": False,
+    }
+    options.update(kwargs)
+    oversampfactor = options["oversampfactor"]
+    interptype = options["interptype"]
+    thetc, theCorrelator, fmri_x, fmridata, os_fmri_x, theglobalmaxlist, thexcorr_y = voxelargs
+    thetcs = np.zeros((len(voxels), len(thetc)), dtype=thetc.dtype)
+    for i, vox in enumerate(voxels):
+        if oversampfactor >= 1:
+            thetcs[i, :] = tide_resample.doresample(
+                fmri_x, fmridata[vox, :], os_fmri_x, method=interptype
+            )
+        else:
+            thetcs[i, :] = fmridata[vox, :]
+    thexcorr_ys, thexcorr_x, theglobalmaxes = theCorrelator.run_batch(thetcs)
+    themeans = np.mean(thetcs, axis=1)
+
+    return [
+        (vox, themeans[i], thexcorr_ys[i, :], thexcorr_x, theglobalmaxes[i], theglobalmaxlist)
+        for i, vox in enumerate(voxels)
+    ]
+
+
 def _packvoxeldata(voxnum: int, voxelargs: list[Any]) -> list[Any]:
     """
     Pack voxel data into a structured list format.
@@ -284,6 +338,7 @@ def correlationpass_cpu(
     interptype: str = "univariate",
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    mpbatchsize: int = 1,
     rt_floattype: np.dtype = np.float64,
     debug: bool = False,
 ) -> tuple[int, list[float], NDArray]:
@@ -326,6 +381,11 @@ def correlationpass_cpu(
         Whether to display a progress bar. Default is True.
     chunksize : int, optional
         Size of chunks for multiprocessing. Default is 1000.
+    mpbatchsize : int, optional
+        Number of voxels processed together.  If greater than 1, voxels are
+        correlated in blocks of this size with `Correlator.run_batch`, and
+        sent to each worker in blocks of this size when multiprocessing.
+        Default is 1.
     rt_floattype : str, optional
         String representation of floating-point type. Default is 'float64'.
     debug : bool, optional
@@ -370,6 +430,12 @@ def correlationpass_cpu(
     voxeltargets = [meanval, corrout, thecorrscale, theglobalmaxlist]
     voxelmask = np.ones_like(fmridata[:, 0])
 
+    # use the vectorized block correlation if the similarity function supports it
+    if hasattr(theCorrelator, "run_batch"):
+        batchfunc = _procVoxelBlockCorrelation
+    else:
+        batchfunc = None
+
     volumetotal = tide_genericmultiproc.run_multiproc(
         voxelfunc,
         packfunc,
@@ -383,6 +449,8 @@ def correlationpass_cpu(
         alwaysmultiproc,
         showprogressbar,
         chunksize,
+        batchsize=mpbatchsize,
+        batchfunc=batchfunc,
         oversampfactor=oversampfactor,
         interptype=interptype,
         debug=debug,
@@ -415,6 +483,7 @@ def correlationpass(
     interptype: str = "univariate",
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    mpbatchsize: int = 1,
     rt_floattype: np.dtype = np.float64,
     debug: bool = False,
     usegpu: bool = False,
@@ -435,6 +504,9 @@ def correlationpass(
         "rocm", "mps". Default is "auto".
     batchsize : int | None, optional
         GPU batch size used when ``usegpu=True``
+    mpbatchsize : int, optional
+        Number of voxels sent to each worker per queue message on the CPU
+        multiprocessing path. Default is 1.
     fallback_to_cpu : bool, optional
         If True, GPU path falls back to CPU when GPU backends are unavailable or
         unsupported for current options.
@@ -479,6 +551,7 @@ def correlationpass(
         interptype=interptype,
         showprogressbar=showprogressbar,
         chunksize=chunksize,
+        mpbatchsize=mpbatchsize,
         rt_floattype=rt_floattype,
         debug=debug,
     )
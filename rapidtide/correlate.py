@@ -21,14 +21,12 @@
 import logging
 from typing import Any, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pyfftw
 import scipy as sp
 from numpy.fft import irfftn, rfftn
 from numpy.typing import NDArray
-from scipy import fft, signal
-from sklearn.metrics import mutual_info_score
+from scipy import fft
 
 import rapidtide.fit as tide_fit
 import rapidtide.miscmath as tide_math
@@ -36,6 +34,12 @@ import rapidtide.resample as tide_resample
 import rapidtide.stats as tide_stats
 import rapidtide.util as tide_util
 from rapidtide.ffttools import optfftlen
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+signal = lazyimport("scipy.signal")
+mutual_info_score = lazyimportfrom("sklearn.metrics", "mutual_info_score")
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -748,6 +752,208 @@ def proc_MI_histogram(
     return mi
 
 
+def proc_MI_histogram_block(
+    jhs: NDArray,
+    sigma: float = 1,
+    normalized: bool = True,
+    EPS: float = 1.0e-6,
+) -> NDArray:
+    """
+    Compute the mutual information from a stack of joint histograms.
+
+    This gives the same result as calling `proc_MI_histogram` on each histogram in
+    the stack, but smooths and reduces the whole stack at once.
+
+    Parameters
+    ----------
+    jhs : ndarray of shape (k, m, n)
+        Joint histograms, one per entry along the first axis.  Smoothing is done in
+        place, with the histograms' own dtype, exactly as in `proc_MI_histogram`.
+    sigma : float, optional
+        Standard deviation for Gaussian smoothing of each joint histogram. Default is 1.0.
+    normalized : bool, optional
+        If True, return normalized mutual information. Default is True.
+    EPS : float, optional
+        Small constant added to the histograms to avoid numerical issues in log computation.
+        Default is 1e-6.
+
+    Returns
+    -------
+    ndarray of shape (k,)
+        The mutual information computed from each joint histogram.
+
+    Examples
+    --------
+    >>> jhs = np.random.rand(5, 10, 10)
+    >>> mi = proc_MI_histogram_block(jhs, sigma=0.5)
+    """
+    # smooth each histogram, but not across the stack
+    sp.ndimage.gaussian_filter(jhs, sigma=(0.0, sigma, sigma), mode="constant", output=jhs)
+
+    jhs = jhs + EPS
+    jhs = jhs / np.sum(jhs, axis=(1, 2), keepdims=True)
+    s1 = np.sum(jhs, axis=1)
+    s2 = np.sum(jhs, axis=2)
+    HX = -np.sum(s1 * np.log(s1), axis=1)
+    HY = -np.sum(s2 * np.log(s2), axis=1)
+    HXcommaY = -np.sum(jhs * np.log(jhs), axis=(1, 2))
+    if normalized:
+        return (HX + HY) / HXcommaY - 1.0
+    else:
+        return -(HXcommaY - HX - HY)
+
+
+def MI_bincodes(x: NDArray[np.floating[Any]], binedges: NDArray) -> NDArray:
+    """
+    Convert a signal to histogram bin indices for mutual information calculations.
+
+    Parameters
+    ----------
+    x : 1D NDArray[np.floating[Any]]
+        The signal.
+    binedges : NDArray
+        Bin edges, as returned by `np.histogram2d`.
+
+    Returns
+    -------
+    NDArray
+        The bin index of each point of `x`, computed as in `mutual_info_2d_fast`, or -1
+        for points outside of ``[binedges[0], binedges[-1])``, which that function skips.
+
+    Examples
+    --------
+    >>> codes = MI_bincodes(np.array([0.0, 0.5, 1.0]), np.linspace(0.0, 1.0, 3))
+    >>> codes
+    array([ 0,  1, -1])
+    """
+    start = binedges[0]
+    end = binedges[-1]
+    numbins = int(len(binedges) - 1)
+    codes = ((x - start) / (end - start) * numbins).astype(np.int_)
+    codes[(x < start) | (x >= end)] = -1
+    return codes
+
+
+def cross_mutual_info_block(
+    xcodes: NDArray,
+    ycodes: NDArray,
+    lags: NDArray,
+    numxbins: int,
+    numybins: int,
+    sigma: float = 1,
+    normalized: bool = True,
+    EPS: float = 1.0e-6,
+    maxpoints: int = 10000000,
+) -> NDArray:
+    """
+    Compute the mutual information between two binned signals at many lags at once.
+
+    For each lag, the joint histogram of ``x[n + lag]`` and ``y[n]`` is accumulated with
+    a single `np.bincount` over all of the lags, and the histograms are smoothed and
+    reduced as a stack.  The results match calling `mutual_info_2d_fast` on the
+    overlapping parts of the two signals at each lag.
+
+    Parameters
+    ----------
+    xcodes, ycodes : 1D NDArray
+        Bin indices of the two signals, from `MI_bincodes`.  They must be the same length.
+    lags : 1D NDArray of int
+        The lags to evaluate.
+    numxbins, numybins : int
+        Number of bins for each signal.
+    sigma : float, optional
+        Sigma for Gaussian smoothing of the joint histograms. Default is 1.
+    normalized : bool, optional
+        If True, compute normalized mutual information. Default is True.
+    EPS : float, optional
+        Small constant to avoid numerical errors in logarithms. Default is 1e-6.
+    maxpoints : int, optional
+        Maximum number of (lag, sample) pairs to process at once.  Lags are done in
+        groups to keep the temporary arrays below this size. Default is 10000000.
+
+    Returns
+    -------
+    NDArray
+        The mutual information at each lag.
+
+    Examples
+    --------
+    >>> xcodes = MI_bincodes(normx, xedges)
+    >>> ycodes = MI_bincodes(normy, yedges)
+    >>> mi = cross_mutual_info_block(xcodes, ycodes, np.arange(-10, 11), 20, 20)
+    """
+    lags = np.asarray(lags, dtype=np.int64)
+    thelen = len(ycodes)
+    numjointbins = numxbins * numybins
+    themi = np.zeros(len(lags), dtype=np.float64)
+
+    # pad x so that every lag is a window of the padded signal, aligned with y
+    paddedx = np.full(3 * thelen, -1, dtype=np.int64)
+    paddedx[thelen : 2 * thelen] = xcodes
+    xwindows = np.lib.stride_tricks.sliding_window_view(paddedx, thelen)
+    yvalid = ycodes >= 0
+    ypart = np.where(yvalid, ycodes * numxbins, 0)
+
+    lagsperblock = max(1, maxpoints // max(thelen, 1))
+    for blockstart in range(0, len(lags), lagsperblock):
+        blocklags = lags[blockstart : blockstart + lagsperblock]
+        numblocklags = len(blocklags)
+        alignedx = xwindows[np.clip(blocklags, -thelen, thelen) + thelen]
+        valid = (alignedx >= 0) & yvalid[None, :]
+        jointcodes = np.where(
+            valid,
+            alignedx + ypart[None, :] + (np.arange(numblocklags) * numjointbins)[:, None],
+            numblocklags * numjointbins,
+        )
+        jhs = np.bincount(jointcodes.ravel(), minlength=numblocklags * numjointbins + 1)[
+            :-1
+        ].reshape(numblocklags, numxbins, numybins)
+        themi[blockstart : blockstart + numblocklags] = proc_MI_histogram_block(
+            jhs, sigma=sigma, normalized=normalized, EPS=EPS
+        )
+    return themi
+
+
+class ReferenceMutualInformation:
+    def __init__(
+        self,
+        reference: NDArray,
+        bins: int = -1,
+        windowfunc: str = "None",
+    ) -> None:
+        """
+        Precompute the reference side of cross mutual information calculations.
+
+        The normalized reference, its histogram bin edges and the bin index of every
+        point are calculated once.  Passing this object to `cross_mutual_info` as
+        `reference` gives the same results as passing the original reference
+        timecourse as `y`, but only the test timecourse has to be normalized and binned.
+
+        Parameters
+        ----------
+        reference : NDArray
+            The reference timecourse (the `y` argument to `cross_mutual_info`).
+        bins : int, optional
+            Number of histogram bins.  If less than 1, chosen from the length of the
+            reference as in `cross_mutual_info`. Default is -1.
+        windowfunc : str, optional
+            Window function applied during normalization, as in `cross_mutual_info`.
+            Default is "None".
+
+        Examples
+        --------
+        >>> refmi = ReferenceMutualInformation(reftc, bins=20)
+        >>> mi = cross_mutual_info(testtc, None, negsteps=10, possteps=10, reference=refmi)
+        """
+        self.windowfunc = windowfunc
+        self.normref = tide_math.corrnormalize(reference, detrendorder=1, windowfunc=windowfunc)
+        if bins < 1:
+            bins = int(np.sqrt(len(reference) / 5))
+        self.bins = bins
+        self.refedges = np.histogram_bin_edges(self.normref, bins=bins)
+        self.refcodes = MI_bincodes(self.normref, self.refedges)
+
+
 # @conditionaljit
 def cross_mutual_info(
     x: NDArray[np.floating[Any]],
@@ -764,6 +970,7 @@ def cross_mutual_info(
     prebin: bool = True,
     sigma: float = 0.25,
     fast: bool = True,
+    reference: Optional[ReferenceMutualInformation] = None,
 ) -> Union[NDArray, Tuple[NDArray, NDArray, int]]:
     """
     Calculate cross-mutual information between two 1D arrays.
@@ -810,6 +1017,9 @@ def cross_mutual_info(
         Default is 0.25.
     fast : bool, optional
         If True, apply speed optimizations. Default is True.
+    reference : ReferenceMutualInformation, optional
+        Precomputed reference information.  If given, it is used in place of `y` (which
+        is ignored), and its bin count in place of `bins`.  Default is None.
 
     Returns
     -------
@@ -841,7 +1051,11 @@ def cross_mutual_info(
     >>> mi_axis, mi_vals, num = cross_mutual_info(x, y, returnaxis=True, Fs=10)
     """
     normx = tide_math.corrnormalize(x, detrendorder=1, windowfunc=windowfunc)
-    normy = tide_math.corrnormalize(y, detrendorder=1, windowfunc=windowfunc)
+    if reference is not None:
+        normy = reference.normref
+        bins = reference.bins
+    else:
+        normy = tide_math.corrnormalize(y, detrendorder=1, windowfunc=windowfunc)
 
     # see if we are using the default number of bins
     if bins < 1:
@@ -849,7 +1063,9 @@ def cross_mutual_info(
         LGR.debug(f"cross_mutual_info: bins set to {bins}")
 
     # find the bin locations
-    if prebin:
+    if reference is not None:
+        bins2d = (np.histogram_bin_edges(normx, bins=bins), reference.refedges)
+    elif prebin:
         jh, bins0, bins1 = np.histogram2d(normx, normy, bins=(bins, bins))
         bins2d = (bins0, bins1)
     else:
@@ -871,63 +1087,75 @@ def cross_mutual_info(
     else:
         thexmi_y = np.zeros((len(locs)), dtype=np.float64)
         irange = np.asarray(locs)
-    destloc = -1
-    for i in irange:
-        if locs is None:
-            destloc = i - negsteps
-        else:
-            destloc += 1
-        if i < 0:
-            if fast:
-                thexmi_y[destloc] = mutual_info_2d_fast(
-                    normx[: i + len(normy)],
-                    normy[-i:],
-                    bins2d,
-                    normalized=norm,
-                    sigma=sigma,
-                )
-            else:
-                thexmi_y[destloc] = mutual_info_2d(
-                    normx[: i + len(normy)],
-                    normy[-i:],
-                    bins2d,
-                    normalized=norm,
-                    sigma=sigma,
-                )
-        elif i == 0:
-            if fast:
-                thexmi_y[destloc] = mutual_info_2d_fast(
-                    normx,
-                    normy,
-                    bins2d,
-                    normalized=norm,
-                    sigma=sigma,
-                )
+    if fast and len(normx) == len(normy):
+        # bin both signals once, then do every lag in one pass
+        thexmi_y[:] = cross_mutual_info_block(
+            MI_bincodes(normx, bins2d[0]),
+            reference.refcodes if reference is not None else MI_bincodes(normy, bins2d[1]),
+            np.asarray(irange),
+            len(bins2d[0]) - 1,
+            len(bins2d[1]) - 1,
+            sigma=sigma,
+            normalized=norm,
+        )
+    else:
+        destloc = -1
+        for i in irange:
+            if locs is None:
+                destloc = i - negsteps
             else:
-                thexmi_y[destloc] = mutual_info_2d(
-                    normx,
-                    normy,
-                    bins2d,
-                    normalized=norm,
-                    sigma=sigma,
-                )
-        else:
-            if fast:
-                thexmi_y[destloc] = mutual_info_2d_fast(
-                    normx[i:],
-                    normy[: len(normy) - i],
-                    bins2d,
-                    normalized=norm,
-                    sigma=sigma,
-                )
+                destloc += 1
+            if i < 0:
+                if fast:
+                    thexmi_y[destloc] = mutual_info_2d_fast(
+                        normx[: i + len(normy)],
+                        normy[-i:],
+                        bins2d,
+                        normalized=norm,
+                        sigma=sigma,
+                    )
+                else:
+                    thexmi_y[destloc] = mutual_info_2d(
+                        normx[: i + len(normy)],
+                        normy[-i:],
+                        bins2d,
+                        normalized=norm,
+                        sigma=sigma,
+                    )
+            elif i == 0:
+                if fast:
+                    thexmi_y[destloc] = mutual_info_2d_fast(
+                        normx,
+                        normy,
+                        bins2d,
+                        normalized=norm,
+                        sigma=sigma,
+                    )
+                else:
+                    thexmi_y[destloc] = mutual_info_2d(
+                        normx,
+                        normy,
+                        bins2d,
+                        normalized=norm,
+                        sigma=sigma,
+                    )
             else:
-                thexmi_y[destloc] = mutual_info_2d(
-                    normx[i:],
-                    normy[: len(normy) - i],
-                    bins2d,
-                    normalized=norm,
-                    sigma=sigma,
-                )
+                if fast:
+                    thexmi_y[destloc] = mutual_info_2d_fast(
+                        normx[i:],
+                        normy[: len(normy) - i],
+                        bins2d,
+                        normalized=norm,
+                        sigma=sigma,
+                    )
+                else:
+                    thexmi_y[destloc] = mutual_info_2d(
+                        normx[i:],
+                        normy[: len(normy) - i],
+                        bins2d,
+                        normalized=norm,
+                        sigma=sigma,
+                    )
 
     if madnorm:
         thexmi_y = tide_math.madnormalize(thexmi_y)[0]
@@ -1548,6 +1776,40 @@ def primefacs(thelen: int) -> list:
     return factors
 
 
+def fastfftlen(thelen: int, maxprimefac: int = 7) -> int:
+    """
+    Find the smallest FFT length at least as long as `thelen` with only small prime factors.
+
+    Parameters
+    ----------
+    thelen : int
+        The minimum acceptable FFT length.
+    maxprimefac : int, optional
+        The largest prime factor allowed in the returned length.  Default is 7.
+
+    Returns
+    -------
+    int
+        The smallest integer >= `thelen` whose prime factors are all <= `maxprimefac`.
+
+    Notes
+    -----
+    FFT libraries are fastest for lengths that factor into small primes.  The returned
+    length is never longer than the next power of 2, and is often considerably shorter.
+
+    Examples
+    --------
+    >>> fastfftlen(1001)
+    1008
+    >>> fastfftlen(1024)
+    1024
+    """
+    thefftlen = max(int(thelen), 1)
+    while max(primefacs(thefftlen)) > maxprimefac:
+        thefftlen += 1
+    return thefftlen
+
+
 def fastcorrelate(
     input1: NDArray,
     input2: NDArray,
@@ -1674,6 +1936,161 @@ def fastcorrelate(
         return np.correlate(paddedinput1, paddedinput2, mode="full")
 
 
+class ReferenceCorrelator:
+    def __init__(
+        self,
+        reference: NDArray,
+        testlen: Optional[int] = None,
+        zeropadding: int = 0,
+        weighting: str = "None",
+        debug: bool = False,
+    ) -> None:
+        """
+        Precompute everything needed to correlate many timecourses against one reference.
+
+        The padding geometry, FFT length, and the spectrum of the (time reversed)
+        reference are calculated once, so that correlating a test timecourse, or a block
+        of them, only requires transforming the test data.  The results match those of
+        ``fastcorrelate(testtc, reference, usefft=True, zeropadding=zeropadding,
+        weighting=weighting)`` for each test timecourse.
+
+        Parameters
+        ----------
+        reference : NDArray
+            The reference timecourse (the second argument to `fastcorrelate`).
+        testlen : int, optional
+            Length of the timecourses that will be correlated with the reference.
+            Defaults to the length of the reference.
+        zeropadding : int, optional
+            Zero-padding length, with the same meaning as in `fastcorrelate`.
+            Default is 0.
+        weighting : str, optional
+            Cross-correlation weighting, with the same meaning as in `fastcorrelate`.
+            Default is "None".
+        debug : bool, optional
+            If True, print diagnostic information. Default is False.
+
+        Examples
+        --------
+        >>> refcorr = ReferenceCorrelator(reftc, weighting="phat")
+        >>> corrfunc = refcorr.run(testtc)
+        >>> corrfuncs = refcorr.run_batch(testtcs)
+        """
+        self.reflen = len(reference)
+        if testlen is None:
+            self.testlen = self.reflen
+        else:
+            self.testlen = testlen
+        self.zeropadding = zeropadding
+        self.weighting = weighting
+        self.debug = debug
+
+        # figure out the padding, matching fastcorrelate
+        if self.zeropadding < 0:
+            self.paddedtestlen = optfftlen(self.testlen * 2)
+            self.paddedreflen = optfftlen(self.reflen * 2)
+            self.startpt = (
+                (self.paddedtestlen - self.testlen) + (self.paddedreflen - self.reflen)
+            ) // 2
+        elif self.zeropadding > 0:
+            self.paddedtestlen = self.testlen + self.zeropadding
+            self.paddedreflen = self.reflen + self.zeropadding
+            self.startpt = self.zeropadding
+        else:
+            self.paddedtestlen = self.testlen
+            self.paddedreflen = self.reflen
+            self.startpt = 0
+        self.outlen = self.testlen + self.reflen - 1
+        self.fullsize = self.paddedtestlen + self.paddedreflen - 1
+        if self.weighting == "None":
+            # any length that avoids wraparound gives the same answer, so pick a fast one
+            self.fftlen = fastfftlen(self.fullsize)
+        else:
+            # the weighting is applied in the frequency domain, so match the power of 2
+            # length used by convolve_weighted_fft
+            self.fftlen = int(2 ** np.ceil(np.log2(self.fullsize)))
+
+        # make the spectrum of the time reversed, padded reference
+        paddedref = np.zeros((self.paddedreflen), dtype=float)
+        paddedref[0 : self.reflen] = reference
+        self.refspectrum = fft.rfft(paddedref[::-1], n=self.fftlen)
+        if self.debug:
+            print(
+                f"ReferenceCorrelator: {self.testlen=}, {self.reflen=}, {self.fftlen=}, "
+                f"{self.startpt=}, {self.outlen=}"
+            )
+
+    def _padtest(self, testtcs: NDArray) -> NDArray:
+        paddedtests = np.zeros((testtcs.shape[0], self.paddedtestlen), dtype=float)
+        if self.zeropadding > 0:
+            paddedtests[:, -self.testlen :] = testtcs
+        else:
+            paddedtests[:, 0 : self.testlen] = testtcs
+        return paddedtests
+
+    def run_batch(self, testtcs: NDArray) -> NDArray:
+        """
+        Correlate a block of timecourses with the reference.
+
+        Parameters
+        ----------
+        testtcs : NDArray
+            2D array of shape (ntimecourses, testlen).  A 1D array is treated as
+            a single timecourse.
+
+        Returns
+        -------
+        NDArray
+            2D array of shape (ntimecourses, testlen + reflen - 1) holding one
+            correlation function per row.
+        """
+        testtcs = np.atleast_2d(testtcs)
+        if testtcs.shape[1] != self.testlen:
+            raise ValueError(
+                f"ReferenceCorrelator: test timecourses have length {testtcs.shape[1]}, "
+                f"expected {self.testlen}"
+            )
+        testspectra = fft.rfft(self._padtest(testtcs), n=self.fftlen, axis=-1)
+        if self.weighting == "None":
+            thecorrs = fft.irfft(testspectra * self.refspectrum, n=self.fftlen, axis=-1)
+        else:
+            # scale the weighted correlation to preserve the maximum of the unweighted one
+            theorigmax = np.max(
+                np.absolute(
+                    fft.irfft(testspectra * self.refspectrum, n=self.fftlen, axis=-1)[
+                        :, : self.fullsize
+                    ]
+                ),
+                axis=1,
+            )
+            thecorrs = fft.irfft(
+                gccproduct(testspectra, self.refspectrum[None, :], self.weighting, axis=-1),
+                n=self.fftlen,
+                axis=-1,
+            )[:, : self.fullsize]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                thecorrs *= (theorigmax / np.max(np.absolute(thecorrs), axis=1))[:, None]
+        return thecorrs[:, self.startpt : self.startpt + self.outlen]
+
+    def run(self, testtc: NDArray) -> NDArray:
+        """
+        Correlate a single timecourse with the reference.
+
+        Parameters
+        ----------
+        testtc : NDArray
+            1D test timecourse of length testlen.
+
+        Returns
+        -------
+        NDArray
+            The correlation function, of length testlen + reflen - 1.  This is the
+            same as ``fastcorrelate(testtc, reference, zeropadding=zeropadding,
+            weighting=weighting)``, but only the test timecourse is transformed.
+        """
+        return self.run_batch(testtc)[0, :]
+
+
 def _centered(arr: NDArray, newsize: Union[int, NDArray]) -> NDArray:
     """
     Extract a centered subset of an array.
@@ -1900,6 +2317,7 @@ def gccproduct(
     threshfrac: float = 0.1,
     compress: bool = False,
     displayplots: bool = False,
+    axis: Optional[int] = None,
 ) -> NDArray:
     """
     Compute the generalized cross-correlation (GCC) product with optional weighting.
@@ -1931,6 +2349,11 @@ def gccproduct(
     displayplots : bool, optional
         If True, display the reciprocal weighting function as a plot.
         Default is False.
+    axis : int, optional
+        If None, the threshold is computed over the whole array.  Otherwise
+        `fft1` and `fft2` are treated as stacks of spectra along `axis`, and
+        the threshold (and compression) is computed separately for each
+        spectrum.  Default is None.
 
     Returns
     -------
@@ -1983,6 +2406,24 @@ def gccproduct(
         plt.show()
 
     # now apply it while preserving the max
+    if axis is not None:
+        theorigmax = np.max(np.absolute(denom), axis=axis, keepdims=True)
+        thresh = theorigmax * threshfrac
+        scalefac = np.absolute(denom)
+        if compress:
+            pctvals = np.apply_along_axis(
+                lambda x: np.asarray(tide_stats.getfracvals(x, [0.10, 0.90], nozero=True)),
+                axis,
+                scalefac,
+            )
+            scalefac = np.clip(
+                scalefac, np.take(pctvals, [0], axis=axis), np.take(pctvals, [1], axis=axis)
+            )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nan_to_num(
+                np.where((scalefac > thresh) & (thresh > 0.0), product / denom, np.float64(0.0))
+            )
+
     theorigmax = np.max(np.absolute(denom))
     thresh = theorigmax * threshfrac
 
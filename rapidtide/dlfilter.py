@@ -54,6 +54,7 @@ from tf_keras.models import Model, Sequential, load_model
 from tf_keras.optimizers.legacy import RMSprop
 
 import rapidtide.io as tide_io
+from rapidtide.dlfilternumpy import batchpredict, overlapadd, overlapweights, slidingwindows
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -65,121 +66,6 @@ LGR = logging.getLogger("GENERAL")
 LGR.debug("setting backend to Agg")
 mpl.use("Agg")
 
-<<<<<<< HEAD
-tfversion = -1
-try:
-    # This really only makes sense if you don't have an nvidia GPU, otherwise default to tensorflow / keras below
-    print("Trying to import plaidml.keras")
-    import plaidml.keras
-
-    plaidml.keras.install_backend("plaidml")
-    tfversion = 0
-    LGR.debug("using plaidml keras")
-    from keras.callbacks import ModelCheckpoint, TerminateOnNaN
-    from keras.layers import (
-        LSTM,
-        Activation,
-        BatchNormalization,
-        Bidirectional,
-        Concatenate,
-        Conv1D,
-        Dense,
-        Dropout,
-        GlobalMaxPool1D,
-        Input,
-        MaxPooling1D,
-        TimeDistributed,
-        UpSampling1D,
-    )
-    from keras.models import Model, Sequential, load_model
-    from keras.optimizers import RMSprop
-except ImportError:
-    tfversion = -1
-    LGR.warning("import plaidml.keras failed: falling back to standard tensorflow keras")
-
-print("tfversion = " + str(tfversion))
-
-if tfversion == -1:
-    try:
-        import tensorflow.compat.v1 as tf
-
-        if tf.__version__[0] == "2":
-            tfversion = 2
-        elif tf.__version__[0] == "1":
-            tfversion = 1
-        else:
-            LGR.warning(f"could not interpret {tf.__version__[0]}")
-        LGR.debug(f"tensorflow version is {tfversion}")
-    except Exception as e:
-        print(e)
-        raise Exception("no backend found - exiting")
-
-if tfversion == 2:
-    try:
-        keras = tf.keras
-        # import keras
-        # import tensorflow.compat.v1.keras as keras
-        LGR.debug("using tensorflow v2x")
-        tf.disable_v2_behavior()
-        # ADDED .python in the path here for all of then and suddenly the import is resolved in vscode
-        from tensorflow.python.keras.callbacks import ModelCheckpoint, TerminateOnNaN
-        # from keras.callbacks import ModelCheckpoint, TerminateOnNaN
-        from tensorflow.python.keras.layers import (
-            # LSTM,
-            # Activation,
-            # BatchNormalization,
-            # Bidirectional,
-            Convolution1D,
-            # Dense,
-            # Dropout,
-            # GlobalMaxPool1D,
-            # MaxPooling1D,
-            # TimeDistributed,
-            # UpSampling1D,
-        )
-        from keras.layers import (
-            LSTM,
-            Activation,
-            BatchNormalization,
-            Bidirectional,
-            # Convolution1D,
-            Dense,
-            Dropout,
-            GlobalMaxPool1D,
-            MaxPooling1D,
-            TimeDistributed,
-            UpSampling1D,
-        )
-        from tensorflow.python.keras.models import Sequential, load_model
-        # from tensorflow.python.keras.optimizers import RMSprop
-        from keras.optimizers import RMSprop
-    except Exception as e:
-        print(e)
-        raise Exception("Importing tensorflow components failed.")
-
-    print(f"tensorflow version: >>>{tf.__version__}<<<")
-    LGR.debug(f"tensorflow version: >>>{tf.__version__}<<<")
-elif tfversion == 1:
-    LGR.debug("using tensorflow v1x")
-    from keras.callbacks import ModelCheckpoint, TerminateOnNaN
-    from keras.layers import (
-        LSTM,
-        Activation,
-        BatchNormalization,
-        Bidirectional,
-        Concatenate,
-        Conv1D,
-        Dense,
-        Dropout,
-        GlobalMaxPool1D,
-        Input,
-        MaxPooling1D,
-        TimeDistributed,
-        UpSampling1D,
-    )
-    from keras.models import Model, Sequential, load_model, model_from_json
-    from keras.optimizers import RMSprop
-=======
 # Disable GPU if desired
 # figure out what sorts of devices we have
 physical_devices = tf.config.list_physical_devices()
@@ -188,7 +74,6 @@ print(physical_devices)
 #    tf.config.set_visible_devices([], "GPU")
 # except Exception as e:
 #    LGR.warning(f"Failed to disable GPU: {e}")
->>>>>>> e44ea1e8aa44b516950b9327909ff2a6bf41e442
 
 LGR.debug(f"tensorflow version: >>>{tf.__version__}<<<")
 
@@ -1066,7 +951,13 @@ class DeepLearningFilter:
         self.savemodel()
         self.trained = True
 
-    def apply(self, inputdata: NDArray, badpts: NDArray | None = None) -> NDArray:
+    def apply(
+        self,
+        inputdata: NDArray,
+        badpts: NDArray | None = None,
+        batchsize: int | None = None,
+        numthreads: int | None = None,
+    ) -> NDArray:
         """
         Apply a sliding-window prediction model to the input data, optionally incorporating bad points.
 
@@ -1082,6 +973,13 @@ class DeepLearningFilter:
         badpts : NDArray | None, optional
             Array of same shape as `inputdata` indicating bad or invalid points. If None, no bad points
             are considered. Default is None.
+        batchsize : int | None, optional
+            Number of windows passed to the model at a time.  If None, all the windows are
+            predicted in a single batch. Default is None.
+        numthreads : int | None, optional
+            Number of intra-op threads tensorflow uses for inference.  This can only be set
+            before tensorflow starts running.  If None, the current setting is left alone.
+            Default is None.
 
         Returns
         -------
@@ -1092,6 +990,8 @@ class DeepLearningFilter:
         Notes
         -----
         - The function uses a sliding window of size `self.window_size` to process input data.
+          The windows are strided views of the input, which are only copied one inference batch
+          at a time (unless the bad point channel is needed).
         - Predictions are aggregated by summing over overlapping windows.
         - A triangular weight scheme is applied to the aggregated predictions to reduce edge effects.
         - If `self.usebadpts` is True, `badpts` are included as an additional feature in the model input.
@@ -1105,33 +1005,28 @@ class DeepLearningFilter:
         """
         initscale = mad(inputdata)
         scaleddata = inputdata / initscale
-        predicteddata = np.zeros_like(scaleddata)
-        weightarray = np.zeros_like(scaleddata)
         N_pts = len(scaleddata)
+        windows = slidingwindows(scaleddata, self.window_size)
         if self.usebadpts:
             if badpts is None:
                 badpts = np.zeros_like(scaleddata)
-            X = np.zeros(((N_pts - self.window_size - 1), self.window_size, 2))
-            for i in range(X.shape[0]):
-                X[i, :, 0] = scaleddata[i : i + self.window_size]
-                X[i, :, 1] = badpts[i : i + self.window_size]
+            badptwindows = slidingwindows(badpts, self.window_size)
+            X = np.stack((windows, badptwindows), axis=-1).astype(np.float64)
         else:
-            X = np.zeros(((N_pts - self.window_size - 1), self.window_size, 1))
-            for i in range(X.shape[0]):
-                X[i, :, 0] = scaleddata[i : i + self.window_size]
-
-        Y = self.predict_model(X).numpy()
-        for i in range(X.shape[0]):
-            predicteddata[i : i + self.window_size] += Y[i, :, 0]
+            X = np.asarray(windows[:, :, None], dtype=np.float64)
 
-        weightarray[:] = self.window_size
-        weightarray[0 : self.window_size] = np.linspace(
-            1.0, self.window_size, self.window_size, endpoint=False
-        )
-        weightarray[-(self.window_size + 1) : -1] = np.linspace(
-            self.window_size, 1.0, self.window_size, endpoint=False
+        if numthreads is not None:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(numthreads)
+            except RuntimeError as e:
+                LGR.warning(f"could not set the number of inference threads: {e}")
+        Y = batchpredict(lambda thebatch: self.predict_model(thebatch).numpy(), X, batchsize)
+        predicteddata = overlapadd(Y[:, :, 0], N_pts, dtype=scaleddata.dtype)
+        return (
+            initscale
+            * predicteddata
+            / overlapweights(N_pts, self.window_size, dtype=scaleddata.dtype)
         )
-        return initscale * predicteddata / weightarray
 
 
 class CNNDLFilter(DeepLearningFilter):
@@ -0,0 +1,700 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016-2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+"""
+CPU inference for the deep learning filters without a training framework.
+
+Trained pytorch filters can be exported with `exportmodel` to a ``model.npz`` file holding
+their weights as plain numpy arrays (with the batch normalization layers folded into the
+preceding convolutions).  `DeepLearningFilter` in this module loads these files and runs the
+forward pass in numpy, so applying a filter does not need to import torch or tensorflow.
+
+The windowing, channel construction and overlap-add helpers used by ``apply`` are also
+used by the pytorch and tensorflow filters in `rapidtide.dlfiltertorch` and
+`rapidtide.dlfilter`, which import them from here.
+"""
+
+import json
+import logging
+import os
+from typing import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy import fft
+
+import rapidtide.io as tide_io
+import rapidtide.miscmath as tide_math
+from rapidtide.lazyimport import lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+mad = lazyimportfrom("statsmodels.robust.scale", "mad")
+
+LGR = logging.getLogger("GENERAL")
+
+EXPORTEDMODELNAME = "model.npz"
+SUPPORTEDNETTYPES = ["cnn", "ppgattention"]
+
+
+def hasexportedmodel(modelpath: str, modelname: str) -> bool:
+    """
+    Check whether a model has been exported for numpy inference.
+
+    Parameters
+    ----------
+    modelpath : str
+        Directory containing the model directories.
+    modelname : str
+        Name of the model directory.
+
+    Returns
+    -------
+    bool
+        True if ``model.npz`` exists in the model directory.
+    """
+    return os.path.isfile(os.path.join(modelpath, modelname, EXPORTEDMODELNAME))
+
+
+def exportmodel(
+    modelpath: str, modelname: str, outputpath: str | None = None, verbose: bool = False
+) -> str:
+    """
+    Export a trained pytorch filter to a numpy weight file.
+
+    The model is loaded with `rapidtide.dlfiltertorch`, put in inference mode, and its
+    weights are written to ``model.npz`` in the model directory.  Batch normalization
+    layers are folded into the preceding convolution, and dropout layers are dropped, so
+    the exported network computes the same function as the model in eval mode.
+
+    Parameters
+    ----------
+    modelpath : str
+        Directory containing the model directories.
+    modelname : str
+        Name of the model directory to export.
+    outputpath : str, optional
+        Directory to write the exported model directory to.  If None, the weight file is
+        written into the source model directory.  Otherwise, ``model_meta.json`` is copied
+        to the new model directory as well.  Default is None.
+    verbose : bool, optional
+        Print the exported layers. Default is False.
+
+    Returns
+    -------
+    str
+        The name of the weight file that was written.
+
+    Notes
+    -----
+    This is the only function in this module that needs torch, which is imported here so
+    that importing the module stays cheap.  Only the "cnn" and "ppgattention" network
+    types are supported.
+    """
+    import torch.nn as nn
+
+    import rapidtide.dlfiltertorch as tide_dlfilttorch
+
+    thefilter = tide_dlfilttorch.DeepLearningFilter(modelpath=modelpath)
+    thefilter.loadmodel(modelname)
+    nettype = thefilter.infodict["nettype"]
+    if nettype not in SUPPORTEDNETTYPES:
+        raise ValueError(f"nettype {nettype} cannot be exported for numpy inference")
+    model = thefilter.model.to("cpu").eval()
+
+    def _tonumpy(theparam):
+        return theparam.detach().cpu().numpy().astype(np.float32)
+
+    weights = {}
+    if nettype == "cnn":
+        # fold each batchnorm into the convolution before it
+        convs = []
+        for layer in model.layers:
+            if isinstance(layer, nn.Conv1d):
+                convs.append([_tonumpy(layer.weight), _tonumpy(layer.bias), layer.dilation[0]])
+            elif isinstance(layer, nn.BatchNorm1d):
+                scale = _tonumpy(layer.weight) / np.sqrt(_tonumpy(layer.running_var) + layer.eps)
+                convs[-1][0] = convs[-1][0] * scale[:, None, None]
+                convs[-1][1] = (convs[-1][1] - _tonumpy(layer.running_mean)) * scale + _tonumpy(
+                    layer.bias
+                )
+        for i, (theweight, thebias, thedilation) in enumerate(convs):
+            weights[f"conv{i}_weight"] = theweight
+            weights[f"conv{i}_bias"] = thebias
+        config = {
+            "nettype": nettype,
+            "numconvs": len(convs),
+            "dilations": [int(theconv[2]) for theconv in convs],
+            "activation": thefilter.activation,
+        }
+    else:
+        weights["conv0_weight"] = _tonumpy(model.cnn[0].weight)
+        weights["conv0_bias"] = _tonumpy(model.cnn[0].bias)
+        weights["conv1_weight"] = _tonumpy(model.cnn[3].weight)
+        weights["conv1_bias"] = _tonumpy(model.cnn[3].bias)
+        for suffix in ["l0", "l0_reverse"]:
+            for thename in ["weight_ih", "weight_hh", "bias_ih", "bias_hh"]:
+                weights[f"lstm_{thename}_{suffix}"] = _tonumpy(
+                    getattr(model.lstm, f"{thename}_{suffix}")
+                )
+        for thename in ["query", "key", "value"]:
+            weights[f"attention_{thename}_weight"] = _tonumpy(
+                getattr(model.attention, thename).weight
+            )
+            weights[f"attention_{thename}_bias"] = _tonumpy(getattr(model.attention, thename).bias)
+        weights["fc_weight"] = _tonumpy(model.fc.weight)
+        weights["fc_bias"] = _tonumpy(model.fc.bias)
+        config = {
+            "nettype": nettype,
+            "hidden_size": int(model.lstm.hidden_size),
+            "attentionscale": float(model.attention.scale),
+        }
+    if verbose:
+        for key, value in weights.items():
+            print(f"{key}: {value.shape}")
+
+    if outputpath is None:
+        outputdir = os.path.join(modelpath, modelname)
+    else:
+        outputdir = os.path.join(outputpath, modelname)
+        os.makedirs(outputdir, exist_ok=True)
+        tide_io.writedicttojson(thefilter.infodict, os.path.join(outputdir, "model_meta.json"))
+    outputname = os.path.join(outputdir, EXPORTEDMODELNAME)
+    np.savez(outputname, config=np.array(json.dumps(config)), **weights)
+    LGR.info(f"exported {modelname} to {outputname}")
+    return outputname
+
+
+def calcnumchannels(usebadpts: bool, dofft: bool) -> tuple[int, int, int]:
+    """
+    Calculate the number of model input channels.
+
+    Parameters
+    ----------
+    usebadpts : bool
+        If True, there is a bad point channel.
+    dofft : bool
+        If True, there are spectral magnitude and phase channels.
+
+    Returns
+    -------
+    tuple of int
+        The total number of channels, the number of bad point channels, and the number
+        of FFT channels.
+    """
+    badptchans = 1 if usebadpts else 0
+    fftchans = 2 if dofft else 0
+    return 1 + badptchans + fftchans, badptchans, fftchans
+
+
+def datatochannels_block(
+    timecourses: NDArray,
+    badpts: NDArray,
+    usebadpts: bool,
+    dofft: bool,
+    logtrans: bool = True,
+    stdnorm: bool = True,
+    magthresh: float = 0.001,
+) -> NDArray:
+    """
+    Convert a block of windows to model input channels.
+
+    This is the vectorized equivalent of calling `rapidtide.dlfiltertorch.datatochannels`
+    on every row of `timecourses`.
+
+    Parameters
+    ----------
+    timecourses : NDArray
+        2D array with one window of data per row.  May be a strided view.
+    badpts : NDArray
+        Bad point flags, with the same shape as `timecourses`.
+    usebadpts : bool
+        If True, add a bad point channel and zero the data at bad points.
+    dofft : bool
+        If True, add spectral magnitude and phase channels.
+    logtrans : bool, optional
+        If True, log transform the spectral magnitudes. Default is True.
+    stdnorm : bool, optional
+        If True, standard normalize each window before the FFT. Default is True.
+    magthresh : float, optional
+        Floor for the normalized spectral magnitudes. Default is 0.001.
+
+    Returns
+    -------
+    NDArray
+        Array of shape (numwindows, windowsize, numchans).  With a single channel and
+        float64 input, this is a view of `timecourses` rather than a copy.
+    """
+    numchans, badptchans, fftchans = calcnumchannels(usebadpts, dofft)
+    if numchans == 1 and timecourses.dtype == np.float64:
+        return timecourses[:, :, None]
+    channeldata = np.zeros((timecourses.shape[0], timecourses.shape[1], numchans), dtype=float)
+
+    # now populate all channels
+    channeldata[:, :, 0] = timecourses
+    if usebadpts:
+        channeldata[:, :, 1] = badpts
+        # zero out data in badpts regions
+        channeldata[:, :, 0][badpts != 0.0] = 0.0
+    if dofft:
+        if stdnorm:
+            # normalize row by row, so the results match datatochannels exactly
+            normdata = np.empty_like(channeldata[:, :, 0])
+            for i in range(normdata.shape[0]):
+                normdata[i, :] = tide_math.stdnormalize(channeldata[i, :, 0])
+            specvals = fft.fft(normdata, axis=1)
+        else:
+            specvals = fft.fft(channeldata[:, :, 0], axis=1)
+        magvals = np.absolute(specvals)
+        themax = np.max(magvals, axis=1)[:, None]
+        goodrows = themax[:, 0] > 0.0
+        magvals = np.where(themax > 0.0, magvals / np.where(themax > 0.0, themax, 1.0), 0.0)
+        if logtrans:
+            magvals = np.where(
+                goodrows[:, None],
+                (np.log(np.maximum(magvals, magthresh)) - np.log(magthresh))
+                / np.abs(np.log(magthresh)),
+                0.0,
+            )
+        channeldata[:, :, 1 + badptchans] = magvals
+        channeldata[:, :, 1 + badptchans + 1] = np.where(
+            goodrows[:, None], np.angle(specvals), 0.0
+        )
+
+    return channeldata
+
+
+def overlapadd(windowvals: NDArray, thelen: int, dtype: np.dtype = np.float64) -> NDArray:
+    """
+    Sum overlapping windows back into a single timecourse.
+
+    Window `i` of `windowvals` is added to the output starting at sample `i`.  The sum is
+    done one window offset at a time, in the same order as adding the windows one by one,
+    so the result is identical to the sequential sum.
+
+    Parameters
+    ----------
+    windowvals : NDArray
+        2D array of shape (numwindows, windowsize).
+    thelen : int
+        Length of the output timecourse.
+    dtype : np.dtype, optional
+        Data type of the output timecourse. Default is np.float64.
+
+    Returns
+    -------
+    NDArray
+        The summed timecourse, of length `thelen`.
+    """
+    numwindows, windowsize = windowvals.shape
+    summeddata = np.zeros(thelen, dtype=dtype)
+    for offset in range(windowsize - 1, -1, -1):
+        summeddata[offset : offset + numwindows] += windowvals[:, offset]
+    return summeddata
+
+
+def slidingwindows(thedata: NDArray, windowsize: int) -> NDArray:
+    """
+    Return the windows of a timecourse that the filters are applied to.
+
+    Parameters
+    ----------
+    thedata : NDArray
+        1D timecourse.
+    windowsize : int
+        Window length in points.
+
+    Returns
+    -------
+    NDArray
+        Read only strided view of shape (len(thedata) - windowsize - 1, windowsize), where
+        row `i` starts at sample `i`.
+    """
+    numwindows = len(thedata) - windowsize - 1
+    return np.lib.stride_tricks.sliding_window_view(thedata, windowsize)[:numwindows]
+
+
+def overlapweights(thelen: int, windowsize: int, dtype: np.dtype = np.float64) -> NDArray:
+    """
+    Return the number of windows covering each point, to normalize `overlapadd` sums.
+
+    Parameters
+    ----------
+    thelen : int
+        Length of the timecourse.
+    windowsize : int
+        Window length in points.
+    dtype : np.dtype, optional
+        Data type of the weights. Default is np.float64.
+
+    Returns
+    -------
+    NDArray
+        The weights, of length `thelen`, ramping up over the first window and down
+        over the last one.
+    """
+    weightarray = np.zeros(thelen, dtype=dtype)
+    weightarray[:] = windowsize
+    weightarray[0:windowsize] = np.linspace(1.0, windowsize, windowsize, endpoint=False)
+    weightarray[-(windowsize + 1) : -1] = np.linspace(windowsize, 1.0, windowsize, endpoint=False)
+    return weightarray
+
+
+def batchpredict(predict: Callable, X: NDArray, batchsize: int | None = None) -> NDArray:
+    """
+    Run a prediction function over the windows of X, a batch at a time.
+
+    Parameters
+    ----------
+    predict : callable
+        Function taking a contiguous block of windows and returning a numpy array of
+        predictions, one per window.
+    X : NDArray
+        Model input, with one window per row.  May be a strided view; only one batch
+        at a time is copied.
+    batchsize : int | None, optional
+        Number of windows per call.  If None, all the windows are predicted in a single
+        batch. Default is None.
+
+    Returns
+    -------
+    NDArray
+        The concatenated predictions.
+    """
+    numwindows = X.shape[0]
+    if batchsize is None:
+        batchsize = max(numwindows, 1)
+    return np.concatenate(
+        [
+            predict(np.ascontiguousarray(X[startpt : startpt + batchsize]))
+            for startpt in range(0, numwindows, batchsize)
+        ]
+    )
+
+
+def linear(X: NDArray, weight: NDArray, bias: NDArray) -> NDArray:
+    """
+    Apply a dense layer to the last axis of an array.
+
+    Parameters
+    ----------
+    X : NDArray
+        Input array, with the features on the last axis.
+    weight : NDArray
+        Weights of shape (outfeatures, infeatures).
+    bias : NDArray
+        Bias of shape (outfeatures,).
+
+    Returns
+    -------
+    NDArray
+        Output array, with `outfeatures` on the last axis.
+    """
+    # a single 2D matrix product is much faster than a broadcast over the batch
+    output = np.matmul(X.reshape((-1, X.shape[-1])), weight.T) + bias
+    return output.reshape(X.shape[:-1] + (weight.shape[0],))
+
+
+def conv1d(X: NDArray, weight: NDArray, bias: NDArray, dilation: int = 1) -> NDArray:
+    """
+    One dimensional convolution with "same" padding.
+
+    This matches ``torch.nn.Conv1d(..., padding="same")``, which pads the extra sample at
+    the end when the total padding is odd.
+
+    Parameters
+    ----------
+    X : NDArray
+        Input of shape (batch, inchannels, length).
+    weight : NDArray
+        Kernel of shape (outchannels, inchannels, kernelsize).
+    bias : NDArray
+        Bias of shape (outchannels,).
+    dilation : int, optional
+        Kernel dilation. Default is 1.
+
+    Returns
+    -------
+    NDArray
+        Output of shape (batch, outchannels, length).
+    """
+    kernelsize = weight.shape[2]
+    thelen = X.shape[2]
+    totalpad = dilation * (kernelsize - 1)
+    Xpad = np.pad(X, ((0, 0), (0, 0), (totalpad // 2, totalpad - totalpad // 2)))
+    if X.shape[1] < 8:
+        # with few input channels, gathering all the taps into one product is much faster
+        Xcols = np.stack(
+            [Xpad[:, :, tap * dilation : tap * dilation + thelen] for tap in range(kernelsize)],
+            axis=2,
+        )
+        output = np.matmul(
+            weight.reshape((weight.shape[0], -1)),
+            Xcols.reshape((X.shape[0], -1, thelen)),
+        )
+        output += bias[None, :, None]
+        return output
+    output = np.matmul(weight[:, :, 0], Xpad[:, :, 0:thelen])
+    for tap in range(1, kernelsize):
+        output += np.matmul(
+            weight[:, :, tap], Xpad[:, :, tap * dilation : tap * dilation + thelen]
+        )
+    output += bias[None, :, None]
+    return output
+
+
+def lstm(X: NDArray, weight_ih: NDArray, weight_hh: NDArray, bias: NDArray) -> NDArray:
+    """
+    Run a single LSTM layer in one direction.
+
+    Parameters
+    ----------
+    X : NDArray
+        Input of shape (batch, length, features).
+    weight_ih : NDArray
+        Input weights of shape (4 * hidden, features), with the gates in pytorch order
+        (input, forget, cell, output).
+    weight_hh : NDArray
+        Recurrent weights of shape (4 * hidden, hidden).
+    bias : NDArray
+        Combined input and recurrent bias, of shape (4 * hidden,).
+
+    Returns
+    -------
+    NDArray
+        Hidden states of shape (batch, length, hidden).
+    """
+    hidden = weight_hh.shape[1]
+    batch, thelen = X.shape[0], X.shape[1]
+    # do the input half of the gates for all time points at once, time major
+    inputgates = linear(np.ascontiguousarray(X.transpose(1, 0, 2)), weight_ih, bias)
+    weight_hhT = np.ascontiguousarray(weight_hh.T)
+    h = np.zeros((batch, hidden), dtype=X.dtype)
+    c = np.zeros((batch, hidden), dtype=X.dtype)
+    output = np.empty((thelen, batch, hidden), dtype=X.dtype)
+    for t in range(thelen):
+        gates = inputgates[t] + np.matmul(h, weight_hhT)
+        cellgate = np.tanh(gates[:, 2 * hidden : 3 * hidden])
+        # sigmoid(x) = (1 + tanh(x / 2)) / 2, which is much faster than expit
+        np.tanh(0.5 * gates, out=gates)
+        gates += 1.0
+        gates *= 0.5
+        c = gates[:, hidden : 2 * hidden] * c + gates[:, 0:hidden] * cellgate
+        h = gates[:, 3 * hidden :] * np.tanh(c)
+        output[t] = h
+    return output.transpose(1, 0, 2)
+
+
+def upsamplelinear(X: NDArray, scalefactor: int = 2) -> NDArray:
+    """
+    Linearly upsample the last axis, matching ``torch.nn.Upsample(mode="linear")``.
+
+    Parameters
+    ----------
+    X : NDArray
+        Input array, upsampled along the last axis.
+    scalefactor : int, optional
+        Upsampling factor. Default is 2.
+
+    Returns
+    -------
+    NDArray
+        Upsampled array.
+    """
+    thelen = X.shape[-1]
+    srcpos = np.maximum(
+        (np.arange(thelen * scalefactor, dtype=np.float32) + 0.5) / scalefactor - 0.5, 0.0
+    )
+    lowerpt = np.floor(srcpos).astype(int)
+    upperpt = np.minimum(lowerpt + 1, thelen - 1)
+    frac = (srcpos - lowerpt).astype(X.dtype)
+    return X[..., lowerpt] * (1.0 - frac) + X[..., upperpt] * frac
+
+
+class DeepLearningFilter:
+    """
+    Apply an exported deep learning filter using only numpy.
+
+    This is a drop in replacement for the inference parts of
+    `rapidtide.dlfiltertorch.DeepLearningFilter`.  Models must first be exported with
+    `exportmodel`.
+
+    Parameters
+    ----------
+    modelpath : str, optional
+        Directory containing the model directories. Default is ".".
+
+    Examples
+    --------
+    >>> thefilter = DeepLearningFilter(modelpath=modelpath)
+    >>> thefilter.loadmodel("model_ppgattention_pytorch_w128_fulldata")
+    >>> filtered = thefilter.apply(cardiacwaveform)
+    """
+
+    def __init__(self, modelpath: str = ".") -> None:
+        self.modelpath = modelpath
+        self.infodict = {}
+        self.config = {}
+        self.weights = {}
+
+    def loadmodel(self, modelname: str, verbose: bool = False) -> None:
+        """
+        Load an exported model.
+
+        Parameters
+        ----------
+        modelname : str
+            Name of the model directory in ``self.modelpath``.
+        verbose : bool, optional
+            Print the model metadata. Default is False.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the model has not been exported.
+        """
+        LGR.info(f"loading {modelname}")
+        self.infodict = tide_io.readdictfromjson(
+            os.path.join(self.modelpath, modelname, "model_meta.json")
+        )
+        if verbose:
+            print(self.infodict)
+        self.window_size = self.infodict["window_size"]
+        self.usebadpts = self.infodict["usebadpts"]
+        self.dofft = self.infodict.get("dofft", False)
+        with np.load(os.path.join(self.modelpath, modelname, EXPORTEDMODELNAME)) as thefile:
+            self.weights = {key: thefile[key] for key in thefile.files if key != "config"}
+            self.config = json.loads(str(thefile["config"]))
+
+    def predict_model(self, X: NDArray) -> NDArray:
+        """
+        Run the network on a batch of windows.
+
+        Parameters
+        ----------
+        X : NDArray
+            Input of shape (batch, window_size, channels).
+
+        Returns
+        -------
+        NDArray
+            Predictions of shape (batch, window_size, 1).
+        """
+        # the convolutions work channels first, like pytorch
+        X = np.asarray(X, dtype=np.float32).transpose(0, 2, 1)
+        if self.config["nettype"] == "cnn":
+            numconvs = self.config["numconvs"]
+            for i in range(numconvs):
+                X = conv1d(
+                    X,
+                    self.weights[f"conv{i}_weight"],
+                    self.weights[f"conv{i}_bias"],
+                    dilation=self.config["dilations"][i],
+                )
+                if i < numconvs - 1:
+                    if self.config["activation"] == "tanh":
+                        X = np.tanh(X)
+                    else:
+                        X = np.maximum(X, 0.0)
+            return X.transpose(0, 2, 1)
+        else:
+            X = np.maximum(
+                conv1d(X, self.weights["conv0_weight"], self.weights["conv0_bias"]), 0.0
+            )
+            # max pool by 2
+            halflen = X.shape[2] // 2
+            X = np.maximum(X[:, :, 0 : 2 * halflen : 2], X[:, :, 1 : 2 * halflen : 2])
+            X = np.maximum(
+                conv1d(X, self.weights["conv1_weight"], self.weights["conv1_bias"]), 0.0
+            )
+
+            # the rest of the network works channels last
+            X = X.transpose(0, 2, 1)
+            directions = []
+            for suffix in ["l0", "l0_reverse"]:
+                theweights = [
+                    self.weights[f"lstm_weight_ih_{suffix}"],
+                    self.weights[f"lstm_weight_hh_{suffix}"],
+                    self.weights[f"lstm_bias_ih_{suffix}"]
+                    + self.weights[f"lstm_bias_hh_{suffix}"],
+                ]
+                if suffix == "l0":
+                    directions.append(lstm(X, *theweights))
+                else:
+                    directions.append(lstm(X[:, ::-1, :], *theweights)[:, ::-1, :])
+            X = np.concatenate(directions, axis=2)
+            Q, K, V = [
+                linear(
+                    X,
+                    self.weights[f"attention_{thename}_weight"],
+                    self.weights[f"attention_{thename}_bias"],
+                )
+                for thename in ["query", "key", "value"]
+            ]
+            scores = np.matmul(Q, K.transpose(0, 2, 1)) / np.float32(self.config["attentionscale"])
+            scores = np.exp(scores - np.max(scores, axis=-1, keepdims=True))
+            scores /= np.sum(scores, axis=-1, keepdims=True)
+            X = linear(np.matmul(scores, V), self.weights["fc_weight"], self.weights["fc_bias"])
+            return upsamplelinear(X.transpose(0, 2, 1)).transpose(0, 2, 1)
+
+    def apply(
+        self, inputdata: NDArray, badpts: NDArray | None = None, batchsize: int | None = 1000
+    ) -> NDArray:
+        """
+        Apply the filter to a timecourse.
+
+        This uses the same scaling, windowing, and overlap weighting as
+        `rapidtide.dlfiltertorch.DeepLearningFilter.apply`.
+
+        Parameters
+        ----------
+        inputdata : NDArray
+            Input data array of shape (N,) to be processed.
+        badpts : NDArray | None, optional
+            Array of same shape as `inputdata` indicating bad or invalid points.
+            Default is None.
+        batchsize : int | None, optional
+            Number of windows passed to the network at a time, which bounds the
+            memory used for the intermediate layers.  If None, all the windows are
+            predicted in a single batch. Default is 1000.
+
+        Returns
+        -------
+        NDArray
+            Filtered data array of the same shape as `inputdata`.
+        """
+        initscale = mad(inputdata)
+        scaleddata = inputdata / initscale
+        N_pts = len(scaleddata)
+
+        # make sure we have a valid badpts vector
+        if badpts is None:
+            badpts = np.zeros_like(scaleddata)
+
+        X = datatochannels_block(
+            slidingwindows(scaleddata, self.window_size),
+            slidingwindows(badpts, self.window_size),
+            self.usebadpts,
+            self.dofft,
+        )
+        Y = batchpredict(self.predict_model, X, batchsize)
+        predicteddata = overlapadd(Y[:, :, 0], N_pts, dtype=scaleddata.dtype)
+        return (
+            initscale
+            * predicteddata
+            / overlapweights(N_pts, self.window_size, dtype=scaleddata.dtype)
+        )
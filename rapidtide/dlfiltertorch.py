@@ -38,6 +38,14 @@ from torch.utils.data import DataLoader, TensorDataset, random_split
 
 import rapidtide.io as tide_io
 import rapidtide.miscmath as tide_math
+from rapidtide.dlfilternumpy import (
+    batchpredict,
+    calcnumchannels,
+    datatochannels_block,
+    overlapadd,
+    overlapweights,
+    slidingwindows,
+)
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -1021,7 +1029,13 @@ class DeepLearningFilter:
         self.savemodel()
         self.trained = True
 
-    def apply(self, inputdata: NDArray, badpts: NDArray | None = None) -> NDArray:
+    def apply(
+        self,
+        inputdata: NDArray,
+        badpts: NDArray | None = None,
+        batchsize: int | None = None,
+        numthreads: int | None = None,
+    ) -> NDArray:
         """
         Apply a sliding-window prediction model to the input data, optionally incorporating bad points.
 
@@ -1037,6 +1051,12 @@ class DeepLearningFilter:
         badpts : NDArray | None, optional
             Array of same shape as `inputdata` indicating bad or invalid points. If None, no bad points
             are considered. Default is None.
+        batchsize : int | None, optional
+            Number of windows passed to the model at a time.  If None, all the windows are
+            predicted in a single batch. Default is None.
+        numthreads : int | None, optional
+            Number of threads torch uses for inference on the CPU.  If None, the current torch
+            setting is left alone. Default is None.
 
         Returns
         -------
@@ -1047,6 +1067,8 @@ class DeepLearningFilter:
         Notes
         -----
         - The function uses a sliding window of size `self.window_size` to process input data.
+          The windows are strided views of the input, which are only copied one inference batch
+          at a time (unless extra channels are needed).
         - Predictions are aggregated by summing over overlapping windows.
         - A triangular weight scheme is applied to the aggregated predictions to reduce edge effects.
         - If `self.usebadpts` is True, `badpts` are included as an additional feature in the model input.
@@ -1060,47 +1082,29 @@ class DeepLearningFilter:
         """
         initscale = mad(inputdata)
         scaleddata = inputdata / initscale
-        predicteddata = np.zeros_like(scaleddata)
-        weightarray = np.zeros_like(scaleddata)
-
-        # make an X array with the proper number of channels
-        if self.usebadpts:
-            badptchans = 1
-        else:
-            badptchans = 0
-        if self.dofft:
-            fftchans = 2
-        else:
-            fftchans = 0
-        numchans = 1 + badptchans + fftchans
         N_pts = len(scaleddata)
-        X = np.zeros(((N_pts - self.window_size - 1), self.window_size, numchans))
 
         # make sure we have a valid badpts vector
         if badpts is None:
             badpts = np.zeros_like(scaleddata)
 
-        # now populate all channels
-        for i in range(X.shape[0]):
-            X[i, :, :] = datatochannels(
-                scaleddata[i : i + self.window_size],
-                badpts[i : i + self.window_size],
-                self.usebadpts,
-                self.dofft,
-            )
-
-        Y = self.predict_model(X)
-        for i in range(X.shape[0]):
-            predicteddata[i : i + self.window_size] += Y[i, :, 0]
-
-        weightarray[:] = self.window_size
-        weightarray[0 : self.window_size] = np.linspace(
-            1.0, self.window_size, self.window_size, endpoint=False
+        # make an X array with the proper number of channels
+        X = datatochannels_block(
+            slidingwindows(scaleddata, self.window_size),
+            slidingwindows(badpts, self.window_size),
+            self.usebadpts,
+            self.dofft,
         )
-        weightarray[-(self.window_size + 1) : -1] = np.linspace(
-            self.window_size, 1.0, self.window_size, endpoint=False
+
+        if numthreads is not None:
+            torch.set_num_threads(numthreads)
+        Y = batchpredict(self.predict_model, X, batchsize)
+        predicteddata = overlapadd(Y[:, :, 0], N_pts, dtype=scaleddata.dtype)
+        return (
+            initscale
+            * predicteddata
+            / overlapweights(N_pts, self.window_size, dtype=scaleddata.dtype)
         )
-        return initscale * predicteddata / weightarray
 
 
 class SelfAttention(nn.Module):
@@ -3128,20 +3132,6 @@ def readindata(
         )
 
 
-def calcnumchannels(usebadpts, dofft):
-    if usebadpts:
-        badptchans = 1
-    else:
-        badptchans = 0
-    if dofft:
-        fftchans = 2
-    else:
-        fftchans = 0
-    numchans = 1 + badptchans + fftchans
-
-    return numchans, badptchans, fftchans
-
-
 def datatochannels(
     timecourse, badpts, usebadpts, dofft, logtrans=True, stdnorm=True, magthresh=0.001
 ):
@@ -20,25 +20,31 @@ import sys
 import warnings
 from typing import Any, Callable, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy as sp
-import scipy.special as sps
-import statsmodels.api as sm
 from numpy.polynomial import Polynomial
 from numpy.typing import ArrayLike, NDArray
-from scipy import signal
-from scipy.optimize import curve_fit
-from scipy.signal import find_peaks, hilbert
-from scipy.stats import entropy, moment
-from sklearn.linear_model import LinearRegression
-from statsmodels.robust import mad
-from statsmodels.tsa.ar_model import AutoReg, ar_select_order
 from tqdm import tqdm
 
 import rapidtide.miscmath as tide_math
 import rapidtide.util as tide_util
 from rapidtide.decorators import conditionaljit, conditionaljit2
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+signal = lazyimport("scipy.signal")
+sps = lazyimport("scipy.special")
+sm = lazyimport("statsmodels.api")
+curve_fit = lazyimportfrom("scipy.optimize", "curve_fit")
+find_peaks = lazyimportfrom("scipy.signal", "find_peaks")
+hilbert = lazyimportfrom("scipy.signal", "hilbert")
+entropy = lazyimportfrom("scipy.stats", "entropy")
+moment = lazyimportfrom("scipy.stats", "moment")
+LinearRegression = lazyimportfrom("sklearn.linear_model", "LinearRegression")
+mad = lazyimportfrom("statsmodels.robust", "mad")
+AutoReg = lazyimportfrom("statsmodels.tsa.ar_model", "AutoReg")
+ar_select_order = lazyimportfrom("statsmodels.tsa.ar_model", "ar_select_order")
 
 # ---------------------------------------- Global constants -------------------------------------------
 defaultbutterorder = 6
@@ -704,6 +710,53 @@ def detrend(
     return inputdata - thefittc
 
 
+def detrend_block(
+    inputdata: NDArray[np.floating[Any]], order: int = 1, demean: bool = False
+) -> NDArray[np.floating[Any]]:
+    """
+    Remove a polynomial trend from each row of a 2D array.
+
+    This is the vectorized equivalent of calling `detrend` on every row. All the rows share
+    the same time points, so the polynomial fits are done with a single least squares
+    solve against a common design matrix.
+
+    Parameters
+    ----------
+    inputdata : NDArray[np.floating[Any]]
+        A 2D NumPy array, with one timecourse per row.
+    order : int, optional
+        The order of the polynomial to fit to the data. Default is 1 (linear).
+    demean : bool, optional
+        If True, the constant term of the fit is removed as well. Default is False.
+
+    Returns
+    -------
+    NDArray[np.floating[Any]]
+        A 2D NumPy array of the detrended data.
+
+    Notes
+    -----
+    The time axis is scaled to [-1, 1) before fitting to keep the design matrix well
+    conditioned, so the results agree with `detrend` to within rounding error.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> data = np.array([[1.0, 2.0, 3.0, 4.0, 5.0], [2.0, 2.0, 2.0, 2.0, 2.0]])
+    >>> detrend_block(data, order=1, demean=True)
+    array([[0., 0., 0., 0., 0.],
+           [0., 0., 0., 0., 0.]])
+    """
+    inputdata = np.atleast_2d(inputdata)
+    thelen = inputdata.shape[1]
+    thetimepoints = (np.arange(0.0, thelen, 1.0) - thelen / 2.0) / (thelen / 2.0)
+    thedesign = np.vander(thetimepoints, order + 1, increasing=True)
+    thecoffs = np.linalg.lstsq(thedesign, inputdata.T, rcond=None)[0]
+    if not demean:
+        thecoffs[0, :] = 0.0
+    return inputdata - (thedesign @ thecoffs).T
+
+
 def prewhiten(
     series: NDArray[np.floating[Any]], nlags: Optional[int] = None, debug: bool = False
 ) -> NDArray[np.floating[Any]]:
@@ -2471,6 +2524,102 @@ def mlregress(
     return np.atleast_2d(coffs), R2
 
 
+def mlregress_block(
+    X: NDArray[np.floating[Any]],
+    Y: NDArray[np.floating[Any]],
+    sharedregressors: Optional[bool] = None,
+    debug: bool = False,
+) -> Tuple[NDArray[np.floating[Any]], NDArray[np.floating[Any]]]:
+    """
+    Perform many multiple linear regressions (with intercept) at once.
+
+    This is the vectorized equivalent of calling `mlregress` on every row of `Y`. The
+    regressors are either shared by all the rows or specific to each row.
+
+    Parameters
+    ----------
+    X : NDArray[np.floating[Any]]
+        The regressors. Either shared by every row of `Y`, with shape (n_samples,) or
+        (n_samples, n_features), or one set per row, with shape (n_rows, n_samples) or
+        (n_rows, n_samples, n_features).
+    Y : NDArray[np.floating[Any]]
+        Target values of shape (n_rows, n_samples).
+    sharedregressors : bool, optional
+        Whether `X` is shared by all the rows. If None (the default), this is inferred from
+        the shapes, with a 2D `X` the same shape as `Y` taken to be one regressor per row.
+    debug : bool, optional
+        If True, print debug information about the input shapes. Default is False.
+
+    Returns
+    -------
+    Tuple[NDArray[np.floating[Any]], NDArray[np.floating[Any]]]
+        A tuple containing:
+        - coefficients : NDArray of shape (n_rows, n_features + 1), where the first column is
+          the intercept and subsequent columns are the regression coefficients
+        - R2 : NDArray of shape (n_rows,), the coefficient of determination of each fit
+
+    Notes
+    -----
+    The regressors and targets are demeaned so the intercept drops out, and the slopes are
+    found from the normal equations. Shared regressors are inverted once for the whole
+    block; row specific regressors are solved as a stack of small (n_features x n_features)
+    systems. Pseudoinverses are used throughout, so rank deficient rows get the same minimum
+    norm solution as `mlregress`. As in `mlregress`, a row with no variance gets an R2 of 1.0
+    if it is fit exactly and 0.0 otherwise.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> X = np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 7.0]])
+    >>> Y = np.array([[3.0, 7.0, 11.0], [1.0, 2.0, 3.0]])
+    >>> coffs, R2 = mlregress_block(X, Y)
+    >>> coffs.shape, R2.shape
+    ((2, 3), (2,))
+    """
+    Y = np.atleast_2d(Y)
+    nrows, n = Y.shape
+    X = np.asarray(X)
+    if sharedregressors is None:
+        sharedregressors = X.ndim == 1 or (X.ndim == 2 and X.shape != Y.shape)
+    if sharedregressors:
+        X = np.atleast_2d(X)
+        if X.shape[0] != n:
+            X = X.transpose()
+            if X.shape[0] != n:
+                raise AttributeError(
+                    "X and Y must have have the same number of samples (%d and %d)"
+                    % (X.shape[0], n)
+                )
+    elif X.ndim == 2:
+        X = X[:, :, None]
+    if debug:
+        print(f"mlregress_block: {X.shape=}, {Y.shape=}, {sharedregressors=}")
+
+    Ymean = np.mean(Y, axis=1)
+    Yc = Y - Ymean[:, None]
+    if sharedregressors:
+        Xmean = np.mean(X, axis=0)
+        Xc = X - Xmean[None, :]
+        slopes = Yc @ np.linalg.pinv(Xc).T
+        residuals = Yc - slopes @ Xc.T
+        intercepts = Ymean - slopes @ Xmean
+    else:
+        Xmean = np.mean(X, axis=1)
+        Xc = X - Xmean[:, None, :]
+        gram = np.einsum("rnp,rnq->rpq", Xc, Xc)
+        xty = np.einsum("rnp,rn->rp", Xc, Yc)
+        slopes = np.einsum("rpq,rq->rp", np.linalg.pinv(gram, hermitian=True), xty)
+        residuals = Yc - np.einsum("rnp,rp->rn", Xc, slopes)
+        intercepts = Ymean - np.einsum("rp,rp->r", Xmean, slopes)
+
+    ssres = np.sum(residuals * residuals, axis=1)
+    sstot = np.sum(Yc * Yc, axis=1)
+    R2 = np.where(ssres == 0.0, 1.0, 0.0)
+    np.divide(ssres, sstot, out=R2, where=(sstot != 0.0))
+    R2 = np.where(sstot != 0.0, 1.0 - R2, R2)
+    return np.concatenate((intercepts[:, None], slopes), axis=1), R2
+
+
 def calcexpandedregressors(
     confounddict: dict,
     labels: Optional[list] = None,
@@ -20,10 +20,198 @@ import gc
 import logging
 from typing import Any, Callable
 
+import numpy as np
 from numpy.typing import NDArray
 from tqdm import tqdm
 
 import rapidtide.multiproc as tide_multiproc
+import rapidtide.util as tide_util
+
+# unregistered arrays at least this large are moved to shared memory for non-fork workers
+SHAREDMINBYTES = 65536
+
+
+def sharevoxelargs(voxelargs: list, nprocs: int = 1) -> tuple[list, list]:
+    """
+    Replace the arrays in a voxelargs list with handles to shared memory.
+
+    Arrays already held in named ``tide_util.sharedinputs`` blocks, and views
+    of them such as column slices, are always replaced by their handles.  When
+    the workers do not inherit the arguments by forking (because of the start
+    method, or because a persistent worker pool will run the pass), any other
+    array of at least ``SHAREDMINBYTES``, including one in an unnamed block, is
+    copied into a temporary shared block, so that it is not pickled and sent to
+    every worker separately.
+
+    Parameters
+    ----------
+    voxelargs : list
+        The arguments of a voxelwise pass.
+    nprocs : int, optional
+        Number of workers that will run the pass.  Default is 1.
+
+    Returns
+    -------
+    tuple[list, list]
+        The arguments to send to the workers, and the shared memory blocks
+        that were created for this pass, which the caller must release with
+        ``releasevoxelargs``.
+    """
+    forked = tide_multiproc.workersforked(nprocs)
+    workerargs = []
+    temporaryblocks = []
+    try:
+        for thearg in voxelargs:
+            thehandle = tide_util.sharedinputs.handlefor(thearg)
+            if (
+                thehandle is None
+                and (not forked)
+                and isinstance(thearg, np.ndarray)
+                and (thearg.dtype != object)
+                and (thearg.nbytes >= SHAREDMINBYTES)
+            ):
+                dummy, theblock = tide_util.sharedinputs.register(thearg, named=True)
+                temporaryblocks.append(theblock)
+                thehandle = tide_util.sharedinputs.handlefor(dummy)
+            workerargs.append(thearg if thehandle is None else thehandle)
+    except BaseException:
+        releasevoxelargs(temporaryblocks)
+        raise
+    return workerargs, temporaryblocks
+
+
+def releasevoxelargs(temporaryblocks: list) -> None:
+    """
+    Release the temporary shared blocks made by ``sharevoxelargs``.
+
+    Parameters
+    ----------
+    temporaryblocks : list
+        The blocks returned by ``sharevoxelargs``.
+    """
+    for theblock in temporaryblocks:
+        tide_util.sharedinputs.release(theblock)
+
+
+def attachvoxelargs(workerargs: list) -> tuple[list, list]:
+    """
+    Undo ``sharevoxelargs`` in a worker process.
+
+    Parameters
+    ----------
+    workerargs : list
+        The arguments returned by ``sharevoxelargs``.
+
+    Returns
+    -------
+    tuple[list, list]
+        The arguments with every ``SharedArrayHandle`` replaced by the array
+        it refers to, and the attached shared memory blocks, which must be
+        kept until the arrays are no longer used and then passed to
+        ``detachvoxelargs``.
+    """
+    voxelargs = []
+    theblocks = []
+    for thearg in workerargs:
+        if isinstance(thearg, tide_util.SharedArrayHandle):
+            thearray, theblock = thearg.attach()
+            voxelargs.append(thearray)
+            theblocks.append(theblock)
+        else:
+            voxelargs.append(thearg)
+    return voxelargs, theblocks
+
+
+def detachvoxelargs(theblocks: list) -> None:
+    """
+    Close the shared memory blocks attached by ``attachvoxelargs``.
+
+    Parameters
+    ----------
+    theblocks : list
+        The blocks returned by ``attachvoxelargs``.
+    """
+    for theblock in theblocks:
+        try:
+            theblock.close()
+        except BufferError:
+            pass
+
+
+def _voxelconsumer(
+    inQ: Any,
+    outQ: Any,
+    voxelfunc: Callable,
+    packfunc: Callable,
+    batchfunc: Callable | None,
+    workerargs: list,
+    batchsize: int,
+    debug: bool,
+    kwargs: dict,
+) -> None:
+    """
+    Worker loop for ``run_multiproc``.
+
+    This is a module level function, rather than a closure, so that it can be
+    used with any multiprocessing start method.  Any ``SharedArrayHandle`` in
+    `workerargs` is attached before processing starts.
+
+    Parameters
+    ----------
+    inQ : Any
+        Queue of voxel indices (or index arrays when batching); None stops the worker.
+    outQ : Any
+        Queue on which the results are returned.
+    voxelfunc, packfunc, batchfunc : callable
+        As in ``run_multiproc``.
+    workerargs : list
+        The voxelargs, with the shared arrays replaced by handles.
+    batchsize : int
+        Number of voxels in each message.
+    debug : bool
+        Passed on to `voxelfunc` and `batchfunc`.
+    kwargs : dict
+        Extra keyword arguments for `voxelfunc` and `batchfunc`.
+    """
+    voxelargs, theblocks = attachvoxelargs(workerargs)
+    while True:
+        try:
+            # get a new message
+            val = inQ.get()
+
+            # this is the 'TERM' signal
+            if val is None:
+                break
+
+            # process and send the data
+            if (batchsize > 1) and (batchfunc is not None):
+                outQ.put(batchfunc(val, voxelargs, debug=debug, **kwargs))
+            elif batchsize > 1:
+                outQ.put(
+                    [
+                        voxelfunc(
+                            vox,
+                            packfunc(vox, voxelargs),
+                            debug=debug,
+                            **kwargs,
+                        )
+                        for vox in val
+                    ]
+                )
+            else:
+                outQ.put(
+                    voxelfunc(
+                        val,
+                        packfunc(val, voxelargs),
+                        debug=debug,
+                        **kwargs,
+                    )
+                )
+        except Exception as e:
+            print("error!", e)
+            break
+    del voxelargs
+    detachvoxelargs(theblocks)
 
 
 def run_multiproc(
@@ -41,6 +229,8 @@ def run_multiproc(
     chunksize: int,
     indexaxis: int = 0,
     procunit: str = "voxels",
+    batchsize: int = 1,
+    batchfunc: Callable | None = None,
     debug: bool = False,
     **kwargs: Any,
 ) -> int:
@@ -83,6 +273,17 @@ def run_multiproc(
         Axis along which to iterate over voxels, default is 0.
     procunit : str, optional
         Unit of processing for progress bar, default is "voxels".
+    batchsize : int, optional
+        Number of voxels sent to a worker in each queue message when
+        multiprocessing.  Each worker returns the results for a whole batch in
+        a single message, which greatly reduces queue overhead when the
+        per-voxel work is small.  Default is 1.
+    batchfunc : callable, optional
+        Vectorized alternative to `voxelfunc`.  If given, and `batchsize` is
+        greater than 1, it is called with an array of voxel indices and the
+        unpacked `voxelargs`, and must return a list with one `voxelfunc`-style
+        result per voxel.  Used in both the single and multiprocess paths.
+        Default is None.
     debug : bool, optional
         If True, prints debug information, default is False.
     **kwargs : dict
@@ -98,6 +299,12 @@ def run_multiproc(
     - If `nprocs` > 1 or `alwaysmultiproc` is True, multiprocessing is used.
     - Otherwise, a single-threaded loop is used with optional progress bar.
     - The function uses `tide_multiproc.run_multiproc` internally for multiprocessing.
+    - Workers attach to any array in `voxelargs` registered in
+      ``tide_util.sharedinputs`` by name, rather than holding their own copy,
+      and work with any start method selected with
+      ``tide_multiproc.setstartmethod``.  `voxelfunc`, `packfunc`,
+      `batchfunc` and `kwargs` must be picklable for start methods other
+      than "fork".
     - Garbage collection is performed after processing.
 
     Examples
@@ -121,41 +328,32 @@ def run_multiproc(
     if debug:
         print(f"{len(voxelproducts)=}, {voxelproducts[0].shape}")
     if nprocs > 1 or alwaysmultiproc:
-        # define the consumer function here so it inherits most of the arguments
-        def theconsumerfunc(inQ, outQ):
-            while True:
-                try:
-                    # get a new message
-                    val = inQ.get()
-
-                    # this is the 'TERM' signal
-                    if val is None:
-                        break
-
-                    # process and send the data
-                    outQ.put(
-                        voxelfunc(
-                            val,
-                            packfunc(val, voxelargs),
-                            debug=debug,
-                            **kwargs,
-                        )
-                    )
-                except Exception as e:
-                    print("error!", e)
-                    break
-
-        data_out = tide_multiproc.run_multiproc(
-            theconsumerfunc,
-            inputshape,
-            voxelmask,
-            indexaxis=indexaxis,
-            procunit=procunit,
-            verbose=(LGR is not None),
-            nprocs=nprocs,
-            showprogressbar=showprogressbar,
-            chunksize=chunksize,
-        )
+        # replace the large inputs with handles to shared memory blocks
+        workerargs, temporaryblocks = sharevoxelargs(voxelargs, nprocs=nprocs)
+        try:
+            data_out = tide_multiproc.run_multiproc(
+                _voxelconsumer,
+                inputshape,
+                voxelmask,
+                indexaxis=indexaxis,
+                procunit=procunit,
+                verbose=(LGR is not None),
+                nprocs=nprocs,
+                showprogressbar=showprogressbar,
+                chunksize=chunksize,
+                batchsize=batchsize,
+                consumerargs=(
+                    voxelfunc,
+                    packfunc,
+                    batchfunc,
+                    workerargs,
+                    batchsize,
+                    debug,
+                    kwargs,
+                ),
+            )
+        finally:
+            releasevoxelargs(temporaryblocks)
 
         # unpack the data
         volumetotal = 0
@@ -163,6 +361,21 @@ def run_multiproc(
             volumetotal += 1
             unpackfunc(returnvals, voxelproducts)
         del data_out
+    elif (batchsize > 1) and (batchfunc is not None):
+        volumetotal = 0
+        voxelstoprocess = np.where(voxelmask > 0)[0]
+        with tqdm(
+            total=len(voxelstoprocess),
+            desc="Voxel",
+            unit=procunit,
+            disable=(not showprogressbar),
+        ) as pbar:
+            for startpt in range(0, len(voxelstoprocess), batchsize):
+                thebatch = voxelstoprocess[startpt : startpt + batchsize]
+                for returnvals in batchfunc(thebatch, voxelargs, debug=debug, **kwargs):
+                    unpackfunc(returnvals, voxelproducts)
+                    volumetotal += 1
+                pbar.update(len(thebatch))
     else:
         volumetotal = 0
         for vox in tqdm(
@@ -23,9 +23,7 @@ from dataclasses import dataclass
 
 import numpy as np
 from numpy.typing import NDArray
-from scipy.signal import savgol_filter, welch
-from scipy.stats import kurtosis, pearsonr, skew
-from statsmodels.robust import mad
+from scipy import sparse
 from tqdm import tqdm
 
 import rapidtide.correlate as tide_corr
@@ -37,6 +35,15 @@ import rapidtide.miscmath as tide_math
 import rapidtide.resample as tide_resample
 import rapidtide.stats as tide_stats
 import rapidtide.util as tide_util
+from rapidtide.lazyimport import lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+savgol_filter = lazyimportfrom("scipy.signal", "savgol_filter")
+welch = lazyimportfrom("scipy.signal", "welch")
+kurtosis = lazyimportfrom("scipy.stats", "kurtosis")
+pearsonr = lazyimportfrom("scipy.stats", "pearsonr")
+skew = lazyimportfrom("scipy.stats", "skew")
+mad = lazyimportfrom("statsmodels.robust", "mad")
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
@@ -2694,6 +2701,9 @@ def _procOnePhaseProject(slice, sliceargs, **kwargs):
           Number of destination points.
         - rawapp_byslice : ndarray
           Raw application data array to be updated.
+        - projector : list of tuple, optional
+          Precomputed projection operators from `makephaseprojector`.  If absent or None,
+          the operator for the slice is computed here.
     **kwargs : dict
         Additional options to override default settings:
         - cache : bool, optional
@@ -2750,38 +2760,32 @@ def _procOnePhaseProject(slice, sliceargs, **kwargs):
         cine_byslice,
         destpoints,
         rawapp_byslice,
-    ) = sliceargs
-    # now smooth the projected data along the time dimension
-    validlocs = validlocslist[slice]
-    if len(validlocs) > 0:
-        for t in proctrs:
-            filteredmr = -demeandata_byslice[validlocs, slice, t]
-            cinemr = fmri_data_byslice[validlocs, slice, t]
-            thevals, theweights, theindices = tide_resample.congrid(
-                outphases,
-                cardphasevals[slice, t],
-                1.0,
-                congridbins,
-                kernel=gridkernel,
-                cache=cache,
-                cyclic=True,
-            )
-            for i in range(len(theindices)):
-                weights_byslice[validlocs, slice, theindices[i]] += theweights[i]
-                rawapp_byslice[validlocs, slice, theindices[i]] += filteredmr
-                cine_byslice[validlocs, slice, theindices[i]] += theweights[i] * cinemr
-        for d in range(destpoints):
-            if weights_byslice[validlocs[0], slice, d] == 0.0:
-                weights_byslice[validlocs, slice, d] = 1.0
-        rawapp_byslice[validlocs, slice, :] = np.nan_to_num(
-            rawapp_byslice[validlocs, slice, :] / weights_byslice[validlocs, slice, :]
-        )
-        cine_byslice[validlocs, slice, :] = np.nan_to_num(
-            cine_byslice[validlocs, slice, :] / weights_byslice[validlocs, slice, :]
-        )
+    ) = sliceargs[:12]
+    if len(sliceargs) > 12 and sliceargs[12] is not None:
+        sliceprojector = sliceargs[12][slice]
     else:
-        rawapp_byslice[:, slice, :] = 0.0
-        cine_byslice[:, slice, :] = 0.0
+        sliceprojector = _makesliceprojector(
+            outphases,
+            cardphasevals[slice, :],
+            congridbins,
+            gridkernel,
+            destpoints,
+            cache=cache,
+            debug=debug,
+        )
+    validlocs = validlocslist[slice]
+    _projectslice(
+        slice,
+        validlocs,
+        proctrs,
+        demeandata_byslice,
+        fmri_data_byslice,
+        sliceprojector,
+        weights_byslice,
+        cine_byslice,
+        rawapp_byslice,
+        destpoints,
+    )
 
     return (
         slice,
@@ -2821,20 +2825,7 @@ def _packslicedataPhaseProject(slicenum, sliceargs):
     >>> _packslicedataPhaseProject(0, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12])
     [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
     """
-    return [
-        sliceargs[0],
-        sliceargs[1],
-        sliceargs[2],
-        sliceargs[3],
-        sliceargs[4],
-        sliceargs[5],
-        sliceargs[6],
-        sliceargs[7],
-        sliceargs[8],
-        sliceargs[9],
-        sliceargs[10],
-        sliceargs[11],
-    ]
+    return list(sliceargs)
 
 
 def _unpackslicedataPhaseProject(retvals, voxelproducts):
@@ -2883,6 +2874,187 @@ def _unpackslicedataPhaseProject(retvals, voxelproducts):
     (voxelproducts[2])[retvals[4], retvals[0], :] = (retvals[3])[retvals[4], :]
 
 
+def _makesliceprojector(
+    outphases: NDArray,
+    slicephasevals: NDArray,
+    congridbins: int,
+    gridkernel: str,
+    destpoints: int,
+    cache: bool = True,
+    debug: bool = False,
+) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """
+    Build the sparse phase projection operator for one slice.
+
+    Parameters
+    ----------
+    outphases : NDArray
+        Output phase values.
+    slicephasevals : NDArray
+        Cardiac phase of the slice at every timepoint.
+    congridbins : int
+        Number of bins for congrid resampling.
+    gridkernel : str
+        Kernel to use for congrid resampling.
+    destpoints : int
+        Number of destination points.
+    cache : bool, optional
+        If True, enable caching for congrid. Default is True.
+    debug : bool, optional
+        If True, enable debug output. Default is False.
+
+    Returns
+    -------
+    tuple of scipy.sparse.csr_matrix
+        The congrid weight of each (timepoint, phase) pair, and the number of times each
+        pair is hit, both with shape (ntimepoints, destpoints).
+    """
+    therows = []
+    theweights = []
+    thecols = []
+    for t in range(len(slicephasevals)):
+        thevals, weights, indices = tide_resample.congrid(
+            outphases,
+            slicephasevals[t],
+            1.0,
+            congridbins,
+            kernel=gridkernel,
+            cyclic=True,
+            cache=cache,
+            debug=debug,
+        )
+        therows.append(np.full(len(indices), t, dtype=int))
+        theweights.append(np.asarray(weights, dtype=float))
+        thecols.append(np.asarray(indices, dtype=int))
+    therows = np.concatenate(therows)
+    thecols = np.concatenate(thecols)
+    theshape = (len(slicephasevals), destpoints)
+
+    # duplicate entries are summed, as repeated indices are when accumulating
+    weightmat = sparse.coo_matrix((np.concatenate(theweights), (therows, thecols)), shape=theshape)
+    countmat = sparse.coo_matrix((np.ones(len(therows)), (therows, thecols)), shape=theshape)
+    return weightmat.tocsr(), countmat.tocsr()
+
+
+def makephaseprojector(
+    outphases: NDArray,
+    cardphasevals: NDArray,
+    congridbins: int,
+    gridkernel: str,
+    destpoints: int,
+    cache: bool = True,
+    debug: bool = False,
+) -> list[tuple[sparse.csr_matrix, sparse.csr_matrix]]:
+    """
+    Precompute the phase projection operators for every slice.
+
+    The congrid weights for all the (timepoint, phase) pairs of each slice are gathered
+    into sparse matrices, so a whole slice can then be projected with a sparse matrix
+    product for any subset of timepoints.
+
+    Parameters
+    ----------
+    outphases : NDArray
+        Output phase values.
+    cardphasevals : NDArray
+        Cardiac phase values for each slice and timepoint, shape (nslices, ntr).
+    congridbins : int
+        Number of bins for congrid resampling.
+    gridkernel : str
+        Kernel to use for congrid resampling.
+    destpoints : int
+        Number of destination points.
+    cache : bool, optional
+        If True, enable caching for congrid. Default is True.
+    debug : bool, optional
+        If True, enable debug output. Default is False.
+
+    Returns
+    -------
+    list of tuple
+        One (weight matrix, count matrix) pair per slice, as returned by
+        `_makesliceprojector`.
+
+    Examples
+    --------
+    >>> projector = makephaseprojector(outphases, cardphasevals, 32, "kaiser", 32)
+    >>> len(projector) == cardphasevals.shape[0]
+    True
+    """
+    return [
+        _makesliceprojector(
+            outphases,
+            cardphasevals[theslice, :],
+            congridbins,
+            gridkernel,
+            destpoints,
+            cache=cache,
+            debug=debug,
+        )
+        for theslice in range(cardphasevals.shape[0])
+    ]
+
+
+def _projectslice(
+    theslice: int,
+    validlocs: NDArray,
+    proctrs: NDArray,
+    demeandata_byslice: NDArray,
+    fmri_data_byslice: NDArray,
+    sliceprojector: tuple[sparse.csr_matrix, sparse.csr_matrix],
+    weights_byslice: NDArray,
+    cine_byslice: NDArray,
+    rawapp_byslice: NDArray,
+    destpoints: int,
+) -> None:
+    """
+    Phase project the timepoints `proctrs` of one slice, in place.
+
+    Parameters
+    ----------
+    theslice : int
+        The slice to process.
+    validlocs : NDArray
+        Valid voxel indices in the slice.
+    proctrs : NDArray
+        Timepoints to process.
+    demeandata_byslice : NDArray
+        Demeaned fMRI data, shape (nvoxels, nslices, ntr).
+    fmri_data_byslice : NDArray
+        Raw fMRI data, shape (nvoxels, nslices, ntr).
+    sliceprojector : tuple of scipy.sparse.csr_matrix
+        The projection operator for the slice, from `_makesliceprojector`.
+    weights_byslice : NDArray
+        Weight array, shape (nvoxels, nslices, ndestpoints).
+    cine_byslice : NDArray
+        Cine data array, shape (nvoxels, nslices, ndestpoints).
+    rawapp_byslice : NDArray
+        Raw application data array, shape (nvoxels, nslices, ndestpoints).
+    destpoints : int
+        Number of destination points.
+    """
+    if len(validlocs) > 0:
+        weightmat = sliceprojector[0][proctrs, :]
+        countmat = sliceprojector[1][proctrs, :]
+        filteredmr = -demeandata_byslice[validlocs, theslice, :][:, proctrs]
+        cinemr = fmri_data_byslice[validlocs, theslice, :][:, proctrs]
+        weights_byslice[validlocs, theslice, :] += np.asarray(weightmat.sum(axis=0))
+        rawapp_byslice[validlocs, theslice, :] += filteredmr @ countmat
+        cine_byslice[validlocs, theslice, :] += cinemr @ weightmat
+        for d in range(destpoints):
+            if weights_byslice[validlocs[0], theslice, d] == 0.0:
+                weights_byslice[validlocs, theslice, d] = 1.0
+        rawapp_byslice[validlocs, theslice, :] = np.nan_to_num(
+            rawapp_byslice[validlocs, theslice, :] / weights_byslice[validlocs, theslice, :]
+        )
+        cine_byslice[validlocs, theslice, :] = np.nan_to_num(
+            cine_byslice[validlocs, theslice, :] / weights_byslice[validlocs, theslice, :]
+        )
+    else:
+        rawapp_byslice[:, theslice, :] = 0.0
+        cine_byslice[:, theslice, :] = 0.0
+
+
 def preloadcongrid(
     outphases: NDArray,
     congridbins: int,
@@ -2966,6 +3138,7 @@ def phaseprojectpass(
     alwaysmultiproc=False,
     showprogressbar=True,
     cache=True,
+    projector=None,
     debug=False,
 ):
     """
@@ -3013,6 +3186,10 @@ def phaseprojectpass(
         If True, show progress bar. Default is True.
     cache : bool, optional
         If True, enable caching for congrid. Default is True.
+    projector : list of tuple, optional
+        Projection operators from `makephaseprojector`.  If None, they are computed here.
+        Passing them in saves recomputing them when the same data is projected repeatedly.
+        Default is None.
     debug : bool, optional
         If True, enable debug output. Default is False.
 
@@ -3025,7 +3202,9 @@ def phaseprojectpass(
     -----
     This function is typically used in the context of phase-encoded fMRI analysis.
     It applies a congrid-based resampling technique to project data onto a specified
-    phase grid, accumulating weighted contributions in the output arrays.
+    phase grid, accumulating weighted contributions in the output arrays. The congrid
+    weights of each slice are gathered into a sparse operator, so each slice is projected
+    with a sparse matrix product.
 
     Examples
     --------
@@ -3050,6 +3229,16 @@ def phaseprojectpass(
     ...     debug=False,
     ... )
     """
+    if projector is None:
+        projector = makephaseprojector(
+            outphases,
+            cardphasevals,
+            congridbins,
+            gridkernel,
+            destpoints,
+            cache=cache,
+            debug=debug,
+        )
     if mpcode:
         inputshape = rawapp_byslice.shape
         sliceargs = [
@@ -3065,6 +3254,7 @@ def phaseprojectpass(
             cine_byslice,
             destpoints,
             rawapp_byslice,
+            projector,
         ]
         slicefunc = _procOnePhaseProject
         packfunc = _packslicedataPhaseProject
@@ -3097,38 +3287,18 @@ def phaseprojectpass(
             unit="slices",
             disable=(not showprogressbar),
         ):
-            validlocs = validlocslist[theslice]
-            if len(validlocs) > 0:
-                for t in proctrs:
-                    filteredmr = -demeandata_byslice[validlocs, theslice, t]
-                    cinemr = fmri_data_byslice[validlocs, theslice, t]
-                    thevals, theweights, theindices = tide_resample.congrid(
-                        outphases,
-                        cardphasevals[theslice, t],
-                        1.0,
-                        congridbins,
-                        kernel=gridkernel,
-                        cyclic=True,
-                        cache=cache,
-                        debug=debug,
-                    )
-                    for i in range(len(theindices)):
-                        weights_byslice[validlocs, theslice, theindices[i]] += theweights[i]
-                        rawapp_byslice[validlocs, theslice, theindices[i]] += filteredmr
-                        cine_byslice[validlocs, theslice, theindices[i]] += theweights[i] * cinemr
-                for d in range(destpoints):
-                    if weights_byslice[validlocs[0], theslice, d] == 0.0:
-                        weights_byslice[validlocs, theslice, d] = 1.0
-                rawapp_byslice[validlocs, theslice, :] = np.nan_to_num(
-                    rawapp_byslice[validlocs, theslice, :]
-                    / weights_byslice[validlocs, theslice, :]
-                )
-                cine_byslice[validlocs, theslice, :] = np.nan_to_num(
-                    cine_byslice[validlocs, theslice, :] / weights_byslice[validlocs, theslice, :]
-                )
-            else:
-                rawapp_byslice[:, theslice, :] = 0.0
-                cine_byslice[:, theslice, :] = 0.0
+            _projectslice(
+                theslice,
+                validlocslist[theslice],
+                proctrs,
+                demeandata_byslice,
+                fmri_data_byslice,
+                projector[theslice],
+                weights_byslice,
+                cine_byslice,
+                rawapp_byslice,
+                destpoints,
+            )
 
 
 def _procOneSliceSmoothing(slice, sliceargs, **kwargs):
@@ -3899,6 +4069,11 @@ def wrightmap(
         print("Finding validlocs")
     for theslice in range(numslices):
         validlocslist.append(np.where(projmask_byslice[:, theslice] > 0)[0])
+
+    # the projection operators are the same for every split, so only make them once
+    projector = makephaseprojector(
+        outphases, cardphasevals, congridbins, gridkernel, destpoints, debug=debug
+    )
     for theiteration in range(iterations):
         print(f"wright iteration: {theiteration + 1} of {iterations}")
         # split timecourse into two sets
@@ -3928,6 +4103,7 @@ def wrightmap(
             destpoints,
             nprocs=nprocs,
             showprogressbar=False,
+            projector=projector,
         )
         rawapp_byslice2 = np.zeros_like(rawapp_byslice)
         cine_byslice2 = np.zeros_like(rawapp_byslice)
@@ -3948,6 +4124,7 @@ def wrightmap(
             destpoints,
             nprocs=nprocs,
             showprogressbar=False,
+            projector=projector,
         )
         for theslice in range(numslices):
             for thepoint in validlocslist[theslice]:
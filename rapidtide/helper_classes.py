@@ -19,13 +19,16 @@
 import sys
 from typing import Any
 
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy as sp
 from numpy.typing import NDArray
 
 import rapidtide.miscmath as tide_math
 import rapidtide.util as tide_util
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
 
 
 class fMRIDataset:
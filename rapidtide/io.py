@@ -26,15 +26,22 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 
 import nibabel as nib
 import numpy as np
-import pandas as pd
 from numpy.typing import NDArray
 
 from rapidtide.tests.utils import mse
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+pd = lazyimport("pandas")
 
 
 # ---------------------------------------- NIFTI file manipulation ---------------------------
 def readfromnifti(
-    inputfile: str, headeronly: bool = False
+    inputfile: str,
+    headeronly: bool = False,
+    dtype: Optional[np.dtype] = None,
+    mmap: bool = False,
+    slabsize: int = 16,
 ) -> Tuple[Any, Optional[NDArray], Any, NDArray, NDArray]:
     """
     Open a nifti file and read in the various important parts
@@ -46,6 +53,17 @@ def readfromnifti(
         (.nii or .nii.gz).
     headeronly : bool, optional
         If True, only read the header without loading data. Default is False.
+    dtype : numpy dtype, optional
+        If None (the default), the data is returned as float64 by ``get_fdata()``.
+        Otherwise the (scaled) data is returned in this dtype, and is read a slab at
+        a time directly into the output array, so no full size float64 copy is ever made.
+    mmap : bool, optional
+        If True, and `dtype` is set, an uncompressed file whose data is stored unscaled
+        in `dtype` is returned as a copy-on-write memory map rather than being read
+        into memory.  Default is False.
+    slabsize : int, optional
+        Number of volumes (or slices, for 3D data) to read at once when `dtype` is set.
+        Default is 16.
 
     Returns
     -------
@@ -72,6 +90,7 @@ def readfromnifti(
     --------
     >>> nim, data, hdr, dims, sizes = readfromnifti('my_image')
     >>> nim, data, hdr, dims, sizes = readfromnifti('my_image.nii.gz', headeronly=True)
+    >>> nim, data, hdr, dims, sizes = readfromnifti('my_image.nii', dtype=np.float32, mmap=True)
     """
     if os.path.isfile(inputfile):
         inputfilename = inputfile
@@ -84,14 +103,68 @@ def readfromnifti(
     nim = nib.load(inputfilename)
     if headeronly:
         nim_data = None
-    else:
+    elif dtype is None:
         nim_data = nim.get_fdata()
+    else:
+        nim_data = _readniftidata(
+            nim, inputfilename, np.dtype(dtype), mmap=mmap, slabsize=slabsize
+        )
     nim_hdr = nim.header.copy()
     thedims = nim_hdr["dim"].copy()
     thesizes = nim_hdr["pixdim"].copy()
     return nim, nim_data, nim_hdr, thedims, thesizes
 
 
+def _readniftidata(
+    nim: Any, inputfilename: str, dtype: np.dtype, mmap: bool = False, slabsize: int = 16
+) -> NDArray:
+    """
+    Read the data from a nifti image in a specified dtype, without a float64 intermediate.
+
+    Parameters
+    ----------
+    nim : nifti image
+        The image, as returned by ``nib.load``.
+    inputfilename : str
+        The name of the file the image was loaded from.
+    dtype : numpy dtype
+        The dtype of the returned array.
+    mmap : bool, optional
+        If True, return a copy-on-write memory map when the file is uncompressed
+        and the stored data needs no scaling or type conversion. Default is False.
+    slabsize : int, optional
+        Number of elements along the last axis to read at a time. Default is 16.
+
+    Returns
+    -------
+    NDArray
+        The image data.
+    """
+    theproxy = nim.dataobj
+    if (
+        mmap
+        and (not inputfilename.endswith(".gz"))
+        and (theproxy.slope == 1.0)
+        and (theproxy.inter == 0.0)
+        and (np.dtype(theproxy.dtype) == dtype)
+    ):
+        nim_data = np.asanyarray(theproxy)
+        if isinstance(nim_data, np.memmap):
+            return nim_data
+
+    # read the data a slab at a time along the last axis, converting as we go
+    theshape = theproxy.shape
+    nim_data = np.empty(theshape, dtype=dtype)
+    if len(theshape) == 0:
+        nim_data[...] = np.asarray(theproxy)
+        return nim_data
+    slabsize = max(1, slabsize)
+    for startpt in range(0, theshape[-1], slabsize):
+        endpt = min(startpt + slabsize, theshape[-1])
+        nim_data[..., startpt:endpt] = theproxy[..., startpt:endpt]
+    return nim_data
+
+
 def readfromcifti(
     inputfile: str, debug: bool = False
 ) -> Tuple[Any, Any, NDArray, Any, NDArray, NDArray, Optional[float]]:
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+"""Deferred imports for heavy optional dependencies.
+
+matplotlib, statsmodels, sklearn and several scipy subpackages take seconds to import, but
+most command line tools only touch them in a few code paths (plotting, robust statistics,
+rarely used fits).  The placeholders returned here stand in for a module, or for a name
+imported from a module, and only do the real import the first time they are used.
+"""
+
+import importlib
+import sys
+import types
+from typing import Any
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder for a module that is imported on first attribute access.
+
+    Attribute lookups are forwarded to the real module every time, so patching the real
+    module (or the placeholder itself) behaves the same way as with a normal import.
+    """
+
+    def __init__(self, modulename: str) -> None:
+        super().__init__(modulename)
+        self._lazy_module = None
+
+    def _lazy_load(self) -> types.ModuleType:
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for names that are not set on the placeholder itself
+        if name.startswith("_lazy_"):
+            raise AttributeError(name)
+        return getattr(self._lazy_load(), name)
+
+    def __dir__(self) -> list:
+        return dir(self._lazy_load())
+
+    def __repr__(self) -> str:
+        if self._lazy_module is None:
+            return f"<lazy module '{self.__name__}' (not loaded)>"
+        return repr(self._lazy_module)
+
+
+class LazyAttribute:
+    """Placeholder for ``from modulename import attrname`` that imports on first use.
+
+    Calling the placeholder calls the real object, and attribute lookups are forwarded to it,
+    so it can stand in for functions as well as objects such as scipy distributions.
+    """
+
+    def __init__(self, modulename: str, attrname: str) -> None:
+        self._lazy_modulename = modulename
+        self._lazy_attrname = attrname
+        self._lazy_target = None
+
+    def _lazy_load(self) -> Any:
+        if self._lazy_target is None:
+            self._lazy_target = getattr(
+                importlib.import_module(self._lazy_modulename), self._lazy_attrname
+            )
+        return self._lazy_target
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._lazy_load()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_lazy_"):
+            raise AttributeError(name)
+        return getattr(self._lazy_load(), name)
+
+    def __repr__(self) -> str:
+        return f"<lazy '{self._lazy_modulename}.{self._lazy_attrname}'>"
+
+
+def lazyimport(modulename: str) -> types.ModuleType:
+    """
+    Return a module placeholder that defers importing until first use.
+
+    Use this in place of ``import modulename as alias`` for dependencies that are expensive to
+    import and only needed by some code paths.  If the module has already been imported,
+    it is returned directly.
+
+    Parameters
+    ----------
+    modulename : str
+        Fully qualified module name, e.g. ``"matplotlib.pyplot"``.
+
+    Returns
+    -------
+    module
+        The module itself if already imported, otherwise a LazyModule placeholder.
+
+    Examples
+    --------
+    >>> plt = lazyimport("matplotlib.pyplot")
+    >>> plt.plot([1, 2, 3])  # matplotlib.pyplot is imported here
+    """
+    try:
+        return sys.modules[modulename]
+    except KeyError:
+        return LazyModule(modulename)
+
+
+def lazyimportfrom(modulename: str, attrname: str) -> Any:
+    """
+    Return a placeholder for ``from modulename import attrname`` that defers the import.
+
+    Parameters
+    ----------
+    modulename : str
+        Fully qualified module name, e.g. ``"statsmodels.robust"``.
+    attrname : str
+        Name to look up in the module once it is imported.
+
+    Returns
+    -------
+    object
+        The object itself if the module has already been imported, otherwise a
+        LazyAttribute placeholder.
+
+    Notes
+    -----
+    Placeholders are plain Python objects, so they cannot be called from inside numba
+    compiled functions.
+
+    Examples
+    --------
+    >>> mad = lazyimportfrom("statsmodels.robust", "mad")
+    >>> mad([1.0, 2.0, 4.0])  # statsmodels.robust is imported here
+    """
+    try:
+        return getattr(sys.modules[modulename], attrname)
+    except (KeyError, AttributeError):
+        return LazyAttribute(modulename, attrname)
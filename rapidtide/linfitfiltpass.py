@@ -25,6 +25,7 @@ from tqdm import tqdm
 
 import rapidtide.filter as tide_filt
 import rapidtide.fit as tide_fit
+import rapidtide.genericmultiproc as tide_genericmultiproc
 import rapidtide.miscmath as tide_math
 import rapidtide.multiproc as tide_multiproc
 
@@ -131,6 +132,173 @@ def _procOneRegressionFitItem(
         )
 
 
+def _procRegressionFitBlock(
+    items: NDArray,
+    theevs: NDArray,
+    fmri_data: NDArray,
+    procbyvoxel: bool = True,
+    sharedevs: bool = False,
+    rt_floattype: np.dtype = np.float64,
+) -> tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]:
+    """
+    Perform the regression fits for a block of items at once.
+
+    This is the vectorized equivalent of calling ``_procOneRegressionFitItem`` on each item
+    in ``items``; all the fits in the block are done with a single call to
+    ``tide_fit.mlregress_block``.
+
+    Parameters
+    ----------
+    items : NDArray
+        Indices of the items (voxels or timepoints) to fit.
+    theevs : NDArray
+        The full set of evs. If ``sharedevs`` is True, these are used for every item,
+        otherwise the evs for each item are selected the same way as the data.
+    fmri_data : NDArray
+        The full data array.
+    procbyvoxel : bool, optional
+        If True, items are rows of the data, otherwise columns. Default is True.
+    sharedevs : bool, optional
+        If True, the same evs are used for every item. Default is False.
+    rt_floattype : np.dtype, optional
+        Floating point type of the results. Default is ``np.float64``.
+
+    Returns
+    -------
+    tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]
+        The intercepts, signed square roots of R-squared, R-squared values, fit coefficients,
+        normalized fit coefficients, data removed by fitting and residuals, with the item
+        along the first axis of each. The fit coefficients are 1D for single ev fits and
+        (nitems, nevs) otherwise.
+    """
+    if procbyvoxel:
+        thedata = fmri_data[items, :]
+        if not sharedevs:
+            theevs = theevs[items]
+    else:
+        thedata = fmri_data[:, items].T
+        if not sharedevs:
+            theevs = np.moveaxis(theevs[:, items], 1, 0)
+    thefit, R2 = tide_fit.mlregress_block(theevs, thedata, sharedregressors=sharedevs)
+    intercepts = thefit[:, 0]
+    fitcoeffs = thefit[:, 1:]
+
+    # reconstruct the fitted regressors without the intercept
+    if sharedevs:
+        singleev = theevs.ndim == 1
+        evmat = np.atleast_2d(theevs)
+        if evmat.shape[0] != thedata.shape[1]:
+            evmat = evmat.T
+        datatoremove = fitcoeffs @ evmat.T
+    else:
+        singleev = theevs.ndim == 2
+        if singleev:
+            datatoremove = fitcoeffs[:, 0:1] * theevs
+        else:
+            datatoremove = np.einsum("rnp,rp->rn", theevs, fitcoeffs)
+    datatoremove = datatoremove.astype(rt_floattype)
+
+    R2 = np.where(np.any(fitcoeffs != 0.0, axis=1), R2, 0.0)
+    coeffsign = np.where(fitcoeffs[:, 0] < 0.0, -1.0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fitnorms = (fitcoeffs / intercepts[:, None]).astype(rt_floattype)
+    fitcoeffs = fitcoeffs.astype(rt_floattype)
+    if singleev:
+        fitcoeffs = fitcoeffs[:, 0]
+        fitnorms = fitnorms[:, 0]
+    return (
+        intercepts,
+        coeffsign * np.sqrt(R2),
+        R2,
+        fitcoeffs,
+        fitnorms,
+        datatoremove,
+        (thedata - datatoremove).astype(rt_floattype),
+    )
+
+
+def _GLMconsumer(
+    inQ: Any,
+    outQ: Any,
+    workerargs: list,
+    procbyvoxel: bool,
+    sharedevs: bool,
+    mpbatchsize: int,
+    rt_floattype: np.dtype,
+    blockfit: bool = False,
+) -> None:
+    """
+    Worker loop for the multiprocess path of ``linfitfiltpass``.
+
+    Parameters
+    ----------
+    inQ : Any
+        Queue of item indices (or index arrays when batching); None stops the worker.
+    outQ : Any
+        Queue on which the fit results are returned.
+    workerargs : list
+        The evs and the data, as prepared by ``genericmultiproc.sharevoxelargs``.
+    procbyvoxel : bool
+        If True, items are voxels (rows of the data), otherwise timepoints (columns).
+    sharedevs : bool
+        If True, the same evs are used for every item, otherwise each item has its own.
+    mpbatchsize : int
+        Number of items in each message.
+    rt_floattype : np.dtype
+        Floating point type of the results.
+    blockfit : bool, optional
+        If True, each batch of items is fit with a single vectorized solve. Default is False.
+    """
+    (theevs, fmri_data), theblocks = tide_genericmultiproc.attachvoxelargs(workerargs)
+
+    def fitoneitem(val):
+        if procbyvoxel:
+            return _procOneRegressionFitItem(
+                val,
+                theevs if sharedevs else theevs[val, :],
+                fmri_data[val, :],
+                rt_floattype=rt_floattype,
+            )
+        else:
+            return _procOneRegressionFitItem(
+                val,
+                theevs if sharedevs else theevs[:, val],
+                fmri_data[:, val],
+                rt_floattype=rt_floattype,
+            )
+
+    while True:
+        try:
+            # get a new message
+            val = inQ.get()
+
+            # this is the 'TERM' signal
+            if val is None:
+                break
+
+            # process and send the data
+            if mpbatchsize > 1 and blockfit:
+                theresults = _procRegressionFitBlock(
+                    val,
+                    theevs,
+                    fmri_data,
+                    procbyvoxel=procbyvoxel,
+                    sharedevs=sharedevs,
+                    rt_floattype=rt_floattype,
+                )
+                outQ.put([(item,) + tuple(x[i] for x in theresults) for i, item in enumerate(val)])
+            elif mpbatchsize > 1:
+                outQ.put([fitoneitem(item) for item in val])
+            else:
+                outQ.put(fitoneitem(val))
+
+        except Exception as e:
+            print("error!", e)
+            break
+    del theevs, fmri_data
+    tide_genericmultiproc.detachvoxelargs(theblocks)
+
+
 def linfitfiltpass(
     numprocitems: int,
     fmri_data: NDArray,
@@ -152,6 +320,8 @@ def linfitfiltpass(
     procbyvoxel: bool = True,
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    mpbatchsize: int = 1,
+    blocksize: int = 1000,
     rt_floattype: np.dtype = np.dtype(np.float64),
     verbose: bool = True,
     debug: bool = False,
@@ -203,6 +373,12 @@ def linfitfiltpass(
         If True, display a progress bar during processing.
     chunksize : int, default: 1000
         Size of chunks for multiprocessing.
+    mpbatchsize : int, default: 1
+        Number of items sent to each worker per queue message when multiprocessing.
+    blocksize : int, default: 1000
+        Number of items fit together in a single vectorized solve. When multiprocessing,
+        each queue message holds at least this many items. Set to 1 to fit each item
+        separately.
     rt_floattype : str, default: np.float64
         Data type for internal floating-point calculations.
     verbose : bool, default: True
@@ -221,6 +397,8 @@ def linfitfiltpass(
     - For ``confoundregress=True``, only ``r2value`` and ``filtereddata`` are populated.
     - When ``coefficientsonly=True``, only ``meanvalue``, ``rvalue``, ``r2value``, ``fitcoeff``, and ``fitNorm`` are populated.
     - If ``threshval`` is provided, a mask is generated based on mean or standard deviation of the data.
+    - With ``blocksize > 1``, the evs are shared by all items if ``constantevs`` or
+      ``confoundregress`` is set, and are selected per item otherwise.
 
     Examples
     --------
@@ -278,75 +456,41 @@ def linfitfiltpass(
     else:
         themask = validmask
 
+    sharedevs = confoundregress or constantevs
+    blockfit = blocksize > 1
+    if blockfit:
+        mpbatchsize = max(mpbatchsize, blocksize)
+
     if (
         nprocs > 1 or alwaysmultiproc
     ):  # temporary workaround until I figure out why nprocs > 1 is failing
-        # define the consumer function here so it inherits most of the arguments
-        def GLM_consumer(inQ, outQ):
-            while True:
-                try:
-                    # get a new message
-                    val = inQ.get()
-
-                    # this is the 'TERM' signal
-                    if val is None:
-                        break
-
-                    # process and send the data
-                    if procbyvoxel:
-                        if confoundregress or constantevs:
-                            outQ.put(
-                                _procOneRegressionFitItem(
-                                    val,
-                                    theevs,
-                                    fmri_data[val, :],
-                                    rt_floattype=rt_floattype,
-                                )
-                            )
-                        else:
-                            outQ.put(
-                                _procOneRegressionFitItem(
-                                    val,
-                                    theevs[val, :],
-                                    fmri_data[val, :],
-                                    rt_floattype=rt_floattype,
-                                )
-                            )
-                    else:
-                        if confoundregress or constantevs:
-                            outQ.put(
-                                _procOneRegressionFitItem(
-                                    val,
-                                    theevs,
-                                    fmri_data[:, val],
-                                    rt_floattype=rt_floattype,
-                                )
-                            )
-                        else:
-                            outQ.put(
-                                _procOneRegressionFitItem(
-                                    val,
-                                    theevs[:, val],
-                                    fmri_data[:, val],
-                                    rt_floattype=rt_floattype,
-                                )
-                            )
-
-                except Exception as e:
-                    print("error!", e)
-                    break
-
-        data_out = tide_multiproc.run_multiproc(
-            GLM_consumer,
-            inputshape,
-            themask,
-            verbose=verbose,
-            nprocs=nprocs,
-            indexaxis=indexaxis,
-            procunit=procunit,
-            showprogressbar=showprogressbar,
-            chunksize=chunksize,
+        # send the large arrays to the workers through shared memory
+        workerargs, temporaryblocks = tide_genericmultiproc.sharevoxelargs(
+            [theevs, fmri_data], nprocs=nprocs
         )
+        try:
+            data_out = tide_multiproc.run_multiproc(
+                _GLMconsumer,
+                inputshape,
+                themask,
+                verbose=verbose,
+                nprocs=nprocs,
+                indexaxis=indexaxis,
+                procunit=procunit,
+                showprogressbar=showprogressbar,
+                chunksize=chunksize,
+                batchsize=mpbatchsize,
+                consumerargs=(
+                    workerargs,
+                    procbyvoxel,
+                    sharedevs,
+                    mpbatchsize,
+                    rt_floattype,
+                    blockfit,
+                ),
+            )
+        finally:
+            tide_genericmultiproc.releasevoxelargs(temporaryblocks)
 
         # unpack the data
         itemstotal = 0
@@ -417,6 +561,63 @@ def linfitfiltpass(
                     itemstotal += 1
 
         del data_out
+    elif blockfit:
+        # this is the single proc path, fitting a block of items at a time
+        if themask is None:
+            theitems = np.arange(numprocitems)
+        else:
+            theitems = np.where(themask[:numprocitems] > 0)[0]
+        with tqdm(
+            total=len(theitems),
+            desc=procunit.capitalize()[:-1],
+            unit=procunit,
+            disable=(not showprogressbar),
+        ) as pbar:
+            for startpt in range(0, len(theitems), blocksize):
+                items = theitems[startpt : startpt + blocksize]
+                (
+                    theintercepts,
+                    thervals,
+                    ther2vals,
+                    thefitcoeffs,
+                    thefitnorms,
+                    theremoveddata,
+                    thefiltereddata,
+                ) = _procRegressionFitBlock(
+                    items,
+                    theevs,
+                    fmri_data,
+                    procbyvoxel=procbyvoxel,
+                    sharedevs=sharedevs,
+                    rt_floattype=rt_floattype,
+                )
+                r2value[items] = ther2vals
+                if not confoundregress:
+                    meanvalue[items] = theintercepts
+                    rvalue[items] = thervals
+                    # match the per item path, which broadcasts scalar coefficients
+                    # across any extra dimensions of the output arrays
+                    if procbyvoxel:
+                        extradims = (1,) * (fitcoeff.ndim - thefitcoeffs.ndim)
+                        fitcoeff[items] = thefitcoeffs.reshape(thefitcoeffs.shape + extradims)
+                        fitNorm[items] = thefitnorms.reshape(thefitnorms.shape + extradims)
+                    elif fitcoeff.ndim == 1:
+                        fitcoeff[items] = thefitcoeffs
+                        fitNorm[items] = thefitnorms
+                    else:
+                        fitcoeff[:, items] = thefitcoeffs.T
+                        fitNorm[:, items] = thefitnorms.T
+                if not coefficientsonly:
+                    if procbyvoxel:
+                        filtereddata[items, :] = thefiltereddata
+                        if not confoundregress:
+                            datatoremove[items, :] = theremoveddata
+                    else:
+                        filtereddata[:, items] = thefiltereddata.T
+                        if not confoundregress:
+                            datatoremove[:, items] = theremoveddata.T
+                pbar.update(len(items))
+        itemstotal = len(theitems)
     else:
         # this is the single proc path
         itemstotal = 0
@@ -22,9 +22,12 @@ from typing import Any
 
 import numpy as np
 from numpy.typing import NDArray
+from tqdm import tqdm
 
 import rapidtide.genericmultiproc as tide_genericmultiproc
 
+DEFAULT_LAGBANKMAXBYTES = 256 * 1024 * 1024
+
 
 def _procOneVoxelMakelagtc(
     vox: int,
@@ -178,6 +181,160 @@ def _unpackvoxeldata(retvals: tuple, voxelproducts: list) -> None:
     (voxelproducts[0])[retvals[0], :] = retvals[1]
 
 
+def makelagbank(
+    lagtcgenerator: Any,
+    timeaxis: NDArray,
+    lagstart: float,
+    numlags: int,
+    lagstep: float,
+    rt_floattype: np.dtype = np.dtype(np.float64),
+) -> NDArray:
+    """
+    Precompute the lagged regressor on a regular grid of lags.
+
+    Parameters
+    ----------
+    lagtcgenerator : Any
+        Lag timecourse generator object with a `yfromx` method.
+    timeaxis : NDArray
+        Time axis on which to evaluate the regressor.
+    lagstart : float
+        The first lag in the grid, in seconds.
+    numlags : int
+        The number of lags in the grid.
+    lagstep : float
+        The spacing of the lag grid, in seconds.
+    rt_floattype : np.dtype, optional
+        Floating point type of the bank. Default is `np.float64`.
+
+    Returns
+    -------
+    NDArray
+        Array of shape (numlags, len(timeaxis)), where row i is the regressor at a lag of
+        ``lagstart + i * lagstep``.
+
+    Examples
+    --------
+    >>> class MockGenerator:
+    ...     def yfromx(self, x):
+    ...         return x**2
+    ...
+    >>> makelagbank(MockGenerator(), np.array([0.0, 1.0, 2.0]), 0.0, 2, 1.0)
+    array([[0., 1., 4.],
+           [1., 0., 1.]])
+    """
+    thebank = np.zeros((numlags, len(timeaxis)), dtype=rt_floattype)
+    for i in range(numlags):
+        thebank[i, :] = lagtcgenerator.yfromx(timeaxis - (lagstart + i * lagstep))
+    return thebank
+
+
+def _makelaggedtcsfrombank(
+    lagtcgenerator: Any,
+    timeaxis: NDArray,
+    lagmask: NDArray,
+    lagtimes: NDArray,
+    lagtc: NDArray,
+    lagstep: float,
+    interpolate: bool = True,
+    maxbankbytes: int = DEFAULT_LAGBANKMAXBYTES,
+    showprogressbar: bool = True,
+    rt_floattype: np.dtype = np.dtype(np.float64),
+    debug: bool = False,
+) -> int:
+    """
+    Fill the lagged timecourses by gathering rows from a precomputed lag bank.
+
+    The voxels are sorted by lag and handled in segments, each covering a range of lags
+    small enough that its bank fits in ``maxbankbytes``.
+
+    Parameters
+    ----------
+    lagtcgenerator : Any
+        Lag timecourse generator object with a `yfromx` method.
+    timeaxis : NDArray
+        Time axis on which to evaluate the regressor.
+    lagmask : NDArray
+        Voxels with nonzero values are filled.
+    lagtimes : NDArray
+        The lag of each voxel, in seconds.
+    lagtc : NDArray
+        Output array of shape (nvoxels, len(timeaxis)), updated in place.
+    lagstep : float
+        The spacing of the lag grid, in seconds.
+    interpolate : bool, optional
+        If True, blend linearly between the two nearest lags in the bank, otherwise use the
+        nearest one. Default is True.
+    maxbankbytes : int, optional
+        The maximum size of the bank held in memory at once. Default is 256MB.
+    showprogressbar : bool, optional
+        If True, display a progress bar. Default is True.
+    rt_floattype : np.dtype, optional
+        Floating point type of the bank. Default is `np.float64`.
+    debug : bool, optional
+        If True, print debug information. Default is False.
+
+    Returns
+    -------
+    int
+        Total number of voxels processed.
+    """
+    thevoxels = np.where(lagmask > 0)[0]
+    if len(thevoxels) == 0:
+        return 0
+    thelags = lagtimes[thevoxels]
+    lagstart = np.floor(np.min(thelags) / lagstep) * lagstep
+    thepositions = (thelags - lagstart) / lagstep
+    if interpolate:
+        thelowrows = np.floor(thepositions).astype(np.int64)
+    else:
+        thelowrows = np.rint(thepositions).astype(np.int64)
+    sortorder = np.argsort(thelowrows, kind="stable")
+    thevoxels = thevoxels[sortorder]
+    thepositions = thepositions[sortorder]
+    thelowrows = thelowrows[sortorder]
+
+    # leave room for the upper neighbor of the last row in each segment
+    rowbytes = len(timeaxis) * np.dtype(rt_floattype).itemsize
+    maxrows = max(2, int(maxbankbytes // rowbytes))
+    segmentspan = maxrows - 1 if interpolate else maxrows
+    if debug:
+        print(f"_makelaggedtcsfrombank: {lagstart=}, {lagstep=}, {maxrows=}")
+
+    gatherblock = max(1, int(maxbankbytes // (2 * rowbytes)))
+    startvox = 0
+    with tqdm(
+        total=len(thevoxels), desc="Voxel", unit="voxels", disable=(not showprogressbar)
+    ) as pbar:
+        while startvox < len(thevoxels):
+            firstrow = thelowrows[startvox]
+            endvox = np.searchsorted(thelowrows, firstrow + segmentspan, side="left")
+            numrows = thelowrows[endvox - 1] - firstrow + (2 if interpolate else 1)
+            thebank = makelagbank(
+                lagtcgenerator,
+                timeaxis,
+                lagstart + firstrow * lagstep,
+                numrows,
+                lagstep,
+                rt_floattype=rt_floattype,
+            )
+            for blockstart in range(startvox, endvox, gatherblock):
+                blockend = min(blockstart + gatherblock, endvox)
+                theserows = thelowrows[blockstart:blockend] - firstrow
+                if interpolate:
+                    thefracs = (
+                        thepositions[blockstart:blockend] - thelowrows[blockstart:blockend]
+                    )[:, None]
+                    lagtc[thevoxels[blockstart:blockend], :] = (1.0 - thefracs) * thebank[
+                        theserows, :
+                    ] + thefracs * thebank[theserows + 1, :]
+                else:
+                    lagtc[thevoxels[blockstart:blockend], :] = thebank[theserows, :]
+                pbar.update(blockend - blockstart)
+            startvox = endvox
+    return len(thevoxels)
+
+
 def makelaggedtcs(
     lagtcgenerator: Any,
     timeaxis: NDArray,
@@ -189,6 +346,10 @@ def makelaggedtcs(
     alwaysmultiproc: bool = False,
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    mpbatchsize: int = 1,
+    lagbankstep: float | None = None,
+    lagbankinterp: bool = True,
+    lagbankmaxbytes: int = DEFAULT_LAGBANKMAXBYTES,
     rt_floattype: np.dtype = np.dtype(np.float64),
     debug: bool = False,
 ) -> int:
@@ -225,6 +386,19 @@ def makelaggedtcs(
     chunksize : int, optional
         Size of chunks to process in each step when using multiprocessing.
         Default is 1000.
+    mpbatchsize : int, optional
+        Number of voxels sent to each worker per queue message when using
+        multiprocessing. Default is 1.
+    lagbankstep : float, optional
+        If set, precompute the regressor on a grid of lags this far apart (in seconds)
+        and fill `lagtc` by gathering rows from it, rather than resampling the regressor
+        for every voxel. This is the lag precision of the result. Default is None (resample
+        every voxel).
+    lagbankinterp : bool, optional
+        If True, blend linearly between the two nearest lags in the bank, otherwise use the
+        nearest one. Default is True.
+    lagbankmaxbytes : int, optional
+        The maximum size of the lag bank held in memory at once. Default is 256MB.
     rt_floattype : str, optional
         String representation of the floating-point type.
         Default is `np.float64`.
@@ -240,7 +414,8 @@ def makelaggedtcs(
     -----
     This function uses `tide_genericmultiproc.run_multiproc` internally to
     distribute voxel processing across multiple processes. It is designed for
-    efficient batch processing of large 4D datasets.
+    efficient batch processing of large 4D datasets. When `lagbankstep` is set,
+    the work is a vectorized gather in a single process and `nprocs` is ignored.
 
     Examples
     --------
@@ -265,32 +440,48 @@ def makelaggedtcs(
         print(f"\t{lagtimes.shape=}")
         print(f"\t{timeaxis.shape=}")
 
-    inputshape = lagtc.shape
-    voxelargs = [
-        lagtcgenerator,
-        lagtimes,
-        timeaxis,
-    ]
-    voxelfunc = _procOneVoxelMakelagtc
-    packfunc = _packvoxeldata
-    unpackfunc = _unpackvoxeldata
-    voxeltargets = [lagtc]
-
-    volumetotal = tide_genericmultiproc.run_multiproc(
-        voxelfunc,
-        packfunc,
-        unpackfunc,
-        voxelargs,
-        voxeltargets,
-        inputshape,
-        lagmask,
-        LGR,
-        nprocs,
-        alwaysmultiproc,
-        showprogressbar,
-        chunksize,
-        rt_floattype=rt_floattype,
-    )
+    if lagbankstep is not None:
+        volumetotal = _makelaggedtcsfrombank(
+            lagtcgenerator,
+            timeaxis,
+            lagmask,
+            lagtimes,
+            lagtc,
+            lagbankstep,
+            interpolate=lagbankinterp,
+            maxbankbytes=lagbankmaxbytes,
+            showprogressbar=showprogressbar,
+            rt_floattype=rt_floattype,
+            debug=debug,
+        )
+    else:
+        inputshape = lagtc.shape
+        voxelargs = [
+            lagtcgenerator,
+            lagtimes,
+            timeaxis,
+        ]
+        voxelfunc = _procOneVoxelMakelagtc
+        packfunc = _packvoxeldata
+        unpackfunc = _unpackvoxeldata
+        voxeltargets = [lagtc]
+
+        volumetotal = tide_genericmultiproc.run_multiproc(
+            voxelfunc,
+            packfunc,
+            unpackfunc,
+            voxelargs,
+            voxeltargets,
+            inputshape,
+            lagmask,
+            LGR,
+            nprocs,
+            alwaysmultiproc,
+            showprogressbar,
+            chunksize,
+            batchsize=mpbatchsize,
+            rt_floattype=rt_floattype,
+        )
     if LGR is not None:
         LGR.info(f"\nLagged timecourses created for {volumetotal} voxels")
 
@@ -21,13 +21,16 @@ import logging
 from typing import Any, Callable, Optional, Tuple, Union
 
 import numpy as np
-from nilearn import masking
 from numpy.typing import ArrayLike, NDArray
-from sklearn.decomposition import PCA
 
 import rapidtide.io as tide_io
 import rapidtide.miscmath as tide_math
 import rapidtide.stats as tide_stats
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+masking = lazyimport("nilearn.masking")
+PCA = lazyimportfrom("sklearn.decomposition", "PCA")
 
 LGR = logging.getLogger("GENERAL")
 
@@ -67,12 +70,6 @@ def resampmask(themask: ArrayLike, thetargetres: float) -> NDArray:
     return themask
 
 
-<<<<<<< HEAD
-def makeepimask(nim, opening=2, excludeZeros=False):
-    # epi_mask = masking.compute_epi_mask(nim, opening=opening, exclude_zeros=excludeZeros)
-    epi_mask = masking.compute_epi_mask(nim)
-    return epi_mask
-=======
 def makeepimask(nim: Any) -> Any:
     """Compute EPI mask from neuroimaging data.
 
@@ -108,7 +105,6 @@ def makeepimask(nim: Any) -> Any:
     >>> print(mask.shape)
     """
     return masking.compute_epi_mask(nim)
->>>>>>> e44ea1e8aa44b516950b9327909ff2a6bf41e442
 
 
 def maketmask(
@@ -19,18 +19,21 @@
 import warnings
 from typing import Callable, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pyfftw
 import scipy as sp
 from numpy.polynomial import Polynomial
 from numpy.typing import NDArray
 from scipy import fft
-from statsmodels.robust import mad
 
 import rapidtide.filter as tide_filt
 import rapidtide.fit as tide_fit
 from rapidtide.decorators import conditionaljit, conditionaljit2
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+mad = lazyimportfrom("statsmodels.robust", "mad")
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -741,7 +744,8 @@ def imagevariance(
     -----
     - NaN values are converted to zero in the final result.
     - When `meannorm=True`, the variance is normalized by the mean of the original data.
-    - The filter is applied to each voxel's time series independently.
+    - The filter is applied to each voxel's time series independently, all at once if
+      the filter has an `apply_block` method.
     - If no filter is provided, the original data is used directly.
 
     Examples
@@ -753,12 +757,14 @@ def imagevariance(
     """
     if debug:
         print(f"IMAGEVARIANCE: {thedata.shape}, {thefilter}, {samplefreq}")
-    filteredim = np.zeros_like(thedata)
-    if thefilter is not None:
+    if thefilter is None:
+        filteredim = thedata
+    elif hasattr(thefilter, "apply_block"):
+        filteredim = thefilter.apply_block(samplefreq, thedata)
+    else:
+        filteredim = np.zeros_like(thedata)
         for thevoxel in range(thedata.shape[0]):
             filteredim[thevoxel, :] = thefilter.apply(samplefreq, thedata[thevoxel, :])
-    else:
-        filteredim = thedata
     if meannorm:
         return np.nan_to_num(np.var(filteredim, axis=1) / np.mean(thedata, axis=1))
     else:
@@ -822,6 +828,56 @@ def corrnormalize(thedata: NDArray, detrendorder: int = 1, windowfunc: str = "ha
         return stdnormalize(intervec) / np.sqrt(np.shape(thedata)[0])
 
 
+def _stdnormalize_rows(thedata: NDArray) -> NDArray:
+    demeaned = thedata - np.mean(thedata, axis=1, keepdims=True)
+    sigstd = np.std(demeaned, axis=1, keepdims=True)
+    return demeaned / np.where(sigstd > 0.0, sigstd, 1.0)
+
+
+def corrnormalize_block(
+    thedata: NDArray, detrendorder: int = 1, windowfunc: str = "hamming"
+) -> NDArray:
+    """
+    Apply `corrnormalize` to each row of a 2D array.
+
+    Parameters
+    ----------
+    thedata : NDArray
+        2D array of timecourses, one per row.
+    detrendorder : int, optional
+        Order of detrending to apply. A value of 0 skips detrending (default is 1).
+    windowfunc : str, optional
+        Window function to apply. Use 'None' to skip windowing (default is 'hamming').
+
+    Returns
+    -------
+    NDArray
+        The normalized timecourses, in the same layout as `thedata`.
+
+    Examples
+    --------
+    >>> normalized = corrnormalize_block(np.random.randn(1000, 200), detrendorder=3)
+    """
+    thedata = np.atleast_2d(thedata)
+    thelen = thedata.shape[1]
+
+    # detrend first
+    if detrendorder > 0:
+        intervec = _stdnormalize_rows(
+            tide_fit.detrend_block(thedata, order=detrendorder, demean=True)
+        )
+    else:
+        intervec = _stdnormalize_rows(thedata)
+
+    # then window
+    if windowfunc != "None":
+        return _stdnormalize_rows(
+            tide_filt.windowfunction(thelen, type=windowfunc)[None, :] * intervec
+        ) / np.sqrt(thelen)
+    else:
+        return _stdnormalize_rows(intervec) / np.sqrt(thelen)
+
+
 def noiseamp(
     vector: NDArray, Fs: float, windowsize: float = 40.0
 ) -> Tuple[NDArray, NDArray, float, float, float, float]:
@@ -16,6 +16,7 @@
 #   limitations under the License.
 #
 #
+import atexit
 import multiprocessing as mp
 import sys
 import threading as thread
@@ -31,6 +32,13 @@ try:
 except ImportError:
     import Queue as thrQueue
 
+# start method used for spawn-safe workers - see setstartmethod
+_startmethod = "fork"
+STARTMETHODS = ["fork", "spawn", "forkserver"]
+
+# the persistent worker pool, if any - see startworkerpool
+_workerpool = None
+
 
 def maxcpus(reservecpu: bool = True) -> int:
     """Return the maximum number of CPUs that can be used for parallel processing.
@@ -71,14 +79,282 @@ def maxcpus(reservecpu: bool = True) -> int:
         return mp.cpu_count()
 
 
+def setstartmethod(startmethod: str = "fork") -> None:
+    """Select how worker processes are started for spawn-safe consumers.
+
+    Only consumers passed to ``run_multiproc`` with ``consumerargs`` (which
+    must therefore be picklable, module level functions) use this setting.
+    Consumers defined as closures are always started with "fork", since
+    that is the only way they can be handed to a child process.
+
+    Parameters
+    ----------
+    startmethod : str, optional
+        One of "fork", "spawn" or "forkserver". Default is "fork".
+
+    Examples
+    --------
+    >>> setstartmethod("spawn")
+    """
+    global _startmethod
+    if startmethod not in STARTMETHODS:
+        raise ValueError(f"startmethod must be one of {STARTMETHODS}")
+    _startmethod = startmethod
+
+
+def getstartmethod() -> str:
+    """Return the start method used for spawn-safe consumers.
+
+    Returns
+    -------
+    str
+        The current start method, as set by ``setstartmethod``.
+    """
+    return _startmethod
+
+
+def _poolworker(jobQ: Any, inQ: Any, outQ: Any, doneQ: Any) -> None:
+    """Main loop of a persistent pool worker.
+
+    Each job is a spawn-safe consumer and its extra arguments.  The consumer
+    is run on the shared queues until it receives its 'TERM' signal, and
+    completion is reported on `doneQ` before waiting for the next job.  A
+    None job shuts the worker down.
+
+    Parameters
+    ----------
+    jobQ : Any
+        Queue of (consumerfunc, consumerargs) jobs.
+    inQ : Any
+        Input queue handed to each consumer.
+    outQ : Any
+        Output queue handed to each consumer.
+    doneQ : Any
+        Queue on which the end of each job is reported.
+    """
+    while True:
+        thejob = jobQ.get()
+        if thejob is None:
+            break
+        consumerfunc, consumerargs = thejob
+        try:
+            consumerfunc(inQ, outQ, *consumerargs)
+        except Exception as e:
+            print("error!", e)
+        del thejob, consumerfunc, consumerargs
+        doneQ.put(True)
+
+
+class WorkerPool:
+    """A set of worker processes that is reused by successive ``run_multiproc`` calls.
+
+    Starting worker processes is expensive - each one has to be forked from
+    (or, with "spawn", has to reimport) the main process - and a rapidtide
+    run makes many voxelwise passes.  A pool is started once, and each
+    ``run_multiproc`` call that uses a spawn-safe consumer sends it to the
+    existing workers as a job instead of starting new processes.
+
+    Parameters
+    ----------
+    nprocs : int
+        Number of worker processes.
+    startmethod : str, optional
+        How to start the workers.  Default is the method chosen with
+        ``setstartmethod``.
+
+    Notes
+    -----
+    Job arguments are pickled and sent through a queue, so large arrays
+    should be passed to the workers as shared memory handles (see
+    ``genericmultiproc.sharevoxelargs``).
+    """
+
+    def __init__(self, nprocs: int, startmethod: Optional[str] = None) -> None:
+        if startmethod is None:
+            startmethod = _startmethod
+        self.nprocs = nprocs
+        self.startmethod = startmethod
+        self.jobsrun = 0
+        ctx = mp.get_context(startmethod)
+        self.jobQ = ctx.Queue()
+        self.inQ = ctx.Queue()
+        self.outQ = ctx.Queue()
+        self.doneQ = ctx.Queue()
+        self.workers = [
+            ctx.Process(
+                target=_poolworker,
+                args=(self.jobQ, self.inQ, self.outQ, self.doneQ),
+                daemon=True,
+            )
+            for i in range(nprocs)
+        ]
+        for w in self.workers:
+            w.start()
+
+    def startjob(self, consumerfunc: Callable, consumerargs: Tuple[Any, ...]) -> None:
+        """Hand a consumer to every worker.
+
+        Parameters
+        ----------
+        consumerfunc : callable
+            A module level consumer, called as ``consumerfunc(inQ, outQ, *consumerargs)``.
+        consumerargs : tuple
+            Picklable extra arguments for `consumerfunc`.
+        """
+        thejob = (consumerfunc, tuple(consumerargs))
+        for i in range(self.nprocs):
+            self.jobQ.put(thejob)
+
+    def finishjob(self) -> None:
+        """Stop the consumers of the current job, and wait until all of them have returned."""
+        for i in range(self.nprocs):
+            self.inQ.put(None)
+        for i in range(self.nprocs):
+            self.doneQ.get()
+        self.jobsrun += 1
+
+    def close(self) -> None:
+        """Shut down the workers."""
+        for i in range(self.nprocs):
+            self.jobQ.put(None)
+        for w in self.workers:
+            w.join()
+            w.close()
+        self.workers = []
+
+
+def startworkerpool(nprocs: int, startmethod: Optional[str] = None) -> WorkerPool:
+    """Start the persistent worker pool used by ``run_multiproc``.
+
+    Any existing pool is shut down first.
+
+    Parameters
+    ----------
+    nprocs : int
+        Number of worker processes.  Only calls to ``run_multiproc`` with
+        this number of processes use the pool.
+    startmethod : str, optional
+        How to start the workers.  Default is the method chosen with
+        ``setstartmethod``.
+
+    Returns
+    -------
+    WorkerPool
+        The new pool.
+
+    Examples
+    --------
+    >>> startworkerpool(8)
+    >>> # ... run some passes ...
+    >>> stopworkerpool()
+    """
+    global _workerpool
+    stopworkerpool()
+    _workerpool = WorkerPool(nprocs, startmethod=startmethod)
+    return _workerpool
+
+
+def stopworkerpool() -> None:
+    """Shut down the persistent worker pool, if there is one."""
+    global _workerpool
+    if _workerpool is not None:
+        _workerpool.close()
+        _workerpool = None
+
+
+def getworkerpool() -> Optional[WorkerPool]:
+    """Return the persistent worker pool, or None if it is not running.
+
+    Returns
+    -------
+    WorkerPool or None
+        The current pool.
+    """
+    return _workerpool
+
+
+def _poolfor(nprocs: int) -> Optional[WorkerPool]:
+    if (_workerpool is not None) and (_workerpool.nprocs == nprocs):
+        return _workerpool
+    return None
+
+
+def workersforked(nprocs: Optional[int] = None) -> bool:
+    """Report whether spawn-safe consumers for a pass will be freshly forked.
+
+    If they are, they inherit the parent's memory, and large arguments do
+    not have to be sent to them.  Otherwise - when another start method has
+    been selected, or when a persistent pool will run the pass - every
+    argument is pickled.
+
+    Parameters
+    ----------
+    nprocs : int, optional
+        Number of processes the pass will use.  If None, report whether the
+        workers of every pass will be forked, i.e. that no persistent pool is
+        running.  Default is None.
+
+    Returns
+    -------
+    bool
+        True if the workers will be forked for this pass.
+    """
+    if nprocs is None:
+        return (_startmethod == "fork") and (_workerpool is None)
+    return (_startmethod == "fork") and (_poolfor(nprocs) is None)
+
+
+atexit.register(stopworkerpool)
+
+
+def _makebatches(data_in: List[Any], batchsize: int = 1) -> List[Any]:
+    """Group a list of work item indices into batches for dispatch.
+
+    Parameters
+    ----------
+    data_in : List[Any]
+        Indices of the items to be processed.
+    batchsize : int, optional
+        Number of items to pack into each queue message. If 1 or less, the
+        items are returned unchanged, and each item is sent as its own message.
+        Default is 1.
+
+    Returns
+    -------
+    List[Any]
+        The messages to put on the input queue.  When batching, each message
+        is a 1D integer array holding a contiguous slice of ``data_in``.
+
+    Examples
+    --------
+    >>> _makebatches([0, 1, 2, 5, 7], batchsize=2)
+    [array([0, 1]), array([2, 5]), array([7])]
+    """
+    if batchsize <= 1:
+        return data_in
+    theindices = np.asarray(data_in, dtype=np.int64)
+    return [
+        theindices[startpt : startpt + batchsize]
+        for startpt in range(0, len(theindices), batchsize)
+    ]
+
+
 def _process_data(
-    data_in: List[Any], inQ: Any, outQ: Any, showprogressbar: bool = True, chunksize: int = 10000
+    data_in: List[Any],
+    inQ: Any,
+    outQ: Any,
+    showprogressbar: bool = True,
+    chunksize: int = 10000,
+    batchsize: int = 1,
+    nworkers: int = 1,
 ) -> List[Any]:
-    """Process input data in chunks using multiprocessing queues.
+    """Process input data using multiprocessing queues.
 
-    This function distributes data into chunks and processes them using
-    provided input and output queues. It supports progress tracking and
-    handles both complete chunks and a final remainder chunk.
+    This function sends work items to the workers through the input queue,
+    keeping a bounded number of messages in flight, and collects the results
+    from the output queue.  Items can either be sent one per message, or in
+    batches of indices, in which case each worker returns one list of results
+    per batch.
 
     Parameters
     ----------
@@ -91,7 +367,14 @@ def _process_data(
     showprogressbar : bool, optional
         If True, display a progress bar during processing. Default is True.
     chunksize : int, optional
-        Size of data chunks to process at a time. Default is 10000.
+        Maximum number of items in flight at any time. Default is 10000.
+    batchsize : int, optional
+        Number of items to send in each queue message.  If greater than 1,
+        workers receive an integer array of indices and must reply with a list
+        holding one result per index. Default is 1.
+    nworkers : int, optional
+        Number of workers consuming from `inQ`.  Used to make sure every
+        worker has something to do when batching. Default is 1.
 
     Returns
     -------
@@ -112,46 +395,39 @@ def _process_data(
     >>> out_q = Queue()
     >>> result = _process_data(data, in_q, out_q)
     """
-    # send pos/data to workers
+    # pack the indices into messages
+    messages = _makebatches(data_in, batchsize=batchsize)
+    if batchsize > 1:
+        maxinflight = max(1, chunksize // batchsize, 2 * nworkers)
+    else:
+        maxinflight = max(1, chunksize)
+
+    # send pos/data to workers, keeping at most maxinflight messages outstanding
     data_out = []
     totalnum = len(data_in)
-    numchunks = int(totalnum // chunksize)
-    remainder = totalnum - numchunks * chunksize
+    nextmessage = 0
+    numinflight = 0
     with tqdm(total=totalnum, desc="Voxel", disable=(not showprogressbar)) as pbar:
-        # process all of the complete chunks
-        for thechunk in range(numchunks):
-            # queue the chunk
-            for i, dat in enumerate(data_in[thechunk * chunksize : (thechunk + 1) * chunksize]):
-                inQ.put(dat)
-
-            # retrieve the chunk
-            numreturned = 0
-            while True:
-                ret = outQ.get()
-                if ret is not None:
-                    data_out.append(ret)
-                numreturned += 1
-                pbar.update(1)
-                if numreturned > chunksize - 1:
-                    break
-
-        # queue the remainder
-        if remainder != 0:
-            for i, dat in enumerate(
-                data_in[numchunks * chunksize : numchunks * chunksize + remainder]
-            ):
-                inQ.put(dat)
-            numreturned = 0
-
-            # retrieve the remainder
-            while True:
-                ret = outQ.get()
+        while (nextmessage < len(messages)) and (numinflight < maxinflight):
+            inQ.put(messages[nextmessage])
+            nextmessage += 1
+            numinflight += 1
+        while numinflight > 0:
+            ret = outQ.get()
+            numinflight -= 1
+            if batchsize > 1:
+                for theresult in ret:
+                    if theresult is not None:
+                        data_out.append(theresult)
+                pbar.update(len(ret))
+            else:
                 if ret is not None:
                     data_out.append(ret)
-                numreturned += 1
                 pbar.update(1)
-                if numreturned > remainder - 1:
-                    break
+            if nextmessage < len(messages):
+                inQ.put(messages[nextmessage])
+                nextmessage += 1
+                numinflight += 1
     if showprogressbar:
         print()
 
@@ -168,6 +444,8 @@ def run_multiproc(
     procunit: str = "voxels",
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    batchsize: int = 1,
+    consumerargs: Optional[Tuple[Any, ...]] = None,
 ) -> List[Any]:
     """
     Execute a function in parallel across multiple processes using multiprocessing.
@@ -200,6 +478,20 @@ def run_multiproc(
         If True, display a progress bar during processing. Default is True.
     chunksize : int, optional
         Number of items to process in each chunk. Default is 1000.
+    batchsize : int, optional
+        Number of indices to send to a worker in each message.  If greater than
+        1, `consumerfunc` receives an integer array of indices rather than a
+        single index, and must put a list with one result per index on the
+        output queue.  Default is 1.
+    consumerargs : tuple, optional
+        Extra arguments passed to `consumerfunc` after the queues.  Giving
+        this marks `consumerfunc` as spawn-safe: it must be a module level
+        function and `consumerargs` must be picklable, and the workers are
+        started with the method chosen by ``setstartmethod``, or, if a
+        pool with `nprocs` workers has been started with
+        ``startworkerpool``, `consumerfunc` is run by the pool workers.
+        If None (the default), `consumerfunc` is called with the queues
+        alone, and the workers are always forked.
 
     Returns
     -------
@@ -209,7 +501,8 @@ def run_multiproc(
     Notes
     -----
     - On Python 3.8+ and non-Windows systems, the function uses the 'fork' context
-      for better performance.
+      for better performance, unless `consumerargs` is given and another start
+      method has been selected with ``setstartmethod``.
     - The function will exit with an error if `maskarray` is provided but its
       length does not match the size of the `indexaxis` dimension of `inputshape`.
 
@@ -229,19 +522,37 @@ def run_multiproc(
     __spec__ = None
     n_workers = nprocs
     versioninfo = python_version().split(".")
-    if (versioninfo[0] == "3") and (int(versioninfo[1]) >= 8) and (system() != "Windows"):
+    thepool = None if consumerargs is None else _poolfor(nprocs)
+    if consumerargs is None:
+        theargs = ()
+        startmethod = "fork"
+    else:
+        theargs = tuple(consumerargs)
+        startmethod = _startmethod
+    if thepool is not None:
+        # hand the consumer to the persistent workers
+        cleanup = None
+        inQ = thepool.inQ
+        outQ = thepool.outQ
+        thepool.startjob(consumerfunc, theargs)
+        workers = []
+    elif (versioninfo[0] == "3") and (int(versioninfo[1]) >= 8) and (system() != "Windows"):
         cleanup = None
-        ctx = mp.get_context("fork")
+        ctx = mp.get_context(startmethod)
         inQ = ctx.Queue()
         outQ = ctx.Queue()
         # original_sigint_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
-        workers = [ctx.Process(target=consumerfunc, args=(inQ, outQ)) for i in range(n_workers)]
+        workers = [
+            ctx.Process(target=consumerfunc, args=(inQ, outQ) + theargs) for i in range(n_workers)
+        ]
         # signal.signal(signal.SIGINT, original_sigint_handler)
     else:
         cleanup = None  # just disable this for now
         inQ = mp.Queue()
         outQ = mp.Queue()
-        workers = [mp.Process(target=consumerfunc, args=(inQ, outQ)) for i in range(n_workers)]
+        workers = [
+            mp.Process(target=consumerfunc, args=(inQ, outQ) + theargs) for i in range(n_workers)
+        ]
     for i, w in enumerate(workers):
         w.start()
 
@@ -262,16 +573,27 @@ def run_multiproc(
             data_in.append(d)
     if verbose:
         print("processing", len(data_in), procunit + " with", n_workers, "processes")
+        if batchsize > 1:
+            print(f"dispatching {procunit} in batches of {batchsize}")
     data_out = _process_data(
-        data_in, inQ, outQ, showprogressbar=showprogressbar, chunksize=chunksize
+        data_in,
+        inQ,
+        outQ,
+        showprogressbar=showprogressbar,
+        chunksize=chunksize,
+        batchsize=batchsize,
+        nworkers=n_workers,
     )
 
     # shut down workers
-    for i in range(n_workers):
-        inQ.put(None)
-    for w in workers:
-        w.join()
-        w.close()
+    if thepool is not None:
+        thepool.finishjob()
+    else:
+        for i in range(n_workers):
+            inQ.put(None)
+        for w in workers:
+            w.join()
+            w.close()
     if cleanup is not None:
         cleanup()
 
@@ -288,6 +610,7 @@ def run_multithread(
     procunit: str = "voxels",
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    batchsize: int = 1,
 ) -> List[Any]:
     """
     Execute a multithreaded processing task using a specified consumer function.
@@ -320,6 +643,10 @@ def run_multithread(
         If True, display a progress bar during processing. Default is True.
     chunksize : int, optional
         Number of items to process in each chunk. Default is 1000.
+    batchsize : int, optional
+        Number of indices to send to a worker in each message.  If greater than
+        1, `consumerfunc` receives an integer array of indices and must return
+        a list of results. Default is 1.
 
     Returns
     -------
@@ -372,7 +699,13 @@ def run_multithread(
     if verbose:
         print("processing", len(data_in), procunit + " with", n_workers, "threads")
     data_out = _process_data(
-        data_in, inQ, outQ, showprogressbar=showprogressbar, chunksize=chunksize
+        data_in,
+        inQ,
+        outQ,
+        showprogressbar=showprogressbar,
+        chunksize=chunksize,
+        batchsize=batchsize,
+        nworkers=n_workers,
     )
 
     # shut down workers
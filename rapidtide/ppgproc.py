@@ -16,16 +16,438 @@
 #   limitations under the License.
 #
 #
-from typing import Any, Callable
+from typing import Any, Callable, Generator, Iterable
 
-import matplotlib.pyplot as plt
 import numpy as np
 from numpy.typing import NDArray
-from scipy import signal
 from scipy.interpolate import interp1d
 
 import rapidtide.filter as tide_filt
 import rapidtide.io as tide_io
+from rapidtide.decorators import conditionaljit, getdecoratorvars
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+signal = lazyimport("scipy.signal")
+
+donotusenumba, dummy = getdecoratorvars()
+
+
+def _validmask(signal_data: NDArray, missing_indices: list | None = None) -> NDArray:
+    """
+    Flag the points of a signal that can be used to update a Kalman filter.
+
+    Parameters
+    ----------
+    signal_data : NDArray
+        Input signal, with missing values as np.nan.
+    missing_indices : list of int, optional
+        Indices of missing points.  Indices outside the signal are ignored. Default is None.
+
+    Returns
+    -------
+    NDArray
+        Boolean array, True where the signal is valid.
+    """
+    valid = ~np.isnan(np.asarray(signal_data, dtype=np.float64))
+    if missing_indices is not None and len(missing_indices) > 0:
+        missing = np.asarray(missing_indices, dtype=np.int64)
+        valid[missing[(missing >= 0) & (missing < len(valid))]] = False
+    return valid
+
+
+@conditionaljit()
+def _kalmanpredict(P: NDArray, F: NDArray, Q: NDArray, FP: NDArray) -> None:
+    """Propagate the covariance in place, P = F @ P @ F.T + Q, using FP as scratch space."""
+    n = P.shape[0]
+    for i in range(n):
+        for j in range(n):
+            acc = 0.0
+            for m in range(n):
+                acc += F[i, m] * P[m, j]
+            FP[i, j] = acc
+    for i in range(n):
+        for j in range(n):
+            acc = 0.0
+            for m in range(n):
+                acc += FP[i, m] * F[j, m]
+            P[i, j] = acc + Q[i, j]
+
+
+@conditionaljit()
+def _kalmanupdate(
+    x: NDArray, P: NDArray, H: NDArray, y: float, R: float, K: NDArray, A: NDArray, Pnew: NDArray
+) -> None:
+    """Scalar measurement Kalman update of x and P in place, using K, A, and Pnew as scratch."""
+    n = P.shape[0]
+    S = 0.0
+    for j in range(n):
+        acc = 0.0
+        for m in range(n):
+            acc += H[m] * P[m, j]
+        S += acc * H[j]
+    S += R
+    for i in range(n):
+        acc = 0.0
+        for m in range(n):
+            acc += P[i, m] * H[m]
+        K[i] = acc / S
+    for i in range(n):
+        x[i] += K[i] * y
+    for i in range(n):
+        for m in range(n):
+            A[i, m] = (1.0 if i == m else 0.0) - K[i] * H[m]
+    for i in range(n):
+        for j in range(n):
+            acc = 0.0
+            for m in range(n):
+                acc += A[i, m] * P[m, j]
+            Pnew[i, j] = acc
+    for i in range(n):
+        for j in range(n):
+            P[i, j] = Pnew[i, j]
+
+
+@conditionaljit()
+def _linearkalmankernel(
+    signal_data: NDArray,
+    valid: NDArray,
+    x: NDArray,
+    P: NDArray,
+    F: NDArray,
+    H: NDArray,
+    Q: NDArray,
+    R: float,
+    adaptive: bool,
+    qscale: float,
+    rbase: float,
+    history: NDArray,
+    numhistory: int,
+    motionthreshold: float,
+) -> tuple[NDArray, NDArray, float, float, int]:
+    """
+    Run the constant velocity Kalman filter over a whole signal.
+
+    This is the compiled inner loop of `PPGKalmanFilter.filter_signal` and
+    `AdaptivePPGKalmanFilter.filter_signal`.  The state `x`, covariance `P`, and the
+    innovation `history` are updated in place.  In adaptive mode, `Q` is the unscaled
+    process noise, and the measurement and process noise are adapted as in
+    `AdaptivePPGKalmanFilter.adapt_noise`.
+
+    Returns
+    -------
+    tuple
+        The filtered signal, the motion artifact flags, and the final process noise
+        scale, measurement noise, and number of innovations in the history.
+    """
+    n = x.shape[0]
+    numpoints = signal_data.shape[0]
+    windowsize = history.shape[0]
+    filtered = np.zeros(numpoints)
+    motion_flags = np.zeros(numpoints, dtype=np.bool_)
+    Qstep = Q.copy()
+    xnew = np.zeros(n)
+    FP = np.zeros((n, n))
+    K = np.zeros(n)
+    A = np.zeros((n, n))
+    Pnew = np.zeros((n, n))
+    for i in range(numpoints):
+        # predict
+        if adaptive:
+            for j in range(n):
+                for m in range(n):
+                    Qstep[j, m] = Q[j, m] * qscale
+        for j in range(n):
+            acc = 0.0
+            for m in range(n):
+                acc += F[j, m] * x[m]
+            xnew[j] = acc
+        for j in range(n):
+            x[j] = xnew[j]
+        _kalmanpredict(P, F, Qstep, FP)
+
+        if valid[i]:
+            zpred = 0.0
+            for m in range(n):
+                zpred += H[m] * x[m]
+            y = signal_data[i] - zpred
+
+            # detect motion artifacts before updating
+            is_motion = False
+            if adaptive and numhistory >= 10:
+                recent_std = np.std(history[numhistory - 10 : numhistory])
+                if recent_std > 0:
+                    is_motion = np.abs(y) / recent_std > motionthreshold
+
+            _kalmanupdate(x, P, H, y, R, K, A, Pnew)
+
+            if adaptive:
+                if numhistory == windowsize:
+                    for j in range(windowsize - 1):
+                        history[j] = history[j + 1]
+                    history[windowsize - 1] = np.abs(y)
+                else:
+                    history[numhistory] = np.abs(y)
+                    numhistory += 1
+                if is_motion:
+                    R = rbase * 10
+                else:
+                    R = rbase
+                if numhistory >= windowsize:
+                    innovation_std = np.std(history)
+                    qscale = max(0.0001, min(0.01, innovation_std * 0.05))
+                motion_flags[i] = is_motion
+        filtered[i] = x[0]
+    return filtered, motion_flags, qscale, R, numhistory
+
+
+@conditionaljit()
+def _harmonickalmankernel(
+    signal_data: NDArray,
+    valid: NDArray,
+    x: NDArray,
+    P: NDArray,
+    Q: NDArray,
+    R: float,
+    dt: float,
+    numharmonics: int,
+) -> tuple[NDArray, NDArray, NDArray]:
+    """
+    Run the sinusoidal extended Kalman filter over a whole signal.
+
+    This is the compiled inner loop of `ExtendedPPGKalmanFilter.filter_signal` (one
+    harmonic) and `HarmonicPPGKalmanFilter.filter_signal` (three harmonics).  The state is
+    [DC offset, harmonic amplitudes..., phase, frequency], and `x` and `P` are updated in
+    place.
+
+    Returns
+    -------
+    tuple
+        The filtered signal, the heart rate at each point, and the harmonic amplitudes at
+        each point.
+    """
+    n = numharmonics + 3
+    phaseidx = numharmonics + 1
+    freqidx = numharmonics + 2
+    numpoints = signal_data.shape[0]
+    filtered = np.zeros(numpoints)
+    heart_rates = np.zeros(numpoints)
+    amplitudes = np.zeros((numpoints, numharmonics))
+    F = np.eye(n)
+    F[phaseidx, freqidx] = dt
+    H = np.zeros(n)
+    FP = np.zeros((n, n))
+    K = np.zeros(n)
+    A = np.zeros((n, n))
+    Pnew = np.zeros((n, n))
+    for i in range(numpoints):
+        # predict
+        x[phaseidx] = (x[phaseidx] + x[freqidx] * dt) % (2 * np.pi)
+        _kalmanpredict(P, F, Q, FP)
+
+        if valid[i]:
+            # the measurement and its jacobian
+            zpred = x[0]
+            dphase = 0.0
+            H[0] = 1.0
+            for k in range(1, numharmonics + 1):
+                zpred += x[k] * np.sin(k * x[phaseidx])
+                H[k] = np.sin(k * x[phaseidx])
+                dphase += k * x[k] * np.cos(k * x[phaseidx])
+            H[phaseidx] = dphase
+            H[freqidx] = 0.0
+            _kalmanupdate(x, P, H, signal_data[i] - zpred, R, K, A, Pnew)
+            x[phaseidx] = x[phaseidx] % (2 * np.pi)
+
+        thevalue = x[0]
+        for k in range(1, numharmonics + 1):
+            thevalue += x[k] * np.sin(k * x[phaseidx])
+        filtered[i] = thevalue
+        heart_rates[i] = x[freqidx] * 60 / (2 * np.pi)
+        for k in range(numharmonics):
+            amplitudes[i, k] = x[k + 1]
+    return filtered, heart_rates, amplitudes
+
+
+@conditionaljit()
+def _linearkalmanbatchkernel(
+    signals: NDArray,
+    valid: NDArray,
+    x0: NDArray,
+    P0: NDArray,
+    F: NDArray,
+    H: NDArray,
+    Q: NDArray,
+    R: float,
+    adaptive: bool,
+    qscale: float,
+    rbase: float,
+    history0: NDArray,
+    numhistory: int,
+    motionthreshold: float,
+) -> tuple[NDArray, NDArray]:
+    """
+    Run `_linearkalmankernel` over every row of a 2D array of recordings.
+
+    Each row starts from its own copy of the state `x0`, covariance `P0` and innovation
+    history `history0`, which are not modified.
+
+    Returns
+    -------
+    tuple
+        The filtered recordings and the motion artifact flags, one row per recording.
+    """
+    numrecordings, numpoints = signals.shape
+    filtered = np.zeros((numrecordings, numpoints))
+    motion_flags = np.zeros((numrecordings, numpoints), dtype=np.bool_)
+    for r in range(numrecordings):
+        rowfiltered, rowflags, dummy, dummy, dummy = _linearkalmankernel(
+            signals[r],
+            valid[r],
+            x0.copy(),
+            P0.copy(),
+            F,
+            H,
+            Q,
+            R,
+            adaptive,
+            qscale,
+            rbase,
+            history0.copy(),
+            numhistory,
+            motionthreshold,
+        )
+        filtered[r, :] = rowfiltered
+        motion_flags[r, :] = rowflags
+    return filtered, motion_flags
+
+
+@conditionaljit()
+def _harmonickalmanbatchkernel(
+    signals: NDArray,
+    valid: NDArray,
+    x0: NDArray,
+    P0: NDArray,
+    Q: NDArray,
+    R: float,
+    dt: float,
+    numharmonics: int,
+) -> tuple[NDArray, NDArray, NDArray]:
+    """
+    Run `_harmonickalmankernel` over every row of a 2D array of recordings.
+
+    Each row starts from its own copy of the state `x0` and covariance `P0`, which are not
+    modified.
+
+    Returns
+    -------
+    tuple
+        The filtered recordings and heart rates, one row per recording, and the harmonic
+        amplitudes, with shape (numrecordings, numpoints, numharmonics).
+    """
+    numrecordings, numpoints = signals.shape
+    filtered = np.zeros((numrecordings, numpoints))
+    heart_rates = np.zeros((numrecordings, numpoints))
+    amplitudes = np.zeros((numrecordings, numpoints, numharmonics))
+    for r in range(numrecordings):
+        rowfiltered, rowrates, rowamplitudes = _harmonickalmankernel(
+            signals[r], valid[r], x0.copy(), P0.copy(), Q, R, dt, numharmonics
+        )
+        filtered[r, :] = rowfiltered
+        heart_rates[r, :] = rowrates
+        amplitudes[r, :, :] = rowamplitudes
+    return filtered, heart_rates, amplitudes
+
+
+def _batchinputs(signals: NDArray, missing_indices: list | None = None) -> tuple[NDArray, NDArray]:
+    """
+    Check a stack of recordings and flag the points that can be used to update a filter.
+
+    Parameters
+    ----------
+    signals : NDArray
+        2D array with one recording per row, or a list of equal length recordings.
+    missing_indices : list, optional
+        One list of missing indices per recording, or None. Default is None.
+
+    Returns
+    -------
+    tuple of (NDArray, NDArray)
+        The recordings as a 2D float64 array, and the matching boolean validity mask.
+    """
+    signals = np.ascontiguousarray(signals, dtype=np.float64)
+    if signals.ndim == 1:
+        signals = signals[None, :]
+    if signals.ndim != 2:
+        raise ValueError("signals must be a 2D array with one recording per row")
+    if missing_indices is None:
+        missing_indices = [None] * signals.shape[0]
+    elif len(missing_indices) != signals.shape[0]:
+        raise ValueError("missing_indices must have one entry per recording")
+    valid = np.empty(signals.shape, dtype=np.bool_)
+    for r in range(signals.shape[0]):
+        valid[r, :] = _validmask(signals[r], missing_indices[r])
+    return signals, valid
+
+
+class _RollingWindows:
+    """
+    Cut fixed length, evenly spaced windows out of signals that arrive in chunks.
+
+    Only the samples that can still be part of a future window are kept, so memory use
+    is bounded by the window length plus the chunk length, however long the stream is.
+    The windows produced are the same as those of a sliding window over the whole
+    signal, starting at sample 0.
+    """
+
+    def __init__(self, window_samples: int, stride_samples: int, numchannels: int = 1) -> None:
+        self.window_samples = window_samples
+        self.stride_samples = stride_samples
+        self.buffers = [np.zeros(0, dtype=np.float64) for _ in range(numchannels)]
+        self.bufferstart = 0
+        self.nextstart = 0
+        self.numsamples = 0
+
+    def push(self, *chunks: NDArray) -> tuple[NDArray, list]:
+        """
+        Add a chunk to each channel and return the windows that are now complete.
+
+        Parameters
+        ----------
+        *chunks : NDArray
+            One 1D array per channel, all the same length.
+
+        Returns
+        -------
+        starts : NDArray
+            Index of the first sample of each new window, counted from the start of the stream.
+        windows : list of NDArray
+            For each channel, a 2D array with one window per row.
+        """
+        self.buffers = [
+            np.concatenate((thebuffer, np.asarray(thechunk, dtype=np.float64)))
+            for thebuffer, thechunk in zip(self.buffers, chunks)
+        ]
+        self.numsamples += len(chunks[0])
+        starts = np.arange(
+            self.nextstart, self.numsamples - self.window_samples + 1, self.stride_samples
+        )
+        if len(starts) > 0:
+            offsets = starts - self.bufferstart
+            windows = [
+                np.lib.stride_tricks.sliding_window_view(thebuffer, self.window_samples)[offsets]
+                for thebuffer in self.buffers
+            ]
+            self.nextstart = starts[-1] + self.stride_samples
+        else:
+            windows = [np.zeros((0, self.window_samples)) for _ in self.buffers]
+
+        # drop the samples that no future window will use
+        numdrop = min(self.nextstart - self.bufferstart, len(self.buffers[0]))
+        self.buffers = [thebuffer[numdrop:].copy() for thebuffer in self.buffers]
+        self.bufferstart += numdrop
+        return starts, windows
 
 
 class PPGKalmanFilter:
@@ -178,20 +600,81 @@ class PPGKalmanFilter:
         >>> signal = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
         >>> filtered = filter_signal(signal)
         """
+        valid = _validmask(signal_data, missing_indices)
+        if not donotusenumba:
+            x = self.x[:, 0].astype(np.float64)
+            P = self.P.astype(np.float64)
+            filtered, dummy, dummy, dummy, dummy = _linearkalmankernel(
+                np.asarray(signal_data, dtype=np.float64),
+                valid,
+                x,
+                P,
+                self.F.astype(np.float64),
+                self.H[0, :].astype(np.float64),
+                self.Q.astype(np.float64),
+                float(self.R[0, 0]),
+                False,
+                1.0,
+                float(self.R[0, 0]),
+                np.zeros(1),
+                0,
+                0.0,
+            )
+            self.x = x[:, None]
+            self.P = P
+            return filtered
+
         filtered = np.zeros(len(signal_data))
 
         for i, measurement in enumerate(signal_data):
             self.predict()
 
             # If data is missing or NaN, skip update step (prediction only)
-            if missing_indices is not None and i in missing_indices:
-                filtered[i] = self.x[0, 0]
-            elif np.isnan(measurement):
-                filtered[i] = self.x[0, 0]
-            else:
+            if valid[i]:
                 self.update(np.array([[measurement]]))
-                filtered[i] = self.x[0, 0]
+            filtered[i] = self.x[0, 0]
+
+        return filtered
+
+    def filter_signal_batch(
+        self, signals: NDArray, missing_indices: list | None = None
+    ) -> NDArray:
+        """
+        Filter several recordings at once.
 
+        Each recording is filtered from the current state of this filter, exactly as a
+        copy of this filter would filter it with `filter_signal`, by a single compiled
+        kernel that loops over the rows.  This filter is not modified.
+
+        Parameters
+        ----------
+        signals : NDArray
+            2D array with one recording per row.  Missing values are np.nan.
+        missing_indices : list, optional
+            One list of missing indices per recording. Default is None.
+
+        Returns
+        -------
+        NDArray
+            Filtered recordings, with the same shape as `signals`.
+        """
+        signals, valid = _batchinputs(signals, missing_indices)
+        filtered, dummy = _linearkalmanbatchkernel(
+            signals,
+            valid,
+            self.x[:, 0].astype(np.float64),
+            self.P.astype(np.float64),
+            self.F.astype(np.float64),
+            self.H[0, :].astype(np.float64),
+            self.Q.astype(np.float64),
+            float(self.R[0, 0]),
+            False,
+            1.0,
+            float(self.R[0, 0]),
+            np.zeros(1),
+            0,
+            0.0,
+        )
         return filtered
 
 
@@ -448,23 +931,97 @@ class AdaptivePPGKalmanFilter:
         >>> # With no missing indices
         >>> filtered_data, motion_flags = filter_signal(signal)
         """
+        valid = _validmask(signal_data, missing_indices)
+        if not donotusenumba:
+            x = self.x[:, 0].astype(np.float64)
+            P = self.P.astype(np.float64)
+            history = np.zeros(self.window_size)
+            thehistory = self.innovation_history[-self.window_size :]
+            history[: len(thehistory)] = thehistory
+            Qunit = np.array(
+                [[self.dt**4 / 4, self.dt**3 / 2], [self.dt**3 / 2, self.dt**2]], dtype=np.float64
+            )
+            filtered, motion_flags, self.Q_scale, Rval, numhistory = _linearkalmankernel(
+                np.asarray(signal_data, dtype=np.float64),
+                valid,
+                x,
+                P,
+                self.F.astype(np.float64),
+                self.H[0, :].astype(np.float64),
+                Qunit,
+                float(self.R[0, 0]),
+                True,
+                float(self.Q_scale),
+                float(self.R_base),
+                history,
+                len(thehistory),
+                float(self.motion_threshold),
+            )
+            self.x = x[:, None]
+            self.P = P
+            self.R = np.array([[Rval]])
+            self.innovation_history = history[:numhistory].tolist()
+            return filtered, motion_flags
+
         filtered = np.zeros(len(signal_data))
         motion_flags = np.zeros(len(signal_data), dtype=bool)
 
         for i, measurement in enumerate(signal_data):
             self.predict()
 
-            if missing_indices is not None and i in missing_indices:
-                filtered[i] = self.x[0, 0]
-            elif np.isnan(measurement):
-                filtered[i] = self.x[0, 0]
-            else:
-                is_motion = self.update(np.array([[measurement]]))
-                filtered[i] = self.x[0, 0]
-                motion_flags[i] = is_motion
+            if valid[i]:
+                motion_flags[i] = self.update(np.array([[measurement]]))
+            filtered[i] = self.x[0, 0]
 
         return filtered, motion_flags
 
+    def filter_signal_batch(
+        self, signals: NDArray, missing_indices: list | None = None
+    ) -> tuple[NDArray, NDArray]:
+        """
+        Filter several recordings at once.
+
+        Each recording is filtered from the current state of this filter, exactly as a
+        copy of this filter would filter it with `filter_signal`, by a single compiled
+        kernel that loops over the rows.  This filter is not modified.
+
+        Parameters
+        ----------
+        signals : NDArray
+            2D array with one recording per row.  Missing values are np.nan.
+        missing_indices : list, optional
+            One list of missing indices per recording. Default is None.
+
+        Returns
+        -------
+        tuple of (NDArray, NDArray)
+            The filtered recordings and the motion artifact flags, each with the same
+            shape as `signals`.
+        """
+        signals, valid = _batchinputs(signals, missing_indices)
+        history = np.zeros(self.window_size)
+        thehistory = self.innovation_history[-self.window_size :]
+        history[: len(thehistory)] = thehistory
+        Qunit = np.array(
+            [[self.dt**4 / 4, self.dt**3 / 2], [self.dt**3 / 2, self.dt**2]], dtype=np.float64
+        )
+        return _linearkalmanbatchkernel(
+            signals,
+            valid,
+            self.x[:, 0].astype(np.float64),
+            self.P.astype(np.float64),
+            self.F.astype(np.float64),
+            self.H[0, :].astype(np.float64),
+            Qunit,
+            float(self.R[0, 0]),
+            True,
+            float(self.Q_scale),
+            float(self.R_base),
+            history,
+            len(thehistory),
+            float(self.motion_threshold),
+        )
+
 
 class ExtendedPPGKalmanFilter:
     """
@@ -804,19 +1361,34 @@ class ExtendedPPGKalmanFilter:
         >>> print(f"Filtered signal shape: {filtered_signal.shape}")
         >>> print(f"Heart rates shape: {hr_values.shape}")
         """
+        valid = _validmask(signal_data, missing_indices)
+        if not donotusenumba:
+            x = self.x[:, 0].astype(np.float64)
+            P = self.P.astype(np.float64)
+            filtered, heart_rates, dummy = _harmonickalmankernel(
+                np.asarray(signal_data, dtype=np.float64),
+                valid,
+                x,
+                P,
+                self.Q.astype(np.float64),
+                float(self.R[0, 0]),
+                float(self.dt),
+                1,
+            )
+            self.x = x[:, None]
+            self.P = P
+            self.hr_history.extend(heart_rates.tolist())
+            return filtered, heart_rates
+
         filtered = np.zeros(len(signal_data))
         heart_rates = np.zeros(len(signal_data))
 
         for i, measurement in enumerate(signal_data):
             self.predict()
 
-            if missing_indices is not None and i in missing_indices:
-                filtered[i] = self.measurement_function(self.x)[0, 0]
-            elif np.isnan(measurement):
-                filtered[i] = self.measurement_function(self.x)[0, 0]
-            else:
+            if valid[i]:
                 self.update(np.array([[measurement]]))
-                filtered[i] = self.measurement_function(self.x)[0, 0]
+            filtered[i] = self.measurement_function(self.x)[0, 0]
 
             # Track heart rate
             hr = self.get_heart_rate()
@@ -825,6 +1397,42 @@ class ExtendedPPGKalmanFilter:
 
         return filtered, heart_rates
 
+    def filter_signal_batch(
+        self, signals: NDArray, missing_indices: list | None = None
+    ) -> tuple[NDArray, NDArray]:
+        """
+        Filter several recordings at once.
+
+        Each recording is filtered from the current state of this filter, exactly as a
+        copy of this filter would filter it with `filter_signal`, by a single compiled
+        kernel that loops over the rows.  This filter is not modified.
+
+        Parameters
+        ----------
+        signals : NDArray
+            2D array with one recording per row.  Missing values are np.nan.
+        missing_indices : list, optional
+            One list of missing indices per recording. Default is None.
+
+        Returns
+        -------
+        tuple of (NDArray, NDArray)
+            The filtered recordings and the heart rates, each with the same shape as
+            `signals`.
+        """
+        signals, valid = _batchinputs(signals, missing_indices)
+        filtered, heart_rates, dummy = _harmonickalmanbatchkernel(
+            signals,
+            valid,
+            self.x[:, 0].astype(np.float64),
+            self.P.astype(np.float64),
+            self.Q.astype(np.float64),
+            float(self.R[0, 0]),
+            float(self.dt),
+            1,
+        )
+        return filtered, heart_rates
+
 
 class HarmonicPPGKalmanFilter:
     """
@@ -1247,6 +1855,25 @@ class HarmonicPPGKalmanFilter:
         >>> print(f"Heart rate estimates: {hr_estimates}")
         >>> print(f"Harmonic amplitudes: {harmonics}")
         """
+        valid = _validmask(signal_data, missing_indices)
+        if not donotusenumba:
+            x = self.x[:, 0].astype(np.float64)
+            P = self.P.astype(np.float64)
+            filtered, heart_rates, harmonic_amplitudes = _harmonickalmankernel(
+                np.asarray(signal_data, dtype=np.float64),
+                valid,
+                x,
+                P,
+                self.Q.astype(np.float64),
+                float(self.R[0, 0]),
+                float(self.dt),
+                3,
+            )
+            self.x = x[:, None]
+            self.P = P
+            self.hr_history.extend(heart_rates.tolist())
+            return filtered, heart_rates, harmonic_amplitudes
+
         filtered = np.zeros(len(signal_data))
         heart_rates = np.zeros(len(signal_data))
         harmonic_amplitudes = np.zeros((len(signal_data), 3))
@@ -1254,13 +1881,9 @@ class HarmonicPPGKalmanFilter:
         for i, measurement in enumerate(signal_data):
             self.predict()
 
-            if missing_indices is not None and i in missing_indices:
-                filtered[i] = self.measurement_function(self.x)[0, 0]
-            elif np.isnan(measurement):
-                filtered[i] = self.measurement_function(self.x)[0, 0]
-            else:
+            if valid[i]:
                 self.update(np.array([[measurement]]))
-                filtered[i] = self.measurement_function(self.x)[0, 0]
+            filtered[i] = self.measurement_function(self.x)[0, 0]
 
             # Track heart rate
             hr = self.get_heart_rate()
@@ -1272,6 +1895,41 @@ class HarmonicPPGKalmanFilter:
 
         return filtered, heart_rates, harmonic_amplitudes
 
+    def filter_signal_batch(
+        self, signals: NDArray, missing_indices: list | None = None
+    ) -> tuple[NDArray, NDArray, NDArray]:
+        """
+        Filter several recordings at once.
+
+        Each recording is filtered from the current state of this filter, exactly as a
+        copy of this filter would filter it with `filter_signal`, by a single compiled
+        kernel that loops over the rows.  This filter is not modified.
+
+        Parameters
+        ----------
+        signals : NDArray
+            2D array with one recording per row.  Missing values are np.nan.
+        missing_indices : list, optional
+            One list of missing indices per recording. Default is None.
+
+        Returns
+        -------
+        tuple of (NDArray, NDArray, NDArray)
+            The filtered recordings and the heart rates, each with the same shape as
+            `signals`, and the harmonic amplitudes, with shape (nrecordings, npoints, 3).
+        """
+        signals, valid = _batchinputs(signals, missing_indices)
+        return _harmonickalmanbatchkernel(
+            signals,
+            valid,
+            self.x[:, 0].astype(np.float64),
+            self.P.astype(np.float64),
+            self.Q.astype(np.float64),
+            float(self.R[0, 0]),
+            float(self.dt),
+            3,
+        )
+
 
 class SignalQualityAssessor:
     """
@@ -1299,6 +1957,7 @@ class SignalQualityAssessor:
         -----
         The window size is converted to the number of samples based on the sampling frequency.
         The resulting number of samples is stored in ``self.window_samples``.
+        ``self.blocksize`` sets how many windows `assess_continuous` scores at once.
 
         Examples
         --------
@@ -1308,6 +1967,7 @@ class SignalQualityAssessor:
         """
         self.fs = fs
         self.window_samples = int(window_size * fs)
+        self.blocksize = 1000
 
     def assess_quality(
         self, signal_segment: NDArray, filtered_segment: NDArray | None = None
@@ -1339,6 +1999,7 @@ class SignalQualityAssessor:
         -----
         This function computes a weighted average of several quality metrics to produce an overall score.
         The weights are chosen to reflect the relative importance of each metric in assessing PPG signal quality.
+        The calculation is done by `assess_quality_block` on a single row.
 
         Examples
         --------
@@ -1346,46 +2007,82 @@ class SignalQualityAssessor:
         >>> print(f"Quality Score: {quality_score:.2f}")
         >>> print(f"SNR: {metrics['snr']:.2f}")
         """
+        quality_scores, blockmetrics = self.assess_quality_block(
+            np.asarray(signal_segment)[None, :],
+            None if filtered_segment is None else np.asarray(filtered_segment)[None, :],
+        )
+        quality_score = float(quality_scores[0])
+        metrics = {key: float(value[0]) for key, value in blockmetrics.items()}
+
+        return quality_score, metrics
+
+    def assess_quality_block(
+        self, signal_segments: NDArray, filtered_segments: NDArray | None = None
+    ) -> tuple[NDArray, dict]:
+        """
+        Assess the quality of many signal segments at once.
+
+        This computes the same metrics and scores as `assess_quality`, for every row of
+        `signal_segments`, with each statistic evaluated along the last axis.
+
+        Parameters
+        ----------
+        signal_segments : ndarray
+            2D array with one raw signal segment per row.
+        filtered_segments : ndarray, optional
+            The filtered versions of the segments, with the same shape.  If not
+            provided, the SNR metric is set to 0.5.
+
+        Returns
+        -------
+        quality_scores : ndarray
+            Overall quality score of each segment, between 0 and 1.
+        metrics : dict
+            The individual quality metrics described in `assess_quality`, as arrays
+            with one value per segment.
+        """
+        from scipy.stats import kurtosis
+
+        signal_segments = np.atleast_2d(np.asarray(signal_segments, dtype=np.float64))
+        numsegments, segmentlength = signal_segments.shape
         metrics = {}
 
-        # 1. SNR estimate (signal-to-noise ratio)
-        if filtered_segment is not None:
-            noise = signal_segment - filtered_segment
-            signal_power = np.var(filtered_segment)
-            noise_power = np.var(noise)
+        # 1. SNR estimate (signal-to-noise ratio), normalized to 0-1
+        if filtered_segments is not None:
+            filtered_segments = np.atleast_2d(np.asarray(filtered_segments, dtype=np.float64))
+            signal_power = np.var(filtered_segments, axis=-1)
+            noise_power = np.var(signal_segments - filtered_segments, axis=-1)
             snr = 10 * np.log10(signal_power / (noise_power + 1e-10))
-            metrics["snr"] = max(0, min(snr / 20, 1))  # Normalize to 0-1
+            metrics["snr"] = np.clip(snr / 20, 0, 1)
         else:
-            metrics["snr"] = 0.5  # Unknown
+            metrics["snr"] = np.full(numsegments, 0.5)
 
-        # 2. Perfusion (relative pulse amplitude)
-        dc_component = np.mean(signal_segment)
-        ac_component = np.std(signal_segment)
-        perfusion = ac_component / (dc_component + 1e-10)
-        metrics["perfusion"] = min(perfusion / 0.1, 1)  # Normalize, typical range 0.01-0.1
+        # 2. Perfusion (relative pulse amplitude), typical range 0.01-0.1
+        dc_component = np.mean(signal_segments, axis=-1)
+        ac_component = np.std(signal_segments, axis=-1)
+        metrics["perfusion"] = np.minimum(ac_component / (dc_component + 1e-10) / 0.1, 1)
 
-        # 3. Spectral purity (concentration of power in physiological range)
+        # 3. Spectral purity - fraction of power in the heart rate range, 0.5-3.0 Hz (30-180 BPM)
         freqs, psd = signal.welch(
-            signal_segment, fs=self.fs, nperseg=min(256, len(signal_segment))
+            signal_segments, fs=self.fs, nperseg=min(256, segmentlength), axis=-1
         )
-
-        # Physiological range for heart rate: 0.5-3.0 Hz (30-180 BPM)
         hr_band = (freqs >= 0.5) & (freqs <= 3.0)
-        total_power = np.sum(psd)
-        hr_power = np.sum(psd[hr_band])
+        total_power = np.sum(psd, axis=-1)
+        hr_power = np.sum(psd[:, hr_band], axis=-1)
         metrics["spectral_purity"] = hr_power / (total_power + 1e-10)
 
-        # 4. Kurtosis (measure of outliers/artifacts)
-        from scipy.stats import kurtosis
-
-        kurt = abs(kurtosis(signal_segment))
-        metrics["kurtosis"] = max(0, 1 - kurt / 10)  # Lower kurtosis is better
+        # 4. Kurtosis (measure of outliers/artifacts) - lower is better
+        kurt = np.abs(kurtosis(signal_segments, axis=-1))
+        metrics["kurtosis"] = np.maximum(0, 1 - kurt / 10)
 
-        # 5. Zero crossing rate (should be regular for good PPG)
-        zero_crossings = np.sum(np.diff(np.sign(signal_segment - np.mean(signal_segment))) != 0)
-        expected_crossings = len(signal_segment) / self.fs * 2 * 1.5  # ~2 per beat at 75 BPM
-        zcr_score = 1 - min(abs(zero_crossings - expected_crossings) / expected_crossings, 1)
-        metrics["zero_crossing"] = zcr_score
+        # 5. Zero crossing rate (should be regular for good PPG), ~2 per beat at 75 BPM
+        zero_crossings = np.sum(
+            np.diff(np.sign(signal_segments - dc_component[:, None]), axis=-1) != 0, axis=-1
+        )
+        expected_crossings = segmentlength / self.fs * 2 * 1.5
+        metrics["zero_crossing"] = 1 - np.minimum(
+            np.abs(zero_crossings - expected_crossings) / expected_crossings, 1
+        )
 
         # Overall quality score (weighted average)
         weights = {
@@ -1395,10 +2092,9 @@ class SignalQualityAssessor:
             "kurtosis": 0.1,
             "zero_crossing": 0.1,
         }
+        quality_scores = sum(metrics[key] * weights[key] for key in weights.keys())
 
-        quality_score = sum(metrics[key] * weights[key] for key in weights.keys())
-
-        return quality_score, metrics
+        return quality_scores, metrics
 
     def assess_continuous(
         self, signal: NDArray, filtered: NDArray | None = None, stride: float = 1.0
@@ -1435,7 +2131,8 @@ class SignalQualityAssessor:
         The function uses a sliding window approach where the window size is defined by
         `self.window_samples` and the sampling frequency by `self.fs`. The quality assessment
         is performed on non-overlapping segments of the signal, with the stride determining
-        the step size between consecutive segments.
+        the step size between consecutive segments.  The windows are scored
+        `self.blocksize` at a time with `assess_quality_block`.
 
         Examples
         --------
@@ -1444,27 +2141,80 @@ class SignalQualityAssessor:
         >>> print(f"Time points: {times}")
         """
         stride_samples = int(stride * self.fs)
-        n_windows = (len(signal) - self.window_samples) // stride_samples + 1
-
-        times = np.zeros(n_windows)
-        quality_scores = np.zeros(n_windows)
+        signal = np.asarray(signal, dtype=np.float64)
+        starts = np.arange(0, len(signal) - self.window_samples + 1, stride_samples)
+        times = (starts + self.window_samples / 2) / self.fs
+        quality_scores = np.zeros(len(starts))
+
+        # score the windows in blocks so the copies welch makes stay small
+        signal_windows = np.lib.stride_tricks.sliding_window_view(signal, self.window_samples)
+        if filtered is not None:
+            filtered_windows = np.lib.stride_tricks.sliding_window_view(
+                np.asarray(filtered, dtype=np.float64), self.window_samples
+            )
+        for blockstart in range(0, len(starts), self.blocksize):
+            blockstarts = starts[blockstart : blockstart + self.blocksize]
+            quality_scores[blockstart : blockstart + len(blockstarts)] = self.assess_quality_block(
+                signal_windows[blockstarts],
+                filtered_windows[blockstarts] if filtered is not None else None,
+            )[0]
 
-        for i in range(n_windows):
-            start = i * stride_samples
-            end = start + self.window_samples
+        return times, quality_scores
 
-            if end > len(signal):
-                break
+    def assess_stream(
+        self, chunks: Iterable, stride: float = 1.0
+    ) -> Generator[tuple[NDArray, NDArray], None, None]:
+        """
+        Assess quality along a signal that arrives in chunks.
 
-            signal_segment = signal[start:end]
-            filtered_segment = filtered[start:end] if filtered is not None else None
+        This gives the same times and scores as `assess_continuous` on the whole
+        signal, but only keeps one window's worth of samples in memory, and reports the
+        windows as soon as their last sample has arrived.
 
-            quality_score, _ = self.assess_quality(signal_segment, filtered_segment)
+        Parameters
+        ----------
+        chunks : iterable
+            Successive pieces of the signal.  Each item is either a 1D array of raw
+            samples, or a (raw, filtered) pair of 1D arrays of the same length.
+        stride : float, default=1.0
+            Stride between windows in seconds.
 
-            times[i] = (start + end) / 2 / self.fs
-            quality_scores[i] = quality_score
+        Yields
+        ------
+        times : ndarray
+            Centers of the windows completed by this chunk, in seconds from the start
+            of the stream.
+        quality_scores : ndarray
+            Quality scores of those windows.
 
-        return times[: i + 1], quality_scores[: i + 1]
+        Examples
+        --------
+        >>> for times, scores in qa.assess_stream(np.array_split(ppg, 100)):
+        ...     print(times, scores)
+        """
+        windows = None
+        for thechunk in chunks:
+            if isinstance(thechunk, tuple):
+                signal_chunk, filtered_chunk = thechunk
+            else:
+                signal_chunk, filtered_chunk = thechunk, None
+            if windows is None:
+                withfiltered = filtered_chunk is not None
+                windows = _RollingWindows(
+                    self.window_samples, int(stride * self.fs), 2 if withfiltered else 1
+                )
+            if withfiltered:
+                starts, segments = windows.push(signal_chunk, filtered_chunk)
+            else:
+                starts, segments = windows.push(signal_chunk)
+            times = (starts + self.window_samples / 2) / self.fs
+            if len(starts) > 0:
+                quality_scores = self.assess_quality_block(
+                    segments[0], segments[1] if withfiltered else None
+                )[0]
+            else:
+                quality_scores = np.zeros(0)
+            yield times, quality_scores
 
 
 class HeartRateExtractor:
@@ -1821,6 +2571,7 @@ class RobustPPGProcessor:
 
         self.quality_assessor = SignalQualityAssessor(fs=fs, window_size=5.0)
         self.hr_extractor = HeartRateExtractor(fs=fs)
+        self.peak_min_distance = 0.4
 
     def process(
         self,
@@ -1900,6 +2651,181 @@ class RobustPPGProcessor:
 
         return results
 
+    def _filterchunk(self, signal_chunk: NDArray, results: dict) -> NDArray:
+        """Run one chunk through the filter, carrying the filter state over from the last."""
+        if self.method == "adaptive":
+            filtered, results["motion_flags"] = self.filter.filter_signal(signal_chunk)
+        elif self.method == "ekf":
+            filtered, results["ekf_heart_rate"] = self.filter.filter_signal(signal_chunk)
+        elif self.method == "raw":
+            filtered = np.asarray(signal_chunk, dtype=np.float64)
+        else:
+            filtered = self.filter.filter_signal(signal_chunk)
+        return filtered
+
+    def _findpeaks(
+        self, peakbuffer: NDArray, bufferstart: int, confirmedupto: int, lastpeak: int | None
+    ) -> tuple[NDArray, NDArray]:
+        """Return the peaks in a filtered buffer from confirmedupto on, with their heart rates."""
+        peaks, _ = signal.find_peaks(
+            peakbuffer, distance=int(self.peak_min_distance * self.fs), prominence=0.1
+        )
+        peaks = peaks + bufferstart
+        peaks = peaks[peaks >= confirmedupto]
+        previous = np.concatenate(([lastpeak if lastpeak is not None else -1], peaks[:-1]))
+        with np.errstate(divide="ignore"):
+            hr_peaks = np.where(previous >= 0, 60.0 * self.fs / (peaks - previous), np.nan)
+        return peaks, hr_peaks
+
+    def process_stream(
+        self,
+        chunks: Iterable,
+        quality_threshold: float = 0.5,
+        lookback: float = 5.0,
+        holdback: float = 2.0,
+    ) -> Generator[dict, None, None]:
+        """
+        Processing pipeline for a signal that arrives in chunks.
+
+        Each chunk is filtered, scored and searched for heart rate as soon as it
+        arrives, and the results for it are yielded immediately.  The Kalman filter
+        state, the samples of the quality and heart rate windows that are still open,
+        and the last few seconds of filtered signal for peak detection are carried over
+        between chunks, so memory use does not grow with the length of the recording.
+
+        Parameters
+        ----------
+        chunks : iterable of array
+            Successive pieces of the raw PPG signal.  Chunks can have any length.
+            Missing samples are np.nan.
+        quality_threshold : float
+            Minimum quality score (0-1) for a quality window to count as good.
+        lookback : float
+            Seconds of already searched filtered signal kept for peak detection, so that
+            peak prominences are judged in context.  Default is 5.0.
+        holdback : float
+            Peaks in the last `holdback` seconds of the signal received so far are not
+            reported until the next chunk arrives, since a larger peak could still
+            follow within the minimum peak separation.  Default is 2.0.
+
+        Yields
+        ------
+        results : dict
+            Results for the samples of one chunk:
+            - 'filtered_signal', and 'motion_flags' or 'ekf_heart_rate' for the
+              adaptive and EKF filters, one value per sample of the chunk.
+            - 'quality_times', 'quality_scores': the quality windows completed by
+              this chunk.
+            - 'hr_times', 'hr_values': the FFT heart rate windows completed by this
+              chunk.
+            - 'peak_indices': newly confirmed peaks, as sample indices from the start
+              of the stream, and 'hr_peaks', the heart rate from the interval to the
+              preceding peak (np.nan for the first peak of the stream).
+            - 'mean_quality', 'good_quality_percentage': running values over all of
+              the quality windows so far.
+            After the last chunk, one more dict is yielded with empty per-sample arrays,
+            holding the peaks that were held back at the end of the stream.
+
+        Notes
+        -----
+        The filtered signal, quality scores and FFT heart rates are identical to those
+        of `process` on the concatenated signal.  Peaks are found in a sliding buffer,
+        so a peak whose prominence depends on signal more than `lookback` seconds away
+        can differ from the whole signal result.  Unlike `process`, heart rate windows
+        are reported whether or not any quality window has been good so far.
+
+        Examples
+        --------
+        >>> processor = RobustPPGProcessor(fs=100.0, method="adaptive")
+        >>> for results in processor.process_stream(np.array_split(ppg, 1000)):
+        ...     print(results["quality_scores"], results["hr_values"])
+        """
+        qualitywindows = _RollingWindows(
+            self.quality_assessor.window_samples, int(1.0 * self.fs), numchannels=2
+        )
+        hrwindows = _RollingWindows(int(10.0 * self.fs), int(2.0 * self.fs))
+        lookback_samples = int(lookback * self.fs)
+        holdback_samples = int(holdback * self.fs)
+        peakbuffer = np.zeros(0, dtype=np.float64)
+        bufferstart = 0
+        confirmedupto = 0
+        lastpeak = None
+        numsamples = 0
+        numquality = 0
+        qualitysum = 0.0
+        numgood = 0
+
+        for signal_chunk in chunks:
+            signal_chunk = np.asarray(signal_chunk, dtype=np.float64)
+            results = {}
+            filtered = self._filterchunk(signal_chunk, results)
+            results["filtered_signal"] = filtered
+            numsamples += len(signal_chunk)
+
+            starts, segments = qualitywindows.push(signal_chunk, filtered)
+            results["quality_times"] = (
+                starts + self.quality_assessor.window_samples / 2
+            ) / self.fs
+            if len(starts) > 0:
+                results["quality_scores"] = self.quality_assessor.assess_quality_block(
+                    segments[0], segments[1]
+                )[0]
+            else:
+                results["quality_scores"] = np.zeros(0)
+            numquality += len(starts)
+            qualitysum += np.sum(results["quality_scores"])
+            numgood += np.sum(results["quality_scores"] > quality_threshold)
+
+            starts, segments = hrwindows.push(filtered)
+            hr_times = []
+            hr_values = []
+            for thestart, thesegment in zip(starts, segments[0]):
+                hr, _, _, _ = self.hr_extractor.extract_from_fft(thesegment)
+                if hr is not None:
+                    hr_times.append((thestart + hrwindows.window_samples / 2) / self.fs)
+                    hr_values.append(hr)
+            results["hr_times"] = np.array(hr_times)
+            results["hr_values"] = np.array(hr_values)
+
+            # only report peaks that later samples can no longer change
+            peakbuffer = np.concatenate((peakbuffer, filtered))
+            peaks, hr_peaks = self._findpeaks(peakbuffer, bufferstart, confirmedupto, lastpeak)
+            newconfirmed = max(confirmedupto, numsamples - holdback_samples)
+            keep = peaks < newconfirmed
+            results["peak_indices"] = peaks[keep]
+            results["hr_peaks"] = hr_peaks[keep]
+            if np.any(keep):
+                lastpeak = int(peaks[keep][-1])
+            confirmedupto = newconfirmed
+            numdrop = max(0, confirmedupto - lookback_samples - bufferstart)
+            peakbuffer = peakbuffer[numdrop:]
+            bufferstart += numdrop
+
+            results["mean_quality"] = qualitysum / numquality if numquality > 0 else np.nan
+            results["good_quality_percentage"] = (
+                numgood / numquality * 100 if numquality > 0 else np.nan
+            )
+            yield results
+
+        # flush the peaks held back at the end of the stream
+        peaks, hr_peaks = self._findpeaks(peakbuffer, bufferstart, confirmedupto, lastpeak)
+        results = {
+            "filtered_signal": np.zeros(0),
+            "quality_times": np.zeros(0),
+            "quality_scores": np.zeros(0),
+            "hr_times": np.zeros(0),
+            "hr_values": np.zeros(0),
+            "peak_indices": peaks,
+            "hr_peaks": hr_peaks,
+            "mean_quality": qualitysum / numquality if numquality > 0 else np.nan,
+            "good_quality_percentage": numgood / numquality * 100 if numquality > 0 else np.nan,
+        }
+        if self.method == "adaptive":
+            results["motion_flags"] = np.zeros(0, dtype=bool)
+        elif self.method == "ekf":
+            results["ekf_heart_rate"] = np.zeros(0)
+        yield results
+
 
 class PPGFeatureExtractor:
     """
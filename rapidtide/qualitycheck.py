@@ -16,16 +16,20 @@
 #   limitations under the License.
 #
 #
-from typing import Any
+from typing import Any, Callable
 
-import matplotlib.pyplot as plt
 import numpy as np
 from numpy.typing import NDArray
 from scipy.ndimage import binary_erosion
 
 import rapidtide.filter as tide_filt
 import rapidtide.stats as tide_stats
+import rapidtide.statscache as tide_statscache
 from rapidtide.RapidtideDataset import RapidtideDataset
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
 
 
 def prepmask(inputmask: NDArray) -> NDArray:
@@ -432,6 +436,77 @@ def checkmap(
     return themetrics
 
 
+def cachedcheckmap(
+    thecache: tide_statscache.StatsCache | None,
+    getmap: Callable[[], NDArray],
+    themask: NDArray,
+    kind: str = "histmetrics",
+    histlen: int = 101,
+    rangemin: float = 0.0,
+    rangemax: float = 1.0,
+    histlabel: str = "similarity metric histogram",
+    ignorefirstpoint: bool = False,
+    savehist: bool = False,
+    debug: bool = False,
+) -> dict[str, Any]:
+    """
+    Run ``checkmap``, reusing the result from a statistics cache if it is there.
+
+    Parameters
+    ----------
+    thecache : StatsCache or None
+        Statistics cache of the image the map comes from.  If None, always calculate.
+    getmap : callable
+        Function with no arguments that returns the map.  Only called if the result is not
+        in the cache, so the map does not have to be read (or derived) when it is.
+    themask : NDArray
+        Binary mask array where non-zero values indicate regions of interest.
+    kind : str, optional
+        Name of the calculation in the cache, to tell apart different maps derived from the
+        same image (default is "histmetrics").
+    histlen, rangemin, rangemax, histlabel, ignorefirstpoint, savehist, debug
+        As in ``checkmap``.  Debug runs always recalculate, so the histograms can be plotted.
+
+    Returns
+    -------
+    dict[str, Any]
+        Dictionary of histogram metrics, as returned by ``checkmap``.
+
+    Examples
+    --------
+    >>> thecache = tide_statscache.StatsCache("sub-01_desc-maxcorr_map.nii.gz")
+    >>> metrics = cachedcheckmap(thecache, lambda: strengths.data, lagmask)
+    """
+    thekey = None
+    if (thecache is not None) and not debug:
+        thekey = thecache.makekey(
+            kind,
+            themask,
+            histlen=histlen,
+            rangemin=rangemin,
+            rangemax=rangemax,
+            ignorefirstpoint=ignorefirstpoint,
+            savehist=savehist,
+        )
+        themetrics = thecache.get(thekey)
+        if themetrics is not None:
+            return themetrics
+    themetrics = checkmap(
+        getmap(),
+        themask,
+        histlen=histlen,
+        rangemin=rangemin,
+        rangemax=rangemax,
+        histlabel=histlabel,
+        ignorefirstpoint=ignorefirstpoint,
+        savehist=savehist,
+        debug=debug,
+    )
+    if thekey is not None:
+        thecache.put(thekey, themetrics)
+    return themetrics
+
+
 def qualitycheck(
     datafileroot: str,
     graymaskspec: str | None = None,
@@ -444,6 +519,7 @@ def qualitycheck(
     forcetr: bool = False,
     forceoffset: bool = False,
     offsettime: float = 0.0,
+    statscache: bool = True,
     verbose: bool = False,
     debug: bool = False,
 ) -> dict[str, Any]:
@@ -480,6 +556,9 @@ def qualitycheck(
         Force offset to be set.
     offsettime : float, default=0.0
         Time offset to apply.
+    statscache : bool, default=True
+        Reuse map statistics from the statistics sidecars next to the maps, and save new
+        ones there.  Maps whose statistics are all cached are not read at all.
     verbose : bool, default=False
         Enable verbose output.
     debug : bool, default=False
@@ -527,8 +606,16 @@ def qualitycheck(
         offsettime=offsettime,
         verbose=verbose,
         init_LUT=False,
+        lazy=True,
+        statscache=statscache,
+        backgroundload=False,
     )
 
+    def mapcache(theoverlay: Any) -> tide_statscache.StatsCache | None:
+        if statscache:
+            return tide_statscache.StatsCache(theoverlay.filename, verbose=verbose)
+        return None
+
     if debug:
         print(f"qualitycheck started on {datafileroot}")
     outputdict = {}
@@ -582,11 +669,12 @@ def qualitycheck(
     # process the lag map
     thelags = thedataset.overlays["lagtimes"]
     thelags.setFuncMask(thelagmask)
-    thelags.updateStats()
     if debug:
         thelags.summarize()
-    outputdict["lag"] = checkmap(
-        thelags.data,
+    thelagcache = mapcache(thelags)
+    outputdict["lag"] = cachedcheckmap(
+        thelagcache,
+        lambda: thelags.data,
         thelagmask,
         rangemin=-5.0,
         rangemax=10.0,
@@ -594,16 +682,26 @@ def qualitycheck(
         debug=debug,
     )
 
-    # get the gradient of the lag map
-    thegradient = np.gradient(thelags.data)
-    thegradientamp = np.sqrt(
-        np.square(thegradient[0] / thelags.xsize)
-        + np.square(thegradient[1] / thelags.ysize)
-        + np.square(thegradient[2] / thelags.zsize)
-    )
-    outputdict["laggrad"] = checkmap(
-        thegradientamp,
+    # get the gradient of the lag map - only calculated if some of its metrics are not cached
+    gradientamp = []
+
+    def getgradientamp() -> NDArray:
+        if len(gradientamp) == 0:
+            thegradient = np.gradient(thelags.data)
+            gradientamp.append(
+                np.sqrt(
+                    np.square(thegradient[0] / thelags.xsize)
+                    + np.square(thegradient[1] / thelags.ysize)
+                    + np.square(thegradient[2] / thelags.zsize)
+                )
+            )
+        return gradientamp[0]
+
+    outputdict["laggrad"] = cachedcheckmap(
+        thelagcache,
+        getgradientamp,
         theerodedmask,
+        kind="laggradhistmetrics",
         rangemin=0.0,
         rangemax=3.0,
         histlabel="lag gradient amplitude histogram",
@@ -614,11 +712,12 @@ def qualitycheck(
     # process the strength map
     thestrengths = thedataset.overlays["lagstrengths"]
     thestrengths.setFuncMask(thelagmask)
-    thestrengths.updateStats()
     if debug:
         thestrengths.summarize()
-    outputdict["strength"] = checkmap(
-        thestrengths.data,
+    thestrengthcache = mapcache(thestrengths)
+    outputdict["strength"] = cachedcheckmap(
+        thestrengthcache,
+        lambda: thestrengths.data,
         thelagmask,
         rangemin=0.0,
         rangemax=1.0,
@@ -629,11 +728,11 @@ def qualitycheck(
     # process the MTT map
     theMTTs = thedataset.overlays["MTT"]
     theMTTs.setFuncMask(thelagmask)
-    theMTTs.updateStats()
     if debug:
         theMTTs.summarize()
-    outputdict["MTT"] = checkmap(
-        theMTTs.data,
+    outputdict["MTT"] = cachedcheckmap(
+        mapcache(theMTTs),
+        lambda: theMTTs.data,
         thelagmask,
         histlabel="MTT histogram",
         rangemin=0.0,
@@ -642,24 +741,28 @@ def qualitycheck(
     )
 
     if dograyonly:
-        outputdict["grayonly-lag"] = checkmap(
-            thelags.data,
+        outputdict["grayonly-lag"] = cachedcheckmap(
+            thelagcache,
+            lambda: thelags.data,
             thelagmask * thegraymask,
             rangemin=-5.0,
             rangemax=10.0,
             histlabel="lag histogram - gray only",
             debug=debug,
         )
-        outputdict["grayonly-laggrad"] = checkmap(
-            thegradientamp,
+        outputdict["grayonly-laggrad"] = cachedcheckmap(
+            thelagcache,
+            getgradientamp,
             theerodedmask * thegraymask,
+            kind="laggradhistmetrics",
             rangemin=0.0,
             rangemax=3.0,
             histlabel="lag gradient amplitude histogram - gray only",
             debug=debug,
         )
-        outputdict["grayonly-strength"] = checkmap(
-            thestrengths.data,
+        outputdict["grayonly-strength"] = cachedcheckmap(
+            thestrengthcache,
+            lambda: thestrengths.data,
             thelagmask * thegraymask,
             rangemin=0.0,
             rangemax=1.0,
@@ -667,24 +770,28 @@ def qualitycheck(
             debug=debug,
         )
     if dowhiteonly:
-        outputdict["whiteonly-lag"] = checkmap(
-            thelags.data,
+        outputdict["whiteonly-lag"] = cachedcheckmap(
+            thelagcache,
+            lambda: thelags.data,
             thelagmask * thewhitemask,
             rangemin=-5.0,
             rangemax=10.0,
             histlabel="lag histogram - white only",
             debug=debug,
         )
-        outputdict["whiteonly-laggrad"] = checkmap(
-            thegradientamp,
+        outputdict["whiteonly-laggrad"] = cachedcheckmap(
+            thelagcache,
+            getgradientamp,
             theerodedmask * thewhitemask,
+            kind="laggradhistmetrics",
             rangemin=0.0,
             rangemax=3.0,
             histlabel="lag gradient amplitude histogram - white only",
             debug=debug,
         )
-        outputdict["whiteonly-strength"] = checkmap(
-            thestrengths.data,
+        outputdict["whiteonly-strength"] = cachedcheckmap(
+            thestrengthcache,
+            lambda: thestrengths.data,
             thelagmask * thewhitemask,
             rangemin=0.0,
             rangemax=1.0,
@@ -23,11 +23,14 @@ import numpy.polynomial.polynomial as poly
 from numpy.typing import NDArray
 from scipy.interpolate import CubicSpline, UnivariateSpline
 from scipy.ndimage import median_filter
-from statsmodels.robust import mad
 
 import rapidtide.filter as tide_filt
 import rapidtide.io as tide_io
 import rapidtide.workflows.regressfrommaps as tide_regressfrommaps
+from rapidtide.lazyimport import lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+mad = lazyimportfrom("statsmodels.robust", "mad")
 
 global ratiotooffsetfunc, funcoffsets, maplimits
 
@@ -456,6 +459,69 @@ def ratiotodelay(theratio: float, offset: float = 0.0, debug: bool = False) -> T
         )
 
 
+def ratiotodelay_block(
+    theratios: NDArray, offsets: Union[NDArray, float] = 0.0, debug: bool = False
+) -> Tuple[NDArray, NDArray]:
+    """
+    Convert an array of ratios to delay values using the lookup tables.
+
+    This is the vectorized equivalent of calling `ratiotodelay` on every element of
+    `theratios`. Each lookup function is evaluated once, on all the ratios that use it.
+
+    Parameters
+    ----------
+    theratios : NDArray
+        Array of derivative ratios to convert to delays.
+    offsets : NDArray or float, optional
+        The offset of each ratio (or one offset for all of them), used to select the
+        lookup table and for compensation outside the map limits. Default is 0.0.
+    debug : bool, optional
+        Flag to enable debug output. Default is False.
+
+    Returns
+    -------
+    Tuple[NDArray, NDArray]
+        A tuple containing:
+        - The calculated delay values, with the same shape as `theratios`
+        - The closest offset value used for each lookup
+
+    Notes
+    -----
+    Uses the same global lookup tables as `ratiotodelay`, set by `trainratiotooffset`.
+
+    Examples
+    --------
+    >>> delays, closestoffsets = ratiotodelay_block(ratiomap, offsets=lagmap)
+    """
+    global ratiotooffsetfunc, funcoffsets, maplimits
+
+    theratios = np.asarray(theratios, dtype=np.float64)
+    offsets = np.broadcast_to(np.asarray(offsets, dtype=np.float64), theratios.shape)
+    theoffsets = np.asarray(funcoffsets, dtype=np.float64)
+
+    # find the closest calculated offset for every point
+    closestindices = np.argmin(np.fabs(theoffsets[None, :] - offsets.reshape((-1, 1))), axis=1)
+    closestindices = closestindices.reshape(theratios.shape)
+    closestoffsets = theoffsets[closestindices]
+    if debug:
+        print(f"ratiotodelay_block: {theratios.shape=}, {np.bincount(closestindices.ravel())=}")
+
+    # clamp to the map limits, compensating for the offset as ratiotodelay does
+    offsetdiffs = offsets - closestoffsets
+    lookupratios = np.clip(theratios, maplimits[0], maplimits[1])
+    compensation = np.where(
+        theratios < maplimits[0],
+        offsetdiffs,
+        np.where(theratios > maplimits[1], -offsetdiffs, 0.0),
+    )
+
+    delays = np.zeros(theratios.shape, dtype=np.float64)
+    for whichoffset in np.unique(closestindices):
+        thelocs = np.where(closestindices == whichoffset)
+        delays[thelocs] = ratiotooffsetfunc[whichoffset](lookupratios[thelocs])
+    return delays + compensation, closestoffsets
+
+
 def coffstodelay(
     thecoffs: NDArray, mindelay: float = -3.0, maxdelay: float = 3.0, debug: bool = False
 ) -> float:
@@ -533,6 +599,80 @@ def coffstodelay(
         return 0.0
 
 
+def coffstodelay_block(
+    thecoffs: NDArray, mindelay: float = -3.0, maxdelay: float = 3.0, debug: bool = False
+) -> NDArray:
+    """
+    Convert rows of polynomial coefficients to delay values.
+
+    This is the vectorized equivalent of calling `coffstodelay` on every row of `thecoffs`.
+    The roots of all the polynomials are found at once, as the eigenvalues of a stack of
+    companion matrices.
+
+    Parameters
+    ----------
+    thecoffs : NDArray
+        2D array of polynomial coefficients (excluding the leading 1.0 term), one set per
+        row. A 1D array is taken to be one coefficient per row.
+    mindelay : float, optional
+        Minimum allowed delay value, default is -3.0.
+    maxdelay : float, optional
+        Maximum allowed delay value, default is 3.0.
+    debug : bool, optional
+        If True, print debugging information, default is False.
+
+    Returns
+    -------
+    NDArray
+        The selected delay value for each row.
+
+    Notes
+    -----
+    As in `coffstodelay`, the polynomial is defined on the domain [mindelay, maxdelay].
+    Rows whose highest order coefficient is zero are handed to `coffstodelay`.
+
+    Examples
+    --------
+    >>> coffstodelay_block(np.array([[-0.5], [0.25]]), mindelay=-3.0, maxdelay=3.0)
+    array([ 6., -12.])
+    """
+    thecoffs = np.asarray(thecoffs, dtype=np.float64)
+    if thecoffs.ndim == 1:
+        thecoffs = thecoffs[:, None]
+    numrows, order = thecoffs.shape
+    delays = np.zeros(numrows, dtype=np.float64)
+    if numrows == 0:
+        return delays
+
+    # roots are found in the window [-1, 1], then mapped back to the domain
+    halfwidth = 0.5 * (maxdelay - mindelay)
+    center = 0.5 * (maxdelay + mindelay)
+    degenerate = thecoffs[:, -1] == 0.0
+    good = np.where(~degenerate)[0]
+    if order == 1:
+        delays[good] = -halfwidth / thecoffs[good, 0] + center
+    else:
+        allcoffs = np.concatenate((np.ones((len(good), 1)), thecoffs[good, :]), axis=1)
+        companions = np.zeros((len(good), order, order), dtype=np.float64)
+        companions[:, np.arange(1, order), np.arange(0, order - 1)] = 1.0
+        companions[:, :, -1] = -allcoffs[:, :-1] / allcoffs[:, -1:]
+        theroots = np.linalg.eigvals(companions)
+        therealroots = theroots.real * halfwidth + center
+        valid = (theroots.imag == 0.0) & (therealroots >= mindelay) & (therealroots <= maxdelay)
+        candidates = np.where(valid, np.fabs(therealroots), np.inf)
+        chosen = np.argmin(candidates, axis=1)
+        delays[good] = np.where(
+            np.any(valid, axis=1), therealroots[np.arange(len(good)), chosen], 0.0
+        )
+    if debug:
+        print(f"coffstodelay_block: {numrows=}, {order=}, {np.sum(degenerate)} degenerate rows")
+    for therow in np.where(degenerate)[0]:
+        delays[therow] = coffstodelay(
+            thecoffs[therow, :], mindelay=mindelay, maxdelay=maxdelay, debug=debug
+        )
+    return delays
+
+
 def getderivratios(
     fmri_data_valid: NDArray,
     validvoxels: NDArray,
@@ -22,10 +22,7 @@ import sys
 from typing import Any
 
 import numpy as np
-import statsmodels as sm
 from numpy.typing import NDArray
-from scipy.stats import pearsonr
-from sklearn.decomposition import PCA, FastICA
 
 import rapidtide.fit as tide_fit
 import rapidtide.genericmultiproc as tide_genericmultiproc
@@ -33,6 +30,14 @@ import rapidtide.io as tide_io
 import rapidtide.miscmath as tide_math
 import rapidtide.resample as tide_resample
 import rapidtide.stats as tide_stats
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+sm = lazyimport("statsmodels")
+pearsonr = lazyimportfrom("scipy.stats", "pearsonr")
+PCA = lazyimportfrom("sklearn.decomposition", "PCA")
+FastICA = lazyimportfrom("sklearn.decomposition", "FastICA")
+IncrementalPCA = lazyimportfrom("sklearn.decomposition", "IncrementalPCA")
 
 LGR = logging.getLogger("GENERAL")
 
@@ -70,6 +75,64 @@ def _procOneVoxelTimeShift(
     return vox, shiftedtc, weights, paddedshiftedtc, paddedweights
 
 
+def _procVoxelBlockTimeShift(
+    voxels: NDArray,
+    voxelargs: tuple,
+    **kwargs: Any,
+) -> list[tuple[int, NDArray, NDArray, NDArray, NDArray]]:
+    """
+    Time shift a block of voxels at once.
+
+    This is the vectorized counterpart of `_procOneVoxelTimeShift`. The block is detrended
+    with a single fit, and all the voxels are shifted with one call to
+    `tide_resample.timeshift_block`.
+
+    Parameters
+    ----------
+    voxels : NDArray
+        Indices of the voxels to process.
+    voxelargs : tuple
+        The unpacked voxel arguments (fmridata, lagtimes, padtrs, fmritr), with the full
+        fMRI data and lag time arrays rather than the values for a single voxel.
+    **kwargs : Any
+        Same options as `_procOneVoxelTimeShift`.
+
+    Returns
+    -------
+    list[tuple[int, NDArray, NDArray, NDArray, NDArray]]
+        One `_procOneVoxelTimeShift` style result tuple for each voxel in `voxels`.
+    """
+    options = {
+        "detrendorder": 1,
+        "offsettime": 0.0,
+        "debug": False,
+    }
+    options.update(kwargs)
+    detrendorder = int(options["detrendorder"])
+    offsettime = options["offsettime"]
+    debug = options["debug"]
+    if debug:
+        print(f"{len(voxels)=} {detrendorder=} {offsettime=}")
+    (
+        fmridata,
+        lagtimes,
+        padtrs,
+        fmritr,
+    ) = voxelargs
+    if detrendorder > 0:
+        normtcs = tide_fit.detrend_block(fmridata[voxels, :], order=detrendorder, demean=True)
+    else:
+        normtcs = fmridata[voxels, :] + 0.0
+    shifttrs = -(-offsettime + lagtimes[voxels]) / fmritr  # lagtime is in seconds
+    shiftedtcs, weights, paddedshiftedtcs, paddedweights = tide_resample.timeshift_block(
+        normtcs, shifttrs, padtrs
+    )
+    return [
+        (vox, shiftedtcs[i, :], weights[i, :], paddedshiftedtcs[i, :], paddedweights[i, :])
+        for i, vox in enumerate(voxels)
+    ]
+
+
 def _packvoxeldata(voxnum: int, voxelargs: tuple) -> list:
     """
     Pack voxel data into a list structure.
@@ -233,6 +296,7 @@ def alignvoxels(
     showprogressbar: bool = True,
     chunksize: int = 1000,
     padtrs: int = 60,
+    blocksize: int = 1000,
     debug: bool = False,
     rt_floattype: np.dtype = np.float64,
 ) -> int:
@@ -275,6 +339,9 @@ def alignvoxels(
         Number of voxels to process per chunk in multiprocessing (default is 1000)
     padtrs : int, optional
         Number of timepoints to pad on each end of the timecourses (default is 60)
+    blocksize : int, optional
+        Number of voxels to shift together in one set of FFTs.  If 1, each voxel is
+        shifted separately with `tide_resample.timeshift` (default is 1000)
     debug : bool, optional
         If True, enable additional debugging output (default is False)
     rt_floattype : np.dtype, optional
@@ -320,6 +387,10 @@ def alignvoxels(
         paddedshiftedtcs,
         paddedweights,
     ]
+    if blocksize > 1:
+        batchfunc = _procVoxelBlockTimeShift
+    else:
+        batchfunc = None
     if debug:
         print("alignvoxels: {inputshape}")
         print("volumetotal: {volumetotal}")
@@ -339,6 +410,8 @@ def alignvoxels(
         alwaysmultiproc,
         showprogressbar,
         chunksize,
+        batchsize=blocksize,
+        batchfunc=batchfunc,
         detrendorder=detrendorder,
         offsettime=offsettime,
         debug=debug,
@@ -665,6 +738,130 @@ def prenorm(
     shiftedtcs *= (normfac * thisweight)[:, None]
 
 
+def _fitrefinepca(
+    refinevoxels: NDArray,
+    pcacomponents: float | str,
+    pcasolver: str = "full",
+    pcablocksize: int = 10000,
+    debug: bool = False,
+) -> tuple[NDArray, NDArray, NDArray]:
+    """
+    Find the principal components of the refinement timecourses.
+
+    Parameters
+    ----------
+    refinevoxels : ndarray
+        Array of shape (n_voxels, n_timepoints) containing the timecourses to decompose.
+    pcacomponents : float or str
+        Number of components to keep if >= 1, fraction of the variance to explain if < 1, or
+        'mle' to select the number of components automatically.
+    pcasolver : str, optional
+        'full' uses an exact SVD of the whole matrix.  'randomized' uses a randomized SVD,
+        and 'incremental' fits the voxels in blocks of `pcablocksize` with IncrementalPCA.
+        Default is 'full'.
+    pcablocksize : int, optional
+        Number of voxels passed to each partial fit with the incremental solver
+        (default is 10000).
+    debug : bool, optional
+        If True, print debug information (default is False).
+
+    Returns
+    -------
+    tuple[ndarray, ndarray, ndarray]
+        The mean timecourse, the retained components (n_components, n_timepoints), and the
+        fraction of the variance explained by each retained component.
+
+    Notes
+    -----
+    When `pcacomponents` is a fraction of the variance, the approximate solvers are run
+    with an increasing number of components until enough of the variance is explained, and
+    components are then selected with the same rule used by `sklearn.decomposition.PCA`.
+    The MLE selection needs the full spectrum, so it always uses the full solver.
+    """
+    maxcomponents = min(refinevoxels.shape)
+    if pcasolver == "incremental":
+        maxcomponents = min(maxcomponents, pcablocksize)
+    if pcasolver in ["randomized", "incremental"] and pcacomponents == "mle":
+        LGR.warning(f"mle component selection is not supported by {pcasolver} pca - using full")
+        pcasolver = "full"
+    if pcasolver == "full":
+        try:
+            thefit = PCA(n_components=pcacomponents).fit(refinevoxels)
+        except ValueError:
+            if pcacomponents == "mle":
+                LGR.info("mle estimation failed - falling back to pcacomponents=0.8")
+                thefit = PCA(n_components=0.8).fit(refinevoxels)
+            else:
+                print("unhandled math exception in PCA refinement - exiting")
+                sys.exit()
+        return thefit.mean_, thefit.components_, thefit.explained_variance_ratio_
+
+    if pcacomponents >= 1:
+        numcomponents = min(int(pcacomponents), maxcomponents)
+    else:
+        numcomponents = min(8, maxcomponents)
+    while True:
+        if pcasolver == "randomized":
+            thefit = PCA(n_components=numcomponents, svd_solver="randomized", random_state=0)
+        else:
+            thefit = IncrementalPCA(n_components=numcomponents, batch_size=pcablocksize)
+        thefit.fit(refinevoxels)
+        ratio_cumsum = np.cumsum(thefit.explained_variance_ratio_)
+        if debug:
+            print(f"_fitrefinepca: {pcasolver=}, {numcomponents=}, {ratio_cumsum[-1]=}")
+        if pcacomponents >= 1 or ratio_cumsum[-1] >= pcacomponents:
+            break
+        if numcomponents == maxcomponents:
+            LGR.warning(
+                f"{pcasolver} pca explains only {100.0 * ratio_cumsum[-1]:.2f}% of the variance"
+            )
+            break
+        numcomponents = min(2 * numcomponents, maxcomponents)
+    if pcacomponents < 1:
+        numcomponents = min(
+            int(np.searchsorted(ratio_cumsum, pcacomponents, side="right")) + 1, numcomponents
+        )
+    return (
+        thefit.mean_,
+        thefit.components_[:numcomponents],
+        thefit.explained_variance_ratio_[:numcomponents],
+    )
+
+
+def _pcaexplainedvariance(
+    refinevoxels: NDArray, themean: NDArray, thecomponents: NDArray, blocksize: int = 10000
+) -> float:
+    """
+    Measure the fraction of the variance captured by a set of components.
+
+    Parameters
+    ----------
+    refinevoxels : ndarray
+        Array of shape (n_voxels, n_timepoints) containing the decomposed timecourses.
+    themean : ndarray
+        The mean timecourse removed before decomposition.
+    thecomponents : ndarray
+        Orthonormal components, shape (n_components, n_timepoints).
+    blocksize : int, optional
+        Number of voxels to project at a time (default is 10000).
+
+    Returns
+    -------
+    float
+        The fraction of the total variance of `refinevoxels` lying in the span of
+        `thecomponents`.
+    """
+    totalvar = 0.0
+    capturedvar = 0.0
+    for startpt in range(0, refinevoxels.shape[0], blocksize):
+        centered = refinevoxels[startpt : startpt + blocksize, :] - themean[None, :]
+        totalvar += np.sum(np.square(centered))
+        capturedvar += np.sum(np.square(centered @ thecomponents.T))
+    if totalvar == 0.0:
+        return 1.0
+    return capturedvar / totalvar
+
+
 def dorefine(
     shiftedtcs: NDArray,
     refinemask: NDArray,
@@ -679,6 +876,7 @@ def dorefine(
     outputname: str,
     detrendorder: int = 1,
     pcacomponents: float | str = 0.8,
+    pcasolver: str = "full",
     dodispersioncalc: bool = False,
     dispersioncalc_lower: float = 0.0,
     dispersioncalc_upper: float = 0.0,
@@ -725,6 +923,9 @@ def dorefine(
     pcacomponents : float or str, optional
         Number of PCA components to use. If < 1, treated as fraction of variance; if 'mle', uses MLE.
         Default is 0.8.
+    pcasolver : str, optional
+        Solver used for PCA refinement: 'full' (exact SVD), 'randomized' (randomized SVD), or
+        'incremental' (IncrementalPCA fit in blocks of voxels).  Default is 'full'.
     dodispersioncalc : bool, optional
         If True, compute dispersion calculation across lag ranges (default is False).
     dispersioncalc_lower : float, optional
@@ -883,24 +1084,29 @@ def dorefine(
     elif refinetype == "pca":
         # use the method of "A novel perspective to calibrate temporal delays in cerebrovascular reactivity
         # using hypercapnic and hyperoxic respiratory challenges". NeuroImage 187, 154?165 (2019).
-        LGR.info(f"performing pca refinement with pcacomponents set to {pcacomponents}")
-        try:
-            thefit = PCA(n_components=pcacomponents).fit(refinevoxels)
-        except ValueError:
-            if pcacomponents == "mle":
-                LGR.info("mle estimation failed - falling back to pcacomponents=0.8")
-                thefit = PCA(n_components=0.8).fit(refinevoxels)
-            else:
-                print("unhandled math exception in PCA refinement - exiting")
-                sys.exit()
         LGR.info(
-            f"Using {len(thefit.components_)} component(s), accounting for "
-            + f"{100.0 * np.cumsum(thefit.explained_variance_ratio_)[len(thefit.components_) - 1]:.2f}% of the variance"
+            f"performing {pcasolver} pca refinement with pcacomponents set to {pcacomponents}"
+        )
+        pcamean, pcacomps, pcaratios = _fitrefinepca(
+            refinevoxels, pcacomponents, pcasolver=pcasolver, debug=debug
         )
-        reduceddata = thefit.inverse_transform(thefit.transform(refinevoxels))
+        LGR.info(
+            f"Using {len(pcacomps)} component(s), accounting for "
+            + f"{100.0 * np.sum(pcaratios):.2f}% of the variance"
+        )
+        if pcasolver != "full":
+            measuredratio = _pcaexplainedvariance(refinevoxels, pcamean, pcacomps)
+            LGR.info(
+                f"{pcasolver} pca approximation error: components explain "
+                + f"{100.0 * measuredratio:.2f}% of the variance "
+                + f"(estimate error {100.0 * (np.sum(pcaratios) - measuredratio):.3f}%)"
+            )
+
+        # the mean of the reduced data, without reconstructing every voxel
+        projection = (np.mean(refinevoxels, axis=0) - pcamean) @ pcacomps.T
+        pcadata = pcamean + projection @ pcacomps
         if debug:
-            print("complex processing: reduceddata.shape =", reduceddata.shape)
-        pcadata = np.mean(reduceddata, axis=0)
+            print("complex processing: pcacomps.shape =", pcacomps.shape)
         filteredavg = tide_math.corrnormalize(
             theprefilter.apply(fmrifreq, averagedata),
             detrendorder=detrendorder,
@@ -20,17 +20,21 @@ import sys
 import time
 from typing import Any, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pyfftw
 import scipy as sp
 from numpy.typing import ArrayLike, NDArray
-from scipy import fft, signal
+from scipy import fft
 
 import rapidtide.filter as tide_filt
 import rapidtide.fit as tide_fit
 import rapidtide.io as tide_io
 import rapidtide.util as tide_util
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+signal = lazyimport("scipy.signal")
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -1312,6 +1316,103 @@ def timeshift(
     )
 
 
+def timeshift_block(
+    inputtcs: NDArray, shifttrs: ArrayLike, padtrs: int, debug: bool = False
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    """
+    Apply a separate time shift to each row of a 2D array of signals.
+
+    This is the vectorized equivalent of calling `timeshift` on every row of `inputtcs`.
+    The whole block is padded, transformed, modulated with one phase ramp per row, and
+    transformed back with a single pair of FFTs along the time axis.
+
+    Parameters
+    ----------
+    inputtcs : NDArray
+        2D array of input time courses, with one time course per row.
+    shifttrs : array-like
+        Time shift of each row, in units of samples. A scalar applies the same shift
+        to every row.
+    padtrs : int
+        Number of samples to pad each signal on each side before shifting.
+    debug : bool, optional
+        If True, prints debug information during execution. Default is False.
+
+    Returns
+    -------
+    tuple of ndarray
+        A tuple containing:
+        - shifted_y : ndarray
+            The time-shifted signals, cropped to the original length.
+        - shifted_weights : ndarray
+            The corresponding shifted weights, cropped to the original length.
+        - shifted_y_full : ndarray
+            The full time-shifted signals including padding.
+        - shifted_weights_full : ndarray
+            The full shifted weights including padding.
+
+    Notes
+    -----
+    The padding and phase ramps are the same as in `timeshift`, so each row of the output
+    matches the corresponding `timeshift` result to within rounding error. Real FFTs are
+    used, since only the real part of the shifted signal is returned.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> input_signals = np.random.rand(10, 100)
+    >>> shifted_sigs, weights, full_shifted, full_weights = timeshift_block(
+    ...     input_signals, np.linspace(-5.0, 5.0, 10), padtrs=10
+    ... )
+    >>> print(shifted_sigs.shape)
+    (10, 100)
+    """
+    # set up useful parameters
+    inputtcs = np.atleast_2d(inputtcs)
+    numrows, thelen = inputtcs.shape
+    thepaddedlen = thelen + 2 * padtrs
+    shifttrs = np.broadcast_to(np.asarray(shifttrs, dtype="float"), (numrows,))
+    if debug:
+        print(
+            "timeshift_block: numrows, thelen, padtrs, thepaddedlen=",
+            numrows,
+            thelen,
+            padtrs,
+            thepaddedlen,
+        )
+
+    # reflect data around ends to eliminate discontinuities
+    preshifted_y = np.zeros((numrows, thepaddedlen), dtype="float")
+    weights = np.zeros(thepaddedlen, dtype="float")
+    preshifted_y[:, padtrs : padtrs + thelen] = inputtcs
+    weights[padtrs : padtrs + thelen] = 1.0
+    revtcs = inputtcs[:, ::-1]
+    preshifted_y[:, 0:padtrs] = revtcs[:, -padtrs:]
+    preshifted_y[:, padtrs + thelen :] = revtcs[:, 0:padtrs]
+
+    # create the phase modulation timecourses, one per row.  Only the real part of the
+    # shifted signal is kept, so the positive frequencies are sufficient.
+    fftlen = thepaddedlen
+    argvecs = np.outer(shifttrs, 2.0 * np.pi * fft.rfftfreq(fftlen))
+    modvecs = np.exp(-1.0j * argvecs)
+
+    # process the data and the weights (fft->modulate->ifft)
+    shifted_y = fft.irfft(modvecs * fft.rfft(preshifted_y, axis=-1), n=fftlen, axis=-1)
+    shifted_weights = fft.irfft(modvecs * fft.rfft(weights)[None, :], n=fftlen, axis=-1)
+    if fftlen % 2 == 1:
+        # the phase ramp in timeshift is offset by half a bin for odd lengths
+        oddlenscale = np.cos(np.pi * shifttrs / fftlen)[:, None]
+        shifted_y *= oddlenscale
+        shifted_weights *= oddlenscale
+
+    return (
+        shifted_y[:, padtrs : padtrs + thelen],
+        shifted_weights[:, padtrs : padtrs + thelen],
+        shifted_y,
+        shifted_weights,
+    )
+
+
 def timewarp(
     orig_x: NDArray,
     orig_y: NDArray,
@@ -20,19 +20,22 @@ import sys
 import warnings
 from typing import Any
 
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy as sp
 from numpy.polynomial import Polynomial
 from numpy.typing import NDArray
-from scipy.optimize import curve_fit
-from statsmodels.robust import mad
 
 import rapidtide.correlate as tide_corr
 import rapidtide.filter as tide_filt
 import rapidtide.fit as tide_fit
 import rapidtide.miscmath as tide_math
 import rapidtide.util as tide_util
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+curve_fit = lazyimportfrom("scipy.optimize", "curve_fit")
+mad = lazyimportfrom("statsmodels.robust", "mad")
 
 
 class SimilarityFunctionator:
@@ -224,6 +227,41 @@ class SimilarityFunctionator:
 
         return thenormtc
 
+    def preptc_batch(self, thetcs: NDArray) -> NDArray:
+        """
+        Prepare a block of test timecourses, one per row.
+
+        This is the vectorized equivalent of calling `preptc` on each row of `thetcs` with
+        ``isreftc=False``.  Filtering is done row by row, but the detrending, windowing and
+        normalization are applied to the whole block at once.
+
+        Parameters
+        ----------
+        thetcs : NDArray
+            2D array of timecourses, one per row.
+
+        Returns
+        -------
+        NDArray
+            The prepared timecourses, in the same layout as `thetcs`.
+
+        Examples
+        --------
+        >>> preptcs = processor.preptc_batch(fmridata[0:1000, :])
+        """
+        thetcs = np.atleast_2d(thetcs)
+        if self.negativegradient or self.filterinputdata:
+            filteredtcs = self.ncprefilter.apply_block(self.Fs, thetcs)
+            if self.negativegradient:
+                filteredtcs = -np.gradient(filteredtcs, axis=1)
+        else:
+            filteredtcs = thetcs
+        return tide_math.corrnormalize_block(
+            filteredtcs,
+            detrendorder=self.detrendorder,
+            windowfunc=self.windowfunc,
+        )
+
     def trim(self, vector: NDArray) -> NDArray:
         """
         Trim vector based on similarity function origin and lag constraints.
@@ -449,6 +487,10 @@ class MutualInformationator(SimilarityFunctionator):
         10
         """
         self.bins = bins
+        if getattr(self, "refmutualinfo", None) is not None:
+            self.refmutualinfo = tide_corr.ReferenceMutualInformation(
+                self.prepreftc, bins=self.bins
+            )
 
     def setreftc(self, reftc: NDArray, offset: float = 0.0) -> None:
         """
@@ -498,6 +540,9 @@ class MutualInformationator(SimilarityFunctionator):
             returnaxis=True,
         )
 
+        # bin the reference once so only the test data is binned in run
+        self.refmutualinfo = tide_corr.ReferenceMutualInformation(self.prepreftc, bins=self.bins)
+
         self.timeaxis -= offset
         self.similarityfunclen = len(self.timeaxis)
         self.timeaxisvalid = True
@@ -624,6 +669,7 @@ class MutualInformationator(SimilarityFunctionator):
                 Fs=self.Fs,
                 sigma=self.sigma,
                 bins=self.bins,
+                reference=self.refmutualinfo,
             )
         else:
             retvals = tide_corr.cross_mutual_info(
@@ -639,6 +685,7 @@ class MutualInformationator(SimilarityFunctionator):
                 Fs=self.Fs,
                 sigma=self.sigma,
                 bins=self.bins,
+                reference=self.refmutualinfo,
             )
         if gettimeaxis:
             self.timeaxis, self.thesimfunc, self.similarityfuncorigin = (
@@ -788,7 +835,8 @@ class Correlator(SimilarityFunctionator):
         1. Creates a copy of the reference time course
         2. Computes preprocessed reference time course using preptc method
         3. Calculates similarity function length and origin
-        4. Constructs time axis based on sampling frequency and offset
+        4. Precomputes the reference spectrum used by `run` and `run_batch`
+        5. Constructs time axis based on sampling frequency and offset
 
         The time axis is centered around zero with the specified offset applied.
 
@@ -803,6 +851,14 @@ class Correlator(SimilarityFunctionator):
         self.similarityfunclen = len(self.reftc) * 2 - 1
         self.similarityfuncorigin = self.similarityfunclen // 2 + 1
 
+        # precompute the reference spectrum so only the test data is transformed in run
+        self.refcorrelator = tide_corr.ReferenceCorrelator(
+            self.prepreftc,
+            zeropadding=self.corrpadding,
+            weighting=self.corrweighting,
+            debug=self.debug,
+        )
+
         # make the reference time axis
         self.timeaxis = (
             np.arange(0.0, self.similarityfunclen) * (1.0 / self.Fs)
@@ -811,6 +867,76 @@ class Correlator(SimilarityFunctionator):
         self.timeaxisvalid = True
         self.datavalid = False
 
+    def run_batch(self, thetcs: NDArray, trim: bool = True) -> tuple[NDArray, NDArray, NDArray]:
+        """
+        Compute the correlation of a block of test timecourses with the reference timecourse.
+
+        This is the vectorized equivalent of calling `run` on each row of `thetcs`.  The
+        timecourses are prepared together with `preptc_batch`, then the whole block is
+        correlated with the reference in a single 2D FFT, using the reference spectrum
+        precomputed in `setreftc`.
+
+        Parameters
+        ----------
+        thetcs : ndarray
+            2D array of test timecourses, shape (ntimecourses, len(reftc)).
+        trim : bool, optional
+            If True, trims the similarity functions and time axis to the lag range.
+            Default is True.
+
+        Returns
+        -------
+        tuple of (ndarray, ndarray, ndarray)
+            A tuple containing:
+                - similarity functions, one per row (ndarray)
+                - time axis (ndarray)
+                - index of the global maximum of each similarity function (ndarray of int)
+
+        Notes
+        -----
+        The function exits with status code 1 if the length of the timecourses in `thetcs`
+        does not match `self.reftc`.  The object state used by `getfunction` is not changed.
+
+        Examples
+        --------
+        >>> simfuncs, time_axis, maxindices = correlator.run_batch(fmridata[0:1000, :])
+        """
+        thetcs = np.atleast_2d(thetcs)
+        if thetcs.shape[1] != len(self.reftc):
+            print(
+                "Correlator: timecourses are of different sizes:",
+                thetcs.shape[1],
+                "!=",
+                len(self.reftc),
+                "- exiting",
+            )
+            sys.exit()
+
+        preptesttcs = self.preptc_batch(thetcs)
+
+        # now actually do the correlation
+        thesimfuncs = self.refcorrelator.run_batch(preptesttcs)
+
+        if self.baselinefilter is not None:
+            thesimfuncs = self.baselinefilter.apply_block(self.Fs, thesimfuncs)
+
+        # find the global maximum values
+        theglobalmaxes = np.argmax(thesimfuncs, axis=1)
+
+        if trim:
+            return (
+                thesimfuncs[
+                    :,
+                    self.similarityfuncorigin
+                    - self.lagmininpts : self.similarityfuncorigin
+                    + self.lagmaxinpts,
+                ],
+                self.trim(self.timeaxis),
+                theglobalmaxes,
+            )
+        else:
+            return thesimfuncs, self.timeaxis, theglobalmaxes
+
     def run(self, thetc: NDArray, trim: bool = True) -> tuple[NDArray, NDArray, int]:
         """
         Compute the correlation between test and reference timecourses.
@@ -858,15 +984,8 @@ class Correlator(SimilarityFunctionator):
         self.testtc = thetc
         self.preptesttc = self.preptc(self.testtc)
 
-        # now actually do the correlation
-        self.thesimfunc = tide_corr.fastcorrelate(
-            self.preptesttc,
-            self.prepreftc,
-            usefft=True,
-            weighting=self.corrweighting,
-            zeropadding=self.corrpadding,
-            debug=self.debug,
-        )
+        # now actually do the correlation, reusing the reference spectrum from setreftc
+        self.thesimfunc = self.refcorrelator.run(self.preptesttc)
         self.similarityfunclen = len(self.thesimfunc)
         self.similarityfuncorigin = self.similarityfunclen // 2 + 1
 
@@ -1041,6 +1160,8 @@ class SimilarityFunctionFitter:
         self.gauss_fastpath_calls = 0
         self.gauss_robust_fallback_calls = 0
         self.last_fit_used_robust = False
+        self.batch_closedform_calls = 0
+        self.batch_fallback_calls = 0
 
     def _maxindex_noedge(self, corrfunc: NDArray) -> tuple[int, float]:
         """
@@ -1967,6 +2088,418 @@ class SimilarityFunctionFitter:
             peakend,
         )
 
+    def _batchinitialpeaks(self, corrfuncs: NDArray) -> tuple[NDArray, NDArray]:
+        """
+        Vectorized equivalent of `_maxindex_noedge` for a block of similarity functions.
+
+        Parameters
+        ----------
+        corrfuncs : NDArray
+            2D array of similarity functions, one per row.
+
+        Returns
+        -------
+        tuple[NDArray, NDArray]
+            The index of the peak in each row, and the flip factor (-1.0 where a
+            negative peak was selected, 1.0 otherwise).
+        """
+        npts = corrfuncs.shape[1]
+        maxindex = np.zeros(corrfuncs.shape[0], dtype=np.int32)
+        flipfac = np.ones(corrfuncs.shape[0], dtype=np.float64)
+        # a peak found at index 0 is rejected, and the search repeated with the first point excluded
+        for lowerlim in [0, 1]:
+            if lowerlim == 0:
+                therows = np.arange(corrfuncs.shape[0])
+            else:
+                therows = np.where(maxindex == 0)[0]
+                if len(therows) == 0:
+                    break
+            thesection = corrfuncs[therows, lowerlim : npts - 1]
+            theindices = np.argmax(thesection, axis=1) + lowerlim
+            theflips = np.ones(len(therows), dtype=np.float64)
+            if self.bipolar:
+                theminindices = np.argmax(-thesection, axis=1) + lowerlim
+                useminimum = np.fabs(corrfuncs[therows, theminindices]) > np.fabs(
+                    corrfuncs[therows, theindices]
+                )
+                theindices = np.where(useminimum, theminindices, theindices)
+                theflips[useminimum] = -1.0
+            maxindex[therows] = theindices
+            flipfac[therows] = theflips
+        return maxindex, flipfac
+
+    def fit_batch(
+        self, incorrfuncs: NDArray, maxgnsteps: int = 10, gntol: float = 1.0e-8
+    ) -> tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]:
+        """
+        Fit a block of similarity functions at once.
+
+        This is the vectorized equivalent of calling `fit` on each row of `incorrfuncs`.
+        The peak search, width estimation and error checks are done with array operations
+        across all rows.  For the "gauss" peak fit type, each peak is refined with a
+        closed-form Gaussian fit to the log of the peak values, followed by a few
+        vectorized Gauss-Newton iterations on the same least squares problem `fit` solves.
+        "fastquad" refinement is closed-form already.  Rows that the closed-form path cannot
+        handle (non-positive or flat topped peaks, fits that do not converge), and all
+        rows for configurations without a vectorized path (mutual information functions,
+        `useguess`, and the other peak fit types), are passed to `fit` one at a time.
+
+        Parameters
+        ----------
+        incorrfuncs : ndarray
+            2D array of similarity functions, shape (nfuncs, len(self.corrtimeaxis)).
+        maxgnsteps : int, optional
+            Maximum number of Gauss-Newton iterations used to polish the closed-form
+            Gaussian fits. Default is 10.
+        gntol : float, optional
+            Relative change in the fit parameters below which the Gauss-Newton iterations
+            are considered converged.  Rows that have not converged fall back to `fit`.
+            Default is 1e-8.
+
+        Returns
+        -------
+        tuple of ndarray
+            Arrays with one entry per row, in the same order as the values returned by `fit`:
+            maxindex, maxlag, maxval, maxsigma, maskval, failreason, peakstart, peakend.
+
+        Notes
+        -----
+        The number of rows fit with the vectorized path and with `fit` are accumulated in
+        `batch_closedform_calls` and `batch_fallback_calls`.  Rows that fail the initial
+        checks always go through `fit`, so their failure codes match it exactly.  The
+        Gaussian width is always positive here; the unconstrained fit in `fit` can
+        occasionally converge to the equivalent negative width on very narrow peaks,
+        which it then reports as FML_FITWIDTHLOW.
+
+        Examples
+        --------
+        >>> (maxindex, maxlag, maxval, maxsigma, maskval,
+        ...  failreason, peakstart, peakend) = fitter.fit_batch(corrout[0:1000, :])
+        """
+        if self.corrtimeaxis is None:
+            print("Correlation time axis is not defined - exiting")
+            sys.exit()
+        corrfuncs = np.atleast_2d(np.asarray(incorrfuncs, dtype=np.float64))
+        if len(self.corrtimeaxis) != corrfuncs.shape[1]:
+            print(
+                "Correlation time axis and values do not match in length (",
+                len(self.corrtimeaxis),
+                "!=",
+                corrfuncs.shape[1],
+                "- exiting",
+            )
+            sys.exit()
+        nfuncs, npts = corrfuncs.shape
+        rows = np.arange(nfuncs)
+        maxindex = np.zeros(nfuncs, dtype=np.int32)
+        maxlag = np.zeros(nfuncs, dtype=np.float64)
+        maxval = np.zeros(nfuncs, dtype=np.float64)
+        maxsigma = np.zeros(nfuncs, dtype=np.float64)
+        maskval = np.ones(nfuncs, dtype=np.uint16)
+        failreason = np.zeros(nfuncs, dtype=np.uint32)
+        peakstart = np.zeros(nfuncs, dtype=np.int32)
+        peakend = np.zeros(nfuncs, dtype=np.int32)
+
+        if (
+            (self.functype != "correlation")
+            or self.useguess
+            or (self.peakfittype not in ["gauss", "fastquad", "None"])
+            or (npts < 5)
+        ):
+            fallback = np.ones(nfuncs, dtype=bool)
+        else:
+            fallback = np.zeros(nfuncs, dtype=bool)
+            binwidth = self.corrtimeaxis[1] - self.corrtimeaxis[0]
+
+            # find the peaks
+            maxindex, flipfac = self._batchinitialpeaks(corrfuncs)
+            corrfuncs = corrfuncs * flipfac[:, None]
+            maxlag_init = self.corrtimeaxis[maxindex].astype(np.float64)
+            maxval_init = corrfuncs[rows, maxindex]
+
+            if self.peakfittype == "fastquad":
+                peakstart = np.maximum(1, maxindex - 2)
+                peakend = np.minimum(npts - 2, maxindex + 2)
+            else:
+                # find the extent of the peak
+                thegrad = np.gradient(corrfuncs, axis=1)
+                peakpoints = corrfuncs > (self.searchfrac * maxval_init)[:, None]
+                peakpoints[:, 0] = False
+                peakpoints[:, -1] = False
+                indices = np.arange(npts)[None, :]
+                peakstart = np.maximum(1, maxindex - 1)
+                peakend = np.minimum(npts - 2, maxindex + 1)
+                stopsend = ~((thegrad <= 0.0) & peakpoints) & (indices > peakend[:, None])
+                peakend = np.argmax(stopsend, axis=1).astype(np.int32) - 1
+                stopsstart = ~((thegrad >= 0.0) & peakpoints) & (indices < peakstart[:, None])
+                peakstart = (
+                    npts - 1 - np.argmax(stopsstart[:, ::-1], axis=1).astype(np.int32)
+                ) + 1
+
+                # flat topped peaks need the iterative treatment
+                fallback |= (peakend < npts - 3) & (
+                    corrfuncs[rows, peakend] == corrfuncs[rows, peakend - 1]
+                )
+                fallback |= (peakstart > 2) & (
+                    corrfuncs[rows, peakstart] == corrfuncs[rows, peakstart + 1]
+                )
+
+                maxsigma_init = (
+                    (peakend - peakstart + 1)
+                    * binwidth
+                    / (2.0 * np.sqrt(-np.log(self.searchfrac)))
+                ) / np.sqrt(2.0)
+
+                # now check the values for errors
+                if self.hardlimit:
+                    rangeextension = 0.0
+                else:
+                    rangeextension = (self.lagmax - self.lagmin) * 0.75
+                lowlaglim = self.lagmin - rangeextension - binwidth
+                highlaglim = self.lagmax + rangeextension + binwidth
+                badlow = maxlag_init < lowlaglim
+                badhigh = maxlag_init > highlaglim
+                failreason[badlow] |= self.FML_INITLAGLOW
+                failreason[badhigh] |= self.FML_INITLAGHIGH
+                maxlag_init = np.where(
+                    badlow, lowlaglim, np.where(badhigh, highlaglim, maxlag_init)
+                )
+                toowide = maxsigma_init > self.absmaxsigma
+                failreason[toowide] |= self.FML_INITWIDTHHIGH
+                maxsigma_init[toowide] = self.absmaxsigma
+                toonarrow = (peakend - peakstart) < 2
+                failreason[toonarrow] |= self.FML_INITWIDTHLOW
+                maxsigma_init[toonarrow] = (
+                    (2 + 1) * binwidth / (2.0 * np.sqrt(-np.log(self.searchfrac)))
+                ) / np.sqrt(2.0)
+                if self.enforcethresh:
+                    failreason[
+                        ~((self.lthreshval <= maxval_init) & (maxval_init <= self.uthreshval))
+                    ] |= self.FML_INITAMPLOW
+                failreason[maxval_init < 0.0] |= self.FML_INITAMPLOW
+                maxval_init = np.where(maxval_init < 0.0, 0.0, maxval_init)
+                if self.enforcethresh:
+                    failreason[maxval_init > 1.0] |= self.FML_INITAMPHIGH
+                    maxval_init = np.where(maxval_init > 1.0, 1.0, maxval_init)
+
+            if self.peakfittype == "None":
+                maxval = maxval_init
+                maxlag = np.fmod(maxlag_init, self.lagmod)
+                maxsigma = maxsigma_init
+                maskval = np.where(failreason == self.FML_NOERROR, 1, 0).astype(np.uint16)
+            else:
+                if self.peakfittype == "fastquad":
+                    # vectorized refinepeak_quad
+                    alpha = corrfuncs[rows, maxindex - 1]
+                    beta = corrfuncs[rows, maxindex]
+                    gamma = corrfuncs[rows, maxindex + 1]
+                    denom = alpha - 2.0 * beta + gamma
+                    fallback |= denom == 0.0
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        offsetbins = 0.5 * (alpha - gamma) / denom
+                        maxlag = maxlag_init + offsetbins * (
+                            self.corrtimeaxis[np.minimum(maxindex + 1, npts - 1)] - maxlag_init
+                        )
+                        maxval = beta - 0.25 * (alpha - gamma) * offsetbins
+                        widthdenom = alpha - maxval
+                        maxsigma = np.sqrt(
+                            np.fabs(
+                                np.square(self.corrtimeaxis[maxindex - 1] - maxlag) / widthdenom
+                            )
+                            / 2.0
+                        )
+                    fallback |= widthdenom == 0.0
+                else:
+                    maxval, maxlag, maxsigma, converged = self._gaussfit_batch(
+                        corrfuncs, maxindex, peakstart, peakend, maxgnsteps, gntol
+                    )
+                    # voxels that failed the initial checks go through fit, so that their
+                    # failure codes are exactly what fit would report
+                    fallback |= ~converged | (failreason != self.FML_NOERROR)
+                    self.gauss_fit_calls += int(np.sum(~fallback))
+                    if self.enforcethresh:
+                        maxval = np.clip(maxval, -1.0, 1.0)
+                    maxlag = np.fmod(maxlag, self.lagmod)
+
+                # check for errors in fit
+                fitfail = np.zeros(nfuncs, dtype=bool)
+                lowestcorrcoeff = -1.0 if self.bipolar else 0.0
+                thisfail = maxval < lowestcorrcoeff
+                failreason[thisfail] |= self.FML_FITAMPLOW
+                maxval[thisfail] = lowestcorrcoeff
+                fitfail |= thisfail
+                thisfail = np.abs(maxval) > 1.0 + self.corrtolerance
+                failreason[thisfail] |= self.FML_FITAMPHIGH
+                maxval[thisfail] = np.sign(maxval[thisfail])
+                fitfail |= thisfail
+                thisfail = self.lagmin > maxlag
+                failreason[thisfail] |= self.FML_FITLAGLOW
+                maxlag[thisfail] = self.lagmin
+                fitfail |= thisfail
+                thisfail = maxlag > self.lagmax
+                failreason[thisfail] |= self.FML_FITLAGHIGH
+                maxlag[thisfail] = self.lagmax
+                fitfail |= thisfail
+                thisfail = maxsigma > self.absmaxsigma
+                failreason[thisfail] |= self.FML_FITWIDTHHIGH
+                maxsigma[thisfail] = self.absmaxsigma
+                fitfail |= thisfail
+                thisfail = maxsigma < self.absminsigma
+                failreason[thisfail] |= self.FML_FITWIDTHLOW
+                maxsigma[thisfail] = self.absminsigma
+                fitfail |= thisfail
+                if self.zerooutbadfit:
+                    maxval[fitfail] = 0.0
+                    maxlag[fitfail] = 0.0
+                    maxsigma[fitfail] = 0.0
+                maskval[fitfail] = 0
+            maxval = flipfac * maxval
+
+        # anything the vectorized path could not handle goes through fit
+        fallbackrows = np.where(fallback)[0]
+        self.batch_closedform_calls += nfuncs - len(fallbackrows)
+        self.batch_fallback_calls += len(fallbackrows)
+        for i in fallbackrows:
+            (
+                maxindex[i],
+                maxlag[i],
+                maxval[i],
+                maxsigma[i],
+                maskval[i],
+                failreason[i],
+                peakstart[i],
+                peakend[i],
+            ) = self.fit(incorrfuncs[i])
+        return maxindex, maxlag, maxval, maxsigma, maskval, failreason, peakstart, peakend
+
+    def _gaussfit_batch(
+        self,
+        corrfuncs: NDArray,
+        maxindex: NDArray,
+        peakstart: NDArray,
+        peakend: NDArray,
+        maxgnsteps: int,
+        gntol: float,
+    ) -> tuple[NDArray, NDArray, NDArray, NDArray]:
+        """
+        Fit a Gaussian to the peak region of every row of a block of similarity functions.
+
+        The initial estimate is a closed-form weighted least squares fit of a parabola to
+        the log of the peak values (which is exact for a noiseless Gaussian).  This is then
+        polished with Gauss-Newton iterations on the unweighted least squares problem,
+        vectorized across rows.
+
+        Parameters
+        ----------
+        corrfuncs : NDArray
+            2D array of (sign corrected) similarity functions.
+        maxindex : NDArray
+            Index of the peak in each row.
+        peakstart : NDArray
+            First index of the peak region in each row.
+        peakend : NDArray
+            Last index of the peak region in each row.
+        maxgnsteps : int
+            Maximum number of Gauss-Newton iterations.
+        gntol : float
+            Convergence tolerance on the relative parameter change.
+
+        Returns
+        -------
+        tuple[NDArray, NDArray, NDArray, NDArray]
+            Fitted amplitude, center and sigma for each row, and a boolean array that is
+            True where the fit is valid and converged.
+        """
+        # pull out the peak regions, padded to a common width
+        npts = corrfuncs.shape[1]
+        peakwidth = np.arange(np.max(peakend - peakstart) + 1)[None, :]
+        indices = np.minimum(peakstart[:, None] + peakwidth, npts - 1)
+        inpeak = indices <= peakend[:, None]
+        peakvals = np.take_along_axis(corrfuncs, indices, axis=1)
+        binwidth = self.corrtimeaxis[1] - self.corrtimeaxis[0]
+        x_center = self.corrtimeaxis[maxindex]
+        # work in units of bins, relative to the peak sample, to keep things well conditioned
+        u = (self.corrtimeaxis[indices] - x_center[:, None]) / binwidth
+        y = np.where(inpeak, peakvals, 0.0)
+        valid = ~np.any(inpeak & (peakvals <= 0.0), axis=1)
+
+        # closed-form fit of log(y) = c + b * u + a * u**2, weighted by y**2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            logy = np.where(inpeak & (peakvals > 0.0), np.log(np.fabs(peakvals)), 0.0)
+        weights = np.square(y)
+        upow = [np.ones_like(u), u, u * u, u * u * u, u * u * u * u]
+        sums = [np.sum(weights * upow[k], axis=1) for k in range(5)]
+        thematrix = np.stack(
+            [
+                np.stack([sums[0], sums[1], sums[2]], axis=-1),
+                np.stack([sums[1], sums[2], sums[3]], axis=-1),
+                np.stack([sums[2], sums[3], sums[4]], axis=-1),
+            ],
+            axis=-2,
+        )
+        thevector = np.stack([np.sum(weights * logy * upow[k], axis=1) for k in range(3)], axis=-1)
+        # a single degenerate peak (e.g. too few distinct points) must not sink the whole block
+        valid &= np.all(np.isfinite(thematrix), axis=(1, 2))
+        valid &= np.fabs(np.linalg.det(np.where(valid[:, None, None], thematrix, np.eye(3)))) > 0.0
+        thematrix[~valid] = np.eye(3)
+        thevector[~valid] = 0.0
+        c, b, a = np.linalg.solve(thematrix, thevector[..., None])[..., 0].T
+        valid &= a < 0.0
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            params = np.stack(
+                [np.exp(c - b * b / (4.0 * a)), -b / (2.0 * a), np.sqrt(-1.0 / (2.0 * a))],
+                axis=-1,
+            )
+        valid &= np.all(np.isfinite(params), axis=1)
+        params[~valid] = [1.0, 0.0, 1.0]
+
+        # polish with Gauss-Newton iterations
+        converged = np.zeros(len(maxindex), dtype=bool)
+        for step in range(maxgnsteps):
+            amp = params[:, 0:1]
+            center = params[:, 1:2]
+            sigma = params[:, 2:3]
+            with np.errstate(invalid="ignore", over="ignore", under="ignore"):
+                offset = u - center
+                g = np.exp(-np.square(offset) / (2.0 * sigma * sigma))
+                residual = np.where(inpeak, y - amp * g, 0.0)
+                jac = (
+                    np.stack(
+                        [
+                            g,
+                            amp * g * offset / (sigma * sigma),
+                            amp * g * np.square(offset) / (sigma * sigma * sigma),
+                        ],
+                        axis=-1,
+                    )
+                    * inpeak[..., None]
+                )
+            jtj = np.einsum("nti,ntj->nij", jac, jac)
+            jtr = np.einsum("nti,nt->ni", jac, residual)
+            solvable = (
+                valid & np.all(np.isfinite(jtj), axis=(1, 2)) & np.all(np.isfinite(jtr), axis=1)
+            )
+            solvable &= (
+                np.fabs(np.linalg.det(np.where(solvable[:, None, None], jtj, np.eye(3)))) > 0.0
+            )
+            jtj[~solvable] = np.eye(3)
+            jtr[~solvable] = 0.0
+            delta = np.linalg.solve(jtj, jtr[..., None])[..., 0]
+            valid &= solvable
+            params = params + delta
+            converged = valid & np.all(
+                np.fabs(delta) <= gntol * np.maximum(np.fabs(params), 1.0), axis=1
+            )
+            if np.all(converged | ~valid):
+                break
+        converged &= valid & (params[:, 2] > 0.0)
+        return (
+            params[:, 0],
+            x_center + params[:, 1] * binwidth,
+            params[:, 2] * np.fabs(binwidth),
+            converged,
+        )
+
 
 class FrequencyTracker:
     freqs = None
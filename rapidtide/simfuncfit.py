@@ -26,6 +26,7 @@ from numpy.typing import ArrayLike, NDArray
 from tqdm import tqdm
 
 import rapidtide.fit as tide_fit
+import rapidtide.genericmultiproc as tide_genericmultiproc
 import rapidtide.multiproc as tide_multiproc
 
 LGR = logging.getLogger("GENERAL")
@@ -272,6 +273,84 @@ def _procOneVoxelFitcorr(
     )
 
 
+def _fitcorrconsumer(
+    inQ: Any,
+    outQ: Any,
+    workerargs: list,
+    thefitter: Any,
+    despeckle_thresh: float,
+    fixdelay: bool,
+    mpbatchsize: int,
+    rt_floattype: np.dtype,
+) -> None:
+    """
+    Worker loop for the multiprocess path of ``fitcorr``.
+
+    Parameters
+    ----------
+    inQ : Any
+        Queue of voxel indices (or index arrays when batching); None stops the worker.
+    outQ : Any
+        Queue on which the fit results are returned.
+    workerargs : list
+        The correlation functions, the mask, the initial lags and the initial
+        delay value, as prepared by ``genericmultiproc.sharevoxelargs``.
+    thefitter : Any
+        The similarity function fitter.
+    despeckle_thresh, fixdelay, rt_floattype
+        As in ``fitcorr``.
+    mpbatchsize : int
+        Number of voxels in each message.
+    """
+    (corrout, themask, initiallags, initialdelayvalue), theblocks = (
+        tide_genericmultiproc.attachvoxelargs(workerargs)
+    )
+
+    def fitonevoxel(vox):
+        if (themask is None) or (initiallags is None):
+            thislag = None
+        else:
+            if themask[vox] > 0:
+                thislag = initiallags[vox]
+            else:
+                thislag = None
+        if isinstance(initialdelayvalue, np.ndarray):
+            thisinitialdelayvalue = initialdelayvalue[vox]
+        else:
+            thisinitialdelayvalue = initialdelayvalue
+        return _procOneVoxelFitcorr(
+            vox,
+            corrout[vox, :],
+            thefitter,
+            disablethresholds=False,
+            despeckle_thresh=despeckle_thresh,
+            initiallag=thislag,
+            fixdelay=fixdelay,
+            initialdelayvalue=thisinitialdelayvalue,
+            rt_floattype=rt_floattype,
+        )
+
+    while True:
+        try:
+            # get a new message
+            val = inQ.get()
+
+            # this is the 'TERM' signal
+            if val is None:
+                break
+
+            # process and send the data
+            if mpbatchsize > 1:
+                outQ.put([fitonevoxel(vox) for vox in val])
+            else:
+                outQ.put(fitonevoxel(val))
+        except Exception as e:
+            print("error!", e)
+            break
+    del corrout, themask, initiallags, initialdelayvalue
+    tide_genericmultiproc.detachvoxelargs(theblocks)
+
+
 def fitcorr(
     corrtimescale: ArrayLike,
     thefitter: Any,
@@ -291,6 +370,7 @@ def fitcorr(
     initialdelayvalue: Union[float, NDArray] = 0.0,
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    mpbatchsize: int = 1,
     despeckle_thresh: float = 5.0,
     initiallags: Optional[NDArray] = None,
     rt_floattype: np.dtype = np.float64,
@@ -340,6 +420,9 @@ def fitcorr(
         If True, show progress bar, by default True.
     chunksize : int, optional
         Size of chunks for multiprocessing, by default 1000.
+    mpbatchsize : int, optional
+        Number of voxels sent to each worker per queue message when
+        multiprocessing, by default 1.
     despeckle_thresh : float, optional
         Threshold for despeckling, by default 5.0.
     initiallags : NDArray, optional
@@ -394,54 +477,30 @@ def fitcorr(
     ) = (0, 0, 0, 0, 0, 0, 0, 0)
 
     if nprocs > 1 or alwaysmultiproc:
-        # define the consumer function here so it inherits most of the arguments
-        def fitcorr_consumer(inQ, outQ):
-            while True:
-                try:
-                    # get a new message
-                    val = inQ.get()
-
-                    # this is the 'TERM' signal
-                    if val is None:
-                        break
-
-                    # process and send the data
-                    if (themask is None) or (initiallags is None):
-                        thislag = None
-                    else:
-                        if themask[val] > 0:
-                            thislag = initiallags[val]
-                        else:
-                            thislag = None
-                    if isinstance(initialdelayvalue, np.ndarray):
-                        thisinitialdelayvalue = initialdelayvalue[val]
-                    else:
-                        thisinitialdelayvalue = initialdelayvalue
-                    outQ.put(
-                        _procOneVoxelFitcorr(
-                            val,
-                            corrout[val, :],
-                            thefitter,
-                            disablethresholds=False,
-                            despeckle_thresh=despeckle_thresh,
-                            initiallag=thislag,
-                            fixdelay=fixdelay,
-                            initialdelayvalue=thisinitialdelayvalue,
-                            rt_floattype=rt_floattype,
-                        )
-                    )
-                except Exception as e:
-                    print("error!", e)
-                    break
-
-        data_out = tide_multiproc.run_multiproc(
-            fitcorr_consumer,
-            inputshape,
-            themask,
-            nprocs=nprocs,
-            showprogressbar=showprogressbar,
-            chunksize=chunksize,
+        # send the large arrays to the workers through shared memory
+        workerargs, temporaryblocks = tide_genericmultiproc.sharevoxelargs(
+            [corrout, themask, initiallags, initialdelayvalue], nprocs=nprocs
         )
+        try:
+            data_out = tide_multiproc.run_multiproc(
+                _fitcorrconsumer,
+                inputshape,
+                themask,
+                nprocs=nprocs,
+                showprogressbar=showprogressbar,
+                chunksize=chunksize,
+                batchsize=mpbatchsize,
+                consumerargs=(
+                    workerargs,
+                    thefitter,
+                    despeckle_thresh,
+                    fixdelay,
+                    mpbatchsize,
+                    rt_floattype,
+                ),
+            )
+        finally:
+            tide_genericmultiproc.releasevoxelargs(temporaryblocks)
 
         # unpack the data
         volumetotal = 0
@@ -19,16 +19,23 @@
 
 from typing import Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pyfftw
 import scipy as sp
 from numpy.typing import ArrayLike, NDArray
-from scipy.stats import johnsonsb, kurtosis, kurtosistest, skew, skewtest
-from statsmodels.robust import mad
 
 import rapidtide.fit as tide_fit
 import rapidtide.io as tide_io
+from rapidtide.lazyimport import lazyimport, lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+johnsonsb = lazyimportfrom("scipy.stats", "johnsonsb")
+kurtosis = lazyimportfrom("scipy.stats", "kurtosis")
+kurtosistest = lazyimportfrom("scipy.stats", "kurtosistest")
+skew = lazyimportfrom("scipy.stats", "skew")
+skewtest = lazyimportfrom("scipy.stats", "skewtest")
+mad = lazyimportfrom("statsmodels.robust", "mad")
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -737,6 +744,110 @@ def fast_ICC_rep_anova(
     return ICC, r_var, e_var, session_effect_F, dfc, dfe
 
 
+# ICC maps are computed in chunks of voxels whose float64 workspace fits in this many bytes
+DEFAULT_ICCMAXBYTES = 256 * 1024 * 1024
+
+# error sums of squares below this fraction of the total are treated as rounding noise
+ICCERRORTOL = 1.0e-12
+
+
+def fast_ICC_rep_anova_block(
+    Y: NDArray, maxbytes: int = DEFAULT_ICCMAXBYTES, debug: bool = False
+) -> Tuple[NDArray, NDArray, NDArray, NDArray, int, int]:
+    """
+    Calculate ICC(3,1) for many (subjects x sessions) tables at once.
+
+    This gives the same results as calling ``fast_ICC_rep_anova`` on ``Y[i, :, :]`` for every
+    i, but computes the repeated measures ANOVA sums of squares for all of them together.
+    For a complete two way design the fitted values of the sessions + subjects model are
+    just row mean + column mean - grand mean, so no design matrix is needed, and the
+    calculation broadcasts over the first axis.  Voxels are processed in chunks so that the
+    working arrays stay under ``maxbytes``.
+
+    Parameters
+    ----------
+    Y : NDArray
+        Data array of shape (numvoxels, numsubjects, numsessions).
+    maxbytes : int, optional
+        Approximate memory budget for the temporary arrays.  Default is 256MB.
+    debug : bool, optional
+        Print chunking information.  Default is False.
+
+    Returns
+    -------
+    tuple of (NDArray, NDArray, NDArray, NDArray, int, int)
+        ICC, r_var, e_var, session_effect_F, each of shape (numvoxels,), followed by the
+        session and error degrees of freedom, dfc and dfe.
+
+    Examples
+    --------
+    >>> Y = np.random.randn(1000, 20, 2)
+    >>> ICC, r_var, e_var, session_effect_F, dfc, dfe = fast_ICC_rep_anova_block(Y)
+    """
+    Y = np.asarray(Y)
+    if Y.ndim != 3:
+        raise ValueError(
+            "fast_ICC_rep_anova_block: Y must have shape (voxels, subjects, sessions)"
+        )
+    numvoxels, nb_subjects, nb_conditions = Y.shape
+    dfc = nb_conditions - 1
+    dfe = (nb_subjects - 1) * dfc
+    dfr = nb_subjects - 1
+
+    ICC = np.zeros(numvoxels, dtype=np.float64)
+    r_var = np.zeros(numvoxels, dtype=np.float64)
+    e_var = np.zeros(numvoxels, dtype=np.float64)
+    session_effect_F = np.zeros(numvoxels, dtype=np.float64)
+
+    # the chunk itself, its centered copy, and the broadcast temporaries
+    chunksize = int(max(1, maxbytes // (3 * 8 * max(1, nb_subjects * nb_conditions))))
+    if debug:
+        print(
+            f"fast_ICC_rep_anova_block: {numvoxels} voxels, nb_subjects = {nb_subjects}, "
+            f"nb_conditions = {nb_conditions}, chunksize = {chunksize}"
+        )
+    for startvox in range(0, numvoxels, chunksize):
+        endvox = min(startvox + chunksize, numvoxels)
+        thechunk = np.asarray(Y[startvox:endvox, :, :], dtype=np.float64)
+
+        # Sum Square Total
+        mean_Y = thechunk.mean(axis=(1, 2))
+        centered = thechunk - mean_Y[:, None, None]
+        SST = np.einsum("vij,vij->v", centered, centered)
+
+        # Sum square session effect - between columns/sessions
+        sessioneffect = centered.mean(axis=1)
+        SSC = np.einsum("vj,vj->v", sessioneffect, sessioneffect) * nb_subjects
+
+        # Sum Square Error - what's left after removing the session and subject effects
+        centered -= sessioneffect[:, None, :]
+        centered -= centered.mean(axis=2)[:, :, None]
+        SSE = np.einsum("vij,vij->v", centered, centered)
+
+        # voxels with no error variance (constant, or with identical sessions) only have
+        # rounding noise left in SSE and SSC - report no error and F = 0 for them, as the one
+        # voxel version does
+        noerror = SSE <= ICCERRORTOL * SST
+        SSE[noerror] = 0.0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            MSE = SSE / dfe
+            MSC = SSC / dfc / nb_subjects
+            session_effect_F[startvox:endvox] = np.where(noerror, 0.0, MSC / MSE)
+
+            # Sum Square subject effect - between rows/subjects
+            SSR = SST - SSC - SSE
+            MSR = SSR / dfr
+
+            # ICC(3,1) = (mean square subject - mean square error) / (mean square subject + (k-1)*mean square error)
+            ICC[startvox:endvox] = np.nan_to_num((MSR - MSE) / (MSR + dfc * MSE))
+
+            e_var[startvox:endvox] = MSE  # variance of error
+            r_var[startvox:endvox] = (MSR - MSE) / nb_conditions  # variance between subjects
+
+    return ICC, r_var, e_var, session_effect_F, dfc, dfe
+
+
 # --------------------------- histogram functions -------------------------------------------------
 def gethistprops(
     indata: NDArray,
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+"""Persistent cache of summary statistics of rapidtide output maps.
+
+tidepool and runqualitycheck both summarize the same maps (percentiles, histograms, voxel
+counts) over the same masks every time a dataset is opened.  The results are kept in a small
+hidden json sidecar next to each map, ``.<mapfile>.statscache.json``, keyed on what was
+calculated and which voxels were included, so a map only has to be scanned again when it, or
+the mask, changes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+STATSCACHEVERSION = 1
+
+# sidecars keep this many entries, dropping the oldest first
+MAXENTRIES = 32
+
+# files larger than this are only checked by size and modification time - hashing them would
+# cost about as much as recalculating the statistics
+DIGESTMAXBYTES = 256 * 1024 * 1024
+
+
+def statscachename(filename: str) -> str:
+    """
+    Return the name of the statistics sidecar for an image file.
+
+    Parameters
+    ----------
+    filename : str
+        The image file.
+
+    Returns
+    -------
+    str
+        ``<dir>/.<basename>.statscache.json``
+    """
+    thepath, thebase = os.path.split(filename)
+    return os.path.join(thepath, f".{thebase}.statscache.json")
+
+
+def filedigest(filename: str, blocksize: int = 1024 * 1024) -> str:
+    """
+    Return a hash of the contents of a file.
+
+    Parameters
+    ----------
+    filename : str
+        The file to hash.
+    blocksize : int, optional
+        Number of bytes to read at a time.  Default is 1MB.
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents.
+    """
+    thehash = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as thefile:
+        for theblock in iter(lambda: thefile.read(blocksize), b""):
+            thehash.update(theblock)
+    return thehash.hexdigest()
+
+
+def maskdigest(themask: NDArray) -> str:
+    """
+    Return a hash of which voxels of a mask are set.
+
+    Only whether each voxel is nonzero matters, so masks with the same extent but different
+    values or dtypes give the same digest.
+
+    Parameters
+    ----------
+    themask : NDArray
+        The mask.
+
+    Returns
+    -------
+    str
+        Hex digest of the mask extent and shape.
+    """
+    thehash = hashlib.blake2b(digest_size=16)
+    thehash.update(np.packbits(np.asarray(themask) != 0).tobytes())
+    thehash.update(repr(np.shape(themask)).encode())
+    return thehash.hexdigest()
+
+
+def tojson(thevalue: Any) -> Any:
+    """
+    Convert numpy scalars and arrays, possibly nested in lists and dicts, to python types.
+
+    Parameters
+    ----------
+    thevalue : Any
+        The value to convert.
+
+    Returns
+    -------
+    Any
+        The value with numpy types replaced by their python equivalents.
+    """
+    if isinstance(thevalue, dict):
+        return {thekey: tojson(theitem) for thekey, theitem in thevalue.items()}
+    if isinstance(thevalue, (list, tuple)):
+        return [tojson(theitem) for theitem in thevalue]
+    if isinstance(thevalue, (np.ndarray, np.generic)):
+        return thevalue.tolist()
+    return thevalue
+
+
+class StatsCache:
+    """Cached statistics for one image file.
+
+    Entries are dictionaries of json-compatible values, stored under a key made by
+    ``makekey`` from the kind of calculation, the mask, and any parameters of the calculation.
+    The whole cache is dropped when the image file changes: it is kept if the size and
+    modification time match, or if the size and a hash of the contents match (so copying a
+    dataset keeps its cache).
+
+    Parameters
+    ----------
+    filename : str
+        The image file the statistics belong to.
+    verbose : int, optional
+        Verbosity level.  Default is 0.
+
+    Examples
+    --------
+    >>> thecache = StatsCache("sub-01_desc-maxtime_map.nii.gz")
+    >>> thekey = thecache.makekey("percentiles", themask)
+    >>> thestats = thecache.get(thekey)
+    >>> if thestats is None:
+    ...     thestats = {"pct50": float(np.median(thedata[themask > 0]))}
+    ...     thecache.put(thekey, thestats)
+    """
+
+    def __init__(self, filename: str, verbose: int = 0) -> None:
+        self.filename = filename
+        self.sidecarname = statscachename(filename)
+        self.verbose = verbose
+        self._entries = None
+        self._digest = None
+        self._lock = threading.Lock()
+
+    def makekey(self, kind: str, themask: NDArray, **params: Any) -> str:
+        """
+        Make the key for a calculation.
+
+        Parameters
+        ----------
+        kind : str
+            Name for the calculation, e.g. "overlay" or "histmetrics".
+        themask : NDArray
+            Mask selecting the voxels that went into the calculation.
+        **params
+            Any other settings that change the result.
+
+        Returns
+        -------
+        str
+            The key.
+        """
+        paramstring = ",".join(f"{thename}={params[thename]!r}" for thename in sorted(params))
+        return f"{kind}:{maskdigest(themask)}:{paramstring}"
+
+    def get(self, key: str) -> dict | None:
+        """
+        Look up cached statistics.
+
+        Parameters
+        ----------
+        key : str
+            Key from ``makekey``.
+
+        Returns
+        -------
+        dict or None
+            The cached statistics, or None if there are none for this key, or the image has
+            changed since they were calculated.
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._read()
+            return self._entries.get(key)
+
+    def put(self, key: str, thestats: dict) -> bool:
+        """
+        Add statistics to the cache and save it.
+
+        Parameters
+        ----------
+        key : str
+            Key from ``makekey``.
+        thestats : dict
+            The statistics.  numpy values are converted to python types.
+
+        Returns
+        -------
+        bool
+            True if the sidecar was written, False if it could not be (for example if the
+            image directory is read only).  The entry is kept in memory either way.
+        """
+        with self._lock:
+            try:
+                signature = self._signature()
+            except OSError:
+                if self._entries is None:
+                    self._entries = {}
+                self._addentry(key, thestats)
+                return False
+            # pick up anything another process or cache object has saved in the meantime,
+            # without losing entries that so far only exist in memory
+            merged = self._read()
+            merged.update(self._entries or {})
+            self._entries = merged
+            self._addentry(key, thestats)
+            tempname = f"{self.sidecarname}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tempname, "w") as thefile:
+                    json.dump(
+                        {
+                            "version": STATSCACHEVERSION,
+                            "source": signature,
+                            "stats": self._entries,
+                        },
+                        thefile,
+                    )
+                os.replace(tempname, self.sidecarname)
+            except OSError:
+                if os.path.isfile(tempname):
+                    os.remove(tempname)
+                if self.verbose > 1:
+                    print(f"could not write statistics cache {self.sidecarname}")
+                return False
+            return True
+
+    def _addentry(self, key: str, thestats: dict) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = tojson(thestats)
+        while len(self._entries) > MAXENTRIES:
+            del self._entries[next(iter(self._entries))]
+
+    def _signature(self) -> dict:
+        thestat = os.stat(self.filename)
+        signature = {"size": thestat.st_size, "mtime_ns": thestat.st_mtime_ns}
+        if thestat.st_size <= DIGESTMAXBYTES:
+            if (self._digest is None) or (self._digest[0] != signature):
+                self._digest = (signature, filedigest(self.filename))
+            signature["digest"] = self._digest[1]
+        return signature
+
+    def _read(self) -> dict:
+        try:
+            with open(self.sidecarname, "r") as thefile:
+                thesidecar = json.load(thefile)
+            if thesidecar["version"] != STATSCACHEVERSION:
+                return {}
+            cached = thesidecar["source"]
+            thestat = os.stat(self.filename)
+            if cached["size"] != thestat.st_size:
+                return {}
+            if cached["mtime_ns"] != thestat.st_mtime_ns:
+                # same size, different time - only keep the entries if the contents match
+                if ("digest" not in cached) or (thestat.st_size > DIGESTMAXBYTES):
+                    return {}
+                if cached["digest"] != filedigest(self.filename):
+                    return {}
+            return dict(thesidecar["stats"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Benchmark command line startup cost: run `python -X importtime` on each rapidtide entry point
+# in a fresh interpreter and report the cumulative import time and the heaviest top level
+# dependencies that were pulled in.
+#
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+# Force imports from the local workspace checkout.
+REPOROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if REPOROOT not in sys.path:
+    sys.path.insert(0, REPOROOT)
+
+# modules that should only be imported by the code paths that actually use them
+WATCHEDMODULES = [
+    "matplotlib",
+    "statsmodels",
+    "sklearn",
+    "nilearn",
+    "pandas",
+    "scipy.stats",
+    "scipy.signal",
+    "torch",
+]
+
+
+def _entrypoints() -> list:
+    scriptdir = os.path.join(REPOROOT, "rapidtide", "scripts")
+    return sorted(
+        os.path.splitext(thefile)[0]
+        for thefile in os.listdir(scriptdir)
+        if thefile.endswith(".py") and not thefile.startswith("_")
+    )
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Return cumulative import time in microseconds for each module in an -X importtime log."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3:
+            continue
+        modname = fields[2].strip()
+        cumulative[modname] = max(cumulative.get(modname, 0), int(fields[1]))
+    return cumulative
+
+
+def time_entrypoint(name: str) -> dict:
+    """Import one entry point module in a fresh interpreter and summarize the import log."""
+    modname = f"rapidtide.scripts.{name}"
+    probe = (
+        f"import sys; import {modname}; "
+        f"print(','.join(m for m in {WATCHEDMODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPOROOT + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=REPOROOT,
+    )
+    cumulative = _parse_importtime(result.stderr)
+    toplevel = {
+        themod: thetime
+        for themod, thetime in cumulative.items()
+        if "." not in themod and themod != "rapidtide"
+    }
+    return {
+        "entrypoint": name,
+        "ok": result.returncode == 0,
+        "import_ms": cumulative.get(modname, 0) / 1.0e3,
+        "loaded": [themod for themod in result.stdout.strip().split(",") if themod != ""],
+        "heaviest": sorted(toplevel.items(), key=lambda x: -x[1])[:5],
+    }
+
+
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="bench_importtime",
+        description="Measure python -X importtime for each rapidtide command line entry point.",
+    )
+    parser.add_argument(
+        "entrypoints",
+        nargs="*",
+        help="Entry points to time (e.g. showtc filttc).  Default is all of rapidtide/scripts.",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of fresh interpreters per entry point; the minimum is reported.",
+    )
+    parser.add_argument(
+        "--json",
+        dest="jsonfile",
+        type=str,
+        default=None,
+        help="Also write the results to this json file, for tracking over time.",
+    )
+    return parser
+
+
+def main() -> None:
+    args = _make_parser().parse_args()
+    names = args.entrypoints if len(args.entrypoints) > 0 else _entrypoints()
+
+    results = []
+    for name in names:
+        runs = [time_entrypoint(name) for i in range(max(args.repeats, 1))]
+        best = min(runs, key=lambda x: x["import_ms"])
+        results.append(best)
+        status = "" if best["ok"] else "  IMPORT FAILED"
+        heaviest = ", ".join(
+            f"{themod}={thetime / 1.0e3:.0f}" for themod, thetime in best["heaviest"]
+        )
+        print(f"{name:<24} {best['import_ms']:9.1f} ms{status}")
+        print(f"{'':<24}   loaded: {', '.join(best['loaded']) if best['loaded'] else '-'}")
+        print(f"{'':<24}   heaviest (ms): {heaviest}")
+
+    importtimes = np.array([theresult["import_ms"] for theresult in results])
+    print(f"entrypoints: {len(results)}")
+    print(f"median_import_ms: {np.median(importtimes):.1f}")
+    print(f"max_import_ms: {np.max(importtimes):.1f}")
+    for themod in WATCHEDMODULES:
+        count = sum(themod in theresult["loaded"] for theresult in results)
+        print(f"entrypoints_loading_{themod}: {count}")
+
+    if args.jsonfile is not None:
+        with open(args.jsonfile, "w") as thefile:
+            json.dump(results, thefile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 #
-# Benchmark SimilarityFunctionFitter Gaussian performance and robust-fallback rate.
+# Benchmark SimilarityFunctionFitter Gaussian performance and robust-fallback rate, for both
+# the per-voxel fit and the vectorized fit_batch.
 #
 import argparse
 import os
@@ -42,6 +43,9 @@ def _make_parser() -> argparse.ArgumentParser:
     parser.add_argument("--npts", type=int, default=201, help="Number of x points.")
     parser.add_argument("--sampletime", type=float, default=0.5, help="Sample spacing in seconds.")
     parser.add_argument("--seed", type=int, default=12345, help="Random seed.")
+    parser.add_argument(
+        "--noise", type=float, default=0.0, help="Standard deviation of added gaussian noise."
+    )
     return parser
 
 
@@ -67,32 +71,41 @@ def main() -> None:
         zerooutbadfit=False,
     )
 
-    timings = np.zeros(args.nfits, dtype="float64")
     problem_prob = np.clip(args.problem_fraction, 0.0, 1.0)
-    problem_count = 0
+    use_problem = rng.random(args.nfits) < problem_prob
+    problem_count = int(np.sum(use_problem))
 
+    # mostly realistic peaks, with occasional asymmetry to trigger fallback.
+    peaks = np.zeros((args.nfits, args.npts), dtype="float64")
     for i in range(args.nfits):
-        use_problem = rng.random() < problem_prob
-        fitter = fitter_old if use_problem else fitter_new
-        x = x_old if use_problem else x_new
-        if use_problem:
-            problem_count += 1
-
-        # mostly realistic peaks, with occasional asymmetry to trigger fallback.
+        x = x_old if use_problem[i] else x_new
         amp = 0.8 + 0.15 * (rng.random() - 0.5)
         lag = rng.uniform(-12.0, 12.0)
         sigma = np.exp(rng.uniform(np.log(0.2), np.log(20.0)))
-        y = tide_fit.gauss_eval(x, np.array([amp, lag, sigma], dtype="float64"))
+        peaks[i, :] = tide_fit.gauss_eval(x, np.array([amp, lag, sigma], dtype="float64"))
+    if args.noise > 0.0:
+        peaks += rng.normal(scale=args.noise, size=peaks.shape)
 
+    timings = np.zeros(args.nfits, dtype="float64")
+    single_lags = np.zeros(args.nfits, dtype="float64")
+    for i in range(args.nfits):
+        fitter = fitter_old if use_problem[i] else fitter_new
         t0 = time.perf_counter()
-        fitter.fit(y)
+        single_lags[i] = fitter.fit(peaks[i, :])[1]
         timings[i] = time.perf_counter() - t0
-
+    single_total = np.sum(timings)
     total_calls = fitter_new.gauss_fit_calls + fitter_old.gauss_fit_calls
     fast_calls = fitter_new.gauss_fastpath_calls + fitter_old.gauss_fastpath_calls
-    robust_calls = (
-        fitter_new.gauss_robust_fallback_calls + fitter_old.gauss_robust_fallback_calls
-    )
+    robust_calls = fitter_new.gauss_robust_fallback_calls + fitter_old.gauss_robust_fallback_calls
+
+    batch_lags = np.zeros(args.nfits, dtype="float64")
+    t0 = time.perf_counter()
+    for fitter, selector in [(fitter_new, ~use_problem), (fitter_old, use_problem)]:
+        if np.any(selector):
+            batch_lags[selector] = fitter.fit_batch(peaks[selector, :])[1]
+    batch_total = time.perf_counter() - t0
+    batch_closedform = fitter_new.batch_closedform_calls + fitter_old.batch_closedform_calls
+    batch_fallback = fitter_new.batch_fallback_calls + fitter_old.batch_fallback_calls
 
     mean_ms = 1.0e3 * np.mean(timings)
     p95_ms = 1.0e3 * np.percentile(timings, 95.0)
@@ -111,6 +124,12 @@ def main() -> None:
     print(f"fastpath_calls: {fast_calls}")
     print(f"robust_fallback_calls: {robust_calls}")
     print(f"robust_fallback_rate_pct: {robust_pct:.3f}")
+    print(f"fit_voxels_per_sec: {args.nfits / max(single_total, 1.0e-12):.1f}")
+    print(f"fit_batch_voxels_per_sec: {args.nfits / max(batch_total, 1.0e-12):.1f}")
+    print(f"fit_batch_speedup: {single_total / max(batch_total, 1.0e-12):.2f}")
+    print(f"fit_batch_closedform_calls: {batch_closedform}")
+    print(f"fit_batch_fallback_calls: {batch_fallback}")
+    print(f"fit_batch_max_lag_diff: {np.max(np.fabs(batch_lags - single_lags)):.3e}")
 
 
 if __name__ == "__main__":
@@ -957,6 +957,124 @@ class TestOverlay:
         assert len(result) == 4
         assert isinstance(result, np.ndarray)
 
+    def test_lazy_matches_eager(self, tmp_path):
+        """Test that a lazy overlay defers reading, and ends up the same as an eager one."""
+        filepath = str(tmp_path / "test_overlay.nii.gz")
+        create_synthetic_nifti(filepath, shape=(6, 7, 8))
+        funcmask = (np.random.rand(6, 7, 8) > 0.3).astype(np.float64)
+
+        eager = Overlay(
+            name="test", filespec=filepath, namebase="test_overlay", init_LUT=False, verbose=0
+        )
+        eager.setFuncMask(funcmask)
+        lazy = Overlay(
+            name="test",
+            filespec=filepath,
+            namebase="test_overlay",
+            init_LUT=False,
+            verbose=0,
+            lazy=True,
+        )
+        lazy.setFuncMask(funcmask)
+
+        # header information is available without reading the data
+        assert not lazy.isloaded()
+        assert (lazy.xdim, lazy.ydim, lazy.zdim) == (6, 7, 8)
+        assert np.array_equal(lazy.affine, eager.affine)
+        assert lazy.RLfactor == eager.RLfactor
+
+        # first use of the data loads it, with the pending mask applied
+        assert np.array_equal(lazy.maskeddata, eager.maskeddata)
+        assert lazy.isloaded()
+        for theattr in ["data", "mask", "minval", "maxval", "robustmin", "robustmax", "histy"]:
+            assert np.array_equal(getattr(lazy, theattr), getattr(eager, theattr))
+        with pytest.raises(AttributeError):
+            lazy.nosuchattribute
+
+    def test_lazy_duplicate_and_datasource(self, tmp_path):
+        """Test that data sources on lazy overlays are only evaluated when needed."""
+        filepath = str(tmp_path / "test_overlay.nii.gz")
+        data = create_synthetic_nifti(filepath, shape=(5, 5, 5))
+
+        lazy = Overlay(
+            name="test",
+            filespec=filepath,
+            namebase="test_overlay",
+            init_LUT=False,
+            verbose=0,
+            lazy=True,
+        )
+        copy = lazy.duplicate("copy", "Copy Label", init_LUT=False)
+        ncalls = []
+
+        def thresholded():
+            ncalls.append(1)
+            return np.where(data > 0.5, 1.0, 0.0)
+
+        copy.setDataSource(thresholded, isaMask=True)
+        assert not lazy.isloaded()
+        assert not copy.isloaded()
+        assert len(ncalls) == 0
+        assert np.array_equal(copy.data, np.where(data > 0.5, 1.0, 0.0))
+        assert len(ncalls) == 1
+        assert not lazy.isloaded()
+
+    def test_statscache(self, tmp_path):
+        """Test that cached statistics are reused, and invalidated when the file changes."""
+        filepath = str(tmp_path / "test_overlay.nii.gz")
+        create_synthetic_nifti(filepath, shape=(5, 5, 5))
+        sidecarname = str(tmp_path / ".test_overlay.nii.gz.statscache.json")
+
+        first = Overlay(
+            name="test",
+            filespec=filepath,
+            namebase="test_overlay",
+            init_LUT=False,
+            verbose=0,
+            statscache=True,
+        )
+        assert os.path.isfile(sidecarname)
+        assert first.maskedcount == 125
+
+        # doctor the cached values to check that they are what gets used
+        with open(sidecarname, "r") as thefile:
+            thesidecar = json.load(thefile)
+        for thestats in thesidecar["stats"].values():
+            thestats["fracvals"][0] = -1000.0
+        with open(sidecarname, "w") as thefile:
+            json.dump(thesidecar, thefile)
+        second = Overlay(
+            name="test",
+            filespec=filepath,
+            namebase="test_overlay",
+            init_LUT=False,
+            verbose=0,
+            statscache=True,
+        )
+        assert second.robustmin == -1000.0
+        assert second.maskedcount == first.maskedcount
+        assert second.maxval == first.maxval
+        assert type(second.maxval) == type(first.maxval)
+        assert np.array_equal(second.histx, first.histx)
+        assert np.array_equal(second.histy, first.histy)
+
+        # a different mask is a different entry
+        second.setFuncMask(np.where(second.data > 0.5, 1.0, 0.0))
+        assert second.robustmin != -1000.0
+
+        # rewriting the image invalidates the cache
+        create_synthetic_nifti(filepath, shape=(5, 5, 5))
+        os.utime(filepath, ns=(0, os.stat(filepath).st_mtime_ns + 1000000000))
+        third = Overlay(
+            name="test",
+            filespec=filepath,
+            namebase="test_overlay",
+            init_LUT=False,
+            verbose=0,
+            statscache=True,
+        )
+        assert third.robustmin != -1000.0
+
     def test_orientation_detection_neurological(self, tmp_path):
         """Test neurological orientation detection."""
         filepath = str(tmp_path / "test_overlay.nii.gz")
@@ -1127,6 +1245,28 @@ class TestRapidtideDataset:
         assert len(thesubject.regressorfilterlimits) == 2
         assert thesubject.regressorfilterlimits == (0.01, 0.15)
 
+    def test_lazy_dataset(self, rapidtide_output):
+        """Test that a lazily loaded dataset gives the same overlays as an eager one."""
+        eager = RapidtideDataset("main", rapidtide_output, init_LUT=False, verbose=0)
+        lazy = RapidtideDataset(
+            "main",
+            rapidtide_output,
+            init_LUT=False,
+            verbose=0,
+            lazy=True,
+            backgroundload=False,
+        )
+        assert list(lazy.getoverlays()) == list(eager.getoverlays())
+        assert not any(theoverlay.isloaded() for theoverlay in lazy.getoverlays().values())
+        assert lazy.xdim == eager.xdim
+
+        lazy.startbackgroundload()
+        lazy.loadoverlays()
+        for themap, theoverlay in lazy.getoverlays().items():
+            assert theoverlay.isloaded()
+            assert np.array_equal(theoverlay.data, eager.overlays[themap].data)
+            assert theoverlay.robustmax == eager.overlays[themap].robustmax
+
 
 # ============================================================================
 # Integration tests
@@ -18,7 +18,7 @@
 #
 import numpy as np
 
-from rapidtide.stats import fast_ICC_rep_anova
+from rapidtide.stats import fast_ICC_rep_anova, fast_ICC_rep_anova_block
 
 
 def test_ICC_rep_anova():
@@ -43,6 +43,14 @@ def test_ICC_rep_anova():
     assert dfe == 15
     assert np.isclose(r_var / (r_var + e_var), icc)
 
+    # the vectorized version gives the same answer for every voxel
+    blockresults = fast_ICC_rep_anova_block(np.stack([Y, 2.0 * Y + 1.0, Y]))
+    assert blockresults[4] == dfc
+    assert blockresults[5] == dfe
+    assert np.allclose(blockresults[0], icc)
+    assert np.allclose(blockresults[1], [r_var, 4.0 * r_var, r_var])
+    assert np.allclose(blockresults[2], [e_var, 4.0 * e_var, e_var])
+
 
 if __name__ == "__main__":
     test_ICC_rep_anova()
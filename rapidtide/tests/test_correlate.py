@@ -22,6 +22,7 @@ import numpy as np
 import pytest
 
 import rapidtide.correlate as tide_corr
+import rapidtide.miscmath as tide_math
 
 
 def _make_pair(length=256, shift=5):
@@ -142,6 +143,53 @@ def cross_mutual_info_paths(debug=False):
     assert len(xaxis2) == len(xmi2) == len(locs)
 
 
+def cross_mutual_info_block_matches_loop(debug=False):
+    if debug:
+        print("cross_mutual_info_block_matches_loop")
+    x, y = _make_pair(length=300, shift=4)
+    normx = tide_math.corrnormalize(x, detrendorder=1)
+    normy = tide_math.corrnormalize(y, detrendorder=1)
+    bins = int(np.sqrt(len(x) / 5))
+    jh, edges0, edges1 = np.histogram2d(normx, normy, bins=(bins, bins))
+    lags = np.arange(-40, 41)
+
+    # the block engine against a lag by lag histogram
+    for norm in [True, False]:
+        blockmi = tide_corr.cross_mutual_info_block(
+            tide_corr.MI_bincodes(normx, edges0),
+            tide_corr.MI_bincodes(normy, edges1),
+            lags,
+            bins,
+            bins,
+            normalized=norm,
+        )
+        loopmi = np.zeros(len(lags), dtype=np.float64)
+        for idx, i in enumerate(lags):
+            if i < 0:
+                thex, they = normx[: i + len(normy)], normy[-i:]
+            else:
+                thex, they = normx[i:], normy[: len(normy) - i]
+            loopmi[idx] = tide_corr.mutual_info_2d_fast(
+                thex, they, (edges0, edges1), normalized=norm
+            )
+        if debug:
+            print(f"max block difference: {np.max(np.abs(blockmi - loopmi))}")
+        np.testing.assert_allclose(blockmi, loopmi, rtol=1e-12, atol=1e-12)
+
+    # a cached reference gives the same answer as passing the reference timecourse
+    refmi = tide_corr.ReferenceMutualInformation(y)
+    plain = tide_corr.cross_mutual_info(x, y, negsteps=40, possteps=40)
+    cached = tide_corr.cross_mutual_info(x, y, negsteps=40, possteps=40, reference=refmi)
+    np.testing.assert_allclose(cached, plain, rtol=1e-12, atol=1e-12)
+    locs = np.array([-7, 0, 3, 12], dtype=int)
+    np.testing.assert_allclose(
+        tide_corr.cross_mutual_info(x, y, locs=locs, reference=refmi),
+        tide_corr.cross_mutual_info(x, y, locs=locs),
+        rtol=1e-12,
+        atol=1e-12,
+    )
+
+
 def mutual_info_to_r_and_delays(debug=False):
     if debug:
         print("mutual_info_to_r_and_delays")
@@ -251,6 +299,30 @@ def centered_convolve_and_gcc(debug=False):
         tide_corr.gccproduct(fft1, fft2, weighting="badweight")
 
 
+def referencecorrelator_matches_fastcorrelate(debug=False):
+    if debug:
+        print("referencecorrelator_matches_fastcorrelate")
+    assert tide_corr.fastfftlen(1001) == 1008
+    assert tide_corr.fastfftlen(1024) == 1024
+    assert max(tide_corr.primefacs(tide_corr.fastfftlen(4099))) <= 7
+
+    x, y = _make_pair(length=251, shift=7)
+    for weighting in ["None", "liang", "eckart", "phat", "regressor"]:
+        for zeropadding in [0, -1, 30]:
+            refcorr = tide_corr.ReferenceCorrelator(
+                x, zeropadding=zeropadding, weighting=weighting
+            )
+            thecorr = tide_corr.fastcorrelate(
+                y, x, usefft=True, zeropadding=zeropadding, weighting=weighting
+            )
+            if debug:
+                print(f"\t{weighting=}, {zeropadding=}, {refcorr.fftlen=}")
+            assert np.allclose(refcorr.run(y), thecorr, atol=1e-10)
+            assert np.allclose(refcorr.run_batch(np.vstack((y, x)))[0, :], thecorr, atol=1e-10)
+    with pytest.raises(ValueError):
+        refcorr.run(y[:-1])
+
+
 def aligntcwithref_basic(debug=False):
     if debug:
         print("aligntcwithref_basic")
@@ -276,10 +348,12 @@ def test_correlate(debug=False):
     mutual_info_functions(debug=debug)
     proc_mi_histogram(debug=debug)
     cross_mutual_info_paths(debug=debug)
+    cross_mutual_info_block_matches_loop(debug=debug)
     mutual_info_to_r_and_delays(debug=debug)
     aliased_and_samplerate_routines(debug=debug)
     stfft_prime_and_fastcorr(debug=debug)
     centered_convolve_and_gcc(debug=debug)
+    referencecorrelator_matches_fastcorrelate(debug=debug)
     aligntcwithref_basic(debug=debug)
 
 
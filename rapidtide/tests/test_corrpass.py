@@ -360,7 +360,66 @@ def test_correlationpass_gpu_matches_cpu(debug=False):
             print("cpu and gpu outputs match!")
 
 
+def test_correlationpass_blocked_matches_voxelwise(debug=False):
+    # Block correlation must give the same answers as one voxel at a time.
+    numvoxels = 37
+    numtimepoints = 160
+    tr = 0.8
+    Fs = 1.0 / tr
+    init_fmri_x = np.linspace(0.0, numtimepoints, numtimepoints, endpoint=False) * tr
+    rng = np.random.default_rng(13579)
+    testfreq = 0.06
+    referencetc = np.sin(2.0 * np.pi * testfreq * init_fmri_x)
+    fmridata = np.zeros((numvoxels, numtimepoints), dtype=np.float64)
+    for i in range(numvoxels):
+        fmridata[i, :] = np.sin(
+            2.0 * np.pi * testfreq * (init_fmri_x - 0.15 * i)
+        ) + 0.2 * rng.normal(size=numtimepoints)
+
+    lagmininpts = 12
+    lagmaxinpts = 12
+    numcorrpoints = lagmaxinpts + lagmininpts
+    prefilt = tide_filt.NoncausalFilter("lfo")
+
+    results = []
+    for nprocs, mpbatchsize in [(1, 1), (1, 8), (2, 8)]:
+        theCorrelator = tide_simFuncClasses.Correlator(
+            Fs=Fs,
+            ncprefilter=prefilt,
+            detrendorder=3,
+            windowfunc="hamming",
+            corrweighting="phat",
+        )
+        corrout = np.zeros((numvoxels, numcorrpoints), dtype=np.float64)
+        meanval = np.zeros((numvoxels), dtype=np.float64)
+        voxelsprocessed, globalmaxlist, corrscale = tide_calcsimfunc.correlationpass(
+            fmridata,
+            referencetc,
+            theCorrelator,
+            init_fmri_x,
+            init_fmri_x,
+            lagmininpts,
+            lagmaxinpts,
+            corrout,
+            meanval,
+            nprocs=nprocs,
+            oversampfactor=1,
+            interptype="univariate",
+            showprogressbar=False,
+            mpbatchsize=mpbatchsize,
+        )
+        if debug:
+            print(f"{nprocs=}, {mpbatchsize=}, {voxelsprocessed=}")
+        assert voxelsprocessed == numvoxels
+        results.append((corrout, meanval, sorted(globalmaxlist)))
+    for corrout, meanval, globalmaxlist in results[1:]:
+        np.testing.assert_allclose(corrout, results[0][0], atol=1e-12)
+        np.testing.assert_allclose(meanval, results[0][1])
+        assert globalmaxlist == results[0][2]
+
+
 if __name__ == "__main__":
     mpl.use("TkAgg")
     test_calcsimfunc(debug=True, displayplots=True)
     test_correlationpass_gpu_matches_cpu(debug=True)
+    test_correlationpass_blocked_matches_voxelwise(debug=True)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2025-2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+import rapidtide.dlfilternumpy as dlfilternumpy
+import rapidtide.dlfiltertorch as dlfiltertorch
+from rapidtide.tests.utils import get_rapidtide_root, get_test_temp_path
+
+
+def layers_match_torch():
+    """Test the numpy layers against the pytorch layers they replace."""
+    rng = np.random.default_rng(2345)
+
+    # convolutions, including an odd total padding and the few input channel path
+    for inchannels, kernelsize, dilation in [(1, 7, 1), (5, 4, 1), (12, 5, 2), (12, 3, 3)]:
+        theconv = nn.Conv1d(inchannels, 9, kernelsize, dilation=dilation, padding="same")
+        X = rng.normal(size=(6, inchannels, 40)).astype(np.float32)
+        with torch.no_grad():
+            target = theconv(torch.from_numpy(X)).numpy()
+        result = dlfilternumpy.conv1d(
+            X,
+            theconv.weight.detach().numpy(),
+            theconv.bias.detach().numpy(),
+            dilation=dilation,
+        )
+        np.testing.assert_allclose(result, target, rtol=1e-4, atol=1e-5)
+
+    # lstm
+    thelstm = nn.LSTM(8, 5, batch_first=True)
+    X = rng.normal(size=(4, 30, 8)).astype(np.float32)
+    with torch.no_grad():
+        target = thelstm(torch.from_numpy(X))[0].numpy()
+    result = dlfilternumpy.lstm(
+        X,
+        thelstm.weight_ih_l0.detach().numpy(),
+        thelstm.weight_hh_l0.detach().numpy(),
+        (thelstm.bias_ih_l0 + thelstm.bias_hh_l0).detach().numpy(),
+    )
+    np.testing.assert_allclose(result, target, rtol=1e-4, atol=1e-5)
+
+    # linear upsampling
+    X = rng.normal(size=(3, 1, 25)).astype(np.float32)
+    target = nn.Upsample(scale_factor=2, mode="linear", align_corners=False)(torch.from_numpy(X))
+    np.testing.assert_allclose(
+        dlfilternumpy.upsamplelinear(X), target.numpy(), rtol=1e-5, atol=1e-6
+    )
+
+
+def exported_cnn_matches_torch(testtemproot, debug=False):
+    """Test that an exported CNN filter gives the same result as the pytorch filter."""
+    filter_obj = dlfiltertorch.CNNDLFilter(
+        num_filters=10,
+        kernel_size=5,
+        window_size=64,
+        num_layers=4,
+        dilation_rate=2,
+        num_epochs=1,
+        modelroot=testtemproot,
+        namesuffix="numpyexporttest",
+    )
+    filter_obj.getname()
+    filter_obj.makenet()
+
+    # give the batchnorm layers something to do
+    rng = np.random.default_rng(3456)
+    for layer in filter_obj.model.layers:
+        if isinstance(layer, nn.BatchNorm1d):
+            layer.running_mean.copy_(torch.from_numpy(rng.normal(size=10).astype(np.float32)))
+            layer.running_var.copy_(
+                torch.from_numpy(rng.uniform(0.5, 2.0, size=10).astype(np.float32))
+            )
+            layer.weight.data.copy_(torch.from_numpy(rng.normal(size=10).astype(np.float32)))
+    filter_obj.model.to(filter_obj.device)
+    filter_obj.initmetadata()
+    filter_obj.savemodel(altname=filter_obj.modelpath)
+    modelname = os.path.basename(filter_obj.modelpath)
+
+    # clear out any export left over from a previous run
+    staleexport = os.path.join(testtemproot, modelname, dlfilternumpy.EXPORTEDMODELNAME)
+    if os.path.isfile(staleexport):
+        os.remove(staleexport)
+    assert not dlfilternumpy.hasexportedmodel(testtemproot, modelname)
+    dlfilternumpy.exportmodel(testtemproot, modelname, verbose=debug)
+    assert dlfilternumpy.hasexportedmodel(testtemproot, modelname)
+
+    torchfilter = dlfiltertorch.DeepLearningFilter(modelpath=testtemproot)
+    torchfilter.loadmodel(modelname)
+    numpyfilter = dlfilternumpy.DeepLearningFilter(modelpath=testtemproot)
+    numpyfilter.loadmodel(modelname)
+    assert numpyfilter.window_size == 64
+
+    X = rng.normal(size=(50, 64, 1))
+    target = torchfilter.predict_model(X)
+    result = numpyfilter.predict_model(X)
+    if debug:
+        print(f"max prediction difference: {np.max(np.abs(result - target))}")
+    assert result.shape == target.shape
+    np.testing.assert_allclose(result, target, rtol=1e-4, atol=1e-4)
+
+    inputdata = np.sin(np.linspace(0.0, 60.0, 600)) + 0.2 * rng.normal(size=600)
+    np.testing.assert_allclose(
+        numpyfilter.apply(inputdata, batchsize=100),
+        torchfilter.apply(inputdata),
+        rtol=1e-4,
+        atol=1e-4,
+    )
+
+
+def bundled_model_matches_torch(debug=False):
+    """Test that the shipped export of happy's default model matches pytorch."""
+    modelpath = os.path.join(get_rapidtide_root(), "data", "models")
+    modelname = "model_ppgattention_pytorch_w128_fulldata"
+    assert dlfilternumpy.hasexportedmodel(modelpath, modelname)
+
+    torchfilter = dlfiltertorch.DeepLearningFilter(modelpath=modelpath)
+    torchfilter.loadmodel(modelname)
+    numpyfilter = dlfilternumpy.DeepLearningFilter(modelpath=modelpath)
+    numpyfilter.loadmodel(modelname)
+
+    rng = np.random.default_rng(4567)
+    inputdata = np.sin(np.linspace(0.0, 100.0, 800)) + 0.3 * rng.normal(size=800)
+    target = torchfilter.apply(inputdata)
+    result = numpyfilter.apply(inputdata)
+    if debug:
+        print(f"max filtered difference: {np.max(np.abs(result - target))}")
+    np.testing.assert_allclose(result, target, rtol=1e-4, atol=1e-4)
+
+
+def test_dlfilternumpy(debug=False, local=False):
+    # set input and output directories
+    testtemproot = get_test_temp_path(local)
+
+    if debug:
+        print("layers_match_torch()")
+    layers_match_torch()
+
+    if debug:
+        print("exported_cnn_matches_torch(testtemproot)")
+    exported_cnn_matches_torch(testtemproot, debug=debug)
+
+    if debug:
+        print("bundled_model_matches_torch()")
+    bundled_model_matches_torch(debug=debug)
+
+
+if __name__ == "__main__":
+    test_dlfilternumpy(debug=True, local=True)
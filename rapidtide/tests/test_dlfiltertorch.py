@@ -951,6 +951,70 @@ def datatochannels_test():
     assert np.allclose(result_zero[:, 2], 0.0)
 
 
+def datatochannels_block_test():
+    """Test that datatochannels_block matches datatochannels window by window."""
+    rng = np.random.default_rng(1234)
+    numwindows = 20
+    length = 64
+    timecourses = rng.normal(size=(numwindows, length))
+    badpts = np.zeros((numwindows, length), dtype=np.float64)
+    badpts[3, 10:20] = 1.0
+    timecourses[5, :] = 0.0
+
+    for usebadpts in [False, True]:
+        for dofft in [False, True]:
+            result = dlfiltertorch.datatochannels_block(
+                timecourses, badpts, usebadpts=usebadpts, dofft=dofft
+            )
+            numchans, dummy, dummy = dlfiltertorch.calcnumchannels(usebadpts, dofft)
+            assert result.shape == (numwindows, length, numchans)
+            for i in range(numwindows):
+                np.testing.assert_array_equal(
+                    result[i, :, :],
+                    dlfiltertorch.datatochannels(
+                        timecourses[i, :], badpts[i, :], usebadpts=usebadpts, dofft=dofft
+                    ),
+                )
+
+
+def overlapadd_test():
+    """Test that overlapadd sums windows exactly as the sequential loop does."""
+    rng = np.random.default_rng(4321)
+    numwindows = 37
+    window_size = 8
+    thelen = numwindows + window_size + 1
+    windowvals = rng.normal(size=(numwindows, window_size))
+
+    target = np.zeros(thelen, dtype=np.float64)
+    for i in range(numwindows):
+        target[i : i + window_size] += windowvals[i, :]
+    np.testing.assert_array_equal(dlfiltertorch.overlapadd(windowvals, thelen), target)
+
+
+def apply_batching(testtemproot):
+    """Test that batched inference gives the same answer as a single batch."""
+    filter_obj = dlfiltertorch.CNNDLFilter(
+        num_filters=10,
+        kernel_size=5,
+        window_size=64,
+        num_layers=3,
+        num_epochs=1,
+        modelroot=testtemproot,
+        usebadpts=True,
+    )
+    filter_obj.getname()
+    filter_obj.makenet()
+    filter_obj.model.to(filter_obj.device)
+
+    input_signal = np.random.randn(500)
+    badpts = np.zeros(500, dtype=np.float64)
+    badpts[100:120] = 1.0
+
+    filtered_signal = filter_obj.apply(input_signal, badpts=badpts)
+    batched_signal = filter_obj.apply(input_signal, badpts=badpts, batchsize=50, numthreads=1)
+    np.testing.assert_allclose(batched_signal, filtered_signal, rtol=1e-5, atol=1e-6)
+
+
 def filtscale_hybrid():
     """Test filtscale in hybrid mode."""
     data = np.random.randn(64)
@@ -1115,6 +1179,18 @@ def test_dlfilterops(debug=False, local=False):
         print("datatochannels_test()")
     datatochannels_test()
 
+    if debug:
+        print("datatochannels_block_test()")
+    datatochannels_block_test()
+
+    if debug:
+        print("overlapadd_test()")
+    overlapadd_test()
+
+    if debug:
+        print("apply_batching(testtemproot)")
+    apply_batching(testtemproot)
+
     if debug:
         print("filtscale_hybrid()")
     filtscale_hybrid()
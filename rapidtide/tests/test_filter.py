@@ -42,6 +42,7 @@ from rapidtide.filter import (
     harmonicnotchfilter,
     ifftfrompolar,
     mRect,
+    padblock,
     padvec,
     polarfft,
     pspec,
@@ -382,6 +383,53 @@ def test_padvec_padding_modes_and_errors():
         padvec(data, padlen=8, padtype="reflect")
 
 
+def test_padblock_matches_padvec():
+    data = np.random.RandomState(3).normal(size=(4, 12))
+    for padtype in ["reflect", "zero", "cyclic", "constant", "constant+"]:
+        padded = padblock(data, padlen=5, avlen=3, padtype=padtype)
+        for i in range(data.shape[0]):
+            assert np.allclose(
+                padded[i, :], padvec(data[i, :], padlen=5, avlen=3, padtype=padtype)
+            )
+    # padding by the whole length of the data
+    for padtype in ["reflect", "zero", "cyclic", "constant", "constant+"]:
+        padded = padblock(data, padlen=12, avlen=3, padtype=padtype)
+        for i in range(data.shape[0]):
+            assert np.allclose(
+                padded[i, :], padvec(data[i, :], padlen=12, avlen=3, padtype=padtype)
+            )
+    with pytest.raises(ValueError):
+        padblock(data, padlen=2, padtype="not-a-mode")
+    with pytest.raises(RuntimeError):
+        padblock(data, padlen=20, padtype="reflect")
+
+
+@pytest.mark.parametrize("transferfunc", ["trapezoidal", "brickwall", "gaussian", "butterworth"])
+def test_apply_block_matches_apply(transferfunc):
+    Fs = 1.0 / 0.72
+    data = np.random.RandomState(5).normal(size=(6, 400)) + 5.0
+    for filtertype in ["lfo", "lfo_stop", "vlf", "resp", "ringstop", "arb", "arb_stop", "None"]:
+        for padtype in ["reflect", "zero", "constant+"]:
+            thefilter = NoncausalFilter(filtertype, transferfunc=transferfunc, padtype=padtype)
+            if filtertype.startswith("arb"):
+                thefilter.setfreqs(0.009, 0.01, 0.15, 0.2)
+            oneatatime = np.array([thefilter.apply(Fs, tc) for tc in data])
+            assert np.allclose(thefilter.apply_block(Fs, data), oneatatime, atol=1e-5)
+            # the cached transfer function gives the same answer, along either axis
+            assert np.allclose(thefilter.apply_block(Fs, data.T, axis=0).T, oneatatime, atol=1e-5)
+
+
+@pytest.mark.parametrize("transferfunc", ["trapezoidal", "butterworth"])
+def test_apply_block_padding_whole_timecourse(transferfunc):
+    # at 10 Hz, the resp and cardiac filters pad by the full length of a 300 point timecourse
+    Fs = 10.0
+    data = np.random.RandomState(7).normal(size=(3, 300))
+    for filtertype in ["resp", "cardiac"]:
+        thefilter = NoncausalFilter(filtertype, transferfunc=transferfunc)
+        oneatatime = np.array([thefilter.apply(Fs, tc) for tc in data])
+        assert np.allclose(thefilter.apply_block(Fs, data), oneatatime, atol=1e-5)
+
+
 def test_getfilterbandfreqs_valid_and_errors():
     lowerpass, upperpass, lowerstop, upperstop = getfilterbandfreqs("lfo")
     assert lowerpass == pytest.approx(0.01)
@@ -480,12 +528,30 @@ def test_filtering_helpers_return_valid_outputs():
     y_lp_fft = dolptransfuncfilt(fs, x, upperpass=4.0, upperstop=5.0, type="brickwall", padlen=20)
     y_hp_fft = dohptransfuncfilt(fs, x, lowerpass=0.8, lowerstop=0.6, type="brickwall", padlen=20)
     y_bp_fft = dobptransfuncfilt(
-        fs, x, lowerpass=0.8, upperpass=4.0, lowerstop=0.6, upperstop=5.0, type="brickwall", padlen=20
+        fs,
+        x,
+        lowerpass=0.8,
+        upperpass=4.0,
+        lowerstop=0.6,
+        upperstop=5.0,
+        type="brickwall",
+        padlen=20,
+    )
+    y_lp_trap = dolptransfuncfilt(
+        fs, x, upperpass=4.0, upperstop=5.0, type="trapezoidal", padlen=20
+    )
+    y_hp_trap = dohptransfuncfilt(
+        fs, x, lowerpass=0.8, lowerstop=0.6, type="trapezoidal", padlen=20
     )
-    y_lp_trap = dolptransfuncfilt(fs, x, upperpass=4.0, upperstop=5.0, type="trapezoidal", padlen=20)
-    y_hp_trap = dohptransfuncfilt(fs, x, lowerpass=0.8, lowerstop=0.6, type="trapezoidal", padlen=20)
     y_bp_trap = dobptransfuncfilt(
-        fs, x, lowerpass=0.8, upperpass=4.0, lowerstop=0.6, upperstop=5.0, type="trapezoidal", padlen=20
+        fs,
+        x,
+        lowerpass=0.8,
+        upperpass=4.0,
+        lowerstop=0.6,
+        upperstop=5.0,
+        type="trapezoidal",
+        padlen=20,
     )
     y_arb = arb_pass(
         fs,
@@ -620,6 +620,51 @@ class TestMlregress:
             tide_fit.mlregress(X, y)
 
 
+class TestMlregressBlock:
+    def test_matches_mlregress_shared(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(50, 2))
+        Y = rng.normal(size=(7, 50)) + 2.0 * X[:, 0][None, :] + 3.0
+        coffs, R2 = tide_fit.mlregress_block(X, Y)
+        assert coffs.shape == (7, 3)
+        for i in range(Y.shape[0]):
+            thecoffs, theR2 = tide_fit.mlregress(X, Y[i, :])
+            np.testing.assert_allclose(coffs[i, :], thecoffs[0, :], atol=1e-10)
+            assert np.isclose(R2[i], theR2, atol=1e-10)
+
+    def test_matches_mlregress_perrow(self):
+        rng = np.random.default_rng(43)
+        X = rng.normal(size=(5, 40, 2))
+        Y = rng.normal(size=(5, 40)) - 1.5 * X[:, :, 1]
+        coffs, R2 = tide_fit.mlregress_block(X, Y)
+        for i in range(Y.shape[0]):
+            thecoffs, theR2 = tide_fit.mlregress(X[i, :, :], Y[i, :])
+            np.testing.assert_allclose(coffs[i, :], thecoffs[0, :], atol=1e-10)
+            assert np.isclose(R2[i], theR2, atol=1e-10)
+
+        # a 2D X the same shape as Y is one single regressor per row
+        coffs, R2 = tide_fit.mlregress_block(X[:, :, 0], Y)
+        assert coffs.shape == (5, 2)
+        thecoffs, theR2 = tide_fit.mlregress(X[2, :, 0], Y[2, :])
+        np.testing.assert_allclose(coffs[2, :], thecoffs[0, :], atol=1e-10)
+
+    def test_degenerate_rows(self):
+        X = np.array([1.0, 2.0, 3.0, 4.0])
+        Y = np.array([[2.0, 2.0, 2.0, 2.0], [1.0, 3.0, 5.0, 7.0]])
+        coffs, R2 = tide_fit.mlregress_block(X, Y)
+        np.testing.assert_allclose(coffs[0, :], [2.0, 0.0], atol=1e-10)
+        np.testing.assert_allclose(coffs[1, :], [-1.0, 2.0], atol=1e-10)
+        np.testing.assert_allclose(R2, [1.0, 1.0])
+
+        # a flat regressor gets a zero slope rather than an error
+        coffs, R2 = tide_fit.mlregress_block(np.ones((2, 4)), Y)
+        np.testing.assert_allclose(coffs[:, 1], 0.0)
+
+    def test_incompatible_shapes_raises(self):
+        with pytest.raises(AttributeError):
+            tide_fit.mlregress_block(np.ones((2, 2)), np.ones((3, 3)))
+
+
 class TestOlsregress:
     def test_simple_linear(self):
         X = np.array([[1.0], [2.0], [3.0], [4.0], [5.0]])
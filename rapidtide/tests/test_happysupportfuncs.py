@@ -642,6 +642,84 @@ def projection_helpers_routines(debug=False):
         )
 
 
+def phaseprojector_routines(debug=False):
+    if debug:
+        print("phaseprojector_routines")
+
+    rng = np.random.RandomState(12)
+    nvox, nslices, ntr, destpoints = 30, 3, 40, 16
+    demean = rng.randn(nvox, nslices, ntr)
+    fmri = rng.randn(nvox, nslices, ntr)
+    outphases = np.linspace(-np.pi, np.pi, destpoints, endpoint=False)
+    cardphasevals = rng.uniform(-np.pi, np.pi, size=(nslices, ntr))
+    validlocslist = [
+        np.arange(0, nvox, 2, dtype=int),
+        np.array([], dtype=int),
+        np.arange(5, nvox, dtype=int),
+    ]
+    proctrs = np.sort(rng.choice(ntr, 30, replace=False))
+
+    # accumulate the projection one timepoint at a time
+    targetweights = np.zeros((nvox, nslices, destpoints))
+    targetcine = np.zeros((nvox, nslices, destpoints))
+    targetrawapp = np.zeros((nvox, nslices, destpoints))
+    for theslice in range(nslices):
+        validlocs = validlocslist[theslice]
+        if len(validlocs) == 0:
+            continue
+        for t in proctrs:
+            thevals, theweights, theindices = hs.tide_resample.congrid(
+                outphases, cardphasevals[theslice, t], 1.0, 2.0, kernel="kaiser", cyclic=True
+            )
+            for i in range(len(theindices)):
+                targetweights[validlocs, theslice, theindices[i]] += theweights[i]
+                targetrawapp[validlocs, theslice, theindices[i]] -= demean[validlocs, theslice, t]
+                targetcine[validlocs, theslice, theindices[i]] += (
+                    theweights[i] * fmri[validlocs, theslice, t]
+                )
+        targetweights[validlocs, theslice, :] = np.where(
+            targetweights[validlocs, theslice, :] == 0.0,
+            1.0,
+            targetweights[validlocs, theslice, :],
+        )
+        targetrawapp[validlocs, theslice, :] /= targetweights[validlocs, theslice, :]
+        targetcine[validlocs, theslice, :] /= targetweights[validlocs, theslice, :]
+
+    projector = hs.makephaseprojector(outphases, cardphasevals, 2.0, "kaiser", destpoints)
+    assert len(projector) == nslices
+    for mpcode, theprojector in [(False, None), (False, projector), (True, projector)]:
+        weights_byslice = np.zeros((nvox, nslices, destpoints))
+        cine_byslice = np.zeros((nvox, nslices, destpoints))
+        rawapp_byslice = np.zeros((nvox, nslices, destpoints))
+        hs.phaseprojectpass(
+            nslices,
+            demean,
+            fmri,
+            validlocslist,
+            proctrs,
+            weights_byslice,
+            cine_byslice,
+            rawapp_byslice,
+            outphases,
+            cardphasevals,
+            2.0,
+            "kaiser",
+            destpoints,
+            mpcode=mpcode,
+            nprocs=1,
+            showprogressbar=False,
+            projector=theprojector,
+        )
+        np.testing.assert_allclose(rawapp_byslice, targetrawapp, atol=1e-12)
+        np.testing.assert_allclose(cine_byslice, targetcine, atol=1e-12)
+        for theslice in [0, 2]:
+            np.testing.assert_allclose(
+                weights_byslice[validlocslist[theslice], theslice, :],
+                targetweights[validlocslist[theslice], theslice, :],
+                atol=1e-12,
+            )
+
+
 def high_level_routines(debug=False):
     if debug:
         print("high_level_routines")
@@ -807,6 +885,7 @@ def test_happysupportfuncs(debug=False, local=False):
     detrend_normalize_routines(debug=debug)
     physio_quality_routines(debug=debug)
     projection_helpers_routines(debug=debug)
+    phaseprojector_routines(debug=debug)
     high_level_routines(debug=debug)
 
 
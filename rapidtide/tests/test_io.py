@@ -2519,6 +2519,38 @@ def dumparraytonifti_basic(debug=False):
         assert read_data.shape == (5, 5, 5)
 
 
+def readfromnifti_dtype_and_mmap(debug=False):
+    """Test reading NIfTI data in a requested dtype, with and without memory mapping."""
+    if debug:
+        print("readfromnifti_dtype_and_mmap")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data = np.random.randn(4, 5, 3, 7).astype(np.float32)
+        for suffix in [".nii", ".nii.gz"]:
+            filepath = os.path.join(tmpdir, f"float_test{suffix}")
+            nib.save(nib.Nifti1Image(data, np.eye(4)), filepath)
+            for mmap in [False, True]:
+                _, read_data, _, thedims, _ = tide_io.readfromnifti(
+                    filepath, dtype=np.float32, mmap=mmap, slabsize=3
+                )
+                assert read_data.dtype == np.float32
+                assert thedims[4] == 7
+                np.testing.assert_array_equal(read_data, data)
+                # only uncompressed files can be memory mapped
+                assert isinstance(read_data, np.memmap) == (mmap and suffix == ".nii")
+
+        # scaled integer data is converted without a float64 copy, and matches get_fdata
+        intdata = (np.random.rand(4, 5, 3, 7) * 1000).astype(np.int16)
+        img = nib.Nifti1Image(intdata, np.eye(4))
+        img.header.set_slope_inter(0.5, 3.0)
+        filepath = os.path.join(tmpdir, "scaled_test.nii")
+        nib.save(img, filepath)
+        _, floatdata, _, _, _ = tide_io.readfromnifti(filepath)
+        _, read_data, _, _, _ = tide_io.readfromnifti(filepath, dtype=np.float32, mmap=True)
+        assert not isinstance(read_data, np.memmap)
+        assert read_data.dtype == np.float32
+        np.testing.assert_allclose(read_data, floatdata, rtol=1e-6)
+
+
 # ==================== niftisplit 5D test ====================
 
 
@@ -2658,6 +2690,7 @@ def test_io3(debug=False):
     if debug:
         print("Running dumparraytonifti tests")
     dumparraytonifti_basic(debug=debug)
+    readfromnifti_dtype_and_mmap(debug=debug)
 
     # niftisplit
     if debug:
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+import os
+import subprocess
+import sys
+
+from rapidtide.lazyimport import LazyAttribute, LazyModule, lazyimport, lazyimportfrom
+from rapidtide.tests.utils import get_rapidtide_root
+
+
+def placeholders_defer_and_forward(debug=False):
+    # "colorsys" is small, part of the standard library, and not imported by anything we load
+    sys.modules.pop("colorsys", None)
+    themodule = lazyimport("colorsys")
+    thefunc = lazyimportfrom("colorsys", "rgb_to_hsv")
+    assert isinstance(themodule, LazyModule)
+    assert isinstance(thefunc, LazyAttribute)
+    assert "colorsys" not in sys.modules
+    if debug:
+        print(repr(themodule), repr(thefunc))
+
+    # first use triggers the import, and both placeholders forward to the real objects
+    assert thefunc(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+    assert themodule.rgb_to_hsv is sys.modules["colorsys"].rgb_to_hsv
+    assert thefunc.__name__ == "rgb_to_hsv"
+
+    # already imported modules are returned directly
+    assert lazyimport("colorsys") is sys.modules["colorsys"]
+    assert lazyimportfrom("colorsys", "rgb_to_hsv") is sys.modules["colorsys"].rgb_to_hsv
+
+    # missing modules fail at first use, not at definition
+    missing = lazyimport("rapidtide.nosuchmodule")
+    try:
+        missing.anything
+    except ModuleNotFoundError:
+        pass
+    else:
+        raise AssertionError("expected ModuleNotFoundError")
+
+
+def entrypoints_skip_heavy_imports(debug=False):
+    # short timecourse tools should not pay for plotting or statistics packages at startup
+    heavymodules = ["matplotlib.pyplot", "statsmodels", "sklearn", "nilearn", "pandas"]
+    for entrypoint in ["filttc", "resampletc", "rapidtide", "happy"]:
+        probe = (
+            f"import sys; import rapidtide.scripts.{entrypoint}; "
+            f"print(','.join(m for m in {heavymodules!r} if m in sys.modules))"
+        )
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.path.abspath(os.path.join(get_rapidtide_root(), ".."))
+        result = subprocess.run(
+            [sys.executable, "-c", probe], capture_output=True, text=True, env=env
+        )
+        if debug:
+            print(entrypoint, result.stdout.strip(), result.returncode)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "", f"{entrypoint} imported {result.stdout.strip()}"
+
+
+def test_lazyimport(debug=False):
+    placeholders_defer_and_forward(debug=debug)
+    entrypoints_skip_heavy_imports(debug=debug)
+
+
+if __name__ == "__main__":
+    test_lazyimport(debug=True)
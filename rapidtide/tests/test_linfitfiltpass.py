@@ -207,6 +207,7 @@ def test_linfitfiltpass_coefficientsonly_constantevs_paths(debug=False):
                 coefficientsonly=True,
                 constantevs=constantevs,
                 showprogressbar=False,
+                blocksize=1,
             )
 
         assert items == numvox
@@ -228,7 +229,70 @@ def test_linfitfiltpass_coefficientsonly_constantevs_paths(debug=False):
                 np.testing.assert_allclose(received_evs[vox], theevs)
 
 
+def test_linfitfiltpass_blockfit(debug=False):
+    rng = np.random.default_rng(24680)
+    numvox = 120
+    tpts = 90
+    theev = np.sin(np.linspace(0.0, 12.0, tpts))
+    fmri_data = (
+        rng.normal(size=(numvox, tpts))
+        + rng.uniform(-2.0, 2.0, size=numvox)[:, None] * theev[None, :]
+        + 5.0
+    )
+    voxelevs = theev[None, :] + 0.3 * rng.normal(size=(numvox, tpts))
+    voxelderivevs = np.stack((voxelevs, np.gradient(voxelevs, axis=1)), axis=2)
+    timepointevs = rng.normal(size=(numvox, tpts))
+
+    # (name, evs, procbyvoxel, constantevs, number of coefficients)
+    thecases = [
+        ("shared", theev, True, True, None),
+        ("voxel", voxelevs, True, False, None),
+        ("voxelderivs", voxelderivevs, True, False, 2),
+        ("timepoint", timepointevs, False, False, None),
+    ]
+    for name, theevs, procbyvoxel, constantevs, numcoffs in thecases:
+        numitems = numvox if procbyvoxel else tpts
+        if numcoffs is None:
+            coffshape = (numitems,)
+        else:
+            coffshape = (numitems, numcoffs)
+        results = []
+        for nprocs, blocksize in [(2, 1), (1, 1000), (2, 32)]:
+            if constantevs and nprocs == 1 and blocksize == 1:
+                continue
+            theoutputs = [
+                np.zeros(numitems),
+                np.zeros(numitems),
+                np.zeros(numitems),
+                np.zeros(coffshape),
+                np.zeros(coffshape),
+                np.zeros_like(fmri_data),
+                np.zeros_like(fmri_data),
+            ]
+            items = tide_linfitfiltpass.linfitfiltpass(
+                numitems,
+                fmri_data,
+                None,
+                theevs,
+                *theoutputs,
+                nprocs=nprocs,
+                constantevs=constantevs,
+                procbyvoxel=procbyvoxel,
+                showprogressbar=False,
+                blocksize=blocksize,
+                verbose=False,
+            )
+            assert items == numitems
+            results.append(theoutputs)
+        if debug:
+            print(f"{name}: {len(results)} runs")
+        for theoutputs in results[1:]:
+            for first, second in zip(results[0], theoutputs):
+                np.testing.assert_allclose(first, second, rtol=1e-6, atol=1e-8)
+
+
 if __name__ == "__main__":
     mpl.use("TkAgg")
     test_linfitfiltpass(debug=True, displayplots=True)
     test_linfitfiltpass_coefficientsonly_constantevs_paths(debug=True)
+    test_linfitfiltpass_blockfit(debug=True)
@@ -367,6 +367,98 @@ def getcorrloc_search_range(debug=False):
     assert maskval == 1
 
 
+# ==================== local correlation engine tests ====================
+
+
+def makeneighborlist_matches_loop(debug=False):
+    """Test that makeneighborlist finds the same neighbors, in the same order, as a loop."""
+    if debug:
+        print("makeneighborlist_matches_loop")
+    radius, xdim, ydim, slicethickness = 5.0, 2.0, 2.5, 3.0
+    for dosphere in [True, False]:
+        neighborlist, distancelist, steps = lf.makeneighborlist(
+            radius, xdim, ydim, slicethickness, dosphere=dosphere
+        )
+        assert steps == (3, 2, 2)
+        target = []
+        targetdistances = []
+        for z in range(-steps[2], steps[2] + 1):
+            for y in range(-steps[1], steps[1] + 1):
+                for x in range(-steps[0], steps[0] + 1):
+                    distance = np.sqrt(
+                        (x * xdim) ** 2 + (y * ydim) ** 2 + (z * slicethickness) ** 2
+                    )
+                    if (x, y, z) != (0, 0, 0) and (distance <= radius or not dosphere):
+                        target.append((x, y, z))
+                        targetdistances.append(distance)
+        assert neighborlist == target
+        if dosphere:
+            np.testing.assert_allclose(distancelist, targetdistances)
+
+
+def localcorrelations_matches_getcorrloc(debug=False):
+    """Test that localcorrelations matches getcorrloc on every voxel/neighbor pair."""
+    if debug:
+        print("localcorrelations_matches_getcorrloc")
+    import rapidtide.miscmath as tide_math
+
+    xsize, ysize, numslices, npts = 5, 4, 3, 120
+    Fs = 1.0
+    thedata = np.zeros((xsize, ysize, numslices, npts), dtype=float)
+    for x in range(xsize):
+        for y in range(ysize):
+            for z in range(numslices):
+                thedata[x, y, z, :] = tide_math.corrnormalize(
+                    _make_broadband_signal(npts, Fs, delay=0.7 * x - 0.4 * z, seed=y),
+                    detrendorder=1,
+                    windowfunc="hamming",
+                )
+    thedata[1, 1, 1, :] = 0.0
+    themask = np.ones((xsize, ysize, numslices), dtype=int)
+    themask[0, 0, 0] = 0
+    themask[4, 3, 2] = 0
+    neighborlist, distancelist, steps = lf.makeneighborlist(1.5, 1.0, 1.0, 1.0)
+    data_byvox = thedata.reshape((-1, npts))
+
+    for dofit in [False, True]:
+        for nprocs in [1, 2]:
+            corrcoeffs, delays, corrvalid, failreason = lf.localcorrelations(
+                thedata,
+                themask,
+                neighborlist,
+                Fs,
+                dofit=dofit,
+                nprocs=nprocs,
+                blocksize=7,
+                showprogressbar=False,
+            )
+            assert corrcoeffs.shape == (xsize, ysize, numslices, len(neighborlist))
+            for x in range(xsize):
+                for y in range(ysize):
+                    for z in range(numslices):
+                        for idx, (xoff, yoff, zoff) in enumerate(neighborlist):
+                            index2 = lf.xyz2index(
+                                x + xoff, y + yoff, z + zoff, xsize, ysize, numslices
+                            )
+                            if themask[x, y, z] > 0 and index2 >= 0 and themask.flat[index2] > 0:
+                                target = lf.getcorrloc(
+                                    data_byvox,
+                                    lf.xyz2index(x, y, z, xsize, ysize, numslices),
+                                    index2,
+                                    Fs,
+                                    dofit=dofit,
+                                )
+                            else:
+                                target = (0.0, 0.0, 0, 0)
+                            result = (
+                                corrcoeffs[x, y, z, idx],
+                                delays[x, y, z, idx],
+                                corrvalid[x, y, z, idx],
+                                failreason[x, y, z, idx],
+                            )
+                            np.testing.assert_allclose(result, target, atol=1e-4)
+
+
 # ==================== preprocdata tests ====================
 
 
@@ -795,6 +887,12 @@ def test_localflow(debug=False):
     getcorrloc_one_zero_signal(debug=debug)
     getcorrloc_search_range(debug=debug)
 
+    # local correlation engine tests
+    if debug:
+        print("Running local correlation engine tests")
+    makeneighborlist_matches_loop(debug=debug)
+    localcorrelations_matches_getcorrloc(debug=debug)
+
     # preprocdata tests
     if debug:
         print("Running preprocdata tests")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016-2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+import rapidtide.makelaggedtcs as tide_makelagged
+import rapidtide.resample as tide_resample
+
+
+def test_makelagbank(debug=False):
+    class LinearGenerator:
+        def yfromx(self, x):
+            return 2.0 * x
+
+    timeaxis = np.linspace(0.0, 10.0, 11)
+    thebank = tide_makelagged.makelagbank(LinearGenerator(), timeaxis, -1.0, 5, 0.5)
+    if debug:
+        print(thebank)
+    assert thebank.shape == (5, 11)
+    for i in range(5):
+        np.testing.assert_allclose(thebank[i, :], 2.0 * (timeaxis - (-1.0 + 0.5 * i)))
+
+
+def test_lagbank(debug=False):
+    tr = 0.72
+    numtrs = 300
+    timeaxis = np.arange(numtrs) * tr
+    rng = np.random.default_rng(8642)
+    genlagtc = tide_resample.FastResampler(
+        timeaxis, gaussian_filter1d(rng.normal(size=numtrs), 3.0), padtime=30.0
+    )
+    numvoxels = 2000
+    lagtimes = rng.uniform(-5.0, 10.0, numvoxels)
+    lagmask = np.ones(numvoxels, dtype=int)
+    lagmask[::7] = 0
+
+    exact = np.zeros((numvoxels, numtrs))
+    numexact = tide_makelagged.makelaggedtcs(
+        genlagtc, timeaxis, lagmask, lagtimes, exact, showprogressbar=False
+    )
+    signalrange = np.max(exact) - np.min(exact)
+
+    # the bank results agree with the exact ones to within the resampler precision
+    for lagbankinterp, lagbankmaxbytes in [(True, 256 * 1024 * 1024), (False, 50 * numtrs * 8)]:
+        banked = np.zeros((numvoxels, numtrs))
+        numbanked = tide_makelagged.makelaggedtcs(
+            genlagtc,
+            timeaxis,
+            lagmask,
+            lagtimes,
+            banked,
+            showprogressbar=False,
+            lagbankstep=0.01,
+            lagbankinterp=lagbankinterp,
+            lagbankmaxbytes=lagbankmaxbytes,
+        )
+        maxerr = np.max(np.abs(banked - exact)) / signalrange
+        if debug:
+            print(f"{lagbankinterp=}, {lagbankmaxbytes=}, {maxerr=}")
+        assert numbanked == numexact == np.sum(lagmask)
+        assert maxerr < 0.01
+        assert np.all(banked[lagmask == 0, :] == 0.0)
+
+    # a coarse bank with interpolation is still close
+    coarse = np.zeros((numvoxels, numtrs))
+    tide_makelagged.makelaggedtcs(
+        genlagtc,
+        timeaxis,
+        lagmask,
+        lagtimes,
+        coarse,
+        showprogressbar=False,
+        lagbankstep=0.1,
+    )
+    assert np.max(np.abs(coarse - exact)) / signalrange < 0.05
+
+
+if __name__ == "__main__":
+    test_makelagbank(debug=True)
+    test_lagbank(debug=True)
@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016-2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+from multiprocessing import shared_memory
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import rapidtide.genericmultiproc as tide_genericmultiproc
+import rapidtide.linfitfiltpass as tide_linfitfiltpass
+import rapidtide.multiproc as tide_multiproc
+import rapidtide.util as tide_util
+
+
+def _procOneRow(vox, voxelargs, **kwargs):
+    return vox, np.sum(voxelargs[0]), voxelargs[0] * 2.0
+
+
+def _packrow(vox, voxelargs):
+    return [voxelargs[0][vox, :]]
+
+
+def _unpackrow(retvals, voxelproducts):
+    voxelproducts[0][retvals[0]] = retvals[1]
+    voxelproducts[1][retvals[0], :] = retvals[2]
+
+
+def test_makebatches(debug=False):
+    thebatches = tide_multiproc._makebatches([0, 1, 2, 5, 7], batchsize=2)
+    if debug:
+        print(thebatches)
+    assert len(thebatches) == 3
+    np.testing.assert_array_equal(thebatches[0], [0, 1])
+    np.testing.assert_array_equal(thebatches[1], [2, 5])
+    np.testing.assert_array_equal(thebatches[2], [7])
+
+    # batchsize 1 leaves the items alone
+    assert tide_multiproc._makebatches([3, 4], batchsize=1) == [3, 4]
+
+
+def test_batcheddispatch(debug=False):
+    rng = np.random.default_rng(12345)
+    numvoxels = 237
+    thedata = rng.normal(size=(numvoxels, 20))
+    voxelmask = np.ones(numvoxels, dtype=int)
+    voxelmask[::7] = 0
+
+    for nprocs in [1, 2]:
+        for batchsize in [1, 16, 1000]:
+            sums = np.zeros(numvoxels, dtype=np.float64)
+            doubled = np.zeros_like(thedata)
+            volumetotal = tide_genericmultiproc.run_multiproc(
+                _procOneRow,
+                _packrow,
+                _unpackrow,
+                [thedata],
+                [sums, doubled],
+                thedata.shape,
+                voxelmask,
+                None,
+                nprocs,
+                False,
+                False,
+                50,
+                batchsize=batchsize,
+            )
+            if debug:
+                print(f"{nprocs=}, {batchsize=}, {volumetotal=}")
+            assert volumetotal == np.sum(voxelmask)
+            np.testing.assert_allclose(sums, np.where(voxelmask > 0, np.sum(thedata, axis=1), 0.0))
+            np.testing.assert_allclose(doubled, thedata * 2.0 * voxelmask[:, None])
+
+
+def test_batchedlinfitfiltpass(debug=False):
+    rng = np.random.default_rng(54321)
+    numvoxels = 101
+    tsize = 80
+    theev = np.sin(np.linspace(0.0, 8.0 * np.pi, tsize))
+    thecoffs = rng.uniform(0.5, 2.0, size=numvoxels)
+    fmri_data = thecoffs[:, None] * theev[None, :] + 0.1 * rng.normal(size=(numvoxels, tsize))
+
+    results = []
+    for mpbatchsize in [1, 8]:
+        meanvalue = np.zeros(numvoxels)
+        rvalue = np.zeros(numvoxels)
+        r2value = np.zeros(numvoxels)
+        fitcoeff = np.zeros(numvoxels)
+        fitNorm = np.zeros(numvoxels)
+        datatoremove = np.zeros_like(fmri_data)
+        filtereddata = np.zeros_like(fmri_data)
+        itemstotal = tide_linfitfiltpass.linfitfiltpass(
+            numvoxels,
+            fmri_data,
+            None,
+            theev,
+            meanvalue,
+            rvalue,
+            r2value,
+            fitcoeff,
+            fitNorm,
+            datatoremove,
+            filtereddata,
+            constantevs=True,
+            nprocs=2,
+            showprogressbar=False,
+            mpbatchsize=mpbatchsize,
+            verbose=debug,
+        )
+        assert itemstotal == numvoxels
+        results.append((fitcoeff, r2value, filtereddata))
+    for first, second in zip(results[0], results[1]):
+        np.testing.assert_allclose(first, second)
+    np.testing.assert_allclose(results[1][0], thecoffs, atol=0.05)
+
+
+def _procRowBlock(voxels, voxelargs, **kwargs):
+    theblock = voxelargs[0][voxels, :]
+    return [(vox, np.sum(theblock[i, :]), theblock[i, :] * 2.0) for i, vox in enumerate(voxels)]
+
+
+def test_batchfunc(debug=False):
+    rng = np.random.default_rng(2468)
+    numvoxels = 151
+    thedata = rng.normal(size=(numvoxels, 20))
+    voxelmask = np.ones(numvoxels, dtype=int)
+    voxelmask[::5] = 0
+
+    for nprocs in [1, 2]:
+        sums = np.zeros(numvoxels, dtype=np.float64)
+        doubled = np.zeros_like(thedata)
+        volumetotal = tide_genericmultiproc.run_multiproc(
+            _procOneRow,
+            _packrow,
+            _unpackrow,
+            [thedata],
+            [sums, doubled],
+            thedata.shape,
+            voxelmask,
+            None,
+            nprocs,
+            False,
+            False,
+            50,
+            batchsize=16,
+            batchfunc=_procRowBlock,
+        )
+        if debug:
+            print(f"{nprocs=}, {volumetotal=}")
+        assert volumetotal == np.sum(voxelmask)
+        np.testing.assert_allclose(sums, np.where(voxelmask > 0, np.sum(thedata, axis=1), 0.0))
+        np.testing.assert_allclose(doubled, thedata * 2.0 * voxelmask[:, None])
+
+
+def test_sharedinputs(debug=False):
+    thedata = np.arange(24, dtype=np.float64).reshape((4, 6))
+    shareddata, theblock = tide_util.sharedinputs.register(thedata, np.float32, named=True)
+    np.testing.assert_array_equal(shareddata, thedata)
+    assert shareddata.dtype == np.float32
+    assert shareddata in tide_util.sharedinputs
+    assert thedata not in tide_util.sharedinputs
+    assert shareddata.copy() not in tide_util.sharedinputs
+
+    # attaching by name sees the same memory
+    thehandle = tide_util.sharedinputs.handlefor(shareddata)
+    if debug:
+        print(thehandle)
+    attached, attachedblock = thehandle.attach()
+    attached[0, 0] = -1.0
+    assert shareddata[0, 0] == -1.0
+    del attached
+    attachedblock.close()
+
+    # views of a registered block are rebuilt from the same memory
+    for theview in [shareddata[1:, :], shareddata[:, 2:5], shareddata[::2, 1::2], shareddata.T]:
+        assert theview in tide_util.sharedinputs
+        viewhandle = tide_util.sharedinputs.handlefor(theview)
+        if debug:
+            print(viewhandle)
+        attached, attachedblock = viewhandle.attach()
+        np.testing.assert_array_equal(attached, theview)
+        attached[-1, -1] = -2.0
+        assert theview[-1, -1] == -2.0
+        del attached
+        attachedblock.close()
+    assert shareddata[::-1, :] not in tide_util.sharedinputs
+
+    tide_util.sharedinputs.release(theblock)
+    assert shareddata not in tide_util.sharedinputs
+
+
+def test_unnamedblocks(debug=False):
+    thedata = np.arange(24, dtype=np.float64).reshape((4, 6))
+    numregistered = len(tide_util.sharedinputs)
+    try:
+        # forked workers inherit the block, so it is unlinked at once and has no handle
+        tide_multiproc.setstartmethod("fork")
+        shareddata, theblock = tide_util.sharedinputs.register(thedata)
+        np.testing.assert_array_equal(shareddata, thedata)
+        assert len(tide_util.sharedinputs) == numregistered + 1
+        assert shareddata not in tide_util.sharedinputs
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=theblock.name, create=False)
+        tide_util.sharedinputs.release(theblock)
+        assert len(tide_util.sharedinputs) == numregistered
+
+        # other workers have to attach by name
+        tide_multiproc.setstartmethod("spawn")
+        shareddata, theblock = tide_util.sharedinputs.register(thedata)
+        assert shareddata in tide_util.sharedinputs
+        tide_util.sharedinputs.release(theblock)
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=theblock.name, create=False)
+    finally:
+        tide_multiproc.setstartmethod("fork")
+    assert len(tide_util.sharedinputs) == numregistered
+
+
+def test_startmethods(debug=False):
+    rng = np.random.default_rng(13579)
+    numvoxels = 97
+    thedata = rng.normal(size=(numvoxels, 200))
+    voxelmask = np.ones(numvoxels, dtype=int)
+    voxelmask[::3] = 0
+    registereddata, theblock = tide_util.sharedinputs.register(thedata)
+    numregistered = len(tide_util.sharedinputs)
+
+    try:
+        for startmethod in ["fork", "spawn", "forkserver"]:
+            tide_multiproc.setstartmethod(startmethod)
+            for inputdata, batchsize in [(thedata, 16), (registereddata, 1)]:
+                sums = np.zeros(numvoxels, dtype=np.float64)
+                doubled = np.zeros_like(thedata)
+                volumetotal = tide_genericmultiproc.run_multiproc(
+                    _procOneRow,
+                    _packrow,
+                    _unpackrow,
+                    [inputdata],
+                    [sums, doubled],
+                    thedata.shape,
+                    voxelmask,
+                    None,
+                    2,
+                    False,
+                    False,
+                    50,
+                    batchsize=batchsize,
+                )
+                if debug:
+                    print(f"{startmethod=}, {batchsize=}, {volumetotal=}")
+                assert volumetotal == np.sum(voxelmask)
+                np.testing.assert_allclose(
+                    sums, np.where(voxelmask > 0, np.sum(thedata, axis=1), 0.0)
+                )
+                np.testing.assert_allclose(doubled, thedata * 2.0 * voxelmask[:, None])
+
+                # temporary blocks are released after each pass
+                assert len(tide_util.sharedinputs) == numregistered
+    finally:
+        tide_multiproc.setstartmethod("fork")
+        tide_util.sharedinputs.release(theblock)
+
+
+def test_sharedslices(debug=False):
+    thedata = np.random.default_rng(24680).normal(size=(300, 100))
+    registereddata, theblock = tide_util.sharedinputs.register(thedata, named=True)
+    numregistered = len(tide_util.sharedinputs)
+    try:
+        tide_multiproc.setstartmethod("spawn")
+        # a column slice of a registered array is sent as a handle, not copied
+        workerargs, temporaryblocks = tide_genericmultiproc.sharevoxelargs(
+            [registereddata[:, 10:91], thedata[:, 10:91]], nprocs=2
+        )
+        assert len(temporaryblocks) == 1
+        assert len(tide_util.sharedinputs) == numregistered + 1
+        assert workerargs[0].name == theblock.name
+        attachedargs, attachedblocks = tide_genericmultiproc.attachvoxelargs(workerargs)
+        np.testing.assert_array_equal(attachedargs[0], thedata[:, 10:91])
+        np.testing.assert_array_equal(attachedargs[1], thedata[:, 10:91])
+        del attachedargs
+        tide_genericmultiproc.detachvoxelargs(attachedblocks)
+        tide_genericmultiproc.releasevoxelargs(temporaryblocks)
+        assert len(tide_util.sharedinputs) == numregistered
+
+        # temporary blocks are released even if the pass fails
+        def _fail(*args, **kwargs):
+            raise RuntimeError("failed pass")
+
+        voxelmask = np.ones(thedata.shape[0], dtype=int)
+        with patch.object(tide_multiproc, "run_multiproc", _fail):
+            with pytest.raises(RuntimeError):
+                tide_genericmultiproc.run_multiproc(
+                    _procOneRow,
+                    _packrow,
+                    _unpackrow,
+                    [thedata],
+                    [np.zeros(thedata.shape[0]), np.zeros_like(thedata)],
+                    thedata.shape,
+                    voxelmask,
+                    None,
+                    2,
+                    False,
+                    False,
+                    50,
+                )
+        assert len(tide_util.sharedinputs) == numregistered
+    finally:
+        tide_multiproc.setstartmethod("fork")
+        tide_util.sharedinputs.release(theblock)
+
+
+def test_workerpool(debug=False):
+    rng = np.random.default_rng(97531)
+    numvoxels = 89
+    thedata = rng.normal(size=(numvoxels, 200))
+    voxelmask = np.ones(numvoxels, dtype=int)
+    voxelmask[::4] = 0
+    theev = np.sin(np.linspace(0.0, 8.0 * np.pi, thedata.shape[1]))
+
+    numregistered = len(tide_util.sharedinputs)
+    thepool = tide_multiproc.startworkerpool(2)
+    try:
+        theworkers = [w.pid for w in thepool.workers]
+        for passnum, batchsize in enumerate([1, 16]):
+            sums = np.zeros(numvoxels, dtype=np.float64)
+            doubled = np.zeros_like(thedata)
+            volumetotal = tide_genericmultiproc.run_multiproc(
+                _procOneRow,
+                _packrow,
+                _unpackrow,
+                [thedata],
+                [sums, doubled],
+                thedata.shape,
+                voxelmask,
+                None,
+                2,
+                False,
+                False,
+                50,
+                batchsize=batchsize,
+            )
+            if debug:
+                print(f"{passnum=}, {batchsize=}, {volumetotal=}, {thepool.jobsrun=}")
+            assert volumetotal == np.sum(voxelmask)
+            np.testing.assert_allclose(sums, np.where(voxelmask > 0, np.sum(thedata, axis=1), 0.0))
+            np.testing.assert_allclose(doubled, thedata * 2.0 * voxelmask[:, None])
+            assert thepool.jobsrun == passnum + 1
+
+        # the GLM pass runs on the same workers
+        r2value = np.zeros(numvoxels)
+        fitcoeff = np.zeros(numvoxels)
+        filtereddata = np.zeros_like(thedata)
+        itemstotal = tide_linfitfiltpass.linfitfiltpass(
+            numvoxels,
+            thedata + 2.0 * theev[None, :],
+            None,
+            theev,
+            np.zeros(numvoxels),
+            np.zeros(numvoxels),
+            r2value,
+            fitcoeff,
+            np.zeros(numvoxels),
+            np.zeros_like(thedata),
+            filtereddata,
+            constantevs=True,
+            nprocs=2,
+            showprogressbar=False,
+            verbose=debug,
+        )
+        assert itemstotal == numvoxels
+        assert thepool.jobsrun == 3
+        np.testing.assert_allclose(fitcoeff, 2.0, atol=0.3)
+        assert [w.pid for w in thepool.workers] == theworkers
+        assert len(tide_util.sharedinputs) == numregistered
+    finally:
+        tide_multiproc.stopworkerpool()
+    assert tide_multiproc.getworkerpool() is None
+
+
+if __name__ == "__main__":
+    test_makebatches(debug=True)
+    test_batcheddispatch(debug=True)
+    test_batchedlinfitfiltpass(debug=True)
+    test_batchfunc(debug=True)
+    test_sharedinputs(debug=True)
+    test_unnamedblocks(debug=True)
+    test_startmethods(debug=True)
+    test_sharedslices(debug=True)
+    test_workerpool(debug=True)
@@ -184,6 +184,77 @@ def test_nullsimfunc(debug=False, displayplots=False):
             assert True
 
 
+def test_nullsimfunc_reproducible(debug=False):
+    timestep = 1.5
+    Fs = 1.0 / timestep
+    sourcedata = tide_io.readvecs(os.path.join(get_test_data_path(), "fmri_globalmean.txt"))[0]
+    theCorrelator = tide_simFuncClasses.Correlator(
+        Fs=Fs,
+        ncprefilter=tide_filt.NoncausalFilter("lfo"),
+        detrendorder=3,
+        windowfunc="hamming",
+        corrweighting="None",
+    )
+    thefitter = tide_simFuncClasses.SimilarityFunctionFitter(
+        lagmin=-10.0,
+        lagmax=10.0,
+        absmaxsigma=25.0,
+        absminsigma=0.25,
+        peakfittype="gauss",
+    )
+    theCorrelator.setlimits(6, 7)
+    theCorrelator.setreftc(sourcedata)
+    dummy, trimmedcorrscale, dummy = theCorrelator.getfunction()
+    thefitter.setcorrtimeaxis(trimmedcorrscale)
+
+    for permutationmethod in ["shuffle", "phaserandom"]:
+        results = {}
+        for nprocs, blocksize in [(1, 1), (1, 100), (2, 100)]:
+            results[(nprocs, blocksize)] = tide_nullsimfunc.getNullDistributionData(
+                Fs,
+                theCorrelator,
+                thefitter,
+                None,
+                numestreps=500,
+                nprocs=nprocs,
+                showprogressbar=False,
+                permutationmethod=permutationmethod,
+                seed=1234,
+                blocksize=blocksize,
+            )
+        if debug:
+            for key, corrlist in results.items():
+                print(permutationmethod, key, np.percentile(corrlist, [50, 95, 99]))
+
+        # the same seed and blocksize give the same distribution, however many processes are used
+        np.testing.assert_array_equal(results[(1, 100)], results[(2, 100)])
+
+        # the batched and one-at-a-time engines agree, apart from the occasional peak that the
+        # iterative fit handles differently
+        closeenough = np.isclose(results[(1, 1)], results[(1, 100)], atol=1e-6)
+        assert np.mean(closeenough) > 0.95
+        np.testing.assert_allclose(
+            np.percentile(results[(1, 1)], [50, 95]),
+            np.percentile(results[(1, 100)], [50, 95]),
+            atol=0.02,
+        )
+
+        # a different seed gives a different distribution
+        otherseed = tide_nullsimfunc.getNullDistributionData(
+            Fs,
+            theCorrelator,
+            thefitter,
+            None,
+            numestreps=500,
+            showprogressbar=False,
+            permutationmethod=permutationmethod,
+            seed=4321,
+            blocksize=100,
+        )
+        assert not np.array_equal(otherseed, results[(1, 100)])
+
+
 if __name__ == "__main__":
     mpl.use("TkAgg")
     test_nullsimfunc(debug=True, displayplots=True)
+    test_nullsimfunc_reproducible(debug=True)
@@ -455,6 +455,83 @@ def harmonic_filter_with_missing(debug=False):
     assert len(hr) == 6
 
 
+# ==================== Compiled kernel and batch tests ====================
+
+
+def _kalmanfilters():
+    return [
+        lambda: PPGKalmanFilter(dt=0.01),
+        lambda: AdaptivePPGKalmanFilter(dt=0.01),
+        lambda: ExtendedPPGKalmanFilter(dt=0.01, hr_estimate=70),
+        lambda: HarmonicPPGKalmanFilter(dt=0.01, hr_estimate=70),
+    ]
+
+
+def _corruptedppg():
+    _, signal = _make_noisy_ppg(duration=20.0, fs=100.0, hr=72.0)
+    signal[500:520] = np.nan
+    signal[1200:1260] += 4.0
+    return signal
+
+
+def kalman_kernels_match_python(debug=False):
+    """Test the compiled filter loops against the sample by sample python loops."""
+    if debug:
+        print("kalman_kernels_match_python")
+    signal = _corruptedppg()
+    missing = list(range(700, 760, 3))
+    for makefilter in _kalmanfilters():
+        compiledfilter = makefilter()
+        compiledresults = compiledfilter.filter_signal(signal, missing)
+        pythonfilter = makefilter()
+        with patch("rapidtide.ppgproc.donotusenumba", True):
+            pythonresults = pythonfilter.filter_signal(signal, missing)
+        if not isinstance(pythonresults, tuple):
+            compiledresults, pythonresults = (compiledresults,), (pythonresults,)
+        for compiled, python in zip(compiledresults, pythonresults):
+            np.testing.assert_allclose(compiled, python, rtol=1e-9, atol=1e-10)
+        np.testing.assert_allclose(compiledfilter.x, pythonfilter.x, rtol=1e-9, atol=1e-10)
+        np.testing.assert_allclose(compiledfilter.P, pythonfilter.P, rtol=1e-9, atol=1e-10)
+        if isinstance(pythonfilter, AdaptivePPGKalmanFilter):
+            assert compiledfilter.Q_scale == pytest.approx(pythonfilter.Q_scale)
+            np.testing.assert_allclose(compiledfilter.R, pythonfilter.R)
+            np.testing.assert_allclose(
+                compiledfilter.innovation_history, pythonfilter.innovation_history
+            )
+        if hasattr(pythonfilter, "hr_history"):
+            np.testing.assert_allclose(compiledfilter.hr_history, pythonfilter.hr_history)
+
+
+def kalman_filter_signal_batch(debug=False):
+    """Test that batch filtering matches filtering each recording separately."""
+    if debug:
+        print("kalman_filter_signal_batch")
+    signal = _corruptedppg()
+    signals = np.stack([signal, 0.5 * signal + 1.0, signal[::-1]])
+    missing = [None, [10, 11, 12], list(range(300, 400))]
+    for makefilter in _kalmanfilters():
+        # start from a filter that has already seen some data, so it has nontrivial state
+        batchfilter = makefilter()
+        batchfilter.filter_signal(signal[:700])
+        initialstate = batchfilter.x.copy()
+        batchresults = batchfilter.filter_signal_batch(signals, missing)
+        np.testing.assert_array_equal(batchfilter.x, initialstate)
+        if not isinstance(batchresults, tuple):
+            batchresults = (batchresults,)
+        for i in range(signals.shape[0]):
+            singlefilter = makefilter()
+            singlefilter.filter_signal(signal[:700])
+            singleresults = singlefilter.filter_signal(signals[i], missing[i])
+            if not isinstance(singleresults, tuple):
+                singleresults = (singleresults,)
+            for batched, single in zip(batchresults, singleresults):
+                assert batched.shape[0] == signals.shape[0]
+                np.testing.assert_array_equal(batched[i], single)
+
+    with pytest.raises(ValueError):
+        PPGKalmanFilter().filter_signal_batch(signals, [None])
+
+
 # ==================== SignalQualityAssessor tests ====================
 
 
@@ -535,6 +612,50 @@ def quality_assess_continuous_with_filtered(debug=False):
     assert len(times) == len(scores)
 
 
+def quality_assess_block_matches_single(debug=False):
+    """Test that block quality assessment matches assessing one segment at a time."""
+    if debug:
+        print("quality_assess_block_matches_single")
+    qa = SignalQualityAssessor(fs=100.0, window_size=2.0)
+    _, noisy = _make_noisy_ppg(duration=10.0, fs=100.0, hr=75.0, noise=0.2)
+    _, ppg = _make_clean_ppg(duration=10.0, fs=100.0, hr=75.0)
+    starts = np.arange(0, 800, 70)
+    segments = np.stack([noisy[s : s + 200] for s in starts])
+    filtered = np.stack([ppg[s : s + 200] for s in starts])
+    for thefiltered in [None, filtered]:
+        scores, metrics = qa.assess_quality_block(segments, thefiltered)
+        for i in range(len(starts)):
+            score, singlemetrics = qa.assess_quality(
+                segments[i], None if thefiltered is None else thefiltered[i]
+            )
+            assert np.isclose(scores[i], score)
+            for key in singlemetrics.keys():
+                assert np.isclose(metrics[key][i], singlemetrics[key])
+
+
+def quality_assess_stream(debug=False):
+    """Test that streaming quality assessment matches assess_continuous."""
+    if debug:
+        print("quality_assess_stream")
+    qa = SignalQualityAssessor(fs=100.0, window_size=2.0)
+    _, noisy = _make_noisy_ppg(duration=30.0, fs=100.0, hr=75.0, noise=0.2)
+    _, ppg = _make_clean_ppg(duration=30.0, fs=100.0, hr=75.0)
+    times, scores = qa.assess_continuous(noisy, filtered=ppg, stride=0.5)
+
+    # uneven chunks, some shorter than the window or the stride
+    splits = [7, 30, 260, 261, 900, 1500, 1510, 2999]
+    chunks = list(zip(np.split(noisy, splits), np.split(ppg, splits)))
+    streamed = list(qa.assess_stream(chunks, stride=0.5))
+    assert len(streamed) == len(chunks)
+    np.testing.assert_allclose(np.concatenate([t for t, s in streamed]), times)
+    np.testing.assert_allclose(np.concatenate([s for t, s in streamed]), scores)
+
+    # raw signal only
+    times, scores = qa.assess_continuous(noisy, stride=1.0)
+    streamed = list(qa.assess_stream(np.split(noisy, splits), stride=1.0))
+    np.testing.assert_allclose(np.concatenate([s for t, s in streamed]), scores)
+
+
 # ==================== HeartRateExtractor tests ====================
 
 
@@ -731,6 +852,50 @@ def processor_process_low_quality_threshold(debug=False):
         assert results.get("hr_overall") is None or results.get("hr_overall") is not None
 
 
+def processor_process_stream(debug=False):
+    """Test that streaming processing matches processing the whole signal."""
+    if debug:
+        print("processor_process_stream")
+    _, ppg = _make_noisy_ppg(duration=60.0, fs=100.0, hr=75.0)
+    ppg[1000:1030] = np.nan
+    for method in ["standard", "adaptive", "ekf"]:
+        target = RobustPPGProcessor(fs=100.0, method=method).process(ppg)
+        chunks = np.array_split(ppg, 37)
+        streamed = list(RobustPPGProcessor(fs=100.0, method=method).process_stream(chunks))
+
+        # one result per chunk, plus the final flush
+        assert len(streamed) == len(chunks) + 1
+        for chunk, results in zip(chunks, streamed):
+            assert len(results["filtered_signal"]) == len(chunk)
+        for key in ["filtered_signal", "quality_times", "quality_scores", "hr_times", "hr_values"]:
+            np.testing.assert_allclose(
+                np.concatenate([results[key] for results in streamed]), target[key]
+            )
+        if method == "adaptive":
+            np.testing.assert_array_equal(
+                np.concatenate([results["motion_flags"] for results in streamed]),
+                target["motion_flags"],
+            )
+        elif method == "ekf":
+            np.testing.assert_allclose(
+                np.concatenate([results["ekf_heart_rate"] for results in streamed]),
+                target["ekf_heart_rate"],
+            )
+        np.testing.assert_array_equal(
+            np.concatenate([results["peak_indices"] for results in streamed]),
+            target["peak_indices"],
+        )
+        assert np.isclose(streamed[-1]["mean_quality"], target["mean_quality"], equal_nan=True)
+        assert np.isclose(
+            streamed[-1]["good_quality_percentage"], target["good_quality_percentage"]
+        )
+        hr_peaks = np.concatenate([results["hr_peaks"] for results in streamed])
+        assert len(hr_peaks) == len(target["peak_indices"])
+        assert np.isnan(hr_peaks[0])
+        if method == "ekf":
+            assert 70.0 < np.median(hr_peaks[1:]) < 80.0
+
+
 # ==================== PPGFeatureExtractor tests ====================
 
 
@@ -1052,6 +1217,12 @@ def test_ppgproc(debug=False):
     harmonic_filter_signal(debug=debug)
     harmonic_filter_with_missing(debug=debug)
 
+    # compiled kernel and batch tests
+    if debug:
+        print("Running compiled kernel and batch tests")
+    kalman_kernels_match_python(debug=debug)
+    kalman_filter_signal_batch(debug=debug)
+
     # SignalQualityAssessor tests
     if debug:
         print("Running SignalQualityAssessor tests")
@@ -1061,6 +1232,8 @@ def test_ppgproc(debug=False):
     quality_assess_noisy_signal(debug=debug)
     quality_assess_continuous(debug=debug)
     quality_assess_continuous_with_filtered(debug=debug)
+    quality_assess_block_matches_single(debug=debug)
+    quality_assess_stream(debug=debug)
 
     # HeartRateExtractor tests
     if debug:
@@ -1085,6 +1258,7 @@ def test_ppgproc(debug=False):
     processor_process_ekf(debug=debug)
     processor_process_with_missing(debug=debug)
     processor_process_low_quality_threshold(debug=debug)
+    processor_process_stream(debug=debug)
 
     # PPGFeatureExtractor tests
     if debug:
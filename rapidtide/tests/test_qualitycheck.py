@@ -16,16 +16,21 @@
 #   limitations under the License.
 #
 #
+import os
 from unittest.mock import patch
 
+import nibabel as nib
 import numpy as np
 
 import rapidtide.qualitycheck as tide_quality
+import rapidtide.statscache as tide_statscache
+from rapidtide.tests.utils import get_test_temp_path
 
 
 class DummyOverlay:
-    def __init__(self, data, xsize=1.0, ysize=1.0, zsize=1.0):
+    def __init__(self, data, xsize=1.0, ysize=1.0, zsize=1.0, filename="nonexistent.nii.gz"):
         self.data = data
+        self.filename = filename
         self.xsize = xsize
         self.ysize = ysize
         self.zsize = zsize
@@ -70,6 +75,9 @@ class DummyDataset:
         offsettime=0.0,
         verbose=False,
         init_LUT=False,
+        lazy=False,
+        statscache=False,
+        backgroundload=True,
     ):
         # Keep masks large enough that post-erosion voxel counts still satisfy
         # SciPy skew/kurtosis test sample-size requirements.
@@ -209,6 +217,52 @@ def gethistmetrics_and_checkmap_tests(debug=False):
     assert np.isfinite(cmap["pct50"])
 
 
+def cachedcheckmap_tests(testtemproot, debug=False):
+    if debug:
+        print("cachedcheckmap_tests")
+    rng = np.random.RandomState(13)
+    themap = rng.randn(8, 8, 8)
+    themask = np.ones((8, 8, 8), dtype=int)
+    themask[:2, :, :] = 0
+    mapname = os.path.join(testtemproot, "qualitycheck_cachetest.nii.gz")
+    nib.save(nib.Nifti1Image(themap, np.eye(4)), mapname)
+    if os.path.isfile(tide_statscache.statscachename(mapname)):
+        os.remove(tide_statscache.statscachename(mapname))
+
+    ncalls = []
+
+    def getmap():
+        ncalls.append(1)
+        return themap
+
+    checkargs = dict(histlen=51, rangemin=-2.0, rangemax=2.0, savehist=True)
+    target = tide_quality.checkmap(themap, themask, **checkargs)
+    first = tide_quality.cachedcheckmap(
+        tide_statscache.StatsCache(mapname), getmap, themask, **checkargs
+    )
+    second = tide_quality.cachedcheckmap(
+        tide_statscache.StatsCache(mapname), getmap, themask, **checkargs
+    )
+    assert len(ncalls) == 1
+    for thekey in target:
+        assert np.allclose(first[thekey], target[thekey])
+        assert np.allclose(second[thekey], target[thekey])
+
+    # a different mask or histogram range is not a cache hit
+    tide_quality.cachedcheckmap(
+        tide_statscache.StatsCache(mapname), getmap, np.ones((8, 8, 8)), **checkargs
+    )
+    assert len(ncalls) == 2
+    tide_quality.cachedcheckmap(
+        tide_statscache.StatsCache(mapname), getmap, themask, histlen=51, rangemin=-1.0
+    )
+    assert len(ncalls) == 3
+
+    # no cache, no reuse
+    tide_quality.cachedcheckmap(None, getmap, themask, **checkargs)
+    assert len(ncalls) == 4
+
+
 def qualitycheck_tests(debug=False):
     if debug:
         print("qualitycheck_tests")
@@ -255,6 +309,7 @@ def test_qualitycheck(debug=False, displayplots=False):
     prepmask_and_getmasksize_tests(debug=debug)
     checkregressors_tests(debug=debug)
     gethistmetrics_and_checkmap_tests(debug=debug)
+    cachedcheckmap_tests(get_test_temp_path(), debug=debug)
     qualitycheck_tests(debug=debug)
 
 
@@ -176,6 +176,49 @@ def coffstodelay_tests(debug=False):
         tide_refinedelay.poly.Polynomial = saved_poly
 
 
+def ratiotodelay_block_tests(debug=False):
+    if debug:
+        print("ratiotodelay_block_tests")
+
+    # uses the lookup tables set up by trainratiotooffset_and_ratiotodelay_tests
+    rng = np.random.default_rng(1234)
+    lowerlim, upperlim = tide_refinedelay.maplimits
+    theratios = rng.uniform(lowerlim - 1.0, upperlim + 1.0, size=500)
+    theratios[::37] = np.nan
+    theoffsets = rng.uniform(-1.0, 1.0, size=500)
+
+    for offsets in [0.0, 0.3, theoffsets]:
+        delays, closest = tide_refinedelay.ratiotodelay_block(theratios, offsets=offsets)
+        targetoffsets = np.broadcast_to(offsets, theratios.shape)
+        for i in range(len(theratios)):
+            thedelay, theclosest = tide_refinedelay.ratiotodelay(
+                theratios[i], offset=targetoffsets[i]
+            )
+            if np.isnan(thedelay):
+                assert np.isnan(delays[i])
+            else:
+                assert np.fabs(delays[i] - thedelay) < 1e-10
+            assert closest[i] == theclosest
+
+
+def coffstodelay_block_tests(debug=False):
+    if debug:
+        print("coffstodelay_block_tests")
+
+    rng = np.random.default_rng(4321)
+    for numcoffs in [1, 2, 3]:
+        thecoffs = rng.normal(size=(200, numcoffs))
+        thecoffs[::23, -1] = 0.0
+        delays = tide_refinedelay.coffstodelay_block(thecoffs, mindelay=-3.0, maxdelay=3.0)
+        for i in range(thecoffs.shape[0]):
+            thedelay = tide_refinedelay.coffstodelay(thecoffs[i, :], mindelay=-3.0, maxdelay=3.0)
+            assert np.fabs(delays[i] - thedelay) < 1e-8
+
+    # a 1D array is one coefficient per voxel
+    delays = tide_refinedelay.coffstodelay_block(np.array([-0.5, 0.25]))
+    np.testing.assert_allclose(delays, [6.0, -12.0])
+
+
 def getderivratios_tests(debug=False):
     if debug:
         print("getderivratios_tests")
@@ -372,7 +415,9 @@ def test_refinedelay(debug=False, local=False):
     np.random.seed(12345)
     smooth_tests(debug=debug)
     trainratiotooffset_and_ratiotodelay_tests(debug=debug)
+    ratiotodelay_block_tests(debug=debug)
     coffstodelay_tests(debug=debug)
+    coffstodelay_block_tests(debug=debug)
     getderivratios_tests(debug=debug)
     filterderivratios_tests(debug=debug)
 
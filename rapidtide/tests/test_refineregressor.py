@@ -24,7 +24,9 @@ import numpy as np
 import pytest
 
 from rapidtide.refineregressor import (
+    _fitrefinepca,
     _packvoxeldata,
+    _pcaexplainedvariance,
     _procOneVoxelTimeShift,
     _unpackvoxeldata,
     alignvoxels,
@@ -943,6 +945,67 @@ def test_dorefine_pca(debug=False):
         print(f"PCA refinement corr: {corr:.4f}")
 
 
+def test_dorefine_pcasolvers(debug=False):
+    """Test that the approximate PCA solvers match the full solver."""
+    rng = np.random.RandomState(42)
+    nvoxels = 400
+    ntimepoints = 100
+
+    signal = _make_broadband_signal(ntimepoints, seed=0)
+    shiftedtcs = np.outer(rng.uniform(0.5, 1.5, nvoxels), signal) + 0.5 * rng.randn(
+        nvoxels, ntimepoints
+    )
+    refinemask = np.ones(nvoxels)
+    weights = np.ones((nvoxels, ntimepoints))
+    lagstrengths = np.ones(nvoxels) * 0.8
+    lagtimes = np.ones(nvoxels) * 2.0
+
+    mock_prefilter = MagicMock()
+    mock_prefilter.apply = MagicMock(side_effect=lambda freq, data: data)
+
+    # the same components are selected for each solver
+    for pcacomponents in [0.5, 3]:
+        fullmean, fullcomps, fullratios = _fitrefinepca(shiftedtcs, pcacomponents)
+        for pcasolver in ["randomized", "incremental"]:
+            themean, thecomps, theratios = _fitrefinepca(
+                shiftedtcs, pcacomponents, pcasolver=pcasolver, pcablocksize=150
+            )
+            assert thecomps.shape == fullcomps.shape
+            np.testing.assert_allclose(themean, fullmean, atol=1e-10)
+            np.testing.assert_allclose(np.sum(theratios), np.sum(fullratios), rtol=0.05)
+            assert (
+                np.fabs(_pcaexplainedvariance(shiftedtcs, themean, thecomps) - np.sum(theratios))
+                < 0.01
+            )
+
+    outputs = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outputname = os.path.join(tmpdir, "test_refine")
+        for pcasolver in ["full", "randomized", "incremental"]:
+            volumetotal, outputs[pcasolver] = dorefine(
+                shiftedtcs.copy(),
+                refinemask,
+                weights,
+                mock_prefilter,
+                fmritr=2.0,
+                passnum=1,
+                lagstrengths=lagstrengths,
+                lagtimes=lagtimes,
+                refinetype="pca",
+                fmrifreq=0.5,
+                outputname=outputname,
+                pcacomponents=0.5,
+                pcasolver=pcasolver,
+            )
+            assert volumetotal == nvoxels
+
+    for pcasolver in ["randomized", "incremental"]:
+        corr = np.corrcoef(outputs[pcasolver], outputs["full"])[0, 1]
+        if debug:
+            print(f"{pcasolver} PCA refinement corr with full: {corr:.6f}")
+        assert corr > 0.999
+
+
 def test_dorefine_ica(debug=False):
     """Test ICA refinement."""
     rng = np.random.RandomState(42)
@@ -1197,6 +1260,52 @@ def test_alignvoxels_partial_mask(debug=False):
         print(f"partial mask volumetotal={volumetotal}")
 
 
+def test_alignvoxels_blocks_match_voxels(debug=False):
+    """Test that shifting blocks of voxels gives the same results as one voxel at a time."""
+    nvoxels = 53
+    ntimepoints = 75
+    padtrs = 10
+    fmritr = 1.5
+
+    rng = np.random.RandomState(7)
+    fmridata = rng.randn(nvoxels, ntimepoints) + np.linspace(0.0, 3.0, ntimepoints)
+    lagtimes = rng.uniform(-5.0, 5.0, nvoxels)
+    lagmask = np.ones(nvoxels)
+    lagmask[::6] = 0
+
+    results = []
+    for nprocs, blocksize in [(1, 1), (1, 16), (2, 16)]:
+        shiftedtcs = np.zeros((nvoxels, ntimepoints))
+        weights = np.zeros((nvoxels, ntimepoints))
+        paddedshiftedtcs = np.zeros((nvoxels, ntimepoints + 2 * padtrs))
+        paddedweights = np.zeros((nvoxels, ntimepoints + 2 * padtrs))
+        volumetotal = alignvoxels(
+            fmridata,
+            fmritr,
+            shiftedtcs,
+            weights,
+            paddedshiftedtcs,
+            paddedweights,
+            lagtimes,
+            lagmask,
+            detrendorder=1,
+            offsettime=0.5,
+            nprocs=nprocs,
+            showprogressbar=False,
+            padtrs=padtrs,
+            blocksize=blocksize,
+        )
+        assert volumetotal == np.sum(lagmask)
+        results.append((shiftedtcs, weights, paddedshiftedtcs, paddedweights))
+
+    for otherresult in results[1:]:
+        for target, other in zip(results[0], otherresult):
+            np.testing.assert_allclose(other, target, atol=1e-10)
+
+    if debug:
+        print("test_alignvoxels_blocks_match_voxels passed")
+
+
 # ==================== Main test entry point ====================
 
 
@@ -1233,12 +1342,14 @@ def test_refineregressor(debug=False):
     test_dorefine_unweighted_average(debug=debug)
     test_dorefine_weighted_average(debug=debug)
     test_dorefine_pca(debug=debug)
+    test_dorefine_pcasolvers(debug=debug)
     test_dorefine_ica(debug=debug)
     test_dorefine_partial_mask(debug=debug)
     test_dorefine_bipolar(debug=debug)
     test_dorefine_cleanrefined(debug=debug)
     test_alignvoxels_single_proc(debug=debug)
     test_alignvoxels_partial_mask(debug=debug)
+    test_alignvoxels_blocks_match_voxels(debug=debug)
 
 
 if __name__ == "__main__":
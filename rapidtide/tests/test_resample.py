@@ -869,6 +869,20 @@ class TestTimeshift:
         assert len(full_shifted) == expected_padded_len
         assert len(full_weights) == expected_padded_len
 
+    @pytest.mark.parametrize("thelen", [100, 101])
+    def test_timeshift_block_matches_timeshift(self, thelen):
+        """Test that timeshift_block matches timeshift applied to each row."""
+        rng = np.random.default_rng(31415)
+        inputtcs = rng.normal(size=(20, thelen))
+        shifttrs = rng.uniform(-8.0, 8.0, size=20)
+        padtrs = 15
+
+        blockresults = tide_resample.timeshift_block(inputtcs, shifttrs, padtrs)
+        for i in range(inputtcs.shape[0]):
+            rowresults = tide_resample.timeshift(inputtcs[i, :], shifttrs[i], padtrs)
+            for rowresult, blockresult in zip(rowresults, blockresults):
+                np.testing.assert_allclose(blockresult[i, :], rowresult, atol=1e-10)
+
 
 # ============================================================================
 # Tests for timewarp function
@@ -348,6 +348,35 @@ class TestCorrelator:
         peak_time = timeaxis[peak_idx]
         assert np.abs(peak_time) < 1.0  # Peak should be near zero
 
+    @pytest.mark.parametrize("corrweighting", ["None", "phat", "liang", "eckart", "regressor"])
+    @pytest.mark.parametrize("corrpadding", [0, -1, 37])
+    def test_run_batch_matches_run(self, sample_filter, corrweighting, corrpadding):
+        """Test that run_batch reproduces run for every row of a block."""
+        rng = np.random.default_rng(1)
+        t = np.arange(300) / 2.0
+        reftc = np.sin(2 * np.pi * 0.05 * t) + 0.3 * rng.normal(size=len(t))
+        thetcs = np.array(
+            [np.roll(reftc, shift) + 0.5 * rng.normal(size=len(t)) for shift in range(-5, 6)]
+        )
+        corr = tide_simfunc.Correlator(
+            Fs=2.0,
+            ncprefilter=sample_filter,
+            corrweighting=corrweighting,
+            corrpadding=corrpadding,
+            lagmininpts=20,
+            lagmaxinpts=20,
+        )
+        corr.setreftc(reftc)
+
+        simfuncs, timeaxis, globalmaxes = corr.run_batch(thetcs)
+
+        assert simfuncs.shape == (thetcs.shape[0], 40)
+        for i in range(thetcs.shape[0]):
+            simfunc, rowtimeaxis, globalmax = corr.run(thetcs[i, :])
+            np.testing.assert_allclose(simfuncs[i, :], simfunc, atol=1e-12)
+            np.testing.assert_allclose(timeaxis, rowtimeaxis)
+            assert globalmaxes[i] == globalmax
+
 
 # ============================================================================
 # SimilarityFunctionFitter tests
@@ -666,6 +695,60 @@ class TestSimilarityFunctionFitter:
         assert maxindex == expected_index
         assert flipfac == 1.0
 
+    @pytest.mark.parametrize("peakfittype", ["gauss", "fastquad", "None", "COM"])
+    @pytest.mark.parametrize("bipolar", [False, True])
+    def test_fit_batch_matches_fit(self, sample_corrtimeaxis, peakfittype, bipolar):
+        """Test that fit_batch agrees with fit on every row of a block."""
+        rng = np.random.default_rng(3)
+        numfuncs = 60
+        corrfuncs = np.zeros((numfuncs, len(sample_corrtimeaxis)), dtype=float)
+        for i in range(numfuncs):
+            amp = rng.uniform(-0.3 if bipolar else 0.05, 0.95)
+            lag = rng.uniform(-7.0, 7.0)
+            sigma = rng.uniform(0.6, 4.0)
+            corrfuncs[i, :] = amp * np.exp(
+                -((sample_corrtimeaxis - lag) ** 2) / (2 * sigma**2)
+            ) + rng.choice([0.0, 0.01]) * rng.normal(size=len(sample_corrtimeaxis))
+        # rows that need the iterative path
+        corrfuncs[0, :] = 0.0
+        corrfuncs[1, :] = np.maximum(0.0, 0.7 - np.abs(sample_corrtimeaxis - 1.0) / 3.0)
+
+        fitter = tide_simfunc.SimilarityFunctionFitter(
+            corrtimeaxis=sample_corrtimeaxis,
+            lagmin=-5.0,
+            lagmax=5.0,
+            bipolar=bipolar,
+            peakfittype=peakfittype,
+        )
+        batchresults = fitter.fit_batch(corrfuncs)
+
+        assert fitter.batch_closedform_calls + fitter.batch_fallback_calls == numfuncs
+        if peakfittype == "COM":
+            assert fitter.batch_fallback_calls == numfuncs
+        else:
+            assert fitter.batch_closedform_calls > numfuncs // 2
+        for i in range(numfuncs):
+            singleresults = fitter.fit(corrfuncs[i, :])
+            for batchval, singleval in zip(batchresults, singleresults):
+                np.testing.assert_allclose(batchval[i], singleval, atol=1e-4)
+
+    def test_fit_batch_degenerate_row(self, sample_corrtimeaxis):
+        """Test that a single degenerate peak does not push the whole block onto fit."""
+        corrfuncs = np.zeros((3, len(sample_corrtimeaxis)), dtype=float)
+        for i, lag in enumerate([-2.0, 3.0]):
+            corrfuncs[i, :] = 0.8 * np.exp(-((sample_corrtimeaxis - lag) ** 2) / (2 * 1.5**2))
+        # a one point spike has too few points to fit a gaussian to
+        corrfuncs[2, 100] = 0.5
+
+        fitter = tide_simfunc.SimilarityFunctionFitter(
+            corrtimeaxis=sample_corrtimeaxis, lagmin=-5.0, lagmax=5.0
+        )
+        batchresults = fitter.fit_batch(corrfuncs)
+
+        assert fitter.batch_closedform_calls == 2
+        assert fitter.batch_fallback_calls == 1
+        np.testing.assert_allclose(batchresults[1][0:2], [-2.0, 3.0], atol=1e-6)
+
 
 # ============================================================================
 # FrequencyTracker tests
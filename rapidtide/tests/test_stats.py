@@ -19,6 +19,7 @@
 from unittest.mock import patch
 
 import numpy as np
+import pytest
 
 import rapidtide.stats as tide_stats
 
@@ -188,6 +189,53 @@ def timeseries_stats_tests(debug=False):
         assert np.isfinite(res[0])
 
 
+def icc_block_tests(debug=False):
+    if debug:
+        print("icc_block_tests")
+
+    rng = np.random.RandomState(4)
+    nvox, nsubjs, nsess = 50, 12, 3
+    subjecteffect = rng.randn(nvox, nsubjs, 1) * rng.uniform(0.0, 3.0, size=(nvox, 1, 1))
+    Y = subjecteffect + rng.randn(nvox, nsubjs, nsess) + rng.randn(nvox, 1, nsess)
+    # a constant voxel - the one voxel version only gets roundoff here, so just check for 0
+    Y[0, :, :] = 5.0
+    # identical sessions - no error variance and no session effect, but the one voxel version
+    # only gets roundoff for F here, so only ICC and r_var are compared with it
+    Y[1, :, 1:] = Y[1, :, 0:1]
+
+    loopresults = np.zeros((4, nvox), dtype=float)
+    for voxel in range(nvox):
+        theresult = tide_stats.fast_ICC_rep_anova(Y[voxel, :, :])
+        loopresults[:, voxel] = theresult[:4]
+        dfc, dfe = theresult[4:]
+
+    blockresults = tide_stats.fast_ICC_rep_anova_block(Y, debug=debug)
+    assert blockresults[4] == dfc
+    assert blockresults[5] == dfe
+    for i in range(4):
+        assert blockresults[i].shape == (nvox,)
+        np.testing.assert_allclose(blockresults[i][2:], loopresults[i, 2:], rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(
+        [blockresults[0][1], blockresults[1][1]], loopresults[:2, 1], rtol=1e-8, atol=1e-10
+    )
+    assert blockresults[0][0] == 0.0
+    assert blockresults[3][0] == 0.0
+    assert blockresults[3][1] == 0.0
+    assert blockresults[2][1] == 0.0
+    assert blockresults[0][1] == pytest.approx(1.0)
+    assert np.all(np.isfinite(blockresults[3]))
+
+    # chunking doesn't change the answer
+    chunkedresults = tide_stats.fast_ICC_rep_anova_block(
+        Y, maxbytes=(5 * 8 * 3 * nsubjs * nsess), debug=debug
+    )
+    for i in range(4):
+        np.testing.assert_array_equal(chunkedresults[i], blockresults[i])
+
+    with pytest.raises(ValueError):
+        tide_stats.fast_ICC_rep_anova_block(Y[0, :, :])
+
+
 def histogram_and_mask_tests(debug=False):
     if debug:
         print("histogram_and_mask_tests")
@@ -328,6 +376,7 @@ def test_stats(debug=False, displayplots=False):
     distribution_and_significance_tests(debug=debug)
     correlation_transform_tests(debug=debug)
     timeseries_stats_tests(debug=debug)
+    icc_block_tests(debug=debug)
     histogram_and_mask_tests(debug=debug)
 
 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+import os
+import shutil
+
+import numpy as np
+
+import rapidtide.statscache as tide_statscache
+from rapidtide.tests.utils import get_test_temp_path
+
+
+def _writefile(filename, contents):
+    with open(filename, "wb") as thefile:
+        thefile.write(contents)
+
+
+def masks_and_keys(debug=False):
+    themask = np.zeros((4, 5, 6), dtype=np.int16)
+    themask[1:3, :, 2:] = 1
+
+    # only the extent of the mask matters
+    assert tide_statscache.maskdigest(themask) == tide_statscache.maskdigest(themask * 2.5)
+    othermask = themask.copy()
+    othermask[0, 0, 0] = 1
+    assert tide_statscache.maskdigest(themask) != tide_statscache.maskdigest(othermask)
+    assert tide_statscache.maskdigest(themask) != tide_statscache.maskdigest(
+        themask.reshape((5, 4, 6))
+    )
+
+    thecache = tide_statscache.StatsCache("nonexistent.nii.gz")
+    key1 = thecache.makekey("histmetrics", themask, rangemin=0.0, rangemax=1.0)
+    key2 = thecache.makekey("histmetrics", themask, rangemax=1.0, rangemin=0.0)
+    key3 = thecache.makekey("histmetrics", themask, rangemin=-1.0, rangemax=1.0)
+    key4 = thecache.makekey("overlay", themask, rangemin=0.0, rangemax=1.0)
+    if debug:
+        print(key1, key3, key4)
+    assert key1 == key2
+    assert len({key1, key3, key4}) == 3
+
+    # a missing source file is never cached, and never an error
+    assert thecache.get(key1) is None
+    assert not thecache.put(key1, {"pct50": 1.0})
+    assert thecache.get(key1) == {"pct50": 1.0}
+
+    assert tide_statscache.tojson(
+        {"a": np.float32(1.5), "b": [np.int64(3), np.arange(2)], "c": None}
+    ) == {"a": 1.5, "b": [3, [0, 1]], "c": None}
+
+
+def roundtrip_and_invalidation(testtemproot, debug=False):
+    sourcename = os.path.join(testtemproot, "statscachetest.bin")
+    _writefile(sourcename, b"0123456789" * 100)
+    sidecarname = tide_statscache.statscachename(sourcename)
+    assert os.path.basename(sidecarname) == ".statscachetest.bin.statscache.json"
+    if os.path.isfile(sidecarname):
+        os.remove(sidecarname)
+
+    themask = np.ones((3, 3))
+    thecache = tide_statscache.StatsCache(sourcename)
+    thekey = thecache.makekey("test", themask)
+    assert thecache.get(thekey) is None
+    thestats = {"count": np.int64(9), "pcts": np.array([0.5, 1.5]), "name": "test"}
+    assert thecache.put(thekey, thestats)
+    assert os.path.isfile(sidecarname)
+    assert tide_statscache.StatsCache(sourcename).get(thekey) == {
+        "count": 9,
+        "pcts": [0.5, 1.5],
+        "name": "test",
+    }
+
+    # two cache objects on the same file don't lose each other's entries
+    othercache = tide_statscache.StatsCache(sourcename)
+    otherkey = othercache.makekey("other", themask)
+    assert othercache.put(otherkey, {"count": 1})
+    assert thecache.put(thecache.makekey("third", themask), {"count": 2})
+    reread = tide_statscache.StatsCache(sourcename)
+    assert reread.get(thekey)["count"] == 9
+    assert reread.get(otherkey)["count"] == 1
+
+    # a copy with a new modification time but the same contents keeps its cache
+    copyname = os.path.join(testtemproot, "statscachetest_copy.bin")
+    shutil.copyfile(sourcename, copyname)
+    shutil.copyfile(sidecarname, tide_statscache.statscachename(copyname))
+    os.utime(copyname, ns=(0, os.stat(sourcename).st_mtime_ns + 5000000000))
+    assert tide_statscache.StatsCache(copyname).get(thekey)["count"] == 9
+
+    # changing the contents invalidates it, even at the same size
+    _writefile(copyname, b"9876543210" * 100)
+    os.utime(copyname, ns=(0, os.stat(sourcename).st_mtime_ns + 5000000000))
+    assert tide_statscache.StatsCache(copyname).get(thekey) is None
+
+    # old entries are dropped once the cache is full
+    for i in range(tide_statscache.MAXENTRIES + 1):
+        thecache.put(thecache.makekey(f"fill{i}", themask), {"count": i})
+    reread = tide_statscache.StatsCache(sourcename)
+    assert reread.get(thekey) is None
+    assert reread.get(thecache.makekey(f"fill{tide_statscache.MAXENTRIES}", themask)) == {
+        "count": tide_statscache.MAXENTRIES
+    }
+    if debug:
+        print(f"{sidecarname}: {os.path.getsize(sidecarname)} bytes")
+
+    # if the sidecar can't be written, every entry stays available in memory
+    nowritename = os.path.join(testtemproot, "statscachetest_nowrite.bin")
+    _writefile(nowritename, b"0123456789" * 100)
+    nowritesidecar = tide_statscache.statscachename(nowritename)
+    if os.path.isfile(nowritesidecar):
+        os.remove(nowritesidecar)
+    os.makedirs(nowritesidecar, exist_ok=True)
+    nowritecache = tide_statscache.StatsCache(nowritename)
+    firstkey = nowritecache.makekey("first", themask)
+    secondkey = nowritecache.makekey("second", themask)
+    assert not nowritecache.put(firstkey, {"count": 1})
+    assert not nowritecache.put(secondkey, {"count": 2})
+    assert nowritecache.get(firstkey) == {"count": 1}
+    assert nowritecache.get(secondkey) == {"count": 2}
+
+
+def test_statscache(debug=False, local=False):
+    testtemproot = get_test_temp_path(local)
+
+    if debug:
+        print("masks_and_keys()")
+    masks_and_keys(debug=debug)
+
+    if debug:
+        print("roundtrip_and_invalidation(testtemproot)")
+    roundtrip_and_invalidation(testtemproot, debug=debug)
+
+
+if __name__ == "__main__":
+    test_statscache(debug=True, local=True)
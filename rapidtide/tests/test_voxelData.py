@@ -18,9 +18,11 @@
 #
 import os
 import sys
+import tempfile
 from types import SimpleNamespace
 from unittest.mock import patch
 
+import nibabel as nib
 import numpy as np
 import pytest
 
@@ -173,6 +175,29 @@ def voxeldata_readdata_nifti_tests(debug=False):
         assert v.byvol().shape == (2, 3, 4, 5)
 
 
+def voxeldata_lowmemload_tests(debug=False):
+    if debug:
+        print("voxeldata_lowmemload_tests")
+    data = np.random.randn(2, 3, 4, 5).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for suffix in [".nii", ".nii.gz"]:
+            filename = os.path.join(tmpdir, f"lowmem{suffix}")
+            nib.save(nib.Nifti1Image(data, np.eye(4)), filename)
+            v = tide_voxelData.VoxelData(filename, timestep=1.0, lowmemload=True)
+            assert v.byvol().dtype == np.float32
+            assert isinstance(v.byvol(), np.memmap) == (suffix == ".nii")
+            np.testing.assert_array_equal(v.byvoxel(), data.reshape(24, 5))
+
+            # writes to the data must not reach the file
+            v.byvol()[0, 0, 0, 0] = 1000.0
+            v.unload()
+            assert v.byvol()[0, 0, 0, 0] == data[0, 0, 0, 0]
+            v.unload()
+
+            vdouble = tide_voxelData.VoxelData(filename, timestep=1.0)
+            assert vdouble.byvol().dtype == np.float64
+
+
 def voxeldata_readdata_text_and_cifti_tests(debug=False):
     if debug:
         print("voxeldata_readdata_text_and_cifti_tests")
@@ -288,6 +313,7 @@ def test_voxelData(debug=False, displayplots=False):
     datavolume_tests(debug=debug)
     load_branch_tests(debug=debug)
     voxeldata_readdata_nifti_tests(debug=debug)
+    voxeldata_lowmemload_tests(debug=debug)
     voxeldata_readdata_text_and_cifti_tests(debug=debug)
     smooth_tests(debug=debug)
 
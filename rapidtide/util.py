@@ -16,6 +16,7 @@
 #   limitations under the License.
 #
 #
+import atexit
 import bisect
 import logging
 import os
@@ -29,16 +30,20 @@ from datetime import datetime
 from multiprocessing import shared_memory
 from typing import Any, Optional
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import pyfftw
 import scipy as sp
 from numpy.typing import NDArray
 
 import rapidtide._version as tide_versioneer
 import rapidtide.io as tide_io
+import rapidtide.multiproc as tide_multiproc
 from rapidtide.decorators import getdecoratorvars
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
+pd = lazyimport("pandas")
 
 # Use pyfftw as the backend for all scipy.fft operations
 sp.fft.set_backend(pyfftw.interfaces.scipy_fft)
@@ -2146,10 +2151,13 @@ def numpy2shared(
 
     Notes
     -----
-    The returned shared memory object must be explicitly closed and unlink
-    when no longer needed to free system resources. The shared memory block
-    will be automatically unlinked upon creation but can be accessed by other
-    processes using the same name.
+    The shared memory block is registered in ``sharedinputs``.  Release it
+    with ``cleanup_shm`` when it is no longer needed to free system resources.
+    If the workers of a pass may not be forked (another start method, or a
+    persistent worker pool), the block keeps its name so that they can attach
+    to it, and stays in /dev/shm until it is released or the process exits
+    normally - a process that is killed leaves it behind.  Otherwise it is
+    unlinked at once, and forked workers share it by inheritance.
 
     Examples
     --------
@@ -2160,17 +2168,10 @@ def numpy2shared(
     >>> print(shared_arr)
     [1 2 3 4 5]
     >>> # Clean up when done
-    >>> shared_arr.close()
-    >>> shm.close()
-    >>> shm.unlink()
+    >>> cleanup_shm(shm)
     """
-    # Create a shared memory block to store the array data
-    outnbytes = np.dtype(theouttype).itemsize * inarray.size
-    shm = shared_memory.SharedMemory(name=None, create=True, size=outnbytes)
-    shm.unlink()
-    inarray_shared = np.ndarray(inarray.shape, dtype=theouttype, buffer=shm.buf)
-    np.copyto(inarray_shared, inarray)  # Copy data to shared memory array
-    return inarray_shared, shm  # Return both the array and the shared memory object
+    # Create a registered shared memory block holding a copy of the array data
+    return sharedinputs.register(inarray, theouttype)
 
 
 def allocshared(
@@ -2203,9 +2204,15 @@ def allocshared(
 
     Notes
     -----
-    The returned shared memory object should be explicitly closed and unlink
-    when no longer needed to free system resources. The array can be accessed
-    from multiple processes, but care should be taken to avoid race conditions.
+    The shared memory block is registered in ``sharedinputs``.  Release it
+    with ``cleanup_shm`` when it is no longer needed to free system resources.
+    If the workers of a pass may not be forked (another start method, or a
+    persistent worker pool), the block keeps its name so that they can attach
+    to it, and stays in /dev/shm until it is released or the process exits
+    normally - a process that is killed leaves it behind.  Otherwise it is
+    unlinked at once, and forked workers share it by inheritance.  The array
+    can be accessed from multiple processes, but care should be taken to
+    avoid race conditions.
 
     Examples
     --------
@@ -2218,18 +2225,10 @@ def allocshared(
      [ 0.  0.  0.  0.]
      [ 0.  0.  0.  0.]]
     >>> # Don't forget to clean up
-    >>> shm.close()
-    >>> shm.unlink()
+    >>> cleanup_shm(shm)
     """
-    # Calculate size based on shape
-    thesize = np.prod(theshape)
-    # Determine the data type size
-    dtype_size = np.dtype(thetype).itemsize
-    # Create a shared memory block of the required size
-    shm = shared_memory.SharedMemory(name=None, create=True, size=thesize * dtype_size)
-    shm.unlink()
-    outarray = np.ndarray(theshape, dtype=thetype, buffer=shm.buf)
-    return outarray, shm  # Return both the array and the shared memory object
+    # Create a registered shared memory block of the required size
+    return sharedinputs.allocate(theshape, thetype)
 
 
 def allocarray(
@@ -2300,7 +2299,10 @@ def cleanup_shm(shm: shared_memory.SharedMemory | None) -> None:
     -----
     This function is designed to properly release shared memory resources.
     It should be called to clean up shared memory objects to prevent resource leaks.
-    If the shared memory object is None, the function performs no operation.
+    The block is unlinked at once, if it has not been already; its memory is
+    returned to the system when the last array using it goes away.  If the shared memory object is None,
+    or was not made by ``allocshared`` or ``numpy2shared``, the function
+    performs no operation.
 
     Examples
     --------
@@ -2310,7 +2312,271 @@ def cleanup_shm(shm: shared_memory.SharedMemory | None) -> None:
     >>> # Shared memory is now cleaned up
     """
     # Cleanup
-    pass
-    # if shm is not None:
-    #    shm.close()
-    #    shm.unlink()
+    sharedinputs.release(shm)
+
+
+class SharedArrayHandle:
+    """
+    Picklable reference to a numpy array stored in a named shared memory block.
+
+    Handles are what gets sent to worker processes in place of the array
+    itself, so that workers started with any multiprocessing start method
+    ("fork", "spawn" or "forkserver") can map the same physical memory
+    rather than inheriting or receiving a private copy.
+
+    Parameters
+    ----------
+    name : str
+        Name of the shared memory block.
+    shape : tuple of int
+        Shape of the array.
+    dtype : str
+        Data type of the array, as a numpy dtype string.
+    offset : int, optional
+        Byte offset of the first element from the start of the block.  Default is 0.
+    strides : tuple of int, optional
+        Strides of the array in bytes, for views of part of a block.  If None, the
+        array is C contiguous.  Default is None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        shape: tuple[int, ...],
+        dtype: str,
+        offset: int = 0,
+        strides: tuple[int, ...] | None = None,
+    ) -> None:
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.offset = offset
+        self.strides = None if strides is None else tuple(strides)
+
+    def __repr__(self) -> str:
+        therepr = f"SharedArrayHandle(name={self.name!r}, shape={self.shape}, dtype={self.dtype!r}"
+        if self.offset != 0 or self.strides is not None:
+            therepr += f", offset={self.offset}, strides={self.strides}"
+        return therepr + ")"
+
+    def attach(self) -> tuple[NDArray, shared_memory.SharedMemory]:
+        """
+        Map the shared memory block into this process.
+
+        Returns
+        -------
+        tuple[NDArray, shared_memory.SharedMemory]
+            The array view of the shared block, and the shared memory object,
+            which must be kept alive as long as the array is in use.
+        """
+        shm = shared_memory.SharedMemory(name=self.name, create=False)
+        thearray = np.ndarray(
+            self.shape,
+            dtype=np.dtype(self.dtype),
+            buffer=shm.buf,
+            offset=self.offset,
+            strides=self.strides,
+        )
+        return thearray, shm
+
+
+class SharedArrayRegistry:
+    """
+    Registry of shared memory blocks holding the inputs of voxelwise passes.
+
+    Named blocks keep their names until they are released, so worker
+    processes can attach to them by name, however they were started.  The
+    arrays made by ``allocshared`` and ``numpy2shared`` live in registered
+    blocks.  ``genericmultiproc.run_multiproc`` replaces any array in a named
+    block, or view of one, in its ``voxelargs`` with a ``SharedArrayHandle``,
+    so each input exists exactly once in physical memory regardless of the
+    number of workers or how they were started.  When every worker will be
+    forked, blocks are unlinked as soon as they are made instead (see
+    ``allocate``); the workers inherit them, and nothing is left in /dev/shm
+    if the process is killed.
+
+    Examples
+    --------
+    >>> thedata, theshm = sharedinputs.register(np.zeros((10, 100)), np.float64, named=True)
+    >>> sharedinputs.handlefor(thedata)
+    SharedArrayHandle(name='...', shape=(10, 100), dtype='<f8')
+    >>> sharedinputs.release(theshm)
+    """
+
+    def __init__(self) -> None:
+        self._blocks = {}
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __contains__(self, thearray: Any) -> bool:
+        return self.handlefor(thearray) is not None
+
+    def register(
+        self,
+        inarray: NDArray,
+        theouttype: np.dtype | None = None,
+        name: str | None = None,
+        named: bool | None = None,
+    ) -> tuple[NDArray, shared_memory.SharedMemory]:
+        """
+        Copy an array into a new shared memory block.
+
+        Parameters
+        ----------
+        inarray : NDArray
+            The array to share.
+        theouttype : dtype, optional
+            Data type of the shared array.  Default is the type of `inarray`.
+        name : str, optional
+            Name of the shared memory block.  If None, a unique name is generated.
+        named : bool, optional
+            As in ``allocate``.  Default is None.
+
+        Returns
+        -------
+        tuple[NDArray, shared_memory.SharedMemory]
+            The shared array, and the shared memory object backing it.  The
+            shared array should be used in place of `inarray` from then on.
+        """
+        if theouttype is None:
+            theouttype = inarray.dtype
+        inarray_shared, shm = self.allocate(inarray.shape, theouttype, name=name, named=named)
+        np.copyto(inarray_shared, inarray)
+        return inarray_shared, shm
+
+    def allocate(
+        self,
+        theshape: tuple[int, ...],
+        thetype: np.dtype,
+        name: str | None = None,
+        named: bool | None = None,
+    ) -> tuple[NDArray, shared_memory.SharedMemory]:
+        """
+        Allocate a zero filled array in a new shared memory block.
+
+        Parameters
+        ----------
+        theshape : tuple of int
+            Shape of the array.
+        thetype : dtype
+            Data type of the array.
+        name : str, optional
+            Name of the shared memory block.  If None, a unique name is generated.
+        named : bool, optional
+            If True, the block keeps its name until it is released, so that
+            workers can attach to it by name.  If False, it is unlinked at once;
+            forked workers still share it, but it has no handle.  If None, the
+            block is only named if some workers will not be forked (see
+            ``multiproc.workersforked``).  Default is None.
+
+        Returns
+        -------
+        tuple[NDArray, shared_memory.SharedMemory]
+            The shared array, and the shared memory object backing it.
+
+        Notes
+        -----
+        A named block stays in /dev/shm until it is released, or the registry
+        releases everything at exit.  If the process is killed (by SIGKILL or
+        the OOM killer, say) before then, the block is left behind and has to be
+        removed by hand.  Unnamed blocks are freed by the system whatever
+        happens to the process.
+        """
+        if named is None:
+            named = not tide_multiproc.workersforked()
+        outnbytes = max(1, int(np.prod(theshape)) * np.dtype(thetype).itemsize)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=outnbytes)
+        if not named:
+            shm.unlink()
+        outarray = np.ndarray(theshape, dtype=thetype, buffer=shm.buf)
+        self._blocks[shm.name] = (
+            shm,
+            SharedArrayHandle(shm.name, outarray.shape, np.dtype(thetype).str) if named else None,
+            outarray.__array_interface__["data"][0],
+        )
+        return outarray, shm
+
+    def handlefor(self, thearray: Any) -> SharedArrayHandle | None:
+        """
+        Find the handle of a registered array.
+
+        Parameters
+        ----------
+        thearray : Any
+            The object to look up.  The array returned by ``register`` matches,
+            and so does any view that lies entirely inside a registered block
+            (such as a slice of it) and has no negative strides.  Copies do not.
+
+        Returns
+        -------
+        SharedArrayHandle or None
+            The handle for the array, or None if it is not in a named registered
+            block.  For views, the handle records the offset and strides needed to
+            rebuild the view.
+        """
+        if not isinstance(thearray, np.ndarray) or thearray.size == 0:
+            return None
+        thepointer = thearray.__array_interface__["data"][0]
+        namedblocks = [theentry for theentry in self._blocks.values() if theentry[1] is not None]
+        for shm, thehandle, datapointer in namedblocks:
+            if (
+                (datapointer == thepointer)
+                and (thehandle.shape == thearray.shape)
+                and (thehandle.dtype == thearray.dtype.str)
+                and thearray.flags.c_contiguous
+            ):
+                return thehandle
+        if min(thearray.strides, default=0) < 0:
+            return None
+        lastbyte = thepointer + thearray.itemsize
+        for thelen, thestride in zip(thearray.shape, thearray.strides):
+            lastbyte += (thelen - 1) * thestride
+        for shm, thehandle, datapointer in namedblocks:
+            blockbytes = int(np.prod(thehandle.shape)) * np.dtype(thehandle.dtype).itemsize
+            if (datapointer <= thepointer) and (lastbyte <= datapointer + blockbytes):
+                return SharedArrayHandle(
+                    thehandle.name,
+                    thearray.shape,
+                    thearray.dtype.str,
+                    offset=thepointer - datapointer,
+                    strides=thearray.strides,
+                )
+        return None
+
+    def release(self, theblock: shared_memory.SharedMemory | str | None) -> None:
+        """
+        Close and unlink a registered block.
+
+        Parameters
+        ----------
+        theblock : shared_memory.SharedMemory, str, or None
+            The shared memory object returned by ``register``, or its name.
+            Unregistered blocks and None are ignored.
+        """
+        if theblock is None:
+            return
+        thename = theblock if isinstance(theblock, str) else theblock.name
+        theentry = self._blocks.pop(thename, None)
+        if theentry is not None:
+            shm, thehandle, datapointer = theentry
+            if thehandle is not None:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+            try:
+                shm.close()
+            except BufferError:
+                # arrays still refer to the buffer - the mapping goes away with them
+                pass
+
+    def releaseall(self) -> None:
+        """Close and unlink every registered block."""
+        for thename in list(self._blocks.keys()):
+            self.release(thename)
+
+
+# the registry used by the voxelwise passes
+sharedinputs = SharedArrayRegistry()
+atexit.register(sharedinputs.releaseall)
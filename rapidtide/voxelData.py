@@ -252,6 +252,8 @@ class VoxelData:
     cifti_hdr = None
     filetype = None
     resident = False
+    lowmemload = False
+    loaddtype = np.float32
 
     def __init__(
         self,
@@ -259,6 +261,8 @@ class VoxelData:
         timestep: float = 0.0,
         validstart: int | None = None,
         validend: int | None = None,
+        lowmemload: bool = False,
+        loaddtype: np.dtype = np.float32,
     ) -> None:
         """
         Initialize the object with filename and optional data reading parameters.
@@ -273,6 +277,12 @@ class VoxelData:
             Starting index for valid data range, default is None (all data).
         validend : int, optional
             Ending index for valid data range, default is None (all data).
+        lowmemload : bool, optional
+            If True, NIFTI data is read in `loaddtype` rather than float64, and uncompressed
+            files that are already stored in that type are memory mapped rather than read
+            into memory.  Default is False.
+        loaddtype : numpy dtype, optional
+            The dtype used for NIFTI data when `lowmemload` is True.  Default is np.float32.
 
         Returns
         -------
@@ -291,6 +301,8 @@ class VoxelData:
         """
 
         self.filename = filename
+        self.lowmemload = lowmemload
+        self.loaddtype = loaddtype
         self.readdata(timestep, validstart, validend)
 
     def readdata(self, timestep: float, validstart: int | None, validend: int | None) -> None:
@@ -589,7 +601,9 @@ class VoxelData:
         - For CIFTI files, data is read using tide_io.readfromcifti() and stored
           in multiple attributes including cifti_hdr and nim_hdr
         - For NIFTI files, data is read using tide_io.readfromnifti() and stored
-          in nim, nim_data, nim_hdr, thedims, and thesizes attributes
+          in nim, nim_data, nim_hdr, thedims, and thesizes attributes.  If
+          self.lowmemload is True, the data is read in self.loaddtype, and memory
+          mapped if possible.
         - The method sets self.resident = True upon successful completion
 
         Examples
@@ -620,9 +634,14 @@ class VoxelData:
                 ) = tide_io.readfromcifti(self.filename)
                 self.nim = None
             else:
-                self.nim, self.nim_data, self.nim_hdr, self.thedims, self.thesizes = (
-                    tide_io.readfromnifti(self.filename)
-                )
+                if self.lowmemload:
+                    self.nim, self.nim_data, self.nim_hdr, self.thedims, self.thesizes = (
+                        tide_io.readfromnifti(self.filename, dtype=self.loaddtype, mmap=True)
+                    )
+                else:
+                    self.nim, self.nim_data, self.nim_hdr, self.thedims, self.thesizes = (
+                        tide_io.readfromnifti(self.filename)
+                    )
         self.resident = True
 
     def reload(self) -> None:
@@ -22,12 +22,15 @@ from typing import Any
 
 import numpy as np
 from numpy.typing import NDArray
-from statsmodels.robust import mad
 
 import rapidtide.io as tide_io
 import rapidtide.maskutil as tide_mask
 import rapidtide.stats as tide_stats
 import rapidtide.workflows.parser_funcs as pf
+from rapidtide.lazyimport import lazyimportfrom
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+mad = lazyimportfrom("statsmodels.robust", "mad")
 
 
 def _get_parser() -> Any:
@@ -196,6 +196,7 @@ def calcSimFunc(
     interptype: str = "univariate",
     showprogressbar: bool = True,
     chunksize: int = 1000,
+    mpbatchsize: int = 1,
     rt_floattype: np.dtype = np.float64,
     mklthreads: int = 1,
     threaddebug: bool = False,
@@ -295,6 +296,9 @@ def calcSimFunc(
         Whether to show a progress bar. Default is True.
     chunksize : int, optional
         Size of chunks for processing. Default is 1000.
+    mpbatchsize : int, optional
+        Number of voxels sent to each worker per queue message when
+        multiprocessing. Default is 1.
     rt_floattype : np.dtype, optional
         Rapidtide floating-point data type. Default is np.float64.
     mklthreads : int, optional
@@ -392,6 +396,7 @@ def calcSimFunc(
             interptype=interptype,
             showprogressbar=showprogressbar,
             chunksize=chunksize,
+            mpbatchsize=mpbatchsize,
             rt_floattype=rt_floattype,
             debug=debug,
             usegpu=optiondict["usegpu"],
@@ -420,6 +425,7 @@ def calcSimFunc(
             interptype=interptype,
             showprogressbar=showprogressbar,
             chunksize=chunksize,
+            mpbatchsize=mpbatchsize,
             rt_floattype=rt_floattype,
             debug=debug,
             usegpu=optiondict["usegpu"],
@@ -452,6 +458,7 @@ def calcSimFunc(
                     showprogressbar=showprogressbar,
                     verbose=(LGR is not None),
                     chunksize=chunksize,
+                    mpbatchsize=mpbatchsize,
                     rt_floattype=rt_floattype,
                     debug=debug,
                 )
@@ -476,6 +483,7 @@ def calcSimFunc(
                 showprogressbar=showprogressbar,
                 verbose=(LGR is not None),
                 chunksize=chunksize,
+                mpbatchsize=mpbatchsize,
                 rt_floattype=rt_floattype,
                 debug=debug,
             )
@@ -58,7 +58,7 @@ def _get_parser() -> Any:
     - Several optional flags for controlling behavior:
         - `--demedian`: subtract median from each map before ICC calculation
         - `--demean`: subtract mean from each map before ICC calculation
-        - `--nocache`: disable caching for ICC calculation (not recommended)
+        - `--nocache`: calculate ICC one voxel at a time without caching (not recommended)
         - `--debug`: enable basic debugging output
         - `--deepdebug`: enable verbose debugging output
 
@@ -122,7 +122,8 @@ def _get_parser() -> Any:
         dest="nocache",
         action="store_true",
         help=(
-            "Disable caching for the ICC calculation.  This is a terrible idea.  Don't do this."
+            "Calculate ICC one voxel at a time, without caching, rather than for all voxels "
+            "at once.  This is a terrible idea.  Don't do this."
         ),
         default=False,
     )
@@ -447,25 +448,38 @@ def calctexticc(args: Any) -> None:
         print("done removing median values")
 
     print("calculating ICC")
-    iccstarttime = time.time()
-    for voxel in range(numvals):
-        # get the voxel data matrix
-        Y = validinvms[voxel, :, :]
-
-        if args.deepdebug:
+    if args.deepdebug:
+        for voxel in range(numvals):
+            Y = validinvms[voxel, :, :]
             print(f"shape of Y: {Y.shape}")
             for thevolume in range(Y.shape[1]):
                 print(f"\tY: {Y[:, thevolume]}")
 
-        # calculate ICC(3,1)
+    iccstarttime = time.time()
+    if args.nocache:
+        # the original one voxel at a time calculation, for comparison
+        for voxel in range(numvals):
+            # calculate ICC(3,1)
+            (
+                ICC_in_valid[voxel],
+                r_var_in_valid[voxel],
+                e_var_in_valid[voxel],
+                session_effect_F_in_valid[voxel],
+                dfc,
+                dfe,
+            ) = tide_stats.fast_ICC_rep_anova(
+                validinvms[voxel, :, :], nocache=args.nocache, debug=args.debug
+            )
+    else:
+        # calculate ICC(3,1) for all voxels at once
         (
-            ICC_in_valid[voxel],
-            r_var_in_valid[voxel],
-            e_var_in_valid[voxel],
-            session_effect_F_in_valid[voxel],
+            ICC_in_valid,
+            r_var_in_valid,
+            e_var_in_valid,
+            session_effect_F_in_valid,
             dfc,
             dfe,
-        ) = tide_stats.fast_ICC_rep_anova(Y, nocache=args.nocache, debug=args.debug)
+        ) = tide_stats.fast_ICC_rep_anova_block(validinvms, debug=args.debug)
     iccduration = time.time() - iccstarttime
 
     print(f"\ndfc: {dfc}, dfe: {dfe}")
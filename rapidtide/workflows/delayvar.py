@@ -892,14 +892,13 @@ def delayvar(args: Any) -> None:
             print(
                 f"calculating delayoffsets for {windowedfilteredregressderivratios.shape[0]} voxels"
             )
-        for i in range(windowedfilteredregressderivratios.shape[0]):
-            windoweddelayoffset[i, thewin], windowedclosestoffset[i, thewin] = (
-                tide_refinedelay.ratiotodelay(
-                    windowedfilteredregressderivratios[i, thewin],
-                    offset=lagstouse_valid[i],
-                    debug=args.focaldebug,
-                )
+        windoweddelayoffset[:, thewin], windowedclosestoffset[:, thewin] = (
+            tide_refinedelay.ratiotodelay_block(
+                windowedfilteredregressderivratios[:, thewin],
+                offsets=lagstouse_valid,
+                debug=args.focaldebug,
             )
+        )
         namesuffix = "_desc-delayoffset_hist"
         tide_stats.makeandsavehistogram(
             windoweddelayoffset[:, thewin],
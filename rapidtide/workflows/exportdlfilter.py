@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016-2026 Blaise Frederick
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#
+import argparse
+import os
+from typing import Any
+
+import rapidtide.dlfilternumpy as tide_dlfiltnumpy
+
+DEFAULT_MODELPATH = os.path.join(
+    os.path.split(os.path.split(os.path.split(__file__)[0])[0])[0],
+    "rapidtide",
+    "data",
+    "models",
+)
+
+
+def _get_parser() -> Any:
+    """
+    Argument parser for exportdlfilter.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        Configured argument parser object with defined arguments for `exportdlfilter`.
+
+    Examples
+    --------
+    >>> parser = _get_parser()
+    >>> args = parser.parse_args(["model_cnn_pytorch"])
+    >>> print(args.modelnames)
+    ['model_cnn_pytorch']
+    """
+    parser = argparse.ArgumentParser(
+        prog="exportdlfilter",
+        description=(
+            "Export trained pytorch deep learning filters so they can be applied "
+            "without importing pytorch."
+        ),
+        allow_abbrev=False,
+    )
+
+    # Required arguments
+    parser.add_argument(
+        "modelnames",
+        nargs="+",
+        metavar="MODELNAME",
+        help="The names of the models to export.",
+    )
+
+    # add optional arguments
+    parser.add_argument(
+        "--modelpath",
+        dest="modelpath",
+        action="store",
+        metavar="PATH",
+        type=str,
+        help=("Directory containing the models (default is the bundled model directory)."),
+        default=DEFAULT_MODELPATH,
+    )
+    parser.add_argument(
+        "--outputpath",
+        dest="outputpath",
+        action="store",
+        metavar="PATH",
+        type=str,
+        help=(
+            "Write the exported models to new model directories in PATH, rather than "
+            "into the source model directories."
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--verbose",
+        dest="verbose",
+        action="store_true",
+        help=("Print a lot of internal information."),
+        default=False,
+    )
+    return parser
+
+
+def exportdlfilter(args: Any) -> None:
+    """
+    Export deep learning filters for numpy inference.
+
+    Each model is written as a ``model.npz`` weight file that
+    `rapidtide.dlfilternumpy.DeepLearningFilter` can load.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments, from `_get_parser`.
+
+    Returns
+    -------
+    None
+    """
+    for modelname in args.modelnames:
+        outputname = tide_dlfiltnumpy.exportmodel(
+            args.modelpath, modelname, outputpath=args.outputpath, verbose=args.verbose
+        )
+        print(f"exported {modelname} to {outputname}")
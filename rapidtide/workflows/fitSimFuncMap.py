@@ -832,6 +832,7 @@ def fitSimFunc(
             initialdelayvalue=theinitialdelay,
             showprogressbar=optiondict["showprogressbar"],
             chunksize=optiondict["mp_chunksize"],
+            mpbatchsize=optiondict["mp_batchsize"],
             despeckle_thresh=optiondict["despeckle_thresh"],
             initiallags=initlags,
             rt_floattype=rt_floattype,
@@ -954,6 +955,7 @@ def fitSimFunc(
                             initialdelayvalue=theinitialdelay,
                             showprogressbar=optiondict["showprogressbar"],
                             chunksize=optiondict["mp_chunksize"],
+                            mpbatchsize=optiondict["mp_batchsize"],
                             despeckle_thresh=optiondict["despeckle_thresh"],
                             initiallags=initlags,
                             rt_floattype=rt_floattype,
@@ -1158,6 +1160,7 @@ def fitSimFunc(
                     initialdelayvalue=theinitialdelay,
                     showprogressbar=optiondict["showprogressbar"],
                     chunksize=optiondict["mp_chunksize"],
+                    mpbatchsize=optiondict["mp_batchsize"],
                     despeckle_thresh=optiondict["despeckle_thresh"],
                     initiallags=initlags_rd,
                     rt_floattype=rt_floattype,
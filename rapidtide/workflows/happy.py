@@ -39,10 +39,13 @@ import rapidtide.resample as tide_resample
 import rapidtide.stats as tide_stats
 import rapidtide.util as tide_util
 import rapidtide.voxelData as tide_voxelData
+from rapidtide.lazyimport import lazyimport
 
 from .utils import setup_logger
 
-from nilearn import masking
+# ---------------------------------------- Deferred imports -------------------------------------------
+masking = lazyimport("nilearn.masking")
+
 MIN_PULSATILITY_VOX_PCT = 7.0
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
@@ -133,15 +136,29 @@ def happy_main(argparsingfunc: Any) -> None:
     args = argparsingfunc
     infodict = vars(args)
 
+    modelpath = os.path.join(
+        os.path.split(os.path.split(os.path.split(__file__)[0])[0])[0],
+        "rapidtide",
+        "data",
+        "models",
+    )
     if args.usepytorch:
-        try:
-            import rapidtide.dlfiltertorch as tide_dlfilt
+        import rapidtide.dlfilternumpy as tide_dlfiltnumpy
 
+        if args.numpydlfilter and tide_dlfiltnumpy.hasexportedmodel(modelpath, args.modelname):
+            # the exported model gives the same answer without loading pytorch
+            tide_dlfilt = tide_dlfiltnumpy
             dlfilterexists = True
-            print("pytorch dlfilter initialized")
-        except ImportError:
-            dlfilterexists = False
-            print("pytorch dlfilter could not be initialized")
+            print("numpy dlfilter initialized")
+        else:
+            try:
+                import rapidtide.dlfiltertorch as tide_dlfilt
+
+                dlfilterexists = True
+                print("pytorch dlfilter initialized")
+            except ImportError:
+                dlfilterexists = False
+                print("pytorch dlfilter could not be initialized")
     else:
         try:
             import rapidtide.dlfilter as tide_dlfilt
@@ -899,12 +916,6 @@ def happy_main(argparsingfunc: Any) -> None:
                 if args.mpfix:
                     print("performing super dangerous openmp workaround")
                     os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
-                modelpath = os.path.join(
-                    os.path.split(os.path.split(os.path.split(__file__)[0])[0])[0],
-                    "rapidtide",
-                    "data",
-                    "models",
-                )
                 thedlfilter = tide_dlfilt.DeepLearningFilter(modelpath=modelpath)
                 thedlfilter.loadmodel(args.modelname)
                 infodict["dlfiltermodel"] = args.modelname
@@ -17,6 +17,7 @@
 #
 #
 import argparse
+import importlib.util
 from typing import Any, Optional
 
 import numpy as np
@@ -25,12 +26,8 @@ import rapidtide.io as tide_io
 import rapidtide.multiproc as tide_multiproc
 import rapidtide.workflows.parser_funcs as pf
 
-try:
-    import tensorflow as tf
-
-    tensorflowpresent = True
-except ImportError:
-    tensorflowpresent = False
+# only check that tensorflow is available - actually importing it takes a long time
+tensorflowpresent = importlib.util.find_spec("tensorflow") is not None
 
 DEFAULT_ALIASEDCORRELATIONWIDTH = 5.0
 DEFAULT_PULSATILITYSIGMA = 6.0
@@ -833,6 +830,16 @@ def _get_parser() -> Any:
         help="Disable the congrid value cache completely.",
         default=True,
     )
+    debug_opts.add_argument(
+        "--nonumpydlfilter",
+        dest="numpydlfilter",
+        action="store_false",
+        help=(
+            "Apply the deep learning filter with pytorch, even if the model has been exported "
+            "for numpy inference (which is faster to start and gives the same result)."
+        ),
+        default=True,
+    )
     if tensorflowpresent:
         debug_opts.add_argument(
             "--usetensorflow",
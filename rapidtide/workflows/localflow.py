@@ -24,6 +24,7 @@ from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
+from scipy import fft
 from tqdm import tqdm
 
 import rapidtide.correlate as tide_corr
@@ -31,6 +32,7 @@ import rapidtide.filter as tide_filt
 import rapidtide.fit as tide_fit
 import rapidtide.io as tide_io
 import rapidtide.miscmath as tide_math
+import rapidtide.multiproc as tide_multiproc
 import rapidtide.resample as tide_resample
 import rapidtide.stats as tide_stats
 import rapidtide.workflows.parser_funcs as pf
@@ -159,6 +161,19 @@ def _get_parser() -> Any:
         default=True,
     )
 
+    parser.add_argument(
+        "--nprocs",
+        dest="nprocs",
+        action="store",
+        type=int,
+        metavar="NPROCS",
+        help=(
+            "Use NPROCS worker processes to compute the local correlations. "
+            "Setting NPROCS to less than 1 sets the number of "
+            "worker processes to n_cpus."
+        ),
+        default=1,
+    )
     pf.addfilteropts(parser, filtertarget="data and regressors", details=True)
     pf.addwindowopts(parser, windowtype=DEFAULT_WINDOW_TYPE)
 
@@ -540,6 +555,337 @@ def index2xyz(theindex: Any, ysize: Any, zsize: Any) -> None:
     return x, y, z
 
 
+def makeneighborlist(
+    radius: float,
+    xdim: float,
+    ydim: float,
+    slicethickness: float,
+    dosphere: bool = True,
+) -> Tuple[List, List, Tuple[int, int, int]]:
+    """
+    Find the voxel offsets that make up a local neighborhood.
+
+    Parameters
+    ----------
+    radius : float
+        Neighborhood radius in mm.
+    xdim, ydim, slicethickness : float
+        Voxel dimensions in mm.
+    dosphere : bool, optional
+        If True, only keep offsets within `radius` of the center.  Otherwise keep the
+        whole enclosing box. Default is True.
+
+    Returns
+    -------
+    neighborlist : list of tuple
+        The (x, y, z) offset of each neighbor, in voxels, with x varying fastest.
+        The center voxel is not included.
+    distancelist : list of float
+        The distance to each neighbor in mm (only filled in when `dosphere` is True).
+    steps : tuple of int
+        The maximum offset along each axis.
+
+    Examples
+    --------
+    >>> neighborlist, distancelist, steps = makeneighborlist(2.5, 2.0, 2.0, 2.0)
+    >>> len(neighborlist)
+    6
+    """
+    xsteps = int(np.ceil(radius / xdim))
+    ysteps = int(np.ceil(radius / ydim))
+    zsteps = int(np.ceil(radius / slicethickness))
+    z, y, x = np.meshgrid(
+        np.arange(-zsteps, zsteps + 1),
+        np.arange(-ysteps, ysteps + 1),
+        np.arange(-xsteps, xsteps + 1),
+        indexing="ij",
+    )
+    x, y, z = x.ravel(), y.ravel(), z.ravel()
+    keep = (x != 0) | (y != 0) | (z != 0)
+    if dosphere:
+        distance = np.sqrt(
+            np.square(x * xdim) + np.square(y * ydim) + np.square(z * slicethickness)
+        )
+        keep &= distance <= radius
+        distancelist = distance[keep].tolist()
+    else:
+        distancelist = []
+    neighborlist = list(zip(x[keep].tolist(), y[keep].tolist(), z[keep].tolist()))
+    return neighborlist, distancelist, (xsteps, ysteps, zsteps)
+
+
+def _corrlocs_block(
+    spectra: NDArray,
+    rows1: NDArray,
+    rows2: NDArray,
+    nonzero: NDArray,
+    fftlen: int,
+    lagindices: NDArray,
+    trimtimeaxis: NDArray,
+    dofit: bool = False,
+    lagmin: float = -12.5,
+    lagmax: float = 12.5,
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    """
+    Find the cross-correlation peaks of a block of timecourse pairs.
+
+    Parameters
+    ----------
+    spectra : NDArray
+        Real FFT of each timecourse, zero padded to `fftlen`, one per row.
+    rows1, rows2 : NDArray
+        Rows of `spectra` holding the first and second timecourse of each pair.
+    nonzero : NDArray
+        True for the rows whose timecourses are not all zero.
+    fftlen : int
+        Length of the padded timecourses.
+    lagindices : NDArray
+        Positions in the circular cross-correlation of the lags in the search range.
+    trimtimeaxis : NDArray
+        The time of each lag in the search range, in seconds.
+    dofit : bool, optional
+        If True, fit each correlation peak, as in `getcorrloc`. Default is False.
+    lagmin, lagmax : float, optional
+        Lag limits for the peak fit, in seconds. Defaults are -12.5 and 12.5.
+
+    Returns
+    -------
+    tuple of NDArray
+        maxcorr, maxtime, maskval and failreason for each pair, as returned by
+        `getcorrloc`.
+    """
+    numpairs = len(rows1)
+    maxcorr = np.zeros(numpairs, dtype=float)
+    maxtime = np.zeros(numpairs, dtype=float)
+    maskval = np.zeros(numpairs, dtype=int)
+    failreason = np.zeros(numpairs, dtype=int)
+    dopair = np.where(nonzero[rows1] & nonzero[rows2])[0]
+    if len(dopair) == 0:
+        return maxcorr, maxtime, maskval, failreason
+
+    # correlate every pair at once, keeping only the lags in the search range
+    trimsimfuncs = fft.irfft(
+        spectra[rows1[dopair]] * np.conj(spectra[rows2[dopair]]), n=fftlen, axis=-1
+    )[:, lagindices]
+    if dofit:
+        for thepair, trimsimfunc in zip(dopair, trimsimfuncs):
+            (
+                dummy,
+                maxtime[thepair],
+                maxcorr[thepair],
+                dummy,
+                maskval[thepair],
+                failreason[thepair],
+                dummy,
+                dummy,
+            ) = tide_fit.simfuncpeakfit(
+                trimsimfunc,
+                trimtimeaxis,
+                useguess=False,
+                maxguess=0.0,
+                displayplots=False,
+                functype="correlation",
+                peakfittype="gauss",
+                searchfrac=0.5,
+                lagmod=1000.0,
+                enforcethresh=True,
+                lagmin=lagmin,
+                lagmax=lagmax,
+                absmaxsigma=1000.0,
+                absminsigma=0.25,
+                hardlimit=True,
+                bipolar=False,
+                lthreshval=0.0,
+                uthreshval=1.0,
+                zerooutbadfit=True,
+                debug=False,
+            )
+    else:
+        maxtime[dopair] = trimtimeaxis[np.argmax(trimsimfuncs, axis=1)]
+        maxcorr[dopair] = np.max(trimsimfuncs, axis=1)
+        maskval[dopair] = 1
+    return maxcorr, maxtime, maskval, failreason
+
+
+def localcorrelations(
+    thedata: NDArray,
+    themask: NDArray,
+    neighborlist: List,
+    Fs: float,
+    dofit: bool = False,
+    lagmin: float = -12.5,
+    lagmax: float = 12.5,
+    negsearch: float = 15.0,
+    possearch: float = 15.0,
+    nprocs: int = 1,
+    blocksize: int = 1000,
+    showprogressbar: bool = True,
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    """
+    Correlate every voxel in a mask with each of its neighbors.
+
+    This gives the same results as calling `getcorrloc` on every (voxel, neighbor)
+    pair, but the timecourses are transformed only once, and each neighbor offset is
+    handled as a single block operation over all of the voxels that have a neighbor
+    at that offset.  Offsets are divided among `nprocs` worker processes.
+
+    Parameters
+    ----------
+    thedata : NDArray
+        Preprocessed timecourses, shape (xsize, ysize, numslices, timepoints).
+    themask : NDArray
+        3D mask.  Voxels with values > 0 are correlated with their neighbors that are
+        also in the mask.
+    neighborlist : list of tuple
+        The (x, y, z) voxel offset of each neighbor.
+    Fs : float
+        Sampling frequency of the timecourses in Hz.
+    dofit : bool, optional
+        If True, fit each correlation peak. Default is False.
+    lagmin, lagmax : float, optional
+        Lag limits for the peak fit, in seconds. Defaults are -12.5 and 12.5.
+    negsearch, possearch : float, optional
+        Search range for negative and positive lags in seconds. Defaults are 15.0.
+    nprocs : int, optional
+        Number of worker processes. Default is 1.
+    blocksize : int, optional
+        Number of voxel pairs correlated at once, which sets the size of the
+        temporary arrays. Default is 1000.
+    showprogressbar : bool, optional
+        Whether to show a progress bar. Default is True.
+
+    Returns
+    -------
+    corrcoeffs, delays, corrvalid, failreason : NDArray
+        Arrays of shape (xsize, ysize, numslices, len(neighborlist)) holding the
+        peak correlation, the delay in seconds, the fit mask and the fit failure
+        reason for each voxel and neighbor.  Entries for pairs that were not
+        correlated are zero.
+
+    Examples
+    --------
+    >>> neighborlist, distancelist, steps = makeneighborlist(10.5, 2.0, 2.0, 2.0)
+    >>> corrcoeffs, delays, corrvalid, failreason = localcorrelations(
+    ...     osfmridata, themask, neighborlist, 2.0 / tr, nprocs=8
+    ... )
+    """
+    xsize, ysize, numslices, timepoints = thedata.shape
+    numspatiallocs = xsize * ysize * numslices
+    numneighbors = len(neighborlist)
+    corrcoeffs = np.zeros((xsize, ysize, numslices, numneighbors), dtype=float)
+    delays = np.zeros((xsize, ysize, numslices, numneighbors), dtype=float)
+    corrvalid = np.zeros((xsize, ysize, numslices, numneighbors), dtype=int)
+    failreason = np.zeros((xsize, ysize, numslices, numneighbors), dtype=int)
+
+    # transform every voxel in the mask once
+    maskvoxels = np.where(themask.reshape(numspatiallocs) > 0)[0]
+    voxelrow = np.full(numspatiallocs, -1, dtype=np.int64)
+    voxelrow[maskvoxels] = np.arange(len(maskvoxels))
+    masktcs = thedata.reshape((numspatiallocs, timepoints))[maskvoxels, :]
+    nonzero = np.any(masktcs != 0.0, axis=1)
+    fftlen = tide_corr.fastfftlen(2 * timepoints - 1)
+    spectra = fft.rfft(masktcs, n=fftlen, axis=-1)
+    del masktcs
+
+    # the lags and times that getcorrloc looks at
+    similarityfunclen = 2 * timepoints - 1
+    similarityfuncorigin = similarityfunclen // 2 + 1
+    trimstart = max(similarityfuncorigin - int(negsearch * Fs), 0)
+    trimend = min(similarityfuncorigin + int(possearch * Fs), similarityfunclen)
+    fullindices = np.arange(trimstart, trimend)
+    lagindices = (fullindices - (timepoints - 1)) % fftlen
+    trimtimeaxis = (
+        np.arange(0.0, similarityfunclen) * (1.0 / Fs)
+        - ((similarityfunclen - 1) * (1.0 / Fs)) / 2.0
+    )[fullindices]
+
+    maskx, masky, maskz = np.unravel_index(maskvoxels, (xsize, ysize, numslices))
+
+    def _procOneOffset(neighboridx):
+        # find the voxels with a neighbor in the mask at this offset
+        xoff, yoff, zoff = neighborlist[neighboridx]
+        nx, ny, nz = maskx + xoff, masky + yoff, maskz + zoff
+        inbounds = np.where(
+            (nx >= 0) & (nx < xsize) & (ny >= 0) & (ny < ysize) & (nz >= 0) & (nz < numslices)
+        )[0]
+        rows2 = voxelrow[
+            np.ravel_multi_index(
+                (nx[inbounds], ny[inbounds], nz[inbounds]), (xsize, ysize, numslices)
+            )
+        ]
+        rows1 = inbounds[rows2 >= 0]
+        rows2 = rows2[rows2 >= 0]
+        results = [np.zeros(len(rows1), dtype=thetype) for thetype in [float, float, int, int]]
+        for blockstart in range(0, len(rows1), blocksize):
+            blockend = blockstart + blocksize
+            blockresults = _corrlocs_block(
+                spectra,
+                rows1[blockstart:blockend],
+                rows2[blockstart:blockend],
+                nonzero,
+                fftlen,
+                lagindices,
+                trimtimeaxis,
+                dofit=dofit,
+                lagmin=lagmin,
+                lagmax=lagmax,
+            )
+            for theresult, theblockresult in zip(results, blockresults):
+                theresult[blockstart:blockend] = theblockresult
+        return neighboridx, maskvoxels[rows1], results
+
+    if nprocs > 1:
+        # define the consumer function here so it inherits most of the arguments
+        def localcorr_consumer(inQ, outQ):
+            while True:
+                try:
+                    # get a new message
+                    val = inQ.get()
+
+                    # this is the 'TERM' signal
+                    if val is None:
+                        break
+
+                    # process and send the data
+                    outQ.put(_procOneOffset(val))
+
+                except Exception as e:
+                    print("error!", e)
+                    break
+
+        data_out = tide_multiproc.run_multiproc(
+            localcorr_consumer,
+            (numneighbors, 1),
+            None,
+            nprocs=nprocs,
+            procunit="neighbor offsets",
+            showprogressbar=showprogressbar,
+            chunksize=numneighbors,
+        )
+    else:
+        data_out = [
+            _procOneOffset(neighboridx)
+            for neighboridx in tqdm(
+                range(numneighbors),
+                desc="Neighbor offset",
+                unit="offsets",
+                disable=(not showprogressbar),
+            )
+        ]
+
+    # unpack the results
+    corrcoeffs_byvox = corrcoeffs.reshape((numspatiallocs, numneighbors))
+    delays_byvox = delays.reshape((numspatiallocs, numneighbors))
+    corrvalid_byvox = corrvalid.reshape((numspatiallocs, numneighbors))
+    failreason_byvox = failreason.reshape((numspatiallocs, numneighbors))
+    for neighboridx, voxels, results in data_out:
+        corrcoeffs_byvox[voxels, neighboridx] = results[0]
+        delays_byvox[voxels, neighboridx] = results[1]
+        corrvalid_byvox[voxels, neighboridx] = results[2]
+        failreason_byvox[voxels, neighboridx] = results[3]
+    return corrcoeffs, delays, corrvalid, failreason
+
+
 def localflow(args: Any) -> None:
     """
     Perform local flow analysis on fMRI data.
@@ -621,6 +967,9 @@ def localflow(args: Any) -> None:
     # postprocess filter options
     theobj, theprefilter = pf.postprocessfilteropts(args)
 
+    if args.nprocs < 1:
+        args.nprocs = tide_multiproc.maxcpus()
+
     # save timinginfo
     eventtimes = []
     starttime = time.time()
@@ -740,25 +1089,9 @@ def localflow(args: Any) -> None:
     thistime = time.time() - starttime
     eventtimes.append(["Find neighbors start", thistime, thistime - lasttime, None, None])
     args.dosphere = True
-    xsteps = int(np.ceil(args.radius / xdim))
-    ysteps = int(np.ceil(args.radius / ydim))
-    zsteps = int(np.ceil(args.radius / slicethickness))
-
-    neighborlist = []
-    distancelist = []
-    for z in range(-zsteps, zsteps + 1):
-        for y in range(-ysteps, ysteps + 1):
-            for x in range(-xsteps, xsteps + 1):
-                if args.dosphere:
-                    distance = np.sqrt(
-                        np.square(x * xdim) + np.square(y * ydim) + np.square(z * slicethickness)
-                    )
-                    if (x != 0 or y != 0 or z != 0) and distance <= args.radius:
-                        neighborlist.append((x, y, z))
-                        distancelist.append(distance)
-                else:
-                    if x != 0 or y != 0 or z != 0:
-                        neighborlist.append((x, y, z))
+    neighborlist, distancelist, (xsteps, ysteps, zsteps) = makeneighborlist(
+        args.radius, xdim, ydim, slicethickness, dosphere=args.dosphere
+    )
     tide_io.writenpvecs(np.transpose(np.asarray(neighborlist)), f"{args.outputroot}_neighbors")
     if args.debug:
         print(f"{len(neighborlist)=}, {neighborlist=}")
@@ -767,103 +1100,28 @@ def localflow(args: Any) -> None:
     eventtimes.append(
         ["Find neighbors done", thistime, thistime - lasttime, len(neighborlist), "voxels"]
     )
-
-    corrcoeffs = np.zeros((xsize, ysize, numslices, len(neighborlist)), dtype=float)
-    delays = np.zeros((xsize, ysize, numslices, len(neighborlist)), dtype=float)
-    corrvalid = np.zeros((xsize, ysize, numslices, len(neighborlist)), dtype=int)
-    failreason = np.zeros((xsize, ysize, numslices, len(neighborlist)), dtype=int)
-    if args.debug:
-        print(f"{corrcoeffs.shape=}, {delays.shape=}, {corrvalid.shape=}")
-        printfirstdetails = True
-    else:
-        printfirstdetails = False
-
-    corrcoeffs_byvox = corrcoeffs.reshape((numspatiallocs, len(neighborlist)))
-    delays_byvox = delays.reshape((numspatiallocs, len(neighborlist)))
-    corrvalid_byvox = corrvalid.reshape((numspatiallocs, len(neighborlist)))
-    failreason_byvox = failreason.reshape((numspatiallocs, len(neighborlist)))
-
-    # Find every voxel's valid neighbors
-    lasttime = thistime
-    thistime = time.time() - starttime
-    eventtimes.append(
-        ["Generate correlation list start", thistime, thistime - lasttime, None, None]
-    )
-    print("Generate the correlation list", flush=True)
-    indexlist = []
-    indexpairs = []
-    theindex = 0
-    for index1 in tqdm(
-        range(numspatiallocs),
-        desc="Voxel",
-        unit="voxels",
-        disable=(not args.showprogressbar),
-    ):
-        if themask_byvox[index1] > 0:
-            # voxel is in the mask
-            x, y, z = index2xyz(index1, ysize, numslices)
-            for idx, neighbor in enumerate(neighborlist):
-                index2 = xyz2index(
-                    x + neighbor[0],
-                    y + neighbor[1],
-                    z + neighbor[2],
-                    xsize,
-                    ysize,
-                    numslices,
-                )
-                if index2 > 0:
-                    # neighbor location is valid
-                    if themask_byvox[index2] > 0:
-                        # neighbor is in the mask
-                        indexpairs.append((index1, index2, idx, theindex + 0))
-            theindex += 1
-            indexlist.append(index1)
-    print("...done", flush=True)
-    print("\n", flush=True)
-    lasttime = thistime
-    thistime = time.time() - starttime
-    eventtimes.append(
-        [
-            "Generate correlation list done",
-            thistime,
-            thistime - lasttime,
-            len(indexpairs),
-            "correlation pairs",
-        ]
-    )
+    indexlist = np.where(themask_byvox > 0)[0]
     tide_io.writenpvecs(np.transpose(np.asarray(indexlist)), f"{args.outputroot}_indexlist")
 
     # Do the correlations
     lasttime = thistime
     thistime = time.time() - starttime
     eventtimes.append(["Do correlations start", thistime, thistime - lasttime, None, None])
-    print(f"Process {len(indexpairs)} correlations", flush=True)
-    for index1, index2, neighboridx, theindex in tqdm(
-        indexpairs,
-        desc="Correlation pair",
-        unit="pairs",
-        disable=(not args.showprogressbar),
-    ):
-        # print(index1, index2, neighboridx, theindex)
-        (
-            corrcoeffs_byvox[index1, neighboridx],
-            delays_byvox[index1, neighboridx],
-            corrvalid_byvox[index1, neighboridx],
-            failreason_byvox[index1, neighboridx],
-        ) = getcorrloc(
-            osfmridata_voxbytime,
-            index1,
-            index2,
-            oversamplefactor * Fs,
-            dofit=args.dofit,
-            debug=printfirstdetails,
-        )
-        neighborloc = (
-            (neighborlist[neighboridx])[0] + xsteps,
-            (neighborlist[neighboridx])[1] + ysteps,
-            (neighborlist[neighboridx])[2] + zsteps,
-        )
-        # print(neighborlist[neighboridx], neighborloc)
+    print(f"Process {len(neighborlist)} neighbor offsets", flush=True)
+    corrcoeffs, delays, corrvalid, failreason = localcorrelations(
+        osfmridata_voxbytime.reshape((xsize, ysize, numslices, ostimepoints)),
+        themask,
+        neighborlist,
+        oversamplefactor * Fs,
+        dofit=args.dofit,
+        nprocs=args.nprocs,
+        showprogressbar=args.showprogressbar,
+    )
+    if args.debug:
+        print(f"{corrcoeffs.shape=}, {delays.shape=}, {corrvalid.shape=}")
+    corrcoeffs_byvox = corrcoeffs.reshape((numspatiallocs, len(neighborlist)))
+    delays_byvox = delays.reshape((numspatiallocs, len(neighborlist)))
+    corrvalid_byvox = corrvalid.reshape((numspatiallocs, len(neighborlist)))
     print("...done", flush=True)
     print("\n", flush=True)
     lasttime = thistime
@@ -873,8 +1131,8 @@ def localflow(args: Any) -> None:
             "Do correlations done",
             thistime,
             thistime - lasttime,
-            len(indexpairs),
-            "correlation pairs",
+            len(neighborlist),
+            "neighbor offsets",
         ]
     )
 
@@ -918,48 +1176,23 @@ def localflow(args: Any) -> None:
 
     numneighbors = np.zeros((xsize, ysize, numslices), dtype=int)
     numneighbors_byvox = numneighbors.reshape((numspatiallocs))
+    # only use the neighbors with a good enough correlation
+    useneighbor = (corrvalid_byvox > 0) & (np.fabs(corrcoeffs_byvox) > args.ampthresh)
+    numneighbors_byvox[:] = np.sum(useneighbor, axis=1)
+    weighteddelays = np.sum(np.where(useneighbor, delays_byvox * corrcoeffs_byvox, 0.0), axis=1)
+    weightsum = np.sum(np.where(useneighbor, corrcoeffs_byvox, 0.0), axis=1)
+    hasneighbors = numneighbors_byvox > 0
+
     # loop over passes
     for thepass in tqdm(
         range(1, args.npasses), desc="Pass", unit="passes", disable=(not args.showprogressbar)
     ):
-        # loop over voxels
-        for thearrayindex, thecoordindex in enumerate(indexlist):
-            deltasum = 0.0
-            numneighbors_byvox[thecoordindex] = 0
-            for whichneighbor in range(len(neighborlist)):
-                if (
-                    corrvalid_byvox[
-                        thecoordindex,
-                        whichneighbor,
-                    ]
-                    > 0
-                    and np.fabs(
-                        corrcoeffs_byvox[
-                            thecoordindex,
-                            whichneighbor,
-                        ]
-                    )
-                    > args.ampthresh
-                ):
-                    thediff = (
-                        delays_byvox[
-                            thecoordindex,
-                            whichneighbor,
-                        ]
-                        - targetdelay_byvox[thecoordindex, thepass - 1]
-                    )
-                    thenorm = corrcoeffs_byvox[
-                        thecoordindex,
-                        whichneighbor,
-                    ]
-                    numneighbors_byvox[thecoordindex] += 1
-                    # deltasum += thediff * thenorm * thenorm / distancelist[whichneighbor]
-                    deltasum += thediff * thenorm
-            if numneighbors_byvox[thecoordindex] > 0:
-                targetdelay_byvox[thecoordindex, thepass] = (
-                    gain * targetdelay_byvox[thecoordindex, thepass - 1]
-                    + deltasum / numneighbors_byvox[thecoordindex]
-                )
+        # sum of (delay - previous target) * corrcoeff over the neighbors used
+        deltasum = weighteddelays - targetdelay_byvox[:, thepass - 1] * weightsum
+        targetdelay_byvox[hasneighbors, thepass] = (
+            gain * targetdelay_byvox[hasneighbors, thepass - 1]
+            + deltasum[hasneighbors] / numneighbors_byvox[hasneighbors]
+        )
     print("...done", flush=True)
     print("\n", flush=True)
     lasttime = thistime
@@ -173,7 +173,8 @@ def _get_parser(calctype: str = "icc") -> Any:
             dest="nocache",
             action="store_true",
             help=(
-                "Disable caching for the ICC calculation.  This is a terrible idea.  Don't do this."
+                "Calculate ICC one voxel at a time, without caching, rather than for all voxels "
+                "at once.  This is a terrible idea.  Don't do this."
             ),
             default=False,
         )
@@ -560,30 +561,43 @@ def niftistats_main(calctype: str = "icc") -> None:
         e_var_in_valid = np.zeros((numvalid), dtype=float)
         session_effect_F_in_valid = np.zeros((numvalid), dtype=float)
 
-        iccstarttime = time.time()
-        for voxel in tqdm(
-            range(0, numvalid),
-            desc="Voxel",
-            unit="voxels",
-            disable=(not args.showprogressbar),
-        ):
-            # get the voxel data matrix
-            Y = validinvms[voxel, :, :]
-
-            if args.deepdebug:
+        if args.deepdebug:
+            for voxel in range(0, numvalid):
+                Y = validinvms[voxel, :, :]
                 print(f"shape of Y: {Y.shape}")
                 for thevolume in range(Y.shape[1]):
                     print(f"\tY: {Y[:, thevolume]}")
 
-            # calculate ICC(3,1)
+        iccstarttime = time.time()
+        if args.nocache:
+            # the original one voxel at a time calculation, for comparison
+            for voxel in tqdm(
+                range(0, numvalid),
+                desc="Voxel",
+                unit="voxels",
+                disable=(not args.showprogressbar),
+            ):
+                # calculate ICC(3,1)
+                (
+                    ICC_in_valid[voxel],
+                    r_var_in_valid[voxel],
+                    e_var_in_valid[voxel],
+                    session_effect_F_in_valid[voxel],
+                    dfc,
+                    dfe,
+                ) = tide_stats.fast_ICC_rep_anova(
+                    validinvms[voxel, :, :], nocache=args.nocache, debug=args.debug
+                )
+        else:
+            # calculate ICC(3,1) for all voxels at once
             (
-                ICC_in_valid[voxel],
-                r_var_in_valid[voxel],
-                e_var_in_valid[voxel],
-                session_effect_F_in_valid[voxel],
+                ICC_in_valid,
+                r_var_in_valid,
+                e_var_in_valid,
+                session_effect_F_in_valid,
                 dfc,
                 dfe,
-            ) = tide_stats.fast_ICC_rep_anova(Y, nocache=args.nocache, debug=args.debug)
+            ) = tide_stats.fast_ICC_rep_anova_block(validinvms, debug=args.debug)
         iccduration = time.time() - iccstarttime
 
         print(f"\ndfc: {dfc}, dfe: {dfe}")
@@ -1791,9 +1791,10 @@ def addpermutationopts(parser: argparse.ArgumentParser, numreps: int = 10000) ->
 
     Notes
     -----
-    The function adds two main arguments to the parser:
+    The function adds three main arguments to the parser:
     1. ``--permutationmethod``: Specifies the permutation method ('shuffle' or 'phaserandom')
     2. ``--numnull``: Sets the number of null correlations for significance testing
+    3. ``--nullseed``: Sets the seed used to generate the null correlations
 
     Examples
     --------
@@ -1829,6 +1830,19 @@ def addpermutationopts(parser: argparse.ArgumentParser, numreps: int = 10000) ->
         ),
         default=numreps,
     )
+    sigcalc_opts.add_argument(
+        "--nullseed",
+        dest="nullseed",
+        action="store",
+        type=int,
+        metavar="SEED",
+        help=(
+            "Seed for the random number generator used to make the null correlations, to make "
+            "the significance thresholds reproducible.  The results do not depend on the number "
+            "of processes used.  Default is to pick a new seed every run."
+        ),
+        default=None,
+    )
 
 
 def addsearchrangeopts(
@@ -27,7 +27,6 @@ from typing import Any, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
-from scipy.stats import rankdata
 
 import rapidtide.calccoherence as tide_calccoherence
 import rapidtide.calcnullsimfunc as tide_nullsimfunc
@@ -55,9 +54,13 @@ import rapidtide.workflows.refineDelayMap as tide_refineDelayMap
 import rapidtide.workflows.refineRegressor as tide_refineRegressor
 import rapidtide.workflows.regressfrommaps as tide_regressfrommaps
 from rapidtide.ffttools import showfftcache
+from rapidtide.lazyimport import lazyimportfrom
 
 from .utils import setup_logger
 
+# ---------------------------------------- Deferred imports -------------------------------------------
+rankdata = lazyimportfrom("scipy.stats", "rankdata")
+
 try:
     import mkl
 
@@ -72,6 +75,9 @@ TimingLGR = logging.getLogger("TIMING")
 global rt_floattype
 rt_floattype: np.dtype = np.float64
 
+# number of voxels temporally filtered together in one call to apply_block
+FILTERBLOCKSIZE = 10000
+
 
 def checkforzeromean(thedataset: Any) -> bool:
     """
@@ -393,6 +399,8 @@ def rapidtide_main(argparsingfunc: Any) -> None:
     # set the number of worker processes if multiprocessing
     if optiondict["nprocs"] < 1:
         optiondict["nprocs"] = tide_multiproc.maxcpus(reservecpu=optiondict["reservecpu"])
+    tide_multiproc.setstartmethod(optiondict["mpstartmethod"])
+    LGR.debug(f"voxelwise pass workers will be started with {optiondict['mpstartmethod']}")
 
     if optiondict["singleproc_confoundregress"]:
         optiondict["nprocs_confoundregress"] = 1
@@ -442,6 +450,11 @@ def rapidtide_main(argparsingfunc: Any) -> None:
         tide_util.enablemkl(optiondict["mklthreads"], debug=optiondict["threaddebug"])
         LGR.info(f"using {optiondict['mklthreads']} MKL threads")
 
+    # start the worker pool while the process is still small - all the voxelwise passes reuse it
+    if optiondict["workerpool"] and (optiondict["nprocs"] > 1 or optiondict["alwaysmultiproc"]):
+        LGR.info(f"starting a pool of {optiondict['nprocs']} worker processes")
+        tide_multiproc.startworkerpool(optiondict["nprocs"])
+
     # Generate MemoryLGR output file with column names
     tide_util.logmem()
 
@@ -450,7 +463,9 @@ def rapidtide_main(argparsingfunc: Any) -> None:
     ####################################################
     # read the fmri datafile
     tide_util.logmem("before reading in input data")
-    theinputdata = tide_voxelData.VoxelData(inputdatafilename, timestep=optiondict["realtr"])
+    theinputdata = tide_voxelData.VoxelData(
+        inputdatafilename, timestep=optiondict["realtr"], lowmemload=optiondict["lowmemload"]
+    )
     if optiondict["debug"]:
         theinputdata.summarize()
     xsize, ysize, numslices, timepoints = theinputdata.getdims()
@@ -796,7 +811,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
     if optiondict["sharedmem"]:
         LGR.info("moving fmri data to shared memory")
         TimingLGR.verbose("Start moving fmri_data to shared memory")
-        fmri_data_valid, fmri_data_valid_shm = tide_util.numpy2shared(
+        fmri_data_valid, fmri_data_valid_shm = tide_util.sharedinputs.register(
             fmri_data_valid, rt_floattype, name=f"fmri_data_valid_{optiondict['pid']}"
         )
         TimingLGR.verbose("End moving fmri_data to shared memory")
@@ -1848,6 +1863,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
             refineweighting=optiondict["refineweighting"],
             refinetype=optiondict["refinetype"],
             pcacomponents=optiondict["pcacomponents"],
+            pcasolver=optiondict["pcasolver"],
             windowfunc=optiondict["windowfunc"],
             passes=optiondict["passes"],
             maxpasses=optiondict["maxpasses"],
@@ -1920,6 +1936,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
             interptype=optiondict["interptype"],
             showprogressbar=optiondict["showprogressbar"],
             chunksize=optiondict["mp_chunksize"],
+            mpbatchsize=optiondict["mp_batchsize"],
             rt_floattype=rt_floattype,
             usegpu=optiondict["usegpu"],
             device=optiondict["gpu_device"],
@@ -2083,6 +2100,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
             interptype=optiondict["interptype"],
             showprogressbar=optiondict["showprogressbar"],
             chunksize=optiondict["mp_chunksize"],
+            mpbatchsize=optiondict["mp_batchsize"],
             rt_floattype=rt_floattype,
             usegpu=optiondict["usegpu"],
             device=optiondict["gpu_device"],
@@ -2356,6 +2374,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
                 showprogressbar=optiondict["showprogressbar"],
                 chunksize=optiondict["mp_chunksize"],
                 permutationmethod=optiondict["permutationmethod"],
+                seed=optiondict["nullseed"],
                 rt_floattype=np.float64,
             )
             tide_util.enablemkl(optiondict["mklthreads"], debug=optiondict["threaddebug"])
@@ -2500,6 +2519,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
             interptype=optiondict["interptype"],
             showprogressbar=optiondict["showprogressbar"],
             chunksize=optiondict["mp_chunksize"],
+            mpbatchsize=optiondict["mp_batchsize"],
             rt_floattype=rt_floattype,
             threaddebug=optiondict["threaddebug"],
             debug=optiondict["debug"],
@@ -2970,7 +2990,11 @@ def rapidtide_main(argparsingfunc: Any) -> None:
                     f"reading in {optiondict['denoisesourcefile']} for sLFO filter, please wait"
                 )
                 sourcename = optiondict["denoisesourcefile"]
-                theinputdata = tide_voxelData.VoxelData(sourcename, timestep=optiondict["realtr"])
+                theinputdata = tide_voxelData.VoxelData(
+                    sourcename,
+                    timestep=optiondict["realtr"],
+                    lowmemload=optiondict["lowmemload"],
+                )
                 theinputdata.setvalidtimes(validstart, validend)
                 theinputdata.setvalidvoxels(validvoxels)
 
@@ -2985,19 +3009,21 @@ def rapidtide_main(argparsingfunc: Any) -> None:
             if optiondict["preservefiltering"]:
                 LGR.info("reapplying temporal filters...")
                 LGR.info(f"fmri_data_valid.shape: {fmri_data_valid.shape}")
-                for i in range(len(validvoxels)):
-                    filteredtc = theprefilter.apply(
-                        optiondict["fmrifreq"], fmri_data_valid[i, :] + 0.0
+                for startvox in range(0, len(validvoxels), FILTERBLOCKSIZE):
+                    fmri_data_valid[startvox : startvox + FILTERBLOCKSIZE, :] = (
+                        theprefilter.apply_block(
+                            optiondict["fmrifreq"],
+                            fmri_data_valid[startvox : startvox + FILTERBLOCKSIZE, :],
+                        )
                     )
-                    fmri_data_valid[i, :] = filteredtc + 0.0
                 LGR.info("...done")
 
             # move fmri_data_valid into shared memory
             if optiondict["sharedmem"]:
-                tide_util.cleanup_shm(fmri_data_valid_shm)
+                tide_util.sharedinputs.release(fmri_data_valid_shm)
                 LGR.info("moving fmri data to shared memory")
                 TimingLGR.info("Start moving fmri_data to shared memory")
-                fmri_data_valid, fmri_data_valid_shm = tide_util.numpy2shared(
+                fmri_data_valid, fmri_data_valid_shm = tide_util.sharedinputs.register(
                     fmri_data_valid,
                     rt_floattype,
                     name=f"fmri_data_valid_regressionfilt_{optiondict['pid']}",
@@ -3214,6 +3240,8 @@ def rapidtide_main(argparsingfunc: Any) -> None:
                     nprocs_regressionfilt=optiondict["nprocs_regressionfilt"],
                     regressderivs=optiondict["regressderivs"],
                     chunksize=optiondict["mp_chunksize"],
+                    mpbatchsize=optiondict["mp_batchsize"],
+                    lagbankstep=optiondict["lagbankstep"],
                     showprogressbar=optiondict["showprogressbar"],
                     alwaysmultiproc=optiondict["alwaysmultiproc"],
                     debug=optiondict["debug"],
@@ -3738,9 +3766,12 @@ def rapidtide_main(argparsingfunc: Any) -> None:
         if optiondict["refinedelay"]:
             # filter the fmri data to the lfo band
             print("filtering fmri_data to sLFO band")
-            for i in range(fmri_data_valid.shape[0]):
-                fmri_data_valid[i, :] = theprefilter.apply(
-                    optiondict["fmrifreq"], fmri_data_valid[i, :]
+            for startvox in range(0, fmri_data_valid.shape[0], FILTERBLOCKSIZE):
+                fmri_data_valid[startvox : startvox + FILTERBLOCKSIZE, :] = (
+                    theprefilter.apply_block(
+                        optiondict["fmrifreq"],
+                        fmri_data_valid[startvox : startvox + FILTERBLOCKSIZE, :],
+                    )
                 )
 
             print("rerunning sLFO fit to get filtered R value")
@@ -3770,6 +3801,8 @@ def rapidtide_main(argparsingfunc: Any) -> None:
                 nprocs_regressionfilt=optiondict["nprocs_regressionfilt"],
                 regressderivs=optiondict["regressderivs"],
                 chunksize=optiondict["mp_chunksize"],
+                mpbatchsize=optiondict["mp_batchsize"],
+                lagbankstep=optiondict["lagbankstep"],
                 showprogressbar=optiondict["showprogressbar"],
                 alwaysmultiproc=optiondict["alwaysmultiproc"],
                 debug=optiondict["debug"],
@@ -3799,7 +3832,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
 
         del fmri_data_valid
         if optiondict["sharedmem"]:
-            tide_util.cleanup_shm(fmri_data_valid_shm)
+            tide_util.sharedinputs.release(fmri_data_valid_shm)
 
         del sLFOfitmean
         del rvalue
@@ -4096,6 +4129,7 @@ def rapidtide_main(argparsingfunc: Any) -> None:
             tide_util.cleanup_shm(filtereddata_shm)
             tide_util.cleanup_shm(movingsignal_shm)
 
+    tide_multiproc.stopworkerpool()
     TimingLGR.info("Finished saving maps")
     LGR.info("done")
 
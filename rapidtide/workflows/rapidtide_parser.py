@@ -75,6 +75,7 @@ DEFAULT_PEAKFIT_TYPE = "gauss"
 DEFAULT_REFINE_PRENORM = "var"
 DEFAULT_REFINE_WEIGHTING = "None"
 DEFAULT_REFINE_PCACOMPONENTS = 0.8
+DEFAULT_REFINE_PCASOLVER = "full"
 DEFAULT_REGRESSIONFILTDERIVS = 0
 
 DEFAULT_DENOISING_LAGMIN = -10.0
@@ -1203,6 +1204,21 @@ def _get_parser() -> Any:
         ),
         default=DEFAULT_REFINE_PCACOMPONENTS,
     )
+    reg_ref.add_argument(
+        "--pcasolver",
+        dest="pcasolver",
+        action="store",
+        type=str,
+        choices=["full", "randomized", "incremental"],
+        help=(
+            'Solver used for PCA refinement.  "full" does an exact SVD of all the refine voxels, '
+            '"randomized" uses a randomized SVD, and "incremental" fits the voxels in blocks, which '
+            "is faster and uses much less memory for large refine masks.  The approximate solvers "
+            "report the fraction of the variance their components actually explain.  "
+            f'Default is "{DEFAULT_REFINE_PCASOLVER}".'
+        ),
+        default=DEFAULT_REFINE_PCASOLVER,
+    )
     reg_ref.add_argument(
         "--convergencethresh",
         dest="convergencethresh",
@@ -1428,6 +1444,20 @@ def _get_parser() -> Any:
         ),
         default=False,
     )
+    perf.add_argument(
+        "--lagbankstep",
+        dest="lagbankstep",
+        action="store",
+        type=lambda x: pf.is_float(parser, x, minval=0.001),
+        metavar="STEP",
+        help=(
+            "When making the voxel specific sLFO regressors, precompute the regressor on a "
+            "grid of lags STEP seconds apart and interpolate between them, rather than "
+            "resampling it separately for every voxel.  Much faster on large datasets.  "
+            "0.01 is a reasonable value.  Default is to resample every voxel."
+        ),
+        default=None,
+    )
     """    
     perf.add_argument(
         "--usegpu",
@@ -1506,6 +1536,16 @@ def _get_parser() -> Any:
         ),
         default="double",
     )
+    misc.add_argument(
+        "--lowmemload",
+        dest="lowmemload",
+        action="store_true",
+        help=(
+            "Read the input NIFTI data in single precision rather than double, memory mapping "
+            "uncompressed files when possible, to reduce the memory needed to load large datasets."
+        ),
+        default=False,
+    )
     misc.add_argument(
         "--dpoutput",
         dest="outputprecision",
@@ -1554,6 +1594,30 @@ def _get_parser() -> Any:
         help=("Disable use of shared memory for large array storage."),
         default=True,
     )
+    misc.add_argument(
+        "--mpstartmethod",
+        dest="mpstartmethod",
+        action="store",
+        type=str,
+        choices=["fork", "spawn", "forkserver"],
+        help=(
+            "How to start the worker processes for the voxelwise passes.  Workers attach to the "
+            "input data in shared memory by name, so every method uses a single copy of the "
+            'data.  "spawn" and "forkserver" avoid the problems of forking a process that has '
+            'started threads.  Default is "fork".'
+        ),
+        default="fork",
+    )
+    misc.add_argument(
+        "--noworkerpool",
+        dest="workerpool",
+        action="store_false",
+        help=(
+            "Start new worker processes for every voxelwise pass, rather than starting them once "
+            "and reusing them for the whole run."
+        ),
+        default=True,
+    )
     pf.addtagopts(misc)
 
     # Experimental options (not fully tested, may not work)
@@ -2208,6 +2272,8 @@ def process_args(inputargs: Optional[Any] = None) -> Tuple[Any, object]:
     # The fraction of the main peak over which points are included in the peak
     args["searchfrac"] = 0.5
     args["mp_chunksize"] = 500
+    # number of voxels sent to a worker process in each queue message
+    args["mp_batchsize"] = 50
     args["patchminsize"] = DEFAULT_PATCHMINSIZE
     args["patchfwhm"] = DEFAULT_PATCHFWHM
 
@@ -154,7 +154,7 @@ def refineDelay(
     1. Computes regression derivative ratios using `getderivratios`.
     2. Filters these ratios using `filterderivratios`.
     3. Trains a ratio-to-delay mapping using `trainratiotooffset`.
-    4. Converts ratios to delay offsets using `ratiotodelay`.
+    4. Converts ratios to delay offsets using `ratiotodelay_block`.
     5. Saves a histogram of delay offsets to disk.
 
     Examples
@@ -221,13 +221,10 @@ def refineDelay(
     )
 
     # now calculate the delay offsets
-    delayoffset = np.zeros_like(filteredregressderivratios)
     if debug:
         print(f"calculating delayoffsets for {filteredregressderivratios.shape[0]} voxels")
-    for i in range(filteredregressderivratios.shape[0]):
-        delayoffset[i], closestoffset = tide_refinedelay.ratiotodelay(
-            filteredregressderivratios[i]
-        )
+    delayoffset, closestoffset = tide_refinedelay.ratiotodelay_block(filteredregressderivratios)
+    delayoffset = delayoffset.astype(filteredregressderivratios.dtype)
 
     namesuffix = "_desc-delayoffset_hist"
     tide_stats.makeandsavehistogram(
@@ -71,6 +71,7 @@ class RegressorRefiner:
         refineweighting: Optional[Any] = None,
         refinetype: str = "pca",
         pcacomponents: float = 0.8,
+        pcasolver: str = "full",
         dodispersioncalc: bool = False,
         dispersioncalc_lower: float = -5.0,
         dispersioncalc_upper: float = 5.0,
@@ -155,6 +156,8 @@ class RegressorRefiner:
             Type of refinement to perform ("pca", "ica", etc.) (default is "pca").
         pcacomponents : float, optional
             Fraction of PCA components to retain (default is 0.8).
+        pcasolver : str, optional
+            Solver for PCA refinement: "full", "randomized", or "incremental" (default is "full").
         dodispersioncalc : bool, optional
             Whether to perform dispersion calculation (default is False).
         dispersioncalc_lower : float, optional
@@ -279,6 +282,7 @@ class RegressorRefiner:
         self.refineweighting = refineweighting
         self.refinetype = refinetype
         self.pcacomponents = pcacomponents
+        self.pcasolver = pcasolver
         self.dodispersioncalc = dodispersioncalc
         self.dispersioncalc_lower = dispersioncalc_lower
         self.dispersioncalc_upper = dispersioncalc_upper
@@ -768,6 +772,7 @@ class RegressorRefiner:
             self.outputname,
             detrendorder=self.detrendorder,
             pcacomponents=self.pcacomponents,
+            pcasolver=self.pcasolver,
             dodispersioncalc=self.dodispersioncalc,
             dispersioncalc_lower=self.dispersioncalc_lower,
             dispersioncalc_upper=self.dispersioncalc_upper,
@@ -53,6 +53,8 @@ def regressfrommaps(
     nprocs_regressionfilt: int = 1,
     regressderivs: int = 0,
     chunksize: int = 50000,
+    mpbatchsize: int = 1,
+    lagbankstep: Optional[float] = None,
     showprogressbar: bool = True,
     alwaysmultiproc: bool = False,
     saveEVsandquit: bool = False,
@@ -120,6 +122,12 @@ def regressfrommaps(
         Order of derivatives to include in regressors (default is 0).
     chunksize : int, optional
         Size of chunks for processing (default is 50000).
+    mpbatchsize : int, optional
+        Number of voxels sent to each worker per queue message when
+        multiprocessing (default is 1).
+    lagbankstep : float, optional
+        If set, build the lagged timecourses from a bank of regressors precomputed on a
+        grid of lags this far apart, in seconds (default is None, resample every voxel).
     showprogressbar : bool, optional
         Whether to show progress bar (default is True).
     alwaysmultiproc : bool, optional
@@ -186,6 +194,7 @@ def regressfrommaps(
         print(f"\t{nprocs_regressionfilt=}")
         print(f"\t{regressderivs=}")
         print(f"\t{chunksize=}")
+        print(f"\t{mpbatchsize=}")
         print(f"\t{showprogressbar=}")
         print(f"\t{alwaysmultiproc=}")
         print(f"\t{mode=}")
@@ -212,6 +221,8 @@ def regressfrommaps(
         alwaysmultiproc=alwaysmultiproc,
         showprogressbar=showprogressbar,
         chunksize=chunksize,
+        mpbatchsize=mpbatchsize,
+        lagbankstep=lagbankstep,
         rt_floattype=rt_floattype,
         debug=debug,
     )
@@ -277,6 +288,7 @@ def regressfrommaps(
         showprogressbar=showprogressbar,
         verbose=(LGR is not None),
         chunksize=chunksize,
+        mpbatchsize=mpbatchsize,
         rt_floattype=rt_floattype,
         debug=debug,
     )
@@ -20,13 +20,16 @@ import argparse
 from argparse import Namespace
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 from numpy.typing import NDArray
 
 import rapidtide.io as tide_io
 import rapidtide.resample as tide_resample
 import rapidtide.workflows.parser_funcs as pf
+from rapidtide.lazyimport import lazyimport
+
+# ---------------------------------------- Deferred imports -------------------------------------------
+plt = lazyimport("matplotlib.pyplot")
 
 
 def _get_parser() -> Any:
@@ -83,6 +83,16 @@ def _get_parser() -> Any:
         "with integral values listed in VALSPEC are used.  If using an aparc+aseg file, set to APARC_WHITE.",
         default=None,
     )
+    parser.add_argument(
+        "--nostatscache",
+        dest="statscache",
+        action="store_false",
+        help=(
+            "Recalculate all map statistics, rather than reusing the ones cached next to the maps "
+            "by previous runs (or by tidepool)."
+        ),
+        default=True,
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -110,6 +120,8 @@ def runqualitycheck(args: Any) -> None:
             Specification for gray matter masking
         - whitemaskspec : str, optional
             Specification for white matter masking
+        - statscache : bool, optional
+            Flag to reuse and save cached map statistics
         - debug : bool, optional
             Flag to enable debug mode
 
@@ -130,6 +142,7 @@ def runqualitycheck(args: Any) -> None:
     ...         self.inputfileroot = "sub-01_task-rest"
     ...         self.graymaskspec = "gray_mask.nii.gz"
     ...         self.whitemaskspec = "white_mask.nii.gz"
+    ...         self.statscache = True
     ...         self.debug = False
     ...
     >>> args = Args()
@@ -139,6 +152,7 @@ def runqualitycheck(args: Any) -> None:
         args.inputfileroot,
         graymaskspec=args.graymaskspec,
         whitemaskspec=args.whitemaskspec,
+        statscache=args.statscache,
         debug=args.debug,
     )
     tide_io.writedicttojson(
@@ -872,6 +872,7 @@ def showxcorrx(args: Any) -> None:
             numestreps=args.numestreps,
             showprogressbar=args.showprogressbar,
             permutationmethod=args.permutationmethod,
+            seed=args.nullseed,
             nprocs=args.nprocs,
         )
 
@@ -903,6 +904,7 @@ def showxcorrx(args: Any) -> None:
             numestreps=args.numestreps,
             showprogressbar=args.showprogressbar,
             permutationmethod=args.permutationmethod,
+            seed=args.nullseed,
             nprocs=args.nprocs,
         )
 
@@ -395,6 +395,9 @@ def addDataset(
         forceoffset=forceoffset,
         offsettime=offsettime,
         verbose=verbosity,
+        lazy=True,
+        statscache=True,
+        backgroundload=False,
     )
     if len(thesubjects) > 0:
         # check to see that the dimensions match
@@ -4320,6 +4323,9 @@ def activateDataset(
         overlays["atlas"].setGeomMask(thegeommask)
         overlays["atlas"].setFuncMask(overlays["atlasmask"].data)
 
+    # now that the masks are in place, read the rest of the maps while the first view is drawn
+    currentdataset.startbackgroundload()
+
     if not panesinitialized:
         if verbosity > 0:
             for theoverlay in overlays: